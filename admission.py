@@ -0,0 +1,228 @@
+# admission.py - Overload protection: per-client token buckets and a cap on concurrent model calls
+import asyncio
+import hashlib
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager, contextmanager
+
+import metrics
+
+
+class RateLimitedError(Exception):
+    """The client is over its request rate: answer 429 with Retry-After."""
+
+    def __init__(self, retry_after):
+        super().__init__("Too many requests, please slow down")
+        self.retry_after = retry_after
+
+
+class OverloadedError(Exception):
+    """No model capacity left (wait queue full or wait timed out): answer 503 with Retry-After."""
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def retry_after_header(seconds):
+    """Whole seconds, at least 1, as the Retry-After header wants them."""
+    return str(max(1, int(math.ceil(seconds))))
+
+
+def _key_hash(api_key):
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()
+
+
+class RateLimiter:
+    """
+    Token bucket per client: `per_minute` tokens refill per minute, up to `burst` saved up.
+    Every request draws from the bucket of its IP address; a request that sends one of the
+    configured api_keys also draws from that key's bucket. Unknown keys are ignored, so a
+    made-up key per request never buys a fresh bucket. Buckets of the least recently seen
+    clients are dropped past max_clients.
+    """
+
+    def __init__(self, per_minute=20, burst=10, max_clients=10000, api_keys=()):
+        self.rate = per_minute / 60.0
+        self.burst = burst
+        self.max_clients = max_clients
+        self._api_keys = frozenset(_key_hash(key) for key in api_keys)
+        self._buckets = OrderedDict()  # client -> (tokens, updated_at)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        """CV_RATE_LIMIT_* environment variables; CV_RATE_LIMIT_PER_MINUTE=0 disables rate limiting."""
+        per_minute = float(os.environ.get("CV_RATE_LIMIT_PER_MINUTE", "20"))
+        if per_minute <= 0:
+            return None
+        api_keys = [key.strip() for key in os.environ.get("CV_RATE_LIMIT_API_KEYS", "").split(",") if key.strip()]
+        return cls(per_minute=per_minute, burst=float(os.environ.get("CV_RATE_LIMIT_BURST", "10")),
+                   api_keys=api_keys)
+
+    def clients(self, address, api_key=None):
+        """Buckets a request draws from: its address, plus its API key when that key is configured."""
+        clients = ["ip:" + (address or "unknown")]
+        if api_key:
+            digest = _key_hash(api_key)
+            if digest in self._api_keys:
+                clients.append("key:" + digest)
+        return clients
+
+    def acquire(self, *clients):
+        """
+        Take one token from every client's bucket, or none when any of them is empty; raises
+        RateLimitedError with the wait until all of them have a token.
+        """
+        now = time.monotonic()
+        with self._lock:
+            buckets = {}
+            for client in clients:
+                tokens, updated_at = self._buckets.pop(client, (self.burst, now))
+                buckets[client] = min(self.burst, tokens + (now - updated_at) * self.rate)
+            allowed = all(tokens >= 1 for tokens in buckets.values())
+            for client, tokens in buckets.items():
+                self._buckets[client] = (tokens - 1 if allowed else tokens, now)
+            while len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+        if not allowed:
+            metrics.ADMISSION_REJECTIONS.inc(reason="rate_limit")
+            raise RateLimitedError(max((1 - tokens) / self.rate for tokens in buckets.values()))
+
+
+class ConcurrencyLimiter:
+    """
+    At most max_in_flight model calls at once in this process; up to max_waiting more wait
+    (at most wait_timeout seconds) for a free slot and anything beyond that is refused
+    straight away, so a spike becomes quick 503s instead of a pile of upstream timeouts.
+    Retry-After is estimated from how long calls have recently held a slot.
+    """
+
+    def __init__(self, max_in_flight=8, max_waiting=16, wait_timeout=30):
+        self.max_in_flight = max_in_flight
+        self.max_waiting = max_waiting
+        self.wait_timeout = wait_timeout
+        self.in_flight = 0
+        self.waiting = 0
+        self._average_hold = 10.0  # seconds, moving average of slot hold times
+        self._condition = threading.Condition()
+
+    @classmethod
+    def from_env(cls):
+        """CV_LLM_* environment variables; CV_LLM_MAX_IN_FLIGHT=0 removes the cap."""
+        max_in_flight = int(os.environ.get("CV_LLM_MAX_IN_FLIGHT", "8"))
+        if max_in_flight <= 0:
+            return None
+        return cls(
+            max_in_flight=max_in_flight,
+            max_waiting=int(os.environ.get("CV_LLM_MAX_WAITING", "16")),
+            wait_timeout=float(os.environ.get("CV_LLM_WAIT_TIMEOUT", "30")),
+        )
+
+    def retry_after(self):
+        """Rough seconds until a newcomer would get a slot."""
+        return min(60.0, max(1.0, self._average_hold * (self.waiting + 1) / self.max_in_flight))
+
+    def _refuse(self, message):
+        metrics.ADMISSION_REJECTIONS.inc(reason="llm_capacity")
+        raise OverloadedError(message, self.retry_after())
+
+    def check_capacity(self):
+        """Refuse new work up front when the wait queue is already full."""
+        if self.in_flight >= self.max_in_flight and self.waiting >= self.max_waiting:
+            self._refuse("The service is busy, please retry shortly")
+
+    @contextmanager
+    def slot(self, bounded=True):
+        """
+        Hold one model-call slot for the duration of the block.
+        bounded=False waits as long as it takes, outside the queue limit (bulk work that
+        has its own concurrency cap and no user waiting on a single answer).
+        """
+        requested = time.perf_counter()
+        with self._condition:
+            if self.in_flight >= self.max_in_flight:
+                if bounded and self.waiting >= self.max_waiting:
+                    self._refuse("The service is busy, please retry shortly")
+                self.waiting += 1
+                try:
+                    free = self._condition.wait_for(
+                        lambda: self.in_flight < self.max_in_flight,
+                        timeout=self.wait_timeout if bounded else None,
+                    )
+                finally:
+                    self.waiting -= 1
+                if not free:
+                    self._refuse("Timed out waiting for model capacity, please retry shortly")
+            self.in_flight += 1
+        acquired = time.perf_counter()
+        metrics.STAGE_SECONDS.observe(acquired - requested, stage="llm_wait")
+        try:
+            yield
+        finally:
+            with self._condition:
+                self.in_flight -= 1
+                self._average_hold += 0.2 * ((time.perf_counter() - acquired) - self._average_hold)
+                self._condition.notify()
+
+
+class AsyncConcurrencyLimiter(ConcurrencyLimiter):
+    """
+    ConcurrencyLimiter for coroutines on one event loop (asgi.py): waiting for a slot awaits
+    instead of blocking the thread. An awaiting CV costs a few kilobytes, not a thread, so the
+    defaults are far higher than the threaded limiter's.
+    """
+
+    def __init__(self, max_in_flight=256, max_waiting=512, wait_timeout=30):
+        super().__init__(max_in_flight, max_waiting, wait_timeout)
+        self._semaphore = asyncio.Semaphore(max_in_flight)
+
+    @classmethod
+    def from_env(cls):
+        """CV_ASYNC_LLM_* environment variables; CV_ASYNC_LLM_MAX_IN_FLIGHT=0 removes the cap."""
+        max_in_flight = int(os.environ.get("CV_ASYNC_LLM_MAX_IN_FLIGHT", "256"))
+        if max_in_flight <= 0:
+            return None
+        return cls(
+            max_in_flight=max_in_flight,
+            max_waiting=int(os.environ.get("CV_ASYNC_LLM_MAX_WAITING", "512")),
+            wait_timeout=float(os.environ.get("CV_LLM_WAIT_TIMEOUT", "30")),
+        )
+
+    @asynccontextmanager
+    async def slot(self, bounded=True):
+        requested = time.perf_counter()
+        if self._semaphore.locked():
+            if bounded and self.waiting >= self.max_waiting:
+                self._refuse("The service is busy, please retry shortly")
+            self.waiting += 1
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), self.wait_timeout if bounded else None)
+            except asyncio.TimeoutError:
+                self._refuse("Timed out waiting for model capacity, please retry shortly")
+            finally:
+                self.waiting -= 1
+        else:
+            await self._semaphore.acquire()
+        self.in_flight += 1
+        acquired = time.perf_counter()
+        metrics.STAGE_SECONDS.observe(acquired - requested, stage="llm_wait")
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self._average_hold += 0.2 * ((time.perf_counter() - acquired) - self._average_hold)
+            self._semaphore.release()
+
+
+# Process-wide limits (each gunicorn worker has its own: the host total is workers x limit)
+RATE_LIMITER = RateLimiter.from_env()
+LLM_LIMITER = ConcurrencyLimiter.from_env()
+
+metrics.Gauge("cv_llm_calls_in_flight", "Model calls holding a slot in this process.",
+              callback=lambda: LLM_LIMITER.in_flight if LLM_LIMITER else 0)
+metrics.Gauge("cv_llm_queue_depth", "Model calls waiting for a slot in this process.",
+              callback=lambda: LLM_LIMITER.waiting if LLM_LIMITER else 0)
@@ -19,7 +19,10 @@ function goHome() {
   const landing = document.getElementById('landingPage');
   const builder = document.getElementById('builderPage');
  
+  forgetResult();
   localStorage.clear();
+  clearDraft();
+  forgetSession();
   currentIndex = 0;
  
   pages.forEach(p => p.classList.remove('active', 'slide-out-left', 'slide-out-right'));
@@ -51,15 +54,233 @@ function goHome() {
   }, 300);
 }
 
+// ==================== DRAFT STORAGE ====================
+// The draft is read from memory (draft.cache), so loadData stays synchronous. Changes are
+// written to IndexedDB (localStorage where it is unavailable) once typing pauses, one record
+// per changed key and one per changed work/project block, so saving does not get slower as
+// the CV grows. Block lists are stored as { order: [ids] } plus a "<list>:<id>" record per block.
+const DRAFT_DB = 'cvDraft';
+const DRAFT_STORE = 'draft';
+const DRAFT_PREFIX = 'cvDraft:';  // localStorage fallback
+const DRAFT_SAVE_DELAY_MS = 400;
+const BLOCK_LISTS = ['work', 'projects'];
+// Keys of drafts saved whole in localStorage by earlier versions (moved over on load)
+const LEGACY_DRAFT_KEYS = ['personalInfo', 'career', 'links', 'education', 'work', 'projects',
+                           'technicalskills', 'softSkills', 'languages'];
+
+const draft = {
+  cache: new Map(),        // key -> value, what loadData returns
+  written: new Map(),      // record key -> JSON last written, to skip unchanged records
+  dirty: new Set(),        // record keys to write on the next flush
+  dirtyBlocks: new Set(),  // block elements typed into since the last flush
+  backend: null,
+  timer: null
+};
+// Block lists whose blocks are rebuilt the first time their page is shown
+const pendingRestore = new Set();
+
+function openDraftDb() {
+  return new Promise((resolve, reject) => {
+    const request = indexedDB.open(DRAFT_DB, 1);
+    request.onupgradeneeded = () => request.result.createObjectStore(DRAFT_STORE);
+    request.onsuccess = () => resolve(request.result);
+    request.onerror = () => reject(request.error);
+  });
+}
+
+function indexedDbBackend(db) {
+  const run = (mode, work) => new Promise((resolve, reject) => {
+    const tx = db.transaction(DRAFT_STORE, mode);
+    const result = work(tx.objectStore(DRAFT_STORE));
+    tx.oncomplete = () => resolve(result);
+    tx.onerror = () => reject(tx.error);
+    tx.onabort = () => reject(tx.error);
+  });
+  return {
+    readAll: () => run('readonly', store => {
+      const records = new Map();
+      store.openCursor().onsuccess = (e) => {
+        const cursor = e.target.result;
+        if (!cursor) return;
+        records.set(cursor.key, cursor.value);
+        cursor.continue();
+      };
+      return records;
+    }),
+    write: (puts, deletes) => run('readwrite', store => {
+      puts.forEach(([key, json]) => store.put(json, key));
+      deletes.forEach(key => store.delete(key));
+    }),
+    clear: () => run('readwrite', store => { store.clear(); })
+  };
+}
+
+function draftKeysInLocalStorage() {
+  const keys = [];
+  for (let i = 0; i < localStorage.length; i++) {
+    const key = localStorage.key(i);
+    if (key.startsWith(DRAFT_PREFIX)) keys.push(key);
+  }
+  return keys;
+}
+
+const localStorageBackend = {
+  readAll: async () => new Map(draftKeysInLocalStorage().map(key => [key.slice(DRAFT_PREFIX.length), localStorage.getItem(key)])),
+  write: async (puts, deletes) => {
+    puts.forEach(([key, json]) => localStorage.setItem(DRAFT_PREFIX + key, json));
+    deletes.forEach(key => localStorage.removeItem(DRAFT_PREFIX + key));
+  },
+  clear: async () => {
+    draftKeysInLocalStorage().forEach(key => localStorage.removeItem(key));
+  }
+};
+
+function newBlockId() {
+  return Date.now().toString(36) + Math.random().toString(36).slice(2, 8);
+}
+
+function isBlockList(key, value) {
+  return BLOCK_LISTS.includes(key) && Array.isArray(value) && value.every(item => item && typeof item === 'object');
+}
+
+// What a record holds right now (undefined once it is gone)
+function recordValue(recordKey) {
+  const sep = recordKey.indexOf(':');
+  if (sep !== -1) {
+    const list = draft.cache.get(recordKey.slice(0, sep));
+    const id = recordKey.slice(sep + 1);
+    return Array.isArray(list) ? list.find(item => item && item.id === id) : undefined;
+  }
+  const value = draft.cache.get(recordKey);
+  return isBlockList(recordKey, value) ? { order: value.map(item => item.id) } : value;
+}
+
+async function loadDraft() {
+  try {
+    draft.backend = indexedDbBackend(await openDraftDb());
+  } catch (e) {
+    draft.backend = localStorageBackend;
+  }
+  let records;
+  try {
+    records = await draft.backend.readAll();
+  } catch (e) {
+    draft.backend = localStorageBackend;
+    records = await draft.backend.readAll();
+  }
+
+  records.forEach((json, recordKey) => {
+    draft.written.set(recordKey, json);
+    if (recordKey.includes(':') || draft.cache.has(recordKey)) return;
+    const value = JSON.parse(json);
+    if (BLOCK_LISTS.includes(recordKey) && value && Array.isArray(value.order)) {
+      draft.cache.set(recordKey, value.order
+        .filter(id => records.has(`${recordKey}:${id}`))
+        .map(id => JSON.parse(records.get(`${recordKey}:${id}`))));
+    } else {
+      draft.cache.set(recordKey, value);
+    }
+  });
+
+  LEGACY_DRAFT_KEYS.forEach(key => {
+    const legacy = localStorage.getItem(key);
+    if (legacy === null) return;
+    localStorage.removeItem(key);
+    if (draft.cache.has(key)) return;
+    const value = JSON.parse(legacy);
+    if (isBlockList(key, value)) value.forEach(item => { item.id = item.id || newBlockId(); });
+    saveData(key, value);
+  });
+}
+
+function scheduleDraftSave() {
+  clearTimeout(draft.timer);
+  draft.timer = setTimeout(flushDraft, DRAFT_SAVE_DELAY_MS);
+}
+
+function flushDraft() {
+  clearTimeout(draft.timer);
+  draft.timer = null;
+  draft.dirtyBlocks.forEach(block => { if (block.isConnected) saveBlock(block); });
+  draft.dirtyBlocks.clear();
+  if (!draft.backend || draft.dirty.size === 0) return;
+
+  const puts = [];
+  const deletes = [];
+  draft.dirty.forEach(recordKey => {
+    const value = recordValue(recordKey);
+    if (value === undefined) {
+      if (draft.written.delete(recordKey)) deletes.push(recordKey);
+      return;
+    }
+    const json = JSON.stringify(value);
+    if (draft.written.get(recordKey) === json) return;
+    draft.written.set(recordKey, json);
+    puts.push([recordKey, json]);
+  });
+  draft.dirty.clear();
+  if (puts.length === 0 && deletes.length === 0) return;
+
+  draft.backend.write(puts, deletes).catch(error => {
+    if (draft.backend === localStorageBackend) {
+      console.error('Could not save the draft:', error);
+      return;
+    }
+    // IndexedDB refused (quota, private mode): keep the whole draft in localStorage instead
+    console.warn('IndexedDB unavailable, saving the draft to localStorage:', error);
+    draft.backend = localStorageBackend;
+    draft.written.clear();
+    draft.cache.forEach((value, key) => saveData(key, value));
+  });
+}
+
 function saveData(key, value) {
-  localStorage.setItem(key, JSON.stringify(value));
+  draft.cache.set(key, value);
+  draft.dirty.add(key);
+  if (BLOCK_LISTS.includes(key)) {
+    const ids = new Set();
+    if (isBlockList(key, value)) {
+      value.forEach(item => {
+        ids.add(item.id);
+        draft.dirty.add(`${key}:${item.id}`);
+      });
+    }
+    // blocks no longer in the list
+    draft.written.forEach((_, recordKey) => {
+      if (recordKey.startsWith(key + ':') && !ids.has(recordKey.slice(key.length + 1))) draft.dirty.add(recordKey);
+    });
+  }
+  scheduleDraftSave();
 }
 
 function loadData(key) {
-  const s = localStorage.getItem(key);
-  return s ? JSON.parse(s) : null;
+  const value = draft.cache.get(key);
+  return value === undefined ? null : value;
 }
 
+function clearDraft() {
+  clearTimeout(draft.timer);
+  draft.timer = null;
+  draft.cache.clear();
+  draft.written.clear();
+  draft.dirty.clear();
+  draft.dirtyBlocks.clear();
+  pendingRestore.clear();
+  if (draft.backend) draft.backend.clear().catch(error => console.error('Could not clear the draft:', error));
+}
+
+// Typing into a work/project block only marks the block; it is read and saved after a pause
+document.addEventListener('input', (e) => {
+  const block = e.target.closest && e.target.closest('.work-block, .project-block');
+  if (!block) return;
+  draft.dirtyBlocks.add(block);
+  scheduleDraftSave();
+});
+window.addEventListener('pagehide', flushDraft);
+document.addEventListener('visibilitychange', () => {
+  if (document.visibilityState === 'hidden') flushDraft();
+});
+
 function escapeHtml(s) {
   if (!s) return '';
   return String(s).replace(/&/g,'&amp;').replace(/</g,'&lt;').replace(/>/g,'&gt;').replace(/"/g,'&quot;');
@@ -88,6 +309,7 @@ function showPage(index, direction = "next") {
   else old.classList.add("slide-out-right");
 
   next.classList.add("active");
+  restoreVisibleBlocks(next);
 
   currentIndex = index;
   updateProgress();
@@ -545,6 +767,7 @@ function generateDateOptions() {
 function createWorkBlock(data = null) {
   const block = document.createElement('div');
   block.className = 'work-block';
+  block.dataset.blockId = (data && data.id) || newBlockId();
   const { monthOptions, yearOptions } = generateDateOptions();
 
   block.innerHTML = `
@@ -578,29 +801,23 @@ function createWorkBlock(data = null) {
   }
 }
 
+function readWorkBlock(b) {
+  return {
+    id: b.dataset.blockId,
+    position: b.querySelector('.pos').value.trim(),
+    company: b.querySelector('.comp').value.trim(),
+    fromMonth: b.querySelector('.from-month').value,
+    fromYear: b.querySelector('.from-year').value,
+    toMonth: b.querySelector('.to-month').value,
+    toYear: b.querySelector('.to-year').value,
+    desc: b.querySelector('.desc').value.trim()
+  };
+}
+
 function saveWork() {
+  restoreBlocks('work');
   const blocks = Array.from(document.querySelectorAll('.work-block'));
-  if (blocks.length === 0) {
-    saveData('work', []);
-    return;
-  }
-  const arr = blocks.map(b => {
-    const fromMonth = b.querySelector('.from-month').value;
-    const fromYear = b.querySelector('.from-year').value;
-    const toMonth = b.querySelector('.to-month').value;
-    const toYear = b.querySelector('.to-year').value;
-   
-    return {
-      position: b.querySelector('.pos').value.trim(),
-      company: b.querySelector('.comp').value.trim(),
-      fromMonth: fromMonth,
-      fromYear: fromYear,
-      toMonth: toMonth,
-      toYear: toYear,
-      desc: b.querySelector('.desc').value.trim()
-    };
-  });
-  saveData('work', arr);
+  saveData('work', blocks.map(readWorkBlock));
 }
 
 function loadWorkBlocks() {
@@ -619,7 +836,10 @@ function loadWorkBlocks() {
 document.addEventListener('click', (e) => {
   if (e.target && e.target.matches('.btn-remove-work')) {
     const b = e.target.closest('.work-block');
-    if (b) b.remove();
+    if (b) {
+      b.remove();
+      saveWork();
+    }
   }
 });
 
@@ -636,6 +856,7 @@ const addProjectBtn = document.getElementById('addProject');
 function createProjectBlock(data = null) {
   const block = document.createElement('div');
   block.className = 'project-block';
+  block.dataset.blockId = (data && data.id) || newBlockId();
 
   block.innerHTML = `
     <div class="form-group"><label>Project Name</label><input class="proj-name" type="text" placeholder="Project name" value="${data ? escapeHtml(data.name) : ''}"></div>
@@ -647,18 +868,19 @@ function createProjectBlock(data = null) {
   projectsContainer.appendChild(block);
 }
 
-function saveProjects() {
-  const blocks = Array.from(document.querySelectorAll('.project-block'));
-  if (blocks.length === 0) {
-    saveData('projects', []);
-    return;
-  }
-  const arr = blocks.map(b => ({
+function readProjectBlock(b) {
+  return {
+    id: b.dataset.blockId,
     name: b.querySelector('.proj-name').value.trim(),
     link: b.querySelector('.proj-link').value.trim(),
     desc: b.querySelector('.proj-desc').value.trim()
-  }));
-  saveData('projects', arr);
+  };
+}
+
+function saveProjects() {
+  restoreBlocks('projects');
+  const blocks = Array.from(document.querySelectorAll('.project-block'));
+  saveData('projects', blocks.map(readProjectBlock));
 }
 
 function loadProjectBlocks() {
@@ -677,7 +899,10 @@ function loadProjectBlocks() {
 document.addEventListener('click', (e) => {
   if (e.target && e.target.matches('.btn-remove-proj')) {
     const b = e.target.closest('.project-block');
-    if (b) b.remove();
+    if (b) {
+      b.remove();
+      saveProjects();
+    }
   }
 });
 
@@ -688,6 +913,32 @@ if (addProjectBtn) addProjectBtn.addEventListener('click', (e) => {
   createProjectBlock(null);
 });
 
+// Save the one block typed into (see flushDraft); a block not saved yet saves its whole list
+function saveBlock(block) {
+  const list = block.classList.contains('work-block') ? 'work' : 'projects';
+  const item = list === 'work' ? readWorkBlock(block) : readProjectBlock(block);
+  const arr = loadData(list);
+  const idx = isBlockList(list, arr) ? arr.findIndex(i => i.id === item.id) : -1;
+  if (idx === -1) {
+    if (list === 'work') saveWork();
+    else saveProjects();
+    return;
+  }
+  arr[idx] = item;
+  draft.dirty.add(`${list}:${item.id}`);
+}
+
+function restoreBlocks(list) {
+  if (!pendingRestore.delete(list)) return;
+  if (list === 'work') loadWorkBlocks();
+  else loadProjectBlocks();
+}
+
+function restoreVisibleBlocks(page) {
+  if (page.contains(workContainer)) restoreBlocks('work');
+  if (page.contains(projectsContainer)) restoreBlocks('projects');
+}
+
 // ==================== TECHNICAL SKILLS FUNCTIONALITY ====================
 const technicalskillsContainer = document.getElementById('technicalskillsContainer');
 const addtechnicalSkillBtn = document.getElementById('addTechnicalSkill');
@@ -999,9 +1250,9 @@ function restoreAll() {
     }
   }
 
-  loadWorkBlocks();
-
-  loadProjectBlocks();
+  // Work and project blocks are built when their page is first shown
+  BLOCK_LISTS.forEach(list => pendingRestore.add(list));
+  restoreVisibleBlocks(pages[currentIndex]);
 
   renderTechnicalSkills();
 
@@ -1226,7 +1477,10 @@ const clearBtn = document.getElementById('clearDataBtn');
 if (clearBtn) {
   clearBtn.addEventListener('click', () => {
     if (confirm("Are you sure you want to clear all data? This cannot be undone.")) {
+      forgetResult();
       localStorage.clear();
+      clearDraft();
+      forgetSession();
       
       document.querySelectorAll('input, textarea, select').forEach(input => {
         if (input.type === 'checkbox' || input.type === 'radio') input.checked = false;
@@ -1250,8 +1504,97 @@ if (clearBtn) {
   });
 }
 
+// Output formats offered by the backend (/api/jobs/<id>/download?format=...)
+const FORMAT_LABELS = { docx: 'Word', pdf: 'PDF', txt: 'Text', html: 'HTML' };
+
+function getOutputFormat() {
+  const select = document.getElementById('outputFormat');
+  // Form resets blank every select; fall back to Word
+  return (select && select.value) || 'docx';
+}
+
+// Fetch a file from the API and save it; returns the file name
+async function downloadFile(path, format) {
+  const response = await fetch(`${API_BASE}${path}?format=${encodeURIComponent(format)}`);
+  if (!response.ok) {
+    const errorData = await response.json();
+    throw new Error(errorData.error || `Server error: ${response.status}`);
+  }
+
+  const blob = await response.blob();
+  const url = window.URL.createObjectURL(blob);
+  const a = document.createElement('a');
+  a.style.display = 'none';
+  a.href = url;
+
+  const contentDisposition = response.headers.get('content-disposition');
+  let filename = `Enhanced_CV.${format}`;
+
+  if (contentDisposition) {
+    // Try to match filename="name.docx" OR filename=name.docx
+    const match = contentDisposition.match(/filename="?([^"]+)"?/);
+    if (match && match[1]) {
+      filename = match[1];
+    }
+  }
+
+  a.download = filename;
+  document.body.appendChild(a);
+  a.click();
+  a.remove();
+  window.URL.revokeObjectURL(url);
+  return filename;
+}
+
+// Download a finished job's CV; when that fails (job expired, connection dropped...) the
+// server's short-lived result store still has it, so nothing is reprocessed
+async function downloadJobFile(jobId, format, resultUrl) {
+  try {
+    return await downloadFile(`/api/jobs/${jobId}/download`, format);
+  } catch (error) {
+    if (!resultUrl) throw error;
+    return downloadFile(resultUrl, format);
+  }
+}
+
+const LAST_RESULT_KEY = 'cvLastResult';
+
+// Remember the last result (survives a closed tab) until the user confirms the download
+function rememberResult(resultUrl, format) {
+  if (resultUrl) localStorage.setItem(LAST_RESULT_KEY, JSON.stringify({ url: resultUrl, format }));
+}
+
+function forgetResult() {
+  const saved = localStorage.getItem(LAST_RESULT_KEY);
+  if (!saved) return;
+  localStorage.removeItem(LAST_RESULT_KEY);
+  fetch(`${API_BASE}${JSON.parse(saved).url}`, { method: 'DELETE' }).catch(() => {});
+}
+
+// "Download my last CV again" on the home page while a stored result may still exist
+function setupLastResultButton() {
+  const button = document.getElementById('lastResultBtn');
+  const saved = localStorage.getItem(LAST_RESULT_KEY);
+  if (!button || !saved) return;
+
+  const { url, format } = JSON.parse(saved);
+  button.style.display = '';
+  button.addEventListener('click', async () => {
+    try {
+      await downloadFile(url, format);
+    } catch (error) {
+      // Expired on the server: nothing left to offer
+      localStorage.removeItem(LAST_RESULT_KEY);
+      button.style.display = 'none';
+      alert('Your last CV is no longer available, please submit it again.');
+    }
+  });
+}
+
 //how Success Message
-function showSuccessMessage(safeName) {
+function showSuccessMessage(safeName, jobId, format, resultUrl) {
+  // The same result can be downloaded again in the other formats, without reprocessing
+  const otherFormats = Object.keys(FORMAT_LABELS).filter(f => f !== format);
   const loadingOverlay = document.getElementById('loadingOverlay');
   const loadingContent = document.querySelector('.loading-content');
   // Create success message HTML
@@ -1263,6 +1606,10 @@ function showSuccessMessage(safeName) {
     <p class="success-details">
       File: <strong>${safeName}_CV.json</strong>
     </p>
+    <p class="success-formats">
+      Also download as:
+      ${otherFormats.map(f => `<button type="button" data-format="${f}">${FORMAT_LABELS[f]}</button>`).join('')}
+    </p>
     <p class="success-note">
       Your CV data will now be cleared for privacy.
     </p>
@@ -1270,10 +1617,18 @@ function showSuccessMessage(safeName) {
       OK
     </button>
   `;
+  loadingContent.querySelectorAll('.success-formats button').forEach(button => {
+    button.addEventListener('click', () => {
+      downloadJobFile(jobId, button.dataset.format, resultUrl).catch(error => alert('Error: ' + error.message));
+    });
+  });
   // Add event listener to OK button
   document.getElementById('successOkBtn').addEventListener('click', function() {
-    // Clear all localStorage data
+    // Clear the saved draft and localStorage data (and the server's copy of the result)
+    forgetResult();
     localStorage.clear();
+    clearDraft();
+    forgetSession();
     
     // Reset all form fields
     document.querySelectorAll('input, textarea, select').forEach(input => {
@@ -1337,10 +1692,126 @@ function resetLoadingContent() {
     <div class="loading-bar-container">
       <div class="loading-bar-fill"></div>
     </div>
+
+    <p class="loading-status" id="loadingStatus"></p>
   `;
 }
 
 
+const API_BASE = 'http://localhost:5000';
+const JOB_POLL_INTERVAL_MS = 1000;
+const JOB_TIMEOUT_MS = 5 * 60 * 1000;
+const SESSION_KEY = 'cvSessionId';
+
+// Editing session id: lets the server re-polish only the sections changed since the last submit.
+// Kept in sessionStorage so it survives the localStorage clean-up but not the tab.
+function getSessionId() {
+  let id = sessionStorage.getItem(SESSION_KEY);
+  if (!id) {
+    id = window.crypto && crypto.randomUUID
+      ? crypto.randomUUID()
+      : Date.now().toString(36) + Math.random().toString(36).slice(2);
+    sessionStorage.setItem(SESSION_KEY, id);
+  }
+  return id;
+}
+
+// Drop the server-side copy of the session together with the local data
+function forgetSession() {
+  const id = sessionStorage.getItem(SESSION_KEY);
+  if (!id) return;
+  sessionStorage.removeItem(SESSION_KEY);
+  fetch(`${API_BASE}/api/sessions/${encodeURIComponent(id)}`, { method: 'DELETE' }).catch(() => {});
+}
+
+const BUSY_MAX_RETRIES = 4;
+
+// fetch() that waits and retries while the server is overloaded (429/503): it honours
+// Retry-After, else backs off exponentially, with jitter so clients do not return in step
+async function fetchWithBackoff(url, options, onWait) {
+  for (let attempt = 0; ; attempt++) {
+    const response = await fetch(url, options);
+    if ((response.status !== 429 && response.status !== 503) || attempt >= BUSY_MAX_RETRIES) {
+      return response;
+    }
+    const retryAfter = parseInt(response.headers.get('Retry-After'), 10);
+    const base = Number.isFinite(retryAfter) ? retryAfter * 1000 : 1000 * 2 ** attempt;
+    const delay = Math.min(base * (1 + attempt * 0.5), 60000) * (0.8 + Math.random() * 0.4);
+    if (onWait) onWait(Math.ceil(delay / 1000));
+    await new Promise(resolve => setTimeout(resolve, delay));
+  }
+}
+
+// Poll a background job until it is done; throws if it fails or times out
+async function waitForJob(jobId) {
+  const deadline = Date.now() + JOB_TIMEOUT_MS;
+
+  while (Date.now() < deadline) {
+    const response = await fetch(`${API_BASE}/api/jobs/${jobId}`);
+    const job = await response.json();
+
+    if (!response.ok) {
+      throw new Error(job.error || `Server error: ${response.status}`);
+    }
+    if (job.status === 'done') return job;
+    if (job.status === 'failed') {
+      throw new Error(job.error || 'CV processing failed');
+    }
+
+    await new Promise(resolve => setTimeout(resolve, JOB_POLL_INTERVAL_MS));
+  }
+
+  throw new Error('CV processing took too long, please try again');
+}
+
+const SECTION_LABELS = {
+  header: 'Contact details',
+  professional_summary: 'Professional summary',
+  work_experience: 'Work experience',
+  skills: 'Skills',
+  education: 'Education',
+  languages: 'Languages',
+  certifications: 'Certifications',
+  projects: 'Projects'
+};
+
+function setLoadingStatus(text) {
+  const status = document.getElementById('loadingStatus');
+  if (status) status.textContent = text;
+}
+
+// Follow a job over Server-Sent Events (per-section progress); falls back to polling
+function followJob(jobId, onProgress) {
+  if (!window.EventSource) return waitForJob(jobId);
+
+  return new Promise((resolve, reject) => {
+    const source = new EventSource(`${API_BASE}/api/jobs/${jobId}/events`);
+    let settled = false;
+
+    const finish = (callback, value) => {
+      if (settled) return;
+      settled = true;
+      source.close();
+      callback(value);
+    };
+
+    source.addEventListener('progress', e => onProgress(JSON.parse(e.data)));
+    source.addEventListener('done', e => finish(resolve, JSON.parse(e.data)));
+    source.addEventListener('failed', e => {
+      finish(reject, new Error(JSON.parse(e.data).error || 'CV processing failed'));
+    });
+
+    // Stream dropped (proxy, old server...): carry on by polling
+    source.onerror = () => {
+      if (settled) return;
+      settled = true;
+      source.close();
+      waitForJob(jobId).then(resolve, reject);
+    };
+  });
+}
+
+
 document.getElementById('submitBtn').addEventListener('click', async (e) => {
   e.preventDefault();
   
@@ -1394,51 +1865,45 @@ document.getElementById('submitBtn').addEventListener('click', async (e) => {
 
   try {
     const finalData = collectCVData();
+    const format = getOutputFormat();
     console.log('Sending data to backend:', finalData);
     
-    // Send to backend API
-    const response = await fetch('http://localhost:5000/api/process-cv',  {
+    // Submit as a background job, then poll until the CV is ready
+    const jobResponse = await fetchWithBackoff(`${API_BASE}/api/jobs?format=${encodeURIComponent(format)}`, {
       method: 'POST',
       headers: {
         'Content-Type': 'application/json',
       },
-      body: JSON.stringify(finalData)
-    });
-    
-    clearInterval(progressTimer); 
+      body: JSON.stringify({ ...finalData, session_id: getSessionId() })
+    }, seconds => setLoadingStatus(`Lots of CVs in progress, retrying in ${seconds}s...`));
 
-    if (!response.ok) {
-      const errorData = await response.json();
-      throw new Error(errorData.error || `Server error: ${response.status}`);
+    if (!jobResponse.ok) {
+      const errorData = await jobResponse.json();
+      throw new Error(errorData.error || `Server error: ${jobResponse.status}`);
     }
 
-    if (loadingBar) loadingBar.style.width = '100%';
-
-    const blob = await response.blob();
-    
-    const url = window.URL.createObjectURL(blob);
-    const a = document.createElement('a');
-    a.style.display = 'none';
-    a.href = url;
-
-    const contentDisposition = response.headers.get('content-disposition');
-    let filename = 'Enhanced_CV.docx';
-
-    if (contentDisposition) {
-      // Try to match filename="name.docx" OR filename=name.docx
-      const match = contentDisposition.match(/filename="?([^"]+)"?/);
-      if (match && match[1]) {
-        filename = match[1];
+    const job = await jobResponse.json();
+    const finished = await followJob(job.job_id, (event) => {
+      if (event.type === 'stage' && event.stage === 'structuring') {
+        setLoadingStatus('Polishing your CV...');
+      } else if (event.type === 'section') {
+        // Real progress replaces the simulated one
+        clearInterval(progressTimer);
+        currentProgress = Math.max(currentProgress, 10 + 85 * event.done / event.total);
+        if (loadingBar) loadingBar.style.width = `${currentProgress}%`;
+        setLoadingStatus(`${SECTION_LABELS[event.section] || event.section} ready (${event.done}/${event.total})`);
       }
-    }
+    });
+
+    rememberResult(finished.result_url, format);
+    const filename = await downloadJobFile(job.job_id, format, finished.result_url);
     
-    a.download = filename;
-    document.body.appendChild(a);
-    a.click();
-    window.URL.revokeObjectURL(url);
+    clearInterval(progressTimer); 
+
+    if (loadingBar) loadingBar.style.width = '100%';
 
     setTimeout(() => {
-      showSuccessMessage(filename.replace('.docx', ''));
+      showSuccessMessage(filename.replace(/\.[a-z]+$/, ''), job.job_id, format, finished.result_url);
     }, 1000);
     
   } catch (error) {
@@ -1458,6 +1923,9 @@ document.addEventListener('DOMContentLoaded', function() {
     populateYearDropdowns();
   
     // Restore saved data if any
-    restoreAll();
+    loadDraft()
+      .catch(error => console.error('Could not load the saved draft:', error))
+      .then(restoreAll);
+    setupLastResultButton();
   });
     
\ No newline at end of file
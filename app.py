@@ -1,39 +1,335 @@
 # app.py - Main Flask API Server
-from flask import Flask, request, jsonify, send_file, after_this_request, send_from_directory
+from flask import Flask, Response, g, request, jsonify, send_file, stream_with_context
 from flask_cors import CORS
+from werkzeug.middleware.proxy_fix import ProxyFix
+import functools
+import hmac
+import io
 import json
+import logging
 import os
 import sys
-import tempfile
-import shutil
+import threading
+import time
 from datetime import datetime
-from backend_1 import CVProcessor
-from cv_generator import CVGenerator
+from llm_cache import LLMResultCache
+from sessions import SessionStore
+from results import ResultStore
+from jobs import JobManager, JobQueueFullError
+from batch import BatchRunner
+from matching import JobIndex
+from local_structurer import STRUCTURER_MODES
+from static_assets import StaticSite
+from admission import LLM_LIMITER, RATE_LIMITER, OverloadedError, RateLimitedError, retry_after_header
+from resilience import BREAKER
+import metrics
+from log_setup import configure_logging
+
+# The OpenAI (pydantic) and python-docx (lxml) stacks are imported on first use or by
+# warm_up(), so /api/health and static files answer as soon as the process starts.
 
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 app = Flask(__name__)
-CORS(app, expose_headers=["Content-Disposition"])  # Allow frontend requests
+CORS(app, expose_headers=["Content-Disposition", "X-Request-ID", "X-Result-URL", "Retry-After"])  # Allow frontend requests
+
+# Behind N reverse proxies, take the client address from X-Forwarded-For (rate limiting is per client)
+if int(os.environ.get('CV_TRUSTED_PROXIES', '0')) > 0:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=int(os.environ['CV_TRUSTED_PROXIES']))
+
+# Logging is configured by the entry point, not by the modules it imports.
+# Records go through a queue to a writer thread as JSON lines with the trace id of the
+# request (or job) that produced them (CV_LOG_* env vars, see log_setup.py)
+configure_logging()
+logger = logging.getLogger(__name__)
+
+# Shared cache of model results (configured through CV_CACHE_* env vars, None when disabled)
+LLM_CACHE = LLMResultCache.from_env()
+
+# Last input + structured CV per editing session (CV_SESSION_* env vars, None when disabled)
+SESSIONS = SessionStore.from_env()
+
+# Finished CVs kept encrypted for a short while, so a failed download is retried
+# without reprocessing (CV_RESULTS_* env vars, None when disabled)
+RESULTS = ResultStore.from_env()
+
+# The frontend: allow-listed, minified, hashed and precompressed files (see static_assets.py)
+STATIC = StaticSite.from_env()
 
-# Configuration
-UPLOAD_FOLDER = 'temp_uploads'
-if not os.path.exists(UPLOAD_FOLDER):
-    os.makedirs(UPLOAD_FOLDER)
+# Job postings that CVs are matched against (CV_MATCH_* env vars; CV_MATCH_DB shares them between workers)
+POSTINGS = JobIndex.from_env()
 
-def clean_temp_files(file_paths):
-    """Clean up temporary files"""
-    for file_path in file_paths:
-        if os.path.exists(file_path):
+def make_processor(bounded_wait=True, mode=None):
+    """
+    CVProcessor wired to the process-wide client, system prompt, result cache and model-call limit.
+    bounded_wait=False waits for a model slot as long as it takes instead of failing fast (bulk work).
+    mode: llm, auto or fast (default CV_STRUCTURER, see CVProcessor.MODES).
+    """
+    from backend_1 import CVProcessor
+    from llm_client import get_client, get_system_prompt
+    
+    api_key = os.environ.get('OPENAI_API_KEY')
+    
+    return CVProcessor(
+        cache=LLM_CACHE,
+        client=get_client(api_key),
+        system_prompt=get_system_prompt("system_prompt.txt"),
+        llm_limiter=LLM_LIMITER,
+        bounded_wait=bounded_wait,
+        mode=mode
+    )
+
+def client_ids():
+    """Rate-limit buckets of the request: its IP address, plus its X-API-Key when that key is configured"""
+    return RATE_LIMITER.clients(request.remote_addr, request.headers.get('X-API-Key'))
+
+def busy_response(error, status, retry_after):
+    """429/503 with Retry-After, so clients back off instead of piling up"""
+    response = jsonify({'error': str(error), 'retry_after': int(retry_after_header(retry_after))})
+    response.headers['Retry-After'] = retry_after_header(retry_after)
+    return response, status
+
+def rate_limited(view):
+    """Token bucket per client on the endpoints that cost model calls"""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        if RATE_LIMITER is not None:
             try:
-                os.remove(file_path)
-            except:
-                pass
+                RATE_LIMITER.acquire(*client_ids())
+            except RateLimitedError as e:
+                return busy_response(e, 429, e.retry_after)
+        return view(*args, **kwargs)
+    return wrapper
+
+def get_output_format(data=None):
+    """
+    Output format of a request: ?format= or a "format" key in the JSON body (popped), default docx.
+    Raises ValueError for formats no renderer handles.
+    """
+    from renderers import FORMATS
+    
+    body_fmt = data.pop('format', None) if isinstance(data, dict) else None
+    fmt = request.args.get('format') or body_fmt or 'docx'
+    fmt = str(fmt).lower()
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported format {fmt!r}; use one of: {', '.join(FORMATS)}")
+    return fmt
+
+def get_structurer_mode(data=None):
+    """
+    Structurer mode of a request: ?mode= or a "mode" key in the JSON body (popped), default None
+    (the CV_STRUCTURER setting). Raises ValueError for unknown modes.
+    """
+    body_mode = data.pop('mode', None) if isinstance(data, dict) else None
+    mode = request.args.get('mode') or body_mode
+    if mode is None:
+        return None
+    mode = str(mode).lower()
+    if mode not in STRUCTURER_MODES:
+        raise ValueError(f"Unsupported mode {mode!r}; use one of: {', '.join(STRUCTURER_MODES)}")
+    return mode
+
+def build_cv(data, progress=None, bounded_wait=True):
+    """
+    Run the full pipeline for one raw CV dict: OpenAI structuring, then rendering
+    (DOCX, or the format named by a "format" key in data: pdf, txt or html).
+    With a progress callback the completion is streamed and each section is rendered
+    as soon as its fields arrive; progress(event) is called once per finished section.
+    A "mode" key picks the structurer: llm (the model structures everything), auto (local
+    rules, the model polishes only the free text that needs it) or fast (no model call).
+    An optional "session_id" in data enables section-level regeneration in llm mode: when
+    the same session submits again, only the edited sections go back to the model.
+    The result is kept in the encrypted result store; its token can fetch it again.
+    bounded_wait=False: an accepted background job waits for model capacity instead of failing.
+    Returns (file_bytes, download_name, mimetype, result_token or None). Everything stays in memory.
+    """
+    from renderers import get_renderer_class
+    
+    edit_session = data.pop('session_id', None)
+    generator = get_renderer_class(data.pop('format', 'docx'))()
+    download_name = make_download_name(data, generator)
+    processor = make_processor(bounded_wait, data.pop('mode', None))
+    # Sessions only pay off when the model structures the whole CV; the rules redo it in milliseconds
+    if processor.mode != 'llm':
+        edit_session = None
+    previous = SESSIONS.get(edit_session, processor.fingerprint) if SESSIONS and edit_session else None
+    
+    if previous is not None:
+        # 1. Re-polish only the sections edited since the last submission
+        structured_cv, _ = processor.process_changes(data, previous['input'], previous['structured'])
+        
+        # 2. Render the CV into memory
+        if progress is None:
+            cv_buffer = generator.generate_cv_bytes(structured_cv)
+        else:
+            cv_buffer = render_progressively(generator, structured_cv.items(), progress)
+    elif progress is None:
+        # 1. Process with OpenAI (or the local rules, see CVProcessor.MODES)
+        structured_cv = processor.process(data)
+        
+        # 2. Render the CV into memory
+        cv_buffer = generator.generate_cv_bytes(structured_cv)
+    elif processor.mode != 'llm':
+        # Nothing to stream: the rules (and any polish call) finish before rendering starts
+        structured_cv = processor.process(data)
+        cv_buffer = render_progressively(generator, structured_cv.items(), progress)
+    else:
+        # 1+2. Stream the completion and build sections while it is still being generated
+        structured_cv = {}
+        
+        def fields():
+            for key, value in processor.stream_structured_cv(processor.clean(data)):
+                structured_cv[key] = value
+                yield key, value
+        
+        cv_buffer = render_progressively(generator, fields(), progress)
+    
+    if SESSIONS and edit_session:
+        SESSIONS.put(edit_session, processor.fingerprint, processor.clean(data), structured_cv)
+    
+    return keep_result(structured_cv, generator, cv_buffer.getvalue(), download_name)
+
+def make_download_name(data, generator):
+    """Enhanced_CV_<time>_<hash of the input><extension>"""
+    session_id = datetime.now().strftime("%Y%m%d_%H%M%S_") + str(hash(str(data)))[:8]
+    return f'Enhanced_CV_{session_id}{generator.EXTENSION}'
+
+def keep_result(structured_cv, generator, cv_bytes, download_name):
+    """
+    Put a rendered CV in the render cache and the result store.
+    Returns (file_bytes, download_name, mimetype, result_token or None) like build_cv.
+    """
+    from renderers import RENDER_CACHE, RenderCache
+    
+    # Later downloads of this result in the same format skip the render
+    RENDER_CACHE.set(RenderCache.key(structured_cv, generator.FORMAT), cv_bytes)
+    token = RESULTS.put(structured_cv, generator.FORMAT, cv_bytes, download_name, generator.MIMETYPE) if RESULTS else None
+    return cv_bytes, download_name, generator.MIMETYPE, token
+
+def render_result(structured_cv, fmt, data):
+    """Render a structured CV in fmt and keep it (keep_result); the blocking half of an async request."""
+    from renderers import get_renderer_class
+    
+    generator = get_renderer_class(fmt)()
+    cv_bytes = generator.generate_cv_bytes(structured_cv).getvalue()
+    return keep_result(structured_cv, generator, cv_bytes, make_download_name(data, generator))
+
+def result_file(token, fmt=None):
+    """
+    (bytes, download_name, mimetype) of a stored result, or None when it is unknown or expired.
+    A format not rendered yet is rendered from the stored structured CV (no model call) and kept.
+    """
+    if RESULTS is None:
+        return None
+    found = RESULTS.get_file(token, fmt)
+    if found is not None or fmt is None:
+        return found
+    stored = RESULTS.get(token)
+    if stored is None:
+        return None
+    from renderers import render_cv
+    
+    with metrics.stage("render_format"):
+        cv_bytes, extension, mimetype = render_cv(stored['structured'], fmt)
+    download_name = os.path.splitext(stored['filename'] or 'Enhanced_CV')[0] + extension
+    RESULTS.add_file(token, fmt, cv_bytes, download_name, mimetype)
+    return cv_bytes, download_name, mimetype
+
+def render_progressively(generator, fields, progress):
+    """Feed (key, value) pairs to the generator and report each section as soon as it is built"""
+    total = len(generator.SECTIONS)
+    progress({'type': 'stage', 'stage': 'structuring'})
+    generator.start_document()
+    for key, value in fields:
+        built = generator.add_field(key, value)
+        done = generator.sections_built - len(built)
+        for section in built:
+            done += 1
+            progress({'type': 'section', 'section': section, 'done': done, 'total': total})
+    cv_buffer = generator.finish_document()
+    progress({'type': 'stage', 'stage': 'rendered', 'done': total, 'total': total})
+    return cv_buffer
+
+# Background jobs for the async API (configured through CV_JOB_* env vars)
+# (new jobs are refused at submission when the model queue is full; accepted ones wait their turn)
+JOBS = JobManager.from_env(functools.partial(build_cv, bounded_wait=False))
+
+metrics.Gauge("cv_jobs_pending", "Background jobs queued or running in this process.", callback=lambda: JOBS.pending)
+metrics.Gauge("cv_results_stored", "Finished CVs held in the result store of this process.",
+              callback=lambda: RESULTS.stats()['entries'] if RESULTS else 0)
+metrics.Gauge("cv_postings_indexed", "Job postings in the matching index.", callback=lambda: len(POSTINGS))
+
+# Set once the heavy stacks are imported and the template (and client) are built
+WARMED_UP = threading.Event()
+
+def warm_up(client=True):
+    """
+    Import the OpenAI and DOCX stacks, build the DOCX base template and, with client=True,
+    the shared HTTP client and system prompt, so the first CV does not pay for any of it.
+    """
+    started = time.perf_counter()
+    import backend_1  # noqa: F401 - pulls in openai
+    import fast_docx
+    
+    fast_docx.warm_up()
+    STATIC.load()
+    if client:
+        from llm_client import get_client, get_system_prompt
+        
+        get_client(os.environ.get('OPENAI_API_KEY'))
+        get_system_prompt("system_prompt.txt").text
+    WARMED_UP.set()
+    logger.info("Warm-up finished in %.0f ms", (time.perf_counter() - started) * 1000)
+
+def _background_warm_up():
+    try:
+        warm_up()
+    except Exception as e:
+        logger.warning("Warm-up failed (%s); the first request will load everything itself", e)
+
+def start_warm_up(mode=None):
+    """
+    CV_WARMUP controls how the process gets ready:
+      background (default) - warm up in a daemon thread, requests are served meanwhile
+      preload              - import and build the template now, without the HTTP client
+                             (gunicorn --preload: forked workers share the loaded pages)
+      off                  - load everything lazily on the first CV
+    """
+    mode = (mode or os.environ.get('CV_WARMUP', 'background')).lower()
+    if mode == 'preload':
+        warm_up(client=False)
+    elif mode == 'background':
+        threading.Thread(target=_background_warm_up, name='cv-warm-up', daemon=True).start()
+
+SSE_POLL_INTERVAL = 0.25
+SSE_MAX_SECONDS = 300
+
+@app.before_request
+def start_request_metrics():
+    """Trace id (from X-Request-ID or a new one), start time and in-flight count for every request"""
+    g.trace_id = metrics.start_trace(request.headers.get('X-Request-ID'))
+    g.started = time.perf_counter()
+    metrics.REQUESTS_IN_FLIGHT.inc()
+
+@app.after_request
+def finish_request_metrics(response):
+    endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+    metrics.REQUEST_SECONDS.observe(
+        time.perf_counter() - g.started,
+        endpoint=endpoint, method=request.method, status=response.status_code
+    )
+    response.headers['X-Request-ID'] = g.trace_id
+    return response
+
+@app.teardown_request
+def end_request_metrics(error=None):
+    if 'started' in g:
+        metrics.REQUESTS_IN_FLIGHT.dec()
 
 @app.route('/api/process-cv', methods=['POST'])
+@rate_limited
 def process_cv():
-    """Main endpoint to process CV data"""
-    temp_files_to_clean = []
-    
+    """Main endpoint to process CV data (fully in memory, nothing is written to disk)"""
     try:
         # Get JSON data from frontend
         data = request.get_json()
@@ -41,90 +337,345 @@ def process_cv():
         if not data:
             return jsonify({'error': 'No data provided'}), 400
         
-        # Generate unique session ID
-        session_id = datetime.now().strftime("%Y%m%d_%H%M%S_") + str(hash(str(data)))[:8]
-        
-        # Create temporary files for this session
-        temp_json1 = os.path.join(UPLOAD_FOLDER, f'{session_id}_input.json')
-        temp_json2 = os.path.join(UPLOAD_FOLDER, f'{session_id}_structured.json')
-        temp_docx = os.path.join(UPLOAD_FOLDER, f'{session_id}_cv.docx')
-        
-        temp_files_to_clean.extend([temp_json1, temp_json2, temp_docx])
-        
-        # 1. Save input to first JSON file
-        with open(temp_json1, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
+        try:
+            data['format'] = get_output_format(data)
+            data['mode'] = get_structurer_mode(data)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
-        # 2. Process with OpenAI
-        api_key = os.environ.get('OPENAI_API_KEY')
-        
-        processor = CVProcessor(
-            input_file=temp_json1,
-            output_file=temp_json2,
-            api_key=api_key,
-            system_prompt_file="system_prompt.txt"
-        )
-        
-        # Run processor
-        processor.run()
-        
-        # 3. Generate CV DOCX
-        generator = CVGenerator()
-        cv_path = generator.generate_cv(temp_json2)
-        
-        # Copy the generated file to our temp location
-        shutil.copy(cv_path, temp_docx)
-        
-        # 4. Clean up original temp file from cv_generator
-        if os.path.exists(cv_path):
-            os.remove(cv_path)
-        
-        # 5. Clean JSON files
-        processor.wipe_json_file(temp_json1)
-        processor.wipe_json_file(temp_json2)
-        
-        @after_this_request
-        def cleanup(response):
-            """Clean up temporary files after sending response"""
-            try:
-                clean_temp_files(temp_files_to_clean)
-            except:
-                pass
-            return response
-        
-        # 6. Send the DOCX file
-        user_name = data.get('full_name', 'Enhanced')
-        
-        safe_name = "".join([c for c in user_name if c.isalnum() or c in " -_"]).strip()
-        safe_name = safe_name.replace(" ", "_")
-        
-        if not safe_name:
-            safe_name = "Enhanced"
+        cv_bytes, download_name, mimetype, token = build_cv(data)
 
-        return send_file(
-            temp_docx,
+        response = send_file(
+            io.BytesIO(cv_bytes),
             as_attachment=True,
-            download_name=f'Enhanced_CV_{session_id}.docx',
-            mimetype='application/vnd.openxmlformats-officedocument.wordprocessingml.document'
+            download_name=download_name,
+            mimetype=mimetype
         )
+        if token:
+            response.headers['X-Result-URL'] = f'/api/results/{token}'
+        return response
         
+    except OverloadedError as e:
+        return busy_response(e, 503, e.retry_after)
     except Exception as e:
-        # Clean up on error
-        clean_temp_files(temp_files_to_clean)
+        metrics.ERRORS.inc(stage='request', type=type(e).__name__)
+        if getattr(e, 'status_code', None) == 429:
+            # OpenAI itself is rate limiting us (after the client's own retries): pass the back-off on
+            metrics.ADMISSION_REJECTIONS.inc(reason='upstream')
+            return busy_response('The AI service is busy, please retry shortly', 503, 10)
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/jobs', methods=['POST'])
+@rate_limited
+def submit_job():
+    """Queue a CV for background processing and return its job id straight away"""
+    data = request.get_json(silent=True)
+    
+    if not data:
+        return jsonify({'error': 'No data provided'}), 400
+    
+    try:
+        data['format'] = get_output_format(data)
+        data['mode'] = get_structurer_mode(data)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    try:
+        # Fast mode never calls the model, so a full model queue is no reason to refuse it
+        if LLM_LIMITER is not None and data['mode'] != 'fast':
+            LLM_LIMITER.check_capacity()
+        job_id = JOBS.submit(data)
+    except OverloadedError as e:
+        return busy_response(e, 503, e.retry_after)
+    except JobQueueFullError as e:
+        metrics.ADMISSION_REJECTIONS.inc(reason='job_queue')
+        return busy_response(e, 503, 5)
+    
+    status_url = f'/api/jobs/{job_id}'
+    response = jsonify({'job_id': job_id, 'status': 'queued', 'status_url': status_url})
+    response.headers['Location'] = status_url
+    return response, 202
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    """Poll a job: queued, running, done or failed"""
+    job = JOBS.status(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found or expired'}), 404
+    
+    token = job.pop('result_token', None)
+    if job['status'] == 'done':
+        job['download_url'] = f'/api/jobs/{job_id}/download'
+        if token:
+            job['result_url'] = f'/api/results/{token}'
+    return jsonify(job)
+
+@app.route('/api/jobs/<job_id>/events', methods=['GET'])
+def job_events(job_id):
+    """
+    Server-Sent Events stream of a job's progress.
+    Sends `progress` events (stage changes and each finished CV section), then a final
+    `done` event with the download URL or a `failed` event with the error.
+    """
+    if JOBS.status(job_id) is None:
+        return jsonify({'error': 'Job not found or expired'}), 404
+    
+    def sse(event, payload):
+        return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+    
+    def stream():
+        sent = 0
+        deadline = time.monotonic() + SSE_MAX_SECONDS
+        last_write = time.monotonic()
+        yield sse('progress', {'type': 'stage', 'stage': 'queued'})
+        while time.monotonic() < deadline:
+            job = JOBS.status(job_id)
+            
+            # Read events after the status so nothing recorded before completion is missed
+            for event in JOBS.progress(job_id, since=sent):
+                sent += 1
+                last_write = time.monotonic()
+                yield sse('progress', event)
+            
+            if job is None:
+                yield sse('failed', {'error': 'Job not found or expired'})
+                return
+            if job['status'] == 'done':
+                done = {'download_url': f'/api/jobs/{job_id}/download'}
+                if job.get('result_token'):
+                    done['result_url'] = f"/api/results/{job['result_token']}"
+                yield sse('done', done)
+                return
+            if job['status'] == 'failed':
+                yield sse('failed', {'error': job['error']})
+                return
+            
+            if time.monotonic() - last_write > 15:
+                last_write = time.monotonic()
+                yield ": keep-alive\n\n"
+            time.sleep(SSE_POLL_INTERVAL)
+        yield sse('failed', {'error': 'Timed out waiting for the job'})
+    
+    return Response(
+        stream(),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@app.route('/api/jobs/<job_id>/download', methods=['GET'])
+def job_download(job_id):
+    """
+    Download the CV of a finished job (available until the job expires).
+    ?format=docx|pdf|txt|html renders the stored structured CV in another format, without a model call.
+    """
+    job = JOBS.status(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found or expired'}), 404
+    
+    result = JOBS.result(job_id)
+    if result is None:
+        return jsonify({'error': f"Job is {job['status']}", 'status': job['status']}), 409
+    
+    cv_bytes, download_name, mimetype = result
+    if request.args.get('format'):
+        from renderers import get_renderer_class
+        
+        try:
+            fmt = get_output_format()
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        # The job's own file answers its format; only another format needs the result store
+        if os.path.splitext(download_name)[1].lower() != get_renderer_class(fmt).EXTENSION:
+            result = result_file(job['result_token'], fmt) if job['result_token'] else None
+            if result is None:
+                return jsonify({'error': 'The stored result has expired, please submit the CV again'}), 410
+            cv_bytes, download_name, mimetype = result
+    return send_file(
+        io.BytesIO(cv_bytes),
+        as_attachment=True,
+        download_name=download_name,
+        mimetype=mimetype
+    )
+
+@app.route('/api/results/<token>', methods=['GET'])
+def download_result(token):
+    """
+    Download a stored result again (after a failed download or a closed tab), served locally.
+    ?format=docx|pdf|txt|html; without it, the format the CV was submitted with.
+    """
+    fmt = None
+    if request.args.get('format'):
+        try:
+            fmt = get_output_format()
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+    
+    result = result_file(token, fmt)
+    if result is None:
+        return jsonify({'error': 'Result not found or expired'}), 404
+    
+    cv_bytes, download_name, mimetype = result
+    response = send_file(
+        io.BytesIO(cv_bytes),
+        as_attachment=True,
+        download_name=download_name,
+        mimetype=mimetype
+    )
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
+@app.route('/api/results/<token>', methods=['DELETE'])
+def forget_result(token):
+    """Wipe a stored result now (the frontend calls this when it clears its data)"""
+    if RESULTS is not None:
+        RESULTS.forget(token)
+    return '', 204
+
+@app.route('/api/batch', methods=['POST'])
+@rate_limited
+def process_batch():
+    """
+    Bulk endpoint: request body is JSONL (one raw CV JSON per line).
+    Streams back a ZIP of DOCX files plus manifest.jsonl with a status per line.
+    ?mode= picks the structurer for the whole batch (llm, auto or fast).
+    """
+    concurrency = request.args.get('concurrency', default=8, type=int)
+    try:
+        mode = get_structurer_mode()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    runner = BatchRunner(make_processor(bounded_wait=False, mode=mode), llm_concurrency=max(1, min(concurrency, 32)))
+    
+    return Response(
+        stream_with_context(runner.iter_zip(request.stream)),
+        mimetype='application/zip',
+        headers={'Content-Disposition': f'attachment; filename=CV_Batch_{datetime.now().strftime("%Y%m%d_%H%M%S")}.zip'}
+    )
+
+def postings_admin(view):
+    """Adding and removing postings needs the X-Admin-Key header; without CV_MATCH_ADMIN_KEY nobody can"""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        admin_key = os.environ.get('CV_MATCH_ADMIN_KEY')
+        if not admin_key:
+            return jsonify({'error': 'Postings are read-only: CV_MATCH_ADMIN_KEY is not configured'}), 403
+        if not hmac.compare_digest(request.headers.get('X-Admin-Key', ''), admin_key):
+            return jsonify({'error': 'Admin key required'}), 403
+        return view(*args, **kwargs)
+    return wrapper
+
+@app.route('/api/postings', methods=['POST'])
+@postings_admin
+def add_postings():
+    """
+    Add or replace job postings in the matching index: one posting, a list, or {"postings": [...]}.
+    A posting has title, description, optional skills (list), company, location, url and id.
+    """
+    data = request.get_json(silent=True)
+    postings = data.get('postings') if isinstance(data, dict) and 'postings' in data else data
+    if isinstance(postings, dict):
+        postings = [postings]
+    if not isinstance(postings, list) or not postings:
+        return jsonify({'error': 'No postings provided'}), 400
+    
+    try:
+        with metrics.stage('index_postings'):
+            ids = POSTINGS.add(postings)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'ids': ids, **POSTINGS.stats()}), 201
+
+@app.route('/api/postings', methods=['GET'])
+def postings_stats():
+    """Number of indexed postings and distinct terms"""
+    return jsonify(POSTINGS.stats())
+
+@app.route('/api/postings/<posting_id>', methods=['DELETE'])
+@postings_admin
+def remove_posting(posting_id):
+    if not POSTINGS.remove(posting_id):
+        return jsonify({'error': 'Posting not found'}), 404
+    return '', 204
+
+@app.route('/api/match', methods=['POST'])
+def match_cv():
+    """
+    Rank the indexed postings for a structured CV ({"cv": {...}}) or a stored result
+    ({"result_token": "..."}). Each match lists the posting's keywords the CV covers and misses.
+    No model call is made.
+    """
+    data = request.get_json(silent=True) or {}
+    structured_cv = data.get('cv')
+    if structured_cv is None and data.get('result_token') and RESULTS is not None:
+        stored = RESULTS.get(str(data['result_token']))
+        if stored is None:
+            return jsonify({'error': 'Result not found or expired'}), 404
+        structured_cv = stored['structured']
+    if not isinstance(structured_cv, dict):
+        return jsonify({'error': 'Provide a structured CV ("cv") or a "result_token"'}), 400
+    
+    try:
+        top_k = max(1, min(int(data.get('top_k', 10)), 100))
+    except (TypeError, ValueError):
+        return jsonify({'error': 'top_k must be a number'}), 400
+    
+    started = time.perf_counter()
+    with metrics.stage('match'):
+        matches = POSTINGS.match(structured_cv, top_k=top_k)
+    return jsonify({
+        'matches': matches,
+        'postings': len(POSTINGS),
+        'took_ms': round((time.perf_counter() - started) * 1000, 2)
+    })
+
+@app.route('/api/sessions/<session_id>', methods=['DELETE'])
+def forget_session(session_id):
+    """Drop the stored input and result of an editing session (the frontend calls this when it clears its data)"""
+    if SESSIONS is not None:
+        SESSIONS.forget(session_id)
+    return '', 204
+
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
-    return jsonify({'status': 'healthy', 'service': 'CV Builder API'})
+    health = {'status': 'healthy', 'service': 'CV Builder API'}
+    if LLM_CACHE is not None:
+        health['llm_cache'] = LLM_CACHE.stats()
+    health['jobs_pending'] = JOBS.pending
+    if LLM_LIMITER is not None:
+        # per-process load, for autoscaling
+        health['llm_in_flight'] = LLM_LIMITER.in_flight
+        health['llm_queue_depth'] = LLM_LIMITER.waiting
+    if BREAKER is not None:
+        health['llm_breaker'] = BREAKER.state
+    health['warm'] = WARMED_UP.is_set()
+    return jsonify(health)
+
+@app.route('/api/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Stage latencies, token usage, cache hits, errors and in-flight requests (Prometheus text format)"""
+    return Response(metrics.REGISTRY.render(), content_type=metrics.CONTENT_TYPE)
+
+def serve_public(path):
+    """
+    Frontend files only (nothing else in the project directory is reachable), from memory,
+    brotli/gzip-encoded when the browser accepts it, with ETags for 304 revalidation.
+    """
+    found = STATIC.respond(path, request.headers.get('Accept-Encoding', ''), request.headers.get('If-None-Match', ''))
+    if found is None:
+        return jsonify({'error': 'Not found'}), 404
+    body, status, headers = found
+    return Response(body, status, headers)
 
 @app.route('/')
 def serve_index():
-    return send_file('index.html')
+    return serve_public('index.html')
 
 @app.route('/<path:path>')
 def serve_static(path):
-    return send_from_directory('.', path)
+    return serve_public(path)
+
+start_warm_up()
 
 if __name__ == '__main__':
     app.run(debug=True, port=5000, host='0.0.0.0')
@@ -0,0 +1,319 @@
+# asgi.py - ASGI entry point: POST /api/process-cv runs on the event loop, every other route is the Flask app
+#
+#   uvicorn asgi:app --host 0.0.0.0 --port 5000 --workers 2
+#   gunicorn -c gunicorn.conf.py -k uvicorn.workers.UvicornWorker asgi:app
+#
+# A CV waiting on the model is a coroutine of a few kilobytes instead of a blocked thread, so
+# one worker keeps hundreds of them in flight. Rendering runs on a small thread pool and the
+# Flask routes (jobs, SSE progress, downloads, matching, static files) on another, so neither
+# blocks the event loop.
+import asyncio
+import contextvars
+import io
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs
+
+import app as wsgi
+import metrics
+from admission import AsyncConcurrencyLimiter, OverloadedError, RateLimitedError, retry_after_header
+from local_structurer import STRUCTURER_MODES
+
+logger = logging.getLogger(__name__)
+
+# Model calls in flight per worker (CV_ASYNC_LLM_* env vars, None when uncapped)
+LLM_LIMITER = AsyncConcurrencyLimiter.from_env()
+# Largest JSON body /api/process-cv accepts
+MAX_BODY_BYTES = int(os.environ.get("CV_ASYNC_MAX_BODY_KB", "1024")) * 1024
+
+_render_pool = ThreadPoolExecutor(int(os.environ.get("CV_ASYNC_RENDER_WORKERS", "4")), thread_name_prefix="cv-render")
+
+metrics.Gauge("cv_async_llm_calls_in_flight", "Model calls of the async path holding a slot in this process.",
+              callback=lambda: LLM_LIMITER.in_flight if LLM_LIMITER else 0)
+metrics.Gauge("cv_async_llm_queue_depth", "Model calls of the async path waiting for a slot in this process.",
+              callback=lambda: LLM_LIMITER.waiting if LLM_LIMITER else 0)
+
+
+# ---------- the Flask app behind ASGI ----------
+class _RequestBody(io.RawIOBase):
+    """wsgi.input for a worker thread: pulls the request body from the event loop as it is read."""
+
+    def __init__(self, receive, loop):
+        self._receive = receive
+        self._loop = loop
+        self._buffer = b""
+        self._more = True
+
+    def readable(self):
+        return True
+
+    def readinto(self, target):
+        while not self._buffer and self._more:
+            message = asyncio.run_coroutine_threadsafe(self._receive(), self._loop).result()
+            self._buffer = message.get("body", b"")
+            self._more = message["type"] == "http.request" and message.get("more_body", False)
+        size = min(len(target), len(self._buffer))
+        target[:size] = self._buffer[:size]
+        self._buffer = self._buffer[size:]
+        return size
+
+
+class WSGIBridge:
+    """
+    Runs a WSGI app for ASGI requests on its own thread pool (one thread per request in
+    progress, as under gunicorn's gthread workers). The body is streamed in and the response
+    streamed out, so uploads to /api/batch and SSE progress streams work as before.
+    """
+
+    def __init__(self, wsgi_app, threads=32):
+        self.wsgi_app = wsgi_app
+        self.pool = ThreadPoolExecutor(threads, thread_name_prefix="cv-wsgi")
+
+    async def __call__(self, scope, receive, send):
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self.pool, self._run, scope, receive, send, loop)
+
+    @staticmethod
+    def environ(scope, body):
+        server = scope.get("server") or ("localhost", 80)
+        environ = {
+            "REQUEST_METHOD": scope["method"],
+            "SCRIPT_NAME": scope.get("root_path", "").encode("utf-8").decode("latin-1"),
+            "PATH_INFO": scope["path"].encode("utf-8").decode("latin-1"),
+            "QUERY_STRING": scope["query_string"].decode("latin-1"),
+            "SERVER_NAME": str(server[0]),
+            "SERVER_PORT": str(server[1] or 80),
+            "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+            "REMOTE_ADDR": (scope.get("client") or ("", 0))[0],
+            "wsgi.version": (1, 0),
+            "wsgi.url_scheme": scope.get("scheme", "http"),
+            "wsgi.input": io.BufferedReader(body),
+            "wsgi.input_terminated": True,
+            "wsgi.errors": sys.stderr,
+            "wsgi.multithread": True,
+            "wsgi.multiprocess": True,
+            "wsgi.run_once": False,
+        }
+        for name, value in scope["headers"]:
+            name = name.decode("latin-1").upper().replace("-", "_")
+            value = value.decode("latin-1")
+            key = name if name in ("CONTENT_TYPE", "CONTENT_LENGTH") else f"HTTP_{name}"
+            environ[key] = f"{environ[key]},{value}" if key in environ else value
+        return environ
+
+    def _run(self, scope, receive, send, loop):
+        def emit(message):
+            asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+        response = {}
+
+        def start_response(status, headers, exc_info=None):
+            response["start"] = {
+                "type": "http.response.start",
+                "status": int(status.split(" ", 1)[0]),
+                "headers": [(name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in headers],
+            }
+
+        body = self.wsgi_app(self.environ(scope, _RequestBody(receive, loop)), start_response)
+        try:
+            started = False
+            for chunk in body:
+                if not started:
+                    emit(response["start"])
+                    started = True
+                if chunk:
+                    emit({"type": "http.response.body", "body": chunk, "more_body": True})
+            if not started:
+                emit(response["start"])
+            emit({"type": "http.response.body", "body": b"", "more_body": False})
+        finally:
+            if hasattr(body, "close"):
+                body.close()
+
+
+flask_app = WSGIBridge(wsgi.app, threads=int(os.environ.get("CV_ASYNC_WSGI_THREADS", "32")))
+
+
+# ---------- POST /api/process-cv on the event loop ----------
+class _HTTPError(Exception):
+    def __init__(self, status, message, retry_after=None):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+
+async def _read_body(receive):
+    chunks = []
+    size = 0
+    more = True
+    while more:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            raise _HTTPError(400, "Client disconnected")
+        chunks.append(message.get("body", b""))
+        size += len(chunks[-1])
+        if size > MAX_BODY_BYTES:
+            raise _HTTPError(413, "Request body too large")
+        more = message.get("more_body", False)
+    return b"".join(chunks)
+
+
+def _client_ids(limiter, headers, scope):
+    """Rate-limit buckets, as app.client_ids: the client address, plus a configured X-API-Key"""
+    proxies = int(os.environ.get("CV_TRUSTED_PROXIES", "0"))
+    forwarded = [part.strip() for part in headers.get("x-forwarded-for", "").split(",") if part.strip()]
+    if proxies > 0 and len(forwarded) >= proxies:
+        address = forwarded[-proxies]
+    else:
+        address = (scope.get("client") or (None,))[0]
+    return limiter.clients(address, headers.get("x-api-key"))
+
+
+def _option(query, data, name, allowed, default):
+    """?name= or a popped "name" key of the body, checked against allowed (ValueError otherwise)"""
+    body_value = data.pop(name, None)  # popped even when the query wins, so it never reaches the CV
+    value = (query.get(name) or [None])[0] or body_value or default
+    if value is None:
+        return None
+    value = str(value).lower()
+    if value not in allowed:
+        raise ValueError(f"Unsupported {name} {value!r}; use one of: {', '.join(allowed)}")
+    return value
+
+
+def make_processor(mode=None):
+    """AsyncCVProcessor on the worker's AsyncOpenAI client, sharing app.py's result cache"""
+    from backend_1 import AsyncCVProcessor
+    from llm_client import get_async_client, get_system_prompt
+
+    return AsyncCVProcessor(
+        cache=wsgi.LLM_CACHE,
+        client=get_async_client(os.environ.get("OPENAI_API_KEY")),
+        system_prompt=get_system_prompt("system_prompt.txt"),
+        llm_limiter=LLM_LIMITER,
+        mode=mode,
+    )
+
+
+async def process_cv(scope, data, headers):
+    """Same contract as the Flask route: JSON in, the CV file out (plus X-Result-URL)"""
+    from renderers import FORMATS
+
+    if wsgi.RATE_LIMITER is not None:
+        try:
+            wsgi.RATE_LIMITER.acquire(*_client_ids(wsgi.RATE_LIMITER, headers, scope))
+        except RateLimitedError as e:
+            raise _HTTPError(429, str(e), e.retry_after)
+    query = parse_qs(scope["query_string"].decode("latin-1"))
+    try:
+        fmt = _option(query, data, "format", FORMATS, "docx")
+        mode = _option(query, data, "mode", STRUCTURER_MODES, None)
+    except ValueError as e:
+        raise _HTTPError(400, str(e))
+
+    try:
+        structured_cv = await make_processor(mode).process(data)
+    except OverloadedError as e:
+        raise _HTTPError(503, str(e), e.retry_after)
+    except Exception as e:
+        metrics.ERRORS.inc(stage="request", type=type(e).__name__)
+        if getattr(e, "status_code", None) == 429:
+            metrics.ADMISSION_REJECTIONS.inc(reason="upstream")
+            raise _HTTPError(503, "The AI service is busy, please retry shortly", 10)
+        raise _HTTPError(500, str(e))
+
+    loop = asyncio.get_running_loop()
+    try:
+        cv_bytes, download_name, mimetype, token = await loop.run_in_executor(
+            _render_pool, contextvars.copy_context().run, wsgi.render_result, structured_cv, fmt, data)
+    except Exception as e:
+        metrics.ERRORS.inc(stage="render", type=type(e).__name__)
+        raise _HTTPError(500, str(e))
+    response_headers = [
+        ("content-type", mimetype),
+        ("content-disposition", f"attachment; filename={download_name}"),
+    ]
+    if token:
+        response_headers.append(("x-result-url", f"/api/results/{token}"))
+    return 200, response_headers, cv_bytes
+
+
+async def _respond(send, status, headers, body, trace_id):
+    headers = headers + [
+        ("content-length", str(len(body))),
+        ("x-request-id", trace_id),
+        # what flask-cors adds on the Flask routes
+        ("access-control-allow-origin", "*"),
+        ("access-control-expose-headers", "Content-Disposition, X-Request-ID, X-Result-URL, Retry-After"),
+    ]
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(name.encode("latin-1"), value.encode("latin-1")) for name, value in headers],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+async def handle_process_cv(scope, receive, send):
+    headers = {name.decode("latin-1").lower(): value.decode("latin-1") for name, value in scope["headers"]}
+    trace_id = metrics.start_trace(headers.get("x-request-id"))
+    started = time.perf_counter()
+    metrics.REQUESTS_IN_FLIGHT.inc()
+    try:
+        try:
+            body = await _read_body(receive)
+            try:
+                data = json.loads(body or b"null")
+            except ValueError:
+                raise _HTTPError(400, "Request body is not valid JSON")
+            if not data or not isinstance(data, dict):
+                raise _HTTPError(400, "No data provided")
+            if data.get("session_id"):
+                # Editing sessions (section-level regeneration) run on the sync pipeline
+                await flask_app(scope, _replay(body), send)
+                return
+            status, response_headers, payload = await process_cv(scope, data, headers)
+        except _HTTPError as e:
+            status = e.status
+            response_headers = [("content-type", "application/json")]
+            error = {"error": str(e)}
+            if e.retry_after is not None:
+                error["retry_after"] = int(retry_after_header(e.retry_after))
+                response_headers.append(("retry-after", retry_after_header(e.retry_after)))
+            payload = json.dumps(error).encode("utf-8")
+        await _respond(send, status, response_headers, payload, trace_id)
+        metrics.REQUEST_SECONDS.observe(time.perf_counter() - started,
+                                        endpoint="/api/process-cv", method="POST", status=status)
+    finally:
+        metrics.REQUESTS_IN_FLIGHT.dec()
+
+
+def _replay(body):
+    async def receive():
+        return {"type": "http.request", "body": body, "more_body": False}
+    return receive
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            _render_pool.shutdown(wait=False)
+            flask_app.pool.shutdown(wait=False)
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def app(scope, receive, send):
+    if scope["type"] == "lifespan":
+        await lifespan(receive, send)
+    elif scope["type"] == "http" and scope["method"] == "POST" and scope["path"] == "/api/process-cv":
+        await handle_process_cv(scope, receive, send)
+    elif scope["type"] == "http":
+        await flask_app(scope, receive, send)
@@ -1,74 +1,544 @@
+import contextlib
 import json
-from openai import OpenAI
-from cv_generator import CVGenerator
+import logging
 import os
 import sys
 import re
+import time
+import metrics
+from cv_repair import RepairReport, empty_value, fields_with_input, normalize_field, repair_structured_cv
+from llm_cache import make_cache_key
+from prompt_builder import compact, serialize_cv
+from sessions import OTHER_SECTION, SECTION_FIELDS, changed_sections, section_of
+from llm_client import get_client, get_system_prompt
+from local_structurer import (DEFAULT_POLISH_THRESHOLD, FREE_TEXT_FIELDS, STRUCTURER_MODES, fields_to_polish,
+                              polish_scores, structure_locally)
+from resilience import MODEL_CALLS, DeadlineExceededError, is_upstream_failure
+from streaming_json import TopLevelKeyParser
 
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-class CVProcessor:
-    def __init__(self, input_file, output_file, api_key, system_prompt_file):
+logger = logging.getLogger(__name__)
+
+class _BaseCVProcessor:
+    """
+    What the sync and async processors share: configuration, cleaning, prompts, the result
+    cache, repair of answers and the local rules. Model calls live in the subclasses.
+    """
+    MODEL = "gpt-5-nano"
+    MODES = STRUCTURER_MODES  # how process() structures a CV, see local_structurer
+
+    def __init__(self, input_file=None, output_file=None, api_key=None, system_prompt_file="system_prompt.txt",
+                 cache=None, client=None, system_prompt=None, llm_limiter=None, bounded_wait=True, mode=None,
+                 polish_threshold=None, caller=None):
         self.input_file = input_file
         self.output_file = output_file
-        self.client = OpenAI(api_key=api_key)
-        with open(system_prompt_file, "r") as f:
-            self.system_prompt = f.read()
+        self.cache = cache  # optional llm_cache.LLMResultCache shared across requests
+        # optional admission.ConcurrencyLimiter: each model call holds one of its slots
+        self.llm_limiter = llm_limiter
+        self.bounded_wait = bounded_wait
+        # deadlines, retries, hedging and the circuit breaker of every model call (resilience.ModelCaller)
+        self.caller = caller or MODEL_CALLS
+        # "local": structure with the rules alone when the model cannot be reached; "off": fail
+        self.fallback = os.environ.get("CV_LLM_FALLBACK", "local").lower()
+        self.mode = mode or os.environ.get("CV_STRUCTURER", "auto").lower()
+        if self.mode not in self.MODES:
+            raise ValueError(f"Unknown structurer mode {self.mode!r}; use one of: {', '.join(self.MODES)}")
+        self.polish_threshold = float(polish_threshold if polish_threshold is not None
+                                      else os.environ.get("CV_POLISH_THRESHOLD", DEFAULT_POLISH_THRESHOLD))
+        # Shared, long-lived resources from llm_client (created on first use if not passed in)
+        self._client = client
+        self._api_key = api_key
+        self._system_prompt = system_prompt or get_system_prompt(system_prompt_file)
 
-    def load_and_clean(self):
-        with open(self.input_file, "r") as file:
-            data = json.load(file)
+    @property
+    def client(self):
+        """The OpenAI client, made on the first model call (fast mode runs without an API key)."""
+        if self._client is None:
+            self._client = get_client(self._api_key)
+        return self._client
+
+    @property
+    def system_prompt(self):
+        return self._system_prompt.text
 
-        clean_data = {
-            key: value
-            for key, value in data.items()
-            if value is not None and not (isinstance(value, str) and value.strip().lower() == "none")
-        }
+    @property
+    def fingerprint(self):
+        """Identifies the prompt + model a structured result was produced with."""
+        return make_cache_key({}, self.system_prompt, self.MODEL)
+
+    def clean(self, data):
+        """Drop None, "none" and empty values at every level of a raw CV dict and collapse whitespace."""
+        with metrics.stage("clean"):
+            clean_data = compact(data)
         return clean_data
 
-    def convert_to_structured_cv(self, clean_data):
-        response = self.client.chat.completions.create(
-            model="gpt-5-nano",
-            messages=[
-                {"role": "system", "content": self.system_prompt},
-                {"role": "user", "content": f"RAW CV DATA:\n{clean_data}"}
-            ]
-        )
-        content = response.choices[0].message.content
+    def _llm_slot(self):
+        """Model-call slot from the limiter (raises admission.OverloadedError when there is no capacity)."""
+        if self.llm_limiter is None:
+            return contextlib.nullcontext()
+        return self.llm_limiter.slot(bounded=self.bounded_wait)
+
+    def _can_fall_back(self, error):
+        return self.fallback == "local" and is_upstream_failure(error)
+
+    def _fall_back(self, clean_data, error):
+        """The model is unreachable: the rules alone structure the CV, so the user still gets one."""
+        metrics.LLM_CALL_OUTCOMES.inc(outcome="fallback")
+        logger.warning("Model unavailable (%s), structuring the CV locally", type(error).__name__)
+        return self._merge_polished(self._structure_locally(clean_data, polish=False)[0], {})
 
+    def _cache_key(self, clean_data, fields=None):
+        """Key of a full answer (or, with fields, of a section-scoped one); None when caching is off."""
+        if self.cache is None:
+            return None
+        prompt = f"{self.system_prompt}\0{','.join(fields)}" if fields else self.system_prompt
+        return make_cache_key(clean_data, prompt, self.MODEL)
+
+    @staticmethod
+    def _counted(cached):
+        """A cache lookup result, counted as a hit or a miss."""
+        metrics.LLM_CACHE_LOOKUPS.inc(result="miss" if cached is None else "hit")
+        return cached
+
+    def _answer_content(self, response):
+        """JSON text of a full answer."""
+        metrics.record_usage(getattr(response, "usage", None))
+        return self._extract_json(response.choices[0].message.content)
+
+    @staticmethod
+    def _merge_reasked(structured_cv, report, wanted, reasked):
+        """(structured CV, re-asked keys, whether the merged CV should replace the cached answer)."""
+        structured_cv.update(reasked)
+        # Keep the repaired result, so a repeat request needs neither the model nor the repair
+        keep = bool(report.changed or reasked) and len(reasked) == len(wanted)
+        return structured_cv, set(reasked), keep
+
+    @staticmethod
+    def _fields_to_reask(clean_data, report):
+        if os.environ.get("CV_REPAIR_REASK", "1") == "0":
+            return []
+        return fields_with_input(clean_data, report.missing + report.incomplete)
+
+    def _fields_answer(self, response, fields):
+        """The requested fields a section-scoped answer contains."""
+        metrics.record_usage(getattr(response, "usage", None))
+        structured_cv, report = self._repair(self._extract_json(response.choices[0].message.content), fields)
+        return {key: structured_cv[key] for key in fields if key in report.present}
+
+    def _build_messages(self, clean_data, fields=None):
+        """
+        System prompt first and unchanged (a byte-identical prefix for provider-side prompt
+        caching), then the CV as compact JSON within the CV_PROMPT_TOKEN_BUDGET.
+        """
+        payload = serialize_cv(clean_data)
+        metrics.PROMPT_TOKENS_SAVED.inc(max(payload.tokens_saved, 0))
+        metrics.PROMPT_FIELDS_SHORTENED.inc(len(payload.shortened))
+        logger.info("Prompt CV data: ~%d tokens, ~%d saved%s", payload.tokens, payload.tokens_saved,
+                    f", {len(payload.shortened)} long field(s) shortened to fit the budget" if payload.shortened else "")
+        user_content = f"RAW CV DATA:\n{payload.text}"
+        if fields:
+            user_content += f"\n\nReturn a JSON object with ONLY these keys: {', '.join(fields)}"
+        return [
+            {"role": "system", "content": self.system_prompt},
+            {"role": "user", "content": user_content}
+        ]
+
+    @staticmethod
+    def _extract_json(content):
         # parsing logic
         match = re.search(r"```(?:json)?(.*?)```", content, re.DOTALL)
         if match:
             content = match.group(1).strip()
-            
         return content.strip()
 
-    def save_structured_cv(self, structured_cv):
+    @staticmethod
+    def _is_json(content):
         try:
-            structured_cv_json = json.loads(structured_cv)  # Try to parse as JSON
+            json.loads(content)
+            return True
         except json.JSONDecodeError:
-            structured_cv_json = {"structured_cv": structured_cv}
+            return False
+
+    def parse_structured_cv(self, structured_cv):
+        """Turn the model output into a schema-shaped dict, repairing broken JSON locally (see cv_repair)."""
+        return self._repair(structured_cv)[0]
+
+    def _repair(self, content, fields=None):
+        """repair_structured_cv with metrics and a log line; `fields` limits what counts as missing."""
+        with metrics.stage("parse"):
+            structured_cv, report = repair_structured_cv(content)
+        if fields is not None:
+            report.missing = [key for key in report.missing if key in fields]
+        for code, _ in report.fixes:
+            metrics.CV_REPAIRS.inc(fix=code)
+        if report.changed:
+            logger.info("Model answer repaired: %s", report.summary())
+        return structured_cv, report
+
+    def _structure_locally(self, clean_data, polish):
+        """(structured CV from the rules, free-text fields to polish - none when polish is False)."""
+        with metrics.stage("structure_local"):
+            structured_cv, _ = structure_locally(clean_data)
+            scores = polish_scores(structured_cv)
+        logger.info("Polish scores: %s", ", ".join(f"{field} {score}" for field, (score, _) in scores.items()))
+        return structured_cv, fields_to_polish(scores, self.polish_threshold) if polish else []
+
+    def _polish_failed(self, error):
+        if not self._can_fall_back(error):
+            raise error
+        metrics.LLM_CALL_OUTCOMES.inc(outcome="fallback")
+        logger.warning("Model unavailable (%s), keeping the local text", type(error).__name__)
+
+    @staticmethod
+    def _merge_polished(structured_cv, polished):
+        structured_cv.update(polished)
+        metrics.CV_FIELDS_STRUCTURED.inc(len(FREE_TEXT_FIELDS) - len(polished), route="local")
+        metrics.CV_FIELDS_STRUCTURED.inc(len(polished), route="llm")
+        return structured_cv
+
+
+class CVProcessor(_BaseCVProcessor):
+    """
+    The synchronous pipeline: model calls block the calling thread (Flask routes, jobs,
+    batch). Also streams answers, regenerates the edited sections of a session and runs
+    the file-based CLI pipeline.
+    """
+
+    def load_and_clean(self):
+        with metrics.stage("load"), open(self.input_file, "r") as file:
+            data = json.load(file)
+
+        return self.clean(data)
+
+    def _create(self, kind, **kwargs):
+        """chat.completions.create through self.caller (deadline, retries, hedging, circuit breaker)."""
+        return self.caller.call(self.client.chat.completions.create, kind=kind, model=self.MODEL, **kwargs)
+
+    def _cache_get(self, cache_key):
+        """Cached text for the key; None on a miss or when caching is off."""
+        return None if cache_key is None else self._counted(self.cache.get(cache_key))
+
+    def _cache_set(self, cache_key, value):
+        if cache_key is not None:
+            self.cache.set(cache_key, value)
+
+    def convert_to_structured_cv(self, clean_data):
+        cache_key = self._cache_key(clean_data)
+        cached = self._cache_get(cache_key)
+        if cached is not None:
+            return cached
+
+        with self._llm_slot(), metrics.stage("llm"):
+            response = self._create("llm", messages=self._build_messages(clean_data))
+        content = self._answer_content(response)
+        # Only cache output we can actually render, so a retry after a bad answer asks again
+        if self._is_json(content):
+            self._cache_set(cache_key, content)
+        return content
+
+    def stream_structured_cv(self, clean_data):
+        """
+        Streaming variant of convert_to_structured_cv.
+        Yields (key, value) for each top-level field as soon as the model has finished writing it,
+        so rendering can start long before the completion ends. The whole stream must finish within
+        the caller's deadline; if the model cannot be reached before the first field, the CV is
+        structured locally instead (CV_LLM_FALLBACK).
+        """
+        cache_key = self._cache_key(clean_data)
+        cached = self._cache_get(cache_key)
+        if cached is not None:
+            yield from self.parse_structured_cv(cached).items()
+            return
+
+        # The slot is held until the stream is fully read (the model is busy until then)
+        with self._llm_slot():
+            # Only time spent waiting on the model counts as "llm", not the caller's work between yields
+            llm_seconds = 0.0
+            started = time.perf_counter()
+            deadline = time.monotonic() + self.caller.deadline
+            emitted = set()
+            chunks = []
+            failure = None
+            try:
+                stream = self._create(
+                    "llm_stream",
+                    messages=self._build_messages(clean_data),
+                    stream=True,
+                    stream_options={"include_usage": True}
+                )
+                parser = TopLevelKeyParser()
+                for event in stream:
+                    if time.monotonic() > deadline:
+                        getattr(stream, "close", lambda: None)()
+                        raise DeadlineExceededError("Model stream deadline exceeded")
+                    metrics.record_usage(getattr(event, "usage", None))
+                    if not event.choices:
+                        continue
+                    delta = event.choices[0].delta.content
+                    if delta:
+                        chunks.append(delta)
+                        members = parser.feed(delta)
+                        if members:
+                            llm_seconds += time.perf_counter() - started
+                            started = None
+                            for key, value in members:
+                                # fixes are counted once, when the full answer is repaired below
+                                key, value = normalize_field(key, value, RepairReport())
+                                emitted.add(key)
+                                yield key, value
+                            started = time.perf_counter()
+            except Exception as e:
+                metrics.ERRORS.inc(stage="llm", type=type(e).__name__)
+                if emitted or not self._can_fall_back(e):
+                    raise
+                failure = e
+            finally:
+                if started is not None:
+                    llm_seconds += time.perf_counter() - started
+                metrics.STAGE_SECONDS.observe(llm_seconds, stage="llm")
+
+        if failure is not None:
+            yield from self._fall_back(clean_data, failure).items()
+            return
+
+        content = self._extract_json("".join(chunks))
+        if self._is_json(content):
+            self._cache_set(cache_key, content)
+
+        # Anything the incremental parser could not pick up comes from the repaired full text,
+        # and fields the answer lacked come from a targeted re-ask
+        structured_cv, reasked = self.finalize_structured_cv(clean_data, content)
+        for key, value in structured_cv.items():
+            if key not in emitted or key in reasked:
+                yield key, value
+
+    def finalize_structured_cv(self, clean_data, content):
+        """
+        Repair and normalise the answer locally (cv_repair), then - last resort - ask the
+        model again for only the fields that are missing or were cut off, if the input has
+        data for them. Returns (structured CV dict, keys filled by the re-ask).
+        """
+        structured_cv, report = self._repair(content)
+        wanted = self._fields_to_reask(clean_data, report)
+        reasked = self.complete_missing_fields(clean_data, wanted) if wanted else {}
+        structured_cv, reasked, keep = self._merge_reasked(structured_cv, report, wanted, reasked)
+        if keep:
+            self._cache_set(self._cache_key(clean_data), json.dumps(structured_cv))
+        return structured_cv, reasked
+
+    def complete_missing_fields(self, clean_data, fields):
+        """Last resort after the local repair: one follow-up call asking only for `fields`."""
+        metrics.LLM_REASKS.inc()
+        logger.info("Re-asking the model for: %s", ", ".join(fields))
+        try:
+            return self.structure_fields(clean_data, fields, stage="llm_reask")
+        except Exception as e:
+            logger.warning("Re-ask failed, keeping the repaired answer: %s", e)
+            return {}
+
+    def structure_fields(self, clean_data, fields, stage="llm_sections"):
+        """
+        Section-scoped call: same system prompt, but the model is asked for `fields` only.
+        Returns the requested fields the answer contains (cached like full answers).
+        """
+        cache_key = self._cache_key(clean_data, fields)
+        cached = self._cache_get(cache_key)
+        if cached is not None:
+            return json.loads(cached)
+
+        with self._llm_slot(), metrics.stage(stage):
+            response = self._create(stage, messages=self._build_messages(clean_data, fields))
+        result = self._fields_answer(response, fields)
+        if len(result) == len(fields):
+            self._cache_set(cache_key, json.dumps(result))
+        return result
+
+    def process_changes(self, data, previous_input, previous_structured):
+        """
+        Section-level regeneration of an edited CV: only the sections whose raw input differs
+        from previous_input go to the model, everything else is reused from previous_structured.
+        Falls back to a full process() when the change cannot be scoped to known sections.
+        Returns (structured CV dict, names of the regenerated sections).
+        """
+        clean_data = self.clean(data)
+        changed = changed_sections(previous_input, clean_data)
+        if OTHER_SECTION in changed:
+            return self.process(data), list(SECTION_FIELDS)
+
+        metrics.CV_SECTIONS.inc(len(SECTION_FIELDS) - len(changed), result="reused")
+        metrics.CV_SECTIONS.inc(len(changed), result="regenerated")
+        if not changed:
+            return dict(previous_structured), []
+
+        fields = [field for section in changed for field in SECTION_FIELDS[section]]
+        scoped_input = {key: value for key, value in clean_data.items() if section_of(key) in changed}
+        wanted = fields_with_input(scoped_input, fields)
+        try:
+            result = self.structure_fields(scoped_input, wanted) if wanted else {}
+        except Exception as e:
+            if not self._can_fall_back(e):
+                raise
+            return self._fall_back(clean_data, e), list(SECTION_FIELDS)
+        if len(result) < len(wanted):
+            logger.info("Section answer incomplete, regenerating the whole CV")
+            return self.process(data), list(SECTION_FIELDS)
+
+        logger.info("Regenerated sections: %s", ", ".join(changed))
+        structured_cv = dict(previous_structured)
+        for field in fields:
+            structured_cv[field] = result.get(field, empty_value(field))
+        return structured_cv, changed
+
+    def save_structured_cv(self, structured_cv):
+        structured_cv_json = self.parse_structured_cv(structured_cv)
 
         with open(self.output_file, "w") as f:
             f.write(json.dumps(structured_cv_json, indent=2))
             f.write("\n")  # ensure each entry is on a new line
 
-        print(f"Structured CV saved successfully in {self.output_file}!")
+        logger.info("Structured CV saved in %s", self.output_file)
 
     # ---------- NEW: Secure JSON wipe function ----------
     def wipe_json_file(self, file_path):
         """Overwrite a JSON file with an empty object {} without deleting the file."""
         with open(file_path, "w", encoding="utf-8") as f:
             json.dump({}, f, indent=2)
-        print(f"Securely wiped contents of: {file_path}")
+        logger.info("Securely wiped contents of: %s", file_path)
+
+    def process(self, data, mode=None):
+        """
+        In-memory pipeline: raw CV dict in, structured CV dict out. Nothing touches disk.
+        `mode` overrides self.mode for this call (see MODES).
+        """
+        clean_data = self.clean(data)
+        if (mode or self.mode) == "llm":
+            try:
+                structured_cv = self.convert_to_structured_cv(clean_data)
+            except Exception as e:
+                if not self._can_fall_back(e):
+                    raise
+                return self._fall_back(clean_data, e)
+            return self.finalize_structured_cv(clean_data, structured_cv)[0]
+        return self.structure_with_rules(clean_data, polish=(mode or self.mode) == "auto")
+
+    def structure_with_rules(self, clean_data, polish=True):
+        """
+        Rule-based structuring (local_structurer); with polish=True the free-text fields
+        scoring at or above polish_threshold are sent to the model - those fields only,
+        already structured. A field the answer leaves out keeps its local version.
+        """
+        structured_cv, fields = self._structure_locally(clean_data, polish)
+        polished = {}
+        if fields:
+            try:
+                polished = self.structure_fields({field: structured_cv[field] for field in fields}, fields,
+                                                 stage="llm_polish")
+            except Exception as e:
+                self._polish_failed(e)
+        return self._merge_polished(structured_cv, polished)
 
     def run(self):
+        """File-based wrapper around the same steps (input_file -> output_file)."""
         clean_data = self.load_and_clean()
         structured_cv = self.convert_to_structured_cv(clean_data)
         self.save_structured_cv(structured_cv)
 
 
+class AsyncCVProcessor(_BaseCVProcessor):
+    """
+    CVProcessor for an event loop (asgi.py): model calls go through AsyncOpenAI and await
+    instead of holding a thread, so one worker keeps hundreds of CVs in flight. Cleaning,
+    prompts, repair and the local rules come from _BaseCVProcessor (they take
+    microseconds to milliseconds); process(), the model-call methods and the cache reads and
+    writes (the SQLite tier touches the disk) are coroutines.
+    Streaming, editing sessions and the file-based run() exist on CVProcessor only.
+    `client` is an AsyncOpenAI client, `llm_limiter` an admission.AsyncConcurrencyLimiter.
+    """
+
+    async def _create(self, kind, **kwargs):
+        return await self.caller.acall(self.client.chat.completions.create, kind=kind, model=self.MODEL, **kwargs)
+
+    async def _cache_get(self, cache_key):
+        return None if cache_key is None else self._counted(await self.cache.aget(cache_key))
+
+    async def _cache_set(self, cache_key, value):
+        if cache_key is not None:
+            await self.cache.aset(cache_key, value)
+
+    async def convert_to_structured_cv(self, clean_data):
+        cache_key = self._cache_key(clean_data)
+        cached = await self._cache_get(cache_key)
+        if cached is not None:
+            return cached
+
+        async with self._llm_slot():
+            with metrics.stage("llm"):
+                response = await self._create("llm", messages=self._build_messages(clean_data))
+        content = self._answer_content(response)
+        if self._is_json(content):
+            await self._cache_set(cache_key, content)
+        return content
+
+    async def finalize_structured_cv(self, clean_data, content):
+        structured_cv, report = self._repair(content)
+        wanted = self._fields_to_reask(clean_data, report)
+        reasked = await self.complete_missing_fields(clean_data, wanted) if wanted else {}
+        structured_cv, reasked, keep = self._merge_reasked(structured_cv, report, wanted, reasked)
+        if keep:
+            await self._cache_set(self._cache_key(clean_data), json.dumps(structured_cv))
+        return structured_cv, reasked
+
+    async def complete_missing_fields(self, clean_data, fields):
+        metrics.LLM_REASKS.inc()
+        logger.info("Re-asking the model for: %s", ", ".join(fields))
+        try:
+            return await self.structure_fields(clean_data, fields, stage="llm_reask")
+        except Exception as e:
+            logger.warning("Re-ask failed, keeping the repaired answer: %s", e)
+            return {}
+
+    async def structure_fields(self, clean_data, fields, stage="llm_sections"):
+        cache_key = self._cache_key(clean_data, fields)
+        cached = await self._cache_get(cache_key)
+        if cached is not None:
+            return json.loads(cached)
+
+        async with self._llm_slot():
+            with metrics.stage(stage):
+                response = await self._create(stage, messages=self._build_messages(clean_data, fields))
+        result = self._fields_answer(response, fields)
+        if len(result) == len(fields):
+            await self._cache_set(cache_key, json.dumps(result))
+        return result
+
+    async def structure_with_rules(self, clean_data, polish=True):
+        structured_cv, fields = self._structure_locally(clean_data, polish)
+        polished = {}
+        if fields:
+            try:
+                polished = await self.structure_fields({field: structured_cv[field] for field in fields}, fields,
+                                                       stage="llm_polish")
+            except Exception as e:
+                self._polish_failed(e)
+        return self._merge_polished(structured_cv, polished)
+
+    async def process(self, data, mode=None):
+        clean_data = self.clean(data)
+        if (mode or self.mode) == "llm":
+            try:
+                structured_cv = await self.convert_to_structured_cv(clean_data)
+            except Exception as e:
+                if not self._can_fall_back(e):
+                    raise
+                return self._fall_back(clean_data, e)
+            return (await self.finalize_structured_cv(clean_data, structured_cv))[0]
+        return await self.structure_with_rules(clean_data, polish=(mode or self.mode) == "auto")
+
+
 if __name__ == "__main__":
+    from cv_generator import CVGenerator
+
     api_key = os.environ.get("OPENAI_API_KEY")
     processor = CVProcessor(
         input_file="Temporary_File_1.json",
@@ -0,0 +1,213 @@
+# batch.py - Bulk CV generation: JSONL of raw CV inputs in, streamed ZIP of DOCX files out
+import argparse
+import json
+import multiprocessing
+import os
+import tempfile
+import threading
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+from local_structurer import STRUCTURER_MODES
+from log_setup import configure_logging
+
+MANIFEST_NAME = "manifest.jsonl"
+
+
+# ---------- render worker (runs inside the process pool) ----------
+def _warm_render_worker():
+    """Pay the python-docx/lxml import and the template build once per pool process, not once per CV."""
+    import cv_generator
+
+    cv_generator.get_base_template()
+
+
+def render_docx_bytes(structured_cv):
+    """Render one structured CV dict to DOCX bytes (top-level so it can be pickled to the pool)."""
+    from fast_docx import get_generator_class
+
+    return get_generator_class()().generate_cv_bytes(structured_cv).getvalue()
+
+
+_render_pool = None
+_render_pool_lock = threading.Lock()
+
+
+def get_render_pool(max_workers=None):
+    """
+    Process-wide warm pool for DOCX rendering (CPU-bound and GIL-limited).
+    forkserver/spawn are used instead of fork so worker threads of the web
+    server are never copied into the children.
+    """
+    global _render_pool
+    with _render_pool_lock:
+        if _render_pool is None:
+            methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+            _render_pool = ProcessPoolExecutor(
+                max_workers=max_workers or int(os.environ.get("CV_BATCH_RENDER_WORKERS", os.cpu_count() or 2)),
+                mp_context=context,
+                initializer=_warm_render_worker,
+            )
+        return _render_pool
+
+
+def _safe_name(name):
+    safe = "".join([c for c in str(name or "") if c.isalnum() or c in " -_"]).strip().replace(" ", "_")
+    return safe or "Enhanced"
+
+
+class _ChunkSink:
+    """Write-only file object that buffers the ZIP bytes until the caller drains them."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+class BatchRunner:
+    """
+    Streams records through two bounded stages:
+      1. CVProcessor.process() on a thread pool (network-bound, llm_concurrency calls at once)
+      2. DOCX rendering on the warm process pool
+    At most `window` records are in memory at any time, whatever the batch size,
+    and a failing record only produces an "error" line in the manifest.
+    """
+
+    def __init__(self, processor, llm_concurrency=8, render_pool=None, window=None):
+        self.processor = processor
+        self.llm_concurrency = llm_concurrency
+        self.render_pool = render_pool
+        self.window = window or llm_concurrency * 2
+
+    def iter_zip(self, lines):
+        """Yield the ZIP archive in chunks while records are still being processed."""
+        sink = _ChunkSink()
+        with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+            for _ in self._write_records(lines, archive):
+                chunk = sink.drain()
+                if chunk:
+                    yield chunk
+        yield sink.drain()
+
+    def write_zip(self, lines, output_path):
+        """Write the whole batch to output_path; returns the summary counts."""
+        with zipfile.ZipFile(output_path, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+            summary = {"ok": 0, "error": 0}
+            for status in self._write_records(lines, archive):
+                summary[status] += 1
+        return summary
+
+    def _write_records(self, lines, archive):
+        """Drive both stages, write each DOCX as soon as it is ready and yield its status."""
+        render_pool = self.render_pool or get_render_pool()
+        records = enumerate(lines, start=1)
+        pending = {}  # future -> (line_number, stage, name)
+
+        # Statuses are tiny but unbounded in count, so they spill to a temp file past 1 MB
+        with tempfile.SpooledTemporaryFile(max_size=1024 * 1024, mode="w+", encoding="utf-8") as manifest, \
+                ThreadPoolExecutor(max_workers=self.llm_concurrency, thread_name_prefix="cv-batch") as llm_pool:
+
+            def record_status(line_number, status, file_name=None, error=None):
+                entry = {"line": line_number, "status": status}
+                if file_name:
+                    entry["file"] = file_name
+                if error:
+                    entry["error"] = error
+                manifest.write(json.dumps(entry) + "\n")
+                return status
+
+            def fill():
+                statuses = []
+                while len(pending) < self.window:
+                    try:
+                        line_number, line = next(records)
+                    except StopIteration:
+                        break
+                    try:
+                        if isinstance(line, bytes):
+                            line = line.decode("utf-8")
+                        if not line.strip():
+                            continue
+                        data = json.loads(line)
+                        if not isinstance(data, dict):
+                            raise ValueError("each line must be a JSON object")
+                    except UnicodeDecodeError as e:
+                        statuses.append(record_status(line_number, "error", error=f"invalid UTF-8: {e}"))
+                        continue
+                    except ValueError as e:
+                        statuses.append(record_status(line_number, "error", error=f"invalid JSON: {e}"))
+                        continue
+                    future = llm_pool.submit(self.processor.process, data)
+                    pending[future] = (line_number, "llm", data.get("full_name"))
+                return statuses
+
+            yield from fill()
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    line_number, stage, name = pending.pop(future)
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        yield record_status(line_number, "error", error=f"{stage}: {e}")
+                        continue
+
+                    if stage == "llm":
+                        render_future = render_pool.submit(render_docx_bytes, result)
+                        pending[render_future] = (line_number, "render", result.get("full_name") or name)
+                    else:
+                        file_name = f"{line_number:05d}_{_safe_name(name)}.docx"
+                        archive.writestr(file_name, result)
+                        yield record_status(line_number, "ok", file_name=file_name)
+                yield from fill()
+
+            manifest.seek(0)
+            with archive.open(MANIFEST_NAME, "w") as manifest_entry:
+                for entry in manifest:
+                    manifest_entry.write(entry.encode("utf-8"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate many CVs from a JSONL file (one raw CV JSON per line).")
+    parser.add_argument("input", help="JSONL file of raw CV inputs")
+    parser.add_argument("output", help="ZIP file to write (DOCX files + manifest.jsonl)")
+    parser.add_argument("--concurrency", type=int, default=8, help="OpenAI calls in flight at once")
+    parser.add_argument("--render-workers", type=int, default=None, help="DOCX render processes")
+    parser.add_argument("--renderer", choices=["docx", "fast"], default=None,
+                        help="python-docx renderer or the direct OOXML fast path (default: CV_RENDERER or docx)")
+    parser.add_argument("--mode", choices=STRUCTURER_MODES, default=None,
+                        help="structurer: llm, auto or fast (local rules only, no OPENAI_API_KEY needed; "
+                             "default: CV_STRUCTURER or auto)")
+    args = parser.parse_args()
+    configure_logging()
+    if args.renderer:
+        os.environ["CV_RENDERER"] = args.renderer  # inherited by the render pool processes
+
+    from backend_1 import CVProcessor
+
+    processor = CVProcessor(api_key=os.environ.get("OPENAI_API_KEY"), mode=args.mode)
+    runner = BatchRunner(
+        processor,
+        llm_concurrency=args.concurrency,
+        render_pool=get_render_pool(args.render_workers),
+    )
+    # Bytes, so a line that is not valid UTF-8 fails on its own instead of ending the batch
+    with open(args.input, "rb") as f:
+        summary = runner.write_zip(f, args.output)
+    print(f"Batch finished: {summary['ok']} CVs generated, {summary['error']} failed -> {args.output}")
+
+
+if __name__ == "__main__":
+    main()
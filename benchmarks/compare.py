@@ -0,0 +1,58 @@
+# compare.py - Diff two run_benchmarks.py result files (e.g. two commits) and flag regressions
+"""
+Usage: python benchmarks/compare.py base.json new.json [--threshold 10] [--metric median_ms]
+Exits with status 1 when any stage got slower than the threshold (percent).
+"""
+import argparse
+import json
+import sys
+
+
+def flatten(report, metric):
+    """{"senior/renderers/docx/section.work_experience": value, ...} for every timed stage."""
+    values = {}
+
+    def walk(prefix, node):
+        if isinstance(node, dict):
+            if metric in node:
+                values[prefix] = node[metric]
+                return
+            for key, child in node.items():
+                walk(f"{prefix}/{key}" if prefix else key, child)
+
+    walk("", report.get("profiles", {}))
+    return values
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files.")
+    parser.add_argument("base")
+    parser.add_argument("new")
+    parser.add_argument("--threshold", type=float, default=10.0, help="percent slowdown reported as a regression")
+    parser.add_argument("--metric", default="median_ms", help="median_ms, mean_ms, p95_ms, min_ms or max_ms")
+    args = parser.parse_args()
+
+    with open(args.base, "r", encoding="utf-8") as f:
+        base = json.load(f)
+    with open(args.new, "r", encoding="utf-8") as f:
+        new = json.load(f)
+
+    print(f"base {base['meta'].get('commit')}  ->  new {new['meta'].get('commit')}  ({args.metric})")
+    before, after = flatten(base, args.metric), flatten(new, args.metric)
+    regressions = 0
+    for stage in sorted(before.keys() & after.keys()):
+        old, current = before[stage], after[stage]
+        change = (current - old) / old * 100 if old else 0.0
+        flag = ""
+        if change > args.threshold:
+            flag = "  REGRESSION"
+            regressions += 1
+        print(f"{stage:<60} {old:>10.2f} {current:>10.2f} {change:>+8.1f}%{flag}")
+    for stage in sorted(before.keys() ^ after.keys()):
+        print(f"{stage:<60} only in {'base' if stage in before else 'new'}")
+
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
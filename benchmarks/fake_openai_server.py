@@ -0,0 +1,253 @@
+# fake_openai_server.py - Local OpenAI-compatible HTTP server for load tests: no API credits, tunable latency and errors
+"""
+Usage (from the project root):
+    python benchmarks/fake_openai_server.py --port 8089 --latency-ms 4000 --distribution lognormal \
+        --error-rate 0.01 --rate-limit-rate 0.01
+    OPENAI_BASE_URL=http://127.0.0.1:8089/v1 OPENAI_API_KEY=fake gunicorn -c gunicorn.conf.py app:app
+
+POST /v1/chat/completions answers like the real endpoint (JSON or, with "stream": true,
+server-sent chunks and a final usage chunk). The structured CV is built from the CV data
+in the prompt and coerced to the app's schema, so answers always parse and render; a
+request for "ONLY these keys" gets only those. GET /v1/models and GET /stats help checks.
+"""
+import argparse
+import json
+import math
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from cv_repair import RepairReport, normalize_cv
+
+_ONLY_KEYS = re.compile(r"Return a JSON object with ONLY these keys: ([\w, ]+)")
+
+
+class FakeConfig:
+    """Latency distribution, failure rates and stream shape of the fake server."""
+
+    def __init__(self, latency_ms=2000.0, distribution="lognormal", spread=0.5, ttft_fraction=0.3,
+                 error_rate=0.0, rate_limit_rate=0.0, chunk_chars=24, seed=None):
+        self.latency_ms = latency_ms
+        self.distribution = distribution  # fixed | uniform | normal | lognormal
+        self.spread = spread              # uniform/normal: fraction of the mean; lognormal: sigma
+        self.ttft_fraction = ttft_fraction  # share of the latency spent before the first streamed chunk
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.chunk_chars = chunk_chars
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.counters = {"requests": 0, "streamed": 0, "errors_500": 0, "errors_429": 0}
+
+    def sample_latency(self):
+        """One latency in seconds drawn from the configured distribution."""
+        with self._lock:
+            mean = self.latency_ms / 1000
+            if self.distribution == "fixed":
+                value = mean
+            elif self.distribution == "uniform":
+                value = self._rng.uniform(mean * (1 - self.spread), mean * (1 + self.spread))
+            elif self.distribution == "normal":
+                value = self._rng.gauss(mean, mean * self.spread)
+            else:
+                # latency_ms is the median; a long right tail like real completions
+                value = self._rng.lognormvariate(math.log(mean) if mean > 0 else -20, self.spread)
+            return max(0.0, value)
+
+    def sample_failure(self):
+        """None, 429 or 500 for the next request, and count it."""
+        with self._lock:
+            self.counters["requests"] += 1
+            draw = self._rng.random()
+            if draw < self.rate_limit_rate:
+                self.counters["errors_429"] += 1
+                return 429
+            if draw < self.rate_limit_rate + self.error_rate:
+                self.counters["errors_500"] += 1
+                return 500
+            return None
+
+
+def structured_answer(messages):
+    """Schema-valid structured CV for the CV data in the last user message (requested keys only, if any)."""
+    prompt = next((m.get("content") or "" for m in reversed(messages) if m.get("role") == "user"), "")
+    payload = prompt.split("RAW CV DATA:", 1)[-1]
+    only = _ONLY_KEYS.search(payload)
+    if only:
+        payload = payload[:only.start()]
+    try:
+        raw = json.loads(payload.strip() or "{}")
+    except ValueError:
+        raw = {}
+    cv = normalize_cv(raw if isinstance(raw, dict) else {}, RepairReport())
+    if only:
+        keys = [key.strip() for key in only.group(1).split(",") if key.strip()]
+        cv = {key: cv[key] for key in keys if key in cv}
+    return cv
+
+
+def _usage(messages, content):
+    prompt_tokens = sum(len(m.get("content") or "") for m in messages) // 4
+    completion_tokens = len(content) // 4
+    return {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens}
+
+
+class FakeOpenAIHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real API (the app's client pools connections)
+    config = FakeConfig()
+
+    def log_message(self, *_args):
+        pass  # one line per request would dominate the output of a load test
+
+    def _send_json(self, status, body, headers=()):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path.rstrip("/").endswith("/models"):
+            self._send_json(200, {"object": "list", "data": [{"id": "gpt-5-nano", "object": "model"}]})
+        elif self.path == "/stats":
+            self._send_json(200, self.config.counters)
+        else:
+            self._send_json(404, {"error": {"message": "Not found", "type": "invalid_request_error"}})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            request = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            return self._send_json(400, {"error": {"message": "Invalid JSON body", "type": "invalid_request_error"}})
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            return self._send_json(404, {"error": {"message": "Not found", "type": "invalid_request_error"}})
+
+        config = self.config
+        latency = config.sample_latency()
+        failure = config.sample_failure()
+        if failure == 429:
+            time.sleep(min(latency, 0.05))
+            return self._send_json(429, {"error": {"message": "Rate limit reached (fake)", "type": "rate_limit_error",
+                                                   "code": "rate_limit_exceeded"}}, headers=[("Retry-After", "1")])
+        if failure == 500:
+            time.sleep(latency * config.ttft_fraction)
+            return self._send_json(500, {"error": {"message": "Internal error (fake)", "type": "server_error"}})
+
+        messages = request.get("messages") or []
+        content = "```json\n" + json.dumps(structured_answer(messages), indent=2) + "\n```"
+        completion_id = "chatcmpl-" + uuid.uuid4().hex
+        model = request.get("model") or "gpt-5-nano"
+
+        if not request.get("stream"):
+            time.sleep(latency)
+            return self._send_json(200, {
+                "id": completion_id, "object": "chat.completion", "created": int(time.time()), "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+                "usage": _usage(messages, content),
+            })
+
+        with config._lock:
+            config.counters["streamed"] += 1
+        self._stream(request, messages, content, completion_id, model, latency)
+
+    def _stream(self, request, messages, content, completion_id, model, latency):
+        """Server-sent chunks: the first after ttft_fraction of the latency, the rest spread over the remainder."""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")  # no Content-Length: the end of the body is the end of the stream
+        self.end_headers()
+        self.close_connection = True
+
+        def event(choices, usage=None):
+            chunk = {"id": completion_id, "object": "chat.completion.chunk", "created": int(time.time()),
+                     "model": model, "choices": choices}
+            if usage is not None:
+                chunk["usage"] = usage
+            self.wfile.write(b"data: " + json.dumps(chunk).encode("utf-8") + b"\n\n")
+            self.wfile.flush()
+
+        size = self.config.chunk_chars
+        pieces = [content[i:i + size] for i in range(0, len(content), size)] or [""]
+        time.sleep(latency * self.config.ttft_fraction)
+        gap = latency * (1 - self.config.ttft_fraction) / len(pieces)
+        try:
+            event([{"index": 0, "delta": {"role": "assistant", "content": ""}, "finish_reason": None}])
+            started = time.monotonic()
+            for index, piece in enumerate(pieces, start=1):
+                event([{"index": 0, "delta": {"content": piece}, "finish_reason": None}])
+                # paced against the clock, so per-chunk overhead does not stretch the total
+                delay = started + gap * index - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+            event([{"index": 0, "delta": {}, "finish_reason": "stop"}])
+            if (request.get("stream_options") or {}).get("include_usage"):
+                event([], usage=_usage(messages, content))
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # the client gave up on the stream
+
+
+def serve(host="127.0.0.1", port=8089, config=None):
+    """Start the server in a daemon thread; returns it (server.server_address, server.shutdown())."""
+    handler = type("ConfiguredHandler", (FakeOpenAIHandler,), {"config": config or FakeConfig()})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="fake-openai", daemon=True).start()
+    return server
+
+
+def add_config_arguments(parser):
+    """Fake-server options, shared with load_test.py."""
+    parser.add_argument("--latency-ms", type=float, default=2000.0, help="mean (median for lognormal) latency")
+    parser.add_argument("--distribution", choices=["fixed", "uniform", "normal", "lognormal"], default="lognormal")
+    parser.add_argument("--spread", type=float, default=0.5,
+                        help="uniform/normal: fraction of the mean; lognormal: sigma (default 0.5)")
+    parser.add_argument("--ttft-fraction", type=float, default=0.3, help="share of the latency before the first chunk")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="fraction answered with 429")
+    parser.add_argument("--chunk-chars", type=int, default=24, help="characters per streamed chunk")
+    parser.add_argument("--seed", type=int, default=None)
+
+
+def config_from_args(args):
+    return FakeConfig(
+        latency_ms=args.latency_ms, distribution=args.distribution, spread=args.spread,
+        ttft_fraction=args.ttft_fraction, error_rate=args.error_rate, rate_limit_rate=args.rate_limit_rate,
+        chunk_chars=args.chunk_chars, seed=args.seed,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local OpenAI-compatible stand-in server for load tests.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    add_config_arguments(parser)
+    args = parser.parse_args()
+
+    server = serve(args.host, args.port, config_from_args(args))
+    host, port = server.server_address[:2]
+    print(f"Fake OpenAI API on http://{host}:{port}/v1  (OPENAI_BASE_URL=http://{host}:{port}/v1)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+        print(json.dumps(server.RequestHandlerClass.config.counters))
+
+
+if __name__ == "__main__":
+    main()
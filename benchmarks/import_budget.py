@@ -0,0 +1,63 @@
+# import_budget.py - Cold-start guard: `import app` must stay fast and must not pull in the LLM/DOCX stacks
+"""
+Usage (from the project root):
+    python benchmarks/import_budget.py [--budget-ms 600] [--runs 5]
+Exits with status 1 when the median import time is over budget or a heavy module
+(openai, pydantic, docx, lxml) is imported by `import app` itself.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ("openai", "pydantic", "docx", "lxml", "httpx")
+
+_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import app
+elapsed = time.perf_counter() - start
+print(json.dumps({"ms": elapsed * 1000, "heavy": [m for m in %r if m in sys.modules]}))
+""" % (HEAVY_MODULES,)
+
+
+def measure_once():
+    """Import app in a fresh interpreter (warm-up disabled) and return (milliseconds, heavy modules loaded)."""
+    env = dict(os.environ, CV_WARMUP="off")
+    output = subprocess.run(
+        [sys.executable, "-c", _PROBE], cwd=ROOT_DIR, env=env,
+        capture_output=True, text=True, check=True,
+    ).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+    return result["ms"], result["heavy"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the import-time budget of app.py.")
+    parser.add_argument("--budget-ms", type=float, default=float(os.environ.get("CV_IMPORT_BUDGET_MS", 600)))
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    timings, heavy = [], set()
+    for _ in range(args.runs):
+        ms, loaded = measure_once()
+        timings.append(ms)
+        heavy.update(loaded)
+
+    median = statistics.median(timings)
+    print(f"import app: median {median:.0f} ms over {args.runs} runs (budget {args.budget_ms:.0f} ms)")
+    failed = False
+    if heavy:
+        print(f"FAIL: imported at startup: {', '.join(sorted(heavy))}")
+        failed = True
+    if median > args.budget_ms:
+        print("FAIL: over budget")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+# load_test.py - Open-loop load generator for the CV API: target RPS, latency percentiles, error breakdown
+"""
+Usage (from the project root):
+    # against a running server (pointed at the real API or at fake_openai_server.py)
+    python benchmarks/load_test.py --url http://127.0.0.1:5000 --rps 5 --duration 60 --payloads recorded.jsonl
+
+    # self-contained sizing run: starts the fake OpenAI server, then gunicorn once per
+    # worker configuration (WORKERSxTHREADS) and drives each one with the same load
+    python benchmarks/load_test.py --configs 1x8,2x8,4x4 --rps 8 --duration 30 --latency-ms 3000
+
+Requests are sent on a fixed schedule (open loop), whatever the server's pace, and latency
+is measured from the scheduled send time, so a saturated server shows up as growing
+latency instead of a quietly lower request rate.
+"""
+import argparse
+import json
+import os
+import platform
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+from fake_openai_server import add_config_arguments, config_from_args, serve
+from synthetic_cv import PROFILES, make_raw_cv
+
+
+def load_payloads(path, count):
+    """Raw CV dicts: one JSON object per line of a recorded JSONL file, else synthetic CVs of every profile."""
+    if path:
+        with open(path, "r", encoding="utf-8") as f:
+            payloads = [json.loads(line) for line in f if line.strip()]
+        if not payloads:
+            raise SystemExit(f"No payloads in {path}")
+        return payloads
+    profiles = list(PROFILES)
+    return [make_raw_cv(profiles[i % len(profiles)], seed=i) for i in range(count)]
+
+
+def percentile(ordered, fraction):
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+class LoadResult:
+    """Outcomes of one run: latencies of successful requests and counts of every failure kind."""
+
+    def __init__(self):
+        self.latencies = []
+        self.errors = {}
+        self.late_sends = 0  # requests that left later than scheduled (the generator itself was saturated)
+        self._lock = threading.Lock()
+
+    def record(self, latency, error=None, late=False):
+        with self._lock:
+            if error is None:
+                self.latencies.append(latency)
+            else:
+                self.errors[error] = self.errors.get(error, 0) + 1
+            self.late_sends += late
+
+    def summary(self, elapsed):
+        ordered = sorted(self.latencies)
+        ms = lambda value: None if value is None else round(value * 1000, 1)  # noqa: E731
+        errors = sum(self.errors.values())
+        return {
+            "requests": len(ordered) + errors,
+            "ok": len(ordered),
+            "errors": dict(sorted(self.errors.items())),
+            "error_rate": round(errors / (len(ordered) + errors), 4) if ordered or errors else 0.0,
+            "throughput_rps": round(len(ordered) / elapsed, 3) if elapsed else 0.0,
+            "p50_ms": ms(percentile(ordered, 0.50)),
+            "p95_ms": ms(percentile(ordered, 0.95)),
+            "p99_ms": ms(percentile(ordered, 0.99)),
+            "max_ms": ms(ordered[-1] if ordered else None),
+            "late_sends": self.late_sends,
+        }
+
+
+def send(url, payload, api_key, timeout):
+    """POST one CV to /api/process-cv and read the whole file; returns None or an error label."""
+    request = urllib.request.Request(
+        url + "/api/process-cv", data=json.dumps(payload).encode("utf-8"), method="POST",
+        headers={"Content-Type": "application/json", "X-API-Key": api_key},
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            response.read()
+        return None
+    except urllib.error.HTTPError as e:
+        return f"http_{e.code}"
+    except (TimeoutError, socket.timeout):
+        return "timeout"
+    except (urllib.error.URLError, ConnectionError) as e:
+        return type(getattr(e, "reason", e)).__name__
+
+
+def run_load(url, payloads, rps, duration, clients=50, max_in_flight=256, timeout=300):
+    """Send rps requests per second for duration seconds and wait for them all; returns the summary."""
+    result = LoadResult()
+    total = int(rps * duration)
+    started = time.monotonic()
+
+    def one(index, scheduled):
+        late = time.monotonic() - scheduled > 0.1
+        error = send(url, payloads[index % len(payloads)], f"load-test-{index % clients}", timeout)
+        result.record(time.monotonic() - scheduled, error, late)
+
+    with ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="load") as pool:
+        for index in range(total):
+            scheduled = started + index / rps
+            delay = scheduled - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(one, index, scheduled)
+    return result.summary(time.monotonic() - started)
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_health(url, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(url + "/api/health", timeout=2) as response:
+                if json.loads(response.read()).get("warm"):
+                    return
+        except (OSError, ValueError):
+            pass
+        time.sleep(0.25)
+    raise RuntimeError(f"{url} did not become healthy within {timeout}s")
+
+
+def start_gunicorn(workers, threads, openai_url, extra_env=None):
+    """gunicorn -c gunicorn.conf.py app:app on a free port, talking to openai_url; returns (process, url)."""
+    port = free_port()
+    env = dict(
+        os.environ,
+        PORT=str(port), WEB_CONCURRENCY=str(workers), GUNICORN_THREADS=str(threads),
+        OPENAI_BASE_URL=openai_url, OPENAI_API_KEY=os.environ.get("OPENAI_API_KEY", "fake"),
+        # every CV must reach the model, and the load generator is a single client
+        CV_CACHE_MAX_ENTRIES="0", CV_RATE_LIMIT_PER_MINUTE="0", CV_STRUCTURER="llm",
+    )
+    env.update(extra_env or {})
+    process = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "app:app"],
+        cwd=ROOT_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    url = f"http://127.0.0.1:{port}"
+    try:
+        wait_for_health(url)
+    except RuntimeError:
+        process.kill()
+        raise
+    return process, url
+
+
+def stop(process):
+    process.send_signal(signal.SIGTERM)
+    try:
+        process.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+def print_table(rows):
+    columns = ("config", "requests", "ok", "throughput_rps", "p50_ms", "p95_ms", "p99_ms", "error_rate", "errors")
+    print("  ".join(f"{name:>14}" for name in columns))
+    for row in rows:
+        print("  ".join(f"{str(row.get(name, '')):>14}" for name in columns))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Drive /api/process-cv at a target request rate.")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--url", help="base URL of a running server")
+    target.add_argument("--configs", help="comma-separated WORKERSxTHREADS gunicorn configurations to start in turn")
+    parser.add_argument("--rps", type=float, default=2.0, help="target requests per second")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds of sending")
+    parser.add_argument("--payloads", help="JSONL of recorded raw CV inputs (default: synthetic CVs)")
+    parser.add_argument("--clients", type=int, default=50, help="distinct X-API-Key values to spread requests over")
+    parser.add_argument("--timeout", type=float, default=300.0, help="per-request timeout in seconds")
+    parser.add_argument("--output", help="write the results as JSON")
+    add_config_arguments(parser)
+    args = parser.parse_args()
+
+    payloads = load_payloads(args.payloads, count=max(1, int(args.rps * args.duration)))
+    runs = []
+    if args.url:
+        summary = run_load(args.url.rstrip("/"), payloads, args.rps, args.duration, args.clients, timeout=args.timeout)
+        runs.append(dict(summary, config=args.url))
+    else:
+        fake = serve(port=0, config=config_from_args(args))
+        openai_url = f"http://127.0.0.1:{fake.server_address[1]}/v1"
+        for config in args.configs.split(","):
+            workers, threads = (int(part) for part in config.lower().split("x"))
+            process, url = start_gunicorn(workers, threads, openai_url)
+            try:
+                print(f"{config}: {args.rps} rps for {args.duration:.0f}s against {url} ...", flush=True)
+                summary = run_load(url, payloads, args.rps, args.duration, args.clients, timeout=args.timeout)
+            finally:
+                stop(process)
+            runs.append(dict(summary, config=config, workers=workers, threads=threads))
+        fake.shutdown()
+
+    print_table(runs)
+    if args.output:
+        meta = {
+            "created": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "cpu_count": os.cpu_count(),
+            "rps": args.rps,
+            "duration": args.duration,
+            "payloads": args.payloads or "synthetic",
+            "fake_openai": None if args.url else {
+                "latency_ms": args.latency_ms, "distribution": args.distribution, "spread": args.spread,
+                "error_rate": args.error_rate, "rate_limit_rate": args.rate_limit_rate,
+            },
+        }
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"meta": meta, "runs": runs}, f, indent=2)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
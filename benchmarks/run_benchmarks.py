@@ -0,0 +1,202 @@
+# run_benchmarks.py - Times every stage of the CV pipeline against a stub LLM and writes the results as JSON
+"""
+Usage (from the project root):
+    python benchmarks/run_benchmarks.py --iterations 20 --output results.json
+    python benchmarks/run_benchmarks.py --profiles senior --renderers docx,fast --latency 0.2
+    python benchmarks/compare.py base.json results.json
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+from stub_llm import StubOpenAI
+from synthetic_cv import PROFILES, make_raw_cv, make_structured_cv
+
+
+def summarize(samples):
+    """Milliseconds summary of a list of durations in seconds."""
+    ordered = sorted(samples)
+    ms = [s * 1000 for s in ordered]
+    return {
+        "n": len(ms),
+        "mean_ms": round(statistics.fmean(ms), 4),
+        "median_ms": round(statistics.median(ms), 4),
+        "p95_ms": round(ms[min(len(ms) - 1, int(len(ms) * 0.95))], 4),
+        "min_ms": round(ms[0], 4),
+        "max_ms": round(ms[-1], 4),
+    }
+
+
+def timed(samples, func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    samples.append(time.perf_counter() - start)
+    return result
+
+
+def bench_processor(profile, iterations):
+    """load_and_clean, prompt building, convert_to_structured_cv, parsing and the local rules, without network."""
+    from backend_1 import CVProcessor
+
+    raw = make_raw_cv(profile)
+    stub = StubOpenAI(make_structured_cv(profile))
+    samples = {name: [] for name in ("load_and_clean", "build_messages", "convert_to_structured_cv",
+                                     "extract_json", "parse_structured_cv", "structure_with_rules")}
+
+    with tempfile.TemporaryDirectory() as workdir:
+        input_file = os.path.join(workdir, "raw_cv.json")
+        with open(input_file, "w", encoding="utf-8") as f:
+            json.dump(raw, f)
+        processor = CVProcessor(input_file=input_file, client=stub, cache=None)
+
+        for _ in range(iterations):
+            clean = timed(samples["load_and_clean"], processor.load_and_clean)
+            timed(samples["build_messages"], processor._build_messages, clean)
+            structured = timed(samples["convert_to_structured_cv"], processor.convert_to_structured_cv, clean)
+            timed(samples["extract_json"], processor._extract_json, stub.content)
+            timed(samples["parse_structured_cv"], processor.parse_structured_cv, structured)
+            timed(samples["structure_with_rules"], processor.structure_with_rules, clean, False)
+
+    return {name: summarize(values) for name, values in samples.items()}
+
+
+def bench_renderer(generator_class, profile, iterations):
+    """Each _create_* section builder in document order, then the in-memory and temp-file saves."""
+    import io
+
+    structured = make_structured_cv(profile)
+    samples = {}
+    sizes = []
+    for _ in range(iterations):
+        generator = timed(samples.setdefault("new_document", []), generator_class)
+        for name, _, builder in generator.SECTIONS:
+            timed(samples.setdefault(f"section.{name}", []), getattr(generator, builder), structured)
+
+        buffer = io.BytesIO()
+        timed(samples.setdefault("save_to_memory", []), generator.doc.save, buffer)
+        sizes.append(buffer.tell())
+
+        path = timed(samples.setdefault("_save_document", []), generator._save_document)
+        os.remove(path)
+
+    results = {name: summarize(values) for name, values in samples.items()}
+    results["docx_bytes"] = sizes[-1]
+    return results
+
+
+def bench_http(profile, iterations, latency, jitter):
+    """The whole POST /api/process-cv request through the Flask test client, LLM replaced by the stub."""
+    import app as app_module
+    import llm_client
+
+    stub = StubOpenAI(make_structured_cv(profile), latency=latency, jitter=jitter)
+    original_get_client, original_cache = llm_client.get_client, app_module.LLM_CACHE
+    original_limiter = app_module.RATE_LIMITER
+    llm_client.get_client = lambda *args, **kwargs: stub
+    app_module.LLM_CACHE = None  # every request must pay the full pipeline
+    app_module.RATE_LIMITER = None  # one client sending back to back is the point here
+    try:
+        client = app_module.app.test_client()
+        raw = make_raw_cv(profile)
+        samples = []
+        for _ in range(iterations):
+            start = time.perf_counter()
+            response = client.post("/api/process-cv?mode=llm", json=raw)
+            response.get_data()
+            samples.append(time.perf_counter() - start)
+            if response.status_code != 200:
+                raise RuntimeError(f"/api/process-cv returned {response.status_code}: {response.get_data(as_text=True)}")
+    finally:
+        llm_client.get_client, app_module.LLM_CACHE = original_get_client, original_cache
+        app_module.RATE_LIMITER = original_limiter
+
+    results = summarize(samples)
+    results["stub_latency_ms"] = latency * 1000
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the CV pipeline with synthetic CVs and a stub LLM.")
+    parser.add_argument("--profiles", default=",".join(PROFILES), help="comma separated: " + ", ".join(PROFILES))
+    parser.add_argument("--renderers", default="docx,fast", help="comma separated: docx, fast")
+    parser.add_argument("--iterations", type=int, default=10, help="timed runs per stage")
+    parser.add_argument("--warmup", type=int, default=2, help="untimed runs first (imports, template build)")
+    parser.add_argument("--latency", type=float, default=0.0, help="stub LLM latency in seconds for the HTTP benchmark")
+    parser.add_argument("--jitter", type=float, default=0.0, help="+/- seconds added to the stub latency")
+    parser.add_argument("--output", default="benchmark_results.json", help="JSON file to write")
+    parser.add_argument("--verbose-logs", action="store_true", help="keep INFO logging of the app while timing")
+    args = parser.parse_args()
+
+    os.chdir(ROOT_DIR)  # system_prompt.txt and index.html are resolved relative to the project
+    os.environ.setdefault("CV_WARMUP", "off")  # no background warm-up thread competing with the timings
+    from cv_generator import CVGenerator
+    from fast_docx import FastCVGenerator
+
+    # Configured before app.py is imported, so its configure_logging() leaves the handlers and level alone
+    logging.basicConfig(level=logging.INFO if args.verbose_logs else logging.WARNING)
+
+    renderers = {"docx": CVGenerator, "fast": FastCVGenerator}
+    profiles = [p.strip() for p in args.profiles.split(",") if p.strip()]
+    selected = [r.strip() for r in args.renderers.split(",") if r.strip()]
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "iterations": args.iterations,
+            "stub_latency_s": args.latency,
+            "stub_jitter_s": args.jitter,
+            "logging": "INFO" if args.verbose_logs else "WARNING",
+        },
+        "profiles": {},
+    }
+
+    for profile in profiles:
+        print(f"[{profile}] processor stages...")
+        bench_processor(profile, args.warmup)
+        entry = {"processor": bench_processor(profile, args.iterations), "renderers": {}}
+        for name in selected:
+            print(f"[{profile}] {name} renderer...")
+            bench_renderer(renderers[name], profile, args.warmup)
+            entry["renderers"][name] = bench_renderer(renderers[name], profile, args.iterations)
+        print(f"[{profile}] /api/process-cv...")
+        bench_http(profile, args.warmup, 0.0, 0.0)
+        entry["http_process_cv"] = bench_http(profile, args.iterations, args.latency, args.jitter)
+        report["profiles"][profile] = entry
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+    for profile, entry in report["profiles"].items():
+        http = entry["http_process_cv"]
+        renders = ", ".join(f"{name} save {stages['save_to_memory']['median_ms']:.1f} ms"
+                            for name, stages in entry["renderers"].items())
+        print(f"{profile:>8}: /api/process-cv median {http['median_ms']:.1f} ms, p95 {http['p95_ms']:.1f} ms; {renders}")
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
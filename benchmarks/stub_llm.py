@@ -0,0 +1,62 @@
+# stub_llm.py - In-process stand-in for the OpenAI client: configurable latency, canned structured JSON
+import json
+import random
+import threading
+import time
+from types import SimpleNamespace
+
+
+class StubOpenAI:
+    """
+    Mimics the part of the OpenAI client CVProcessor uses:
+    client.chat.completions.create(model=..., messages=..., stream=False|True).
+    Every call sleeps latency +/- jitter seconds, then answers with the canned
+    structured CV wrapped in a ```json fence, the way the real model does.
+    """
+
+    def __init__(self, structured_cv, latency=0.0, jitter=0.0, stream_chunk_size=24, seed=0):
+        self.content = "```json\n" + json.dumps(structured_cv, indent=2) + "\n```"
+        self.latency = latency
+        self.jitter = jitter
+        self.stream_chunk_size = stream_chunk_size
+        self.calls = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def with_options(self, **_options):
+        return self
+
+    def _delay(self):
+        with self._lock:
+            self.calls += 1
+            delay = self.latency + self._rng.uniform(-self.jitter, self.jitter)
+        if delay > 0:
+            time.sleep(delay)
+
+    def _usage(self, messages):
+        prompt_chars = sum(len(message["content"]) for message in messages)
+        prompt_tokens, completion_tokens = prompt_chars // 4, len(self.content) // 4
+        return SimpleNamespace(
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            total_tokens=prompt_tokens + completion_tokens,
+        )
+
+    def _create(self, model=None, messages=(), stream=False, **_kwargs):
+        self._delay()
+        if stream:
+            return self._stream(messages)
+        message = SimpleNamespace(role="assistant", content=self.content)
+        return SimpleNamespace(
+            model=model,
+            choices=[SimpleNamespace(index=0, message=message, finish_reason="stop")],
+            usage=self._usage(messages),
+        )
+
+    def _stream(self, messages):
+        size = self.stream_chunk_size
+        for start in range(0, len(self.content), size):
+            delta = SimpleNamespace(content=self.content[start:start + size])
+            yield SimpleNamespace(choices=[SimpleNamespace(index=0, delta=delta, finish_reason=None)], usage=None)
+        yield SimpleNamespace(choices=[], usage=self._usage(messages))
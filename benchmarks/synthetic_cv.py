@@ -0,0 +1,99 @@
+# synthetic_cv.py - Deterministic synthetic CVs for benchmarks (raw frontend payloads and structured results)
+import random
+
+# name -> (jobs, total responsibility bullets, projects, certificates, skills per list)
+PROFILES = {
+    "small": (1, 3, 1, 1, 5),
+    "medium": (4, 16, 3, 3, 12),
+    "senior": (20, 50, 8, 10, 30),
+}
+
+_WORDS = (
+    "designed built migrated automated optimised led delivered reduced improved scaled "
+    "pipeline service platform dashboard API latency cost throughput reliability team "
+    "customers release database cluster model forecast revenue onboarding security audit "
+    "kubernetes python sql spark airflow terraform react analytics stakeholders quarterly"
+).split()
+_SKILLS = (
+    "Python SQL Java Go Rust TypeScript React Docker Kubernetes Terraform AWS GCP Azure Spark Kafka "
+    "Airflow dbt Pandas NumPy PyTorch TensorFlow Linux Git CI/CD PostgreSQL MongoDB Redis GraphQL "
+    "REST Flask Django FastAPI Tableau PowerBI Excel Jira"
+).split()
+_SOFT = "Leadership Communication Mentoring Ownership Teamwork Negotiation Planning Presentation".split()
+_MONTHS = "January February March April May June July August September October November December".split()
+
+
+def _sentence(rng, words=14):
+    text = " ".join(rng.choice(_WORDS) for _ in range(words))
+    return text[0].upper() + text[1:] + "."
+
+
+def _spread(total, buckets):
+    """Split `total` items over `buckets` as evenly as possible."""
+    base, extra = divmod(total, buckets)
+    return [base + (1 if i < extra else 0) for i in range(buckets)]
+
+
+def make_structured_cv(profile="medium", seed=0):
+    """A structured CV in the exact schema CVGenerator consumes (what the model returns)."""
+    jobs, bullets, projects, certificates, skills = PROFILES[profile]
+    rng = random.Random(f"{profile}-{seed}")
+    return {
+        "full_name": f"Candidate {profile.title()} {seed}",
+        "job_title": "Senior Data Engineer",
+        "email": f"candidate{seed}@example.com",
+        "phone": "+20 100 000 0000",
+        "city": "Cairo, Egypt",
+        "linkedin": f"linkedin.com/in/candidate-{seed}",
+        "portfolio": f"candidate{seed}.dev",
+        "professional_summary": " ".join(_sentence(rng) for _ in range(4)),
+        "technical_skills": rng.sample(_SKILLS, min(skills, len(_SKILLS))),
+        "soft_skills": rng.sample(_SOFT, min(max(skills // 4, 2), len(_SOFT))),
+        "languages": [
+            {"name": "Arabic", "proficiency": "Native"},
+            {"name": "English", "proficiency": "Fluent"},
+        ],
+        "education": [{
+            "degree": "BSc Computer Engineering",
+            "institution": "Cairo University",
+            "start_date": "2010",
+            "end_date": "2015",
+            "location": "Cairo",
+            "gpa": "3.6",
+        }],
+        "work_experience": [
+            {
+                "position": f"Engineer Level {index + 1}",
+                "company": f"Company {index + 1}",
+                "start_date": f"{rng.choice(_MONTHS)} {2024 - index}",
+                "end_date": "Present" if index == 0 else f"{rng.choice(_MONTHS)} {2025 - index}",
+                "location": "Remote",
+                "responsibilities": [_sentence(rng) for _ in range(count)],
+            }
+            for index, count in enumerate(_spread(bullets, jobs))
+        ],
+        "projects": [
+            {
+                "name": f"Project {index + 1}",
+                "description": _sentence(rng, 20),
+                "Project_Link": [f"github.com/candidate/project-{index + 1}"],
+            }
+            for index in range(projects)
+        ],
+        "certificates": [f"Certificate {index + 1} - {rng.choice(_SKILLS)}" for index in range(certificates)],
+    }
+
+
+def make_raw_cv(profile="medium", seed=0):
+    """The same CV as the frontend's collectCVData() would send it (unpolished, paragraph descriptions)."""
+    structured = make_structured_cv(profile, seed)
+    raw = dict(structured)
+    raw["work_experience"] = [
+        dict(job, responsibilities=[line.lower().rstrip(".") for line in job["responsibilities"]])
+        for job in structured["work_experience"]
+    ]
+    raw["projects"] = [
+        {"name": project["name"], "description": project["description"], "Project_Link": project["Project_Link"]}
+        for project in structured["projects"]
+    ]
+    return raw
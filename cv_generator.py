@@ -2,21 +2,110 @@
 from docx.shared import Inches, Pt
 from docx.enum.text import WD_ALIGN_PARAGRAPH
 from docx.enum.text import WD_LINE_SPACING
+from docx.enum.style import WD_STYLE_TYPE
+from docx.oxml.ns import qn
 from typing import Dict, List, Any
 import logging
 import tempfile
+import io
 import os
 import json
+import threading
+import metrics
 
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Named styles carried by the base template; sections only reference these names
+STYLE_NAME = 'CV Name'
+STYLE_JOB_TITLE = 'CV Job Title'
+STYLE_CONTACT = 'CV Contact'
+STYLE_SECTION_TITLE = 'CV Section Title'
+STYLE_RULE = 'CV Rule'
+STYLE_JOB_HEADER = 'CV Job Header'
+STYLE_DETAIL = 'CV Detail'
+STYLE_BODY = 'CV Body'
+STYLE_BULLET = 'CV Bullet'
+STYLE_STRONG = 'CV Strong'
+
+# Built-in styles the CV styles depend on; everything else in the default template is dropped
+_KEPT_BUILTIN_STYLE_IDS = {'Normal', 'DefaultParagraphFont', 'TableNormal', 'NoList', 'ListBullet'}
+# Parts of the default template a CV never uses (they only add size and parse time)
+_DROPPED_RELATIONSHIPS = ('stylesWithEffects', 'customXml', 'thumbnail', 'webSettings')
+
+_template_bytes = None
+_template_lock = threading.Lock()
+
+
+def get_base_template() -> bytes:
+    """
+    The styled base DOCX, built once per process: page setup, the CV named
+    styles, and a pruned style sheet. Every render starts from a copy of it.
+    """
+    global _template_bytes
+    if _template_bytes is None:
+        with _template_lock:
+            if _template_bytes is None:
+                _template_bytes = _build_base_template()
+    return _template_bytes
+
+
+def _build_base_template() -> bytes:
+    doc = Document()
+    CVGenerator._setup_ats_document_styles(doc)
+    
+    # Prune the style sheet down to what the CV styles are built on
+    styles_element = doc.styles.element
+    latent_styles = styles_element.find(qn('w:latentStyles'))
+    if latent_styles is not None:
+        styles_element.remove(latent_styles)
+    custom_ids = {doc.styles[name].style_id for name in (
+        STYLE_NAME, STYLE_JOB_TITLE, STYLE_CONTACT, STYLE_SECTION_TITLE, STYLE_RULE,
+        STYLE_JOB_HEADER, STYLE_DETAIL, STYLE_BODY, STYLE_BULLET, STYLE_STRONG)}
+    for style in styles_element.findall(qn('w:style')):
+        if style.get(qn('w:styleId')) not in _KEPT_BUILTIN_STYLE_IDS | custom_ids:
+            styles_element.remove(style)
+    
+    for rels in (doc.part.rels, doc.part.package.rels):
+        for rel_id, rel in list(rels.items()):
+            if rel.reltype.rsplit('/', 1)[-1] in _DROPPED_RELATIONSHIPS:
+                del rels[rel_id]
+    
+    buffer = io.BytesIO()
+    doc.save(buffer)
+    logger.info("Base CV template built (%d bytes)", buffer.tell())
+    return buffer.getvalue()
+
+
 class CVGenerator:
+    # Renderer interface shared with the other output formats (see renderers.py)
+    FORMAT = 'docx'
+    EXTENSION = '.docx'
+    MIMETYPE = 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
+
+    # CV sections in ATS-friendly order: (name, fields the section is built from, builder method)
+    SECTIONS = [
+        ('header', ('full_name', 'job_title', 'email', 'phone', 'city', 'linkedin', 'portfolio'),
+         '_create_ats_header_section'),
+        ('professional_summary', ('professional_summary',), '_create_professional_summary'),
+        ('work_experience', ('work_experience',), '_create_work_experience'),
+        ('skills', ('technical_skills', 'soft_skills'), '_create_skills_section'),
+        ('education', ('education',), '_create_education_section'),
+        ('languages', ('languages',), '_create_languages_section'),
+        ('certifications', ('certificates',), '_create_certifications_section'),
+        ('projects', ('projects',), '_create_projects_section'),
+    ]
+
     def __init__(self, json_file_path: str = None):
-        self.doc = Document()
+        self.doc = self._new_document()
         self.json_file_path = json_file_path
-        logger.info("CV Generator initialized with ATS-friendly template")
+        self._fields = {}
+        self._next_section = 0
+        logger.debug("CV Generator initialized with ATS-friendly template")
     
+    def _new_document(self):
+        """Cheap copy of the cached, already styled base template"""
+        return Document(io.BytesIO(get_base_template()))
+
     def generate_cv(self, json_file_path: str = None) -> str:
         """
         Main function: Creates a professional ATS-friendly CV document
@@ -31,22 +120,8 @@ class CVGenerator:
         # Load data from JSON file
         json_data = self._load_json_data(file_path)
         
-        logger.info("Starting ATS-friendly CV generation for: %s", 
-                   json_data.get('full_name', 'Unknown'))
-        
         try:
-            # Setup document styles for ATS compatibility
-            self._setup_ats_document_styles()
-            
-            # Build CV sections in ATS-friendly order
-            self._create_ats_header_section(json_data)
-            self._create_professional_summary(json_data)
-            self._create_work_experience(json_data)
-            self._create_skills_section(json_data)
-            self._create_education_section(json_data)
-            self._create_languages_section(json_data)
-            self._create_certifications_section(json_data)
-            self._create_projects_section(json_data)
+            self._build_document(json_data)
             
             # Save to temporary file
             cv_file_path = self._save_document()
@@ -58,6 +133,84 @@ class CVGenerator:
             logger.error("Error generating CV: %s", str(e))
             raise
 
+    def generate_cv_bytes(self, json_data: Dict[str, Any]) -> io.BytesIO:
+        """
+        In-memory variant of generate_cv: takes the structured CV dict
+        Returns: BytesIO holding the DOCX, rewound to the start
+        """
+        try:
+            self._build_document(json_data)
+            
+            buffer = io.BytesIO()
+            with metrics.stage("save"):
+                self.doc.save(buffer)
+            buffer.seek(0)
+            logger.debug("ATS-friendly CV successfully generated in memory (%d bytes)", 
+                       buffer.getbuffer().nbytes)
+            
+            return buffer
+            
+        except Exception as e:
+            logger.error("Error generating CV: %s", str(e))
+            raise
+
+    def render(self, json_data: Dict[str, Any]) -> bytes:
+        """Renderer interface: the structured CV as file bytes in this generator's FORMAT"""
+        return self.generate_cv_bytes(json_data).getvalue()
+
+    def _build_document(self, json_data: Dict[str, Any]):
+        """Build every CV section into self.doc"""
+        # No names or other CV contents in log records
+        logger.debug("Starting ATS-friendly CV generation (%d sections)", len(self.SECTIONS))
+        
+        # Build CV sections in ATS-friendly order
+        for name, _, builder in self.SECTIONS:
+            self._build_section(name, builder, json_data)
+
+    def _build_section(self, name: str, builder: str, data: Dict[str, Any]):
+        with metrics.stage(f"render.{name}"):
+            getattr(self, builder)(data)
+
+    # ---------- Progressive rendering (fields arrive one by one from a streamed completion) ----------
+    def start_document(self):
+        """Begin a progressive render; feed fields with add_field() and close with finish_document()"""
+        self._fields = {}
+        self._next_section = 0
+
+    def add_field(self, key: str, value: Any) -> List[str]:
+        """
+        Record one top-level field of the structured CV and build every section
+        whose fields have now all arrived, keeping document order.
+        Returns: names of the sections built by this call
+        """
+        self._fields[key] = value
+        built = []
+        while self._next_section < len(self.SECTIONS):
+            name, fields, builder = self.SECTIONS[self._next_section]
+            if not all(field in self._fields for field in fields):
+                break
+            self._build_section(name, builder, self._fields)
+            self._next_section += 1
+            built.append(name)
+        return built
+
+    @property
+    def sections_built(self) -> int:
+        return self._next_section
+
+    def finish_document(self) -> io.BytesIO:
+        """Build the remaining sections from whatever arrived and return the DOCX in memory"""
+        while self._next_section < len(self.SECTIONS):
+            name, _, builder = self.SECTIONS[self._next_section]
+            self._build_section(name, builder, self._fields)
+            self._next_section += 1
+        
+        buffer = io.BytesIO()
+        with metrics.stage("save"):
+            self.doc.save(buffer)
+        buffer.seek(0)
+        return buffer
+
     def _load_json_data(self, file_path: str) -> Dict[str, Any]:
         try:
             with open(file_path, 'r', encoding='utf-8') as file:
@@ -75,10 +228,11 @@ class CVGenerator:
             logger.error("Error loading JSON file %s: %s", file_path, e)
             raise
     
-    def _setup_ats_document_styles(self):
-        """Setup ATS-friendly document styles"""
+    @staticmethod
+    def _setup_ats_document_styles(doc):
+        """Setup ATS-friendly page layout and the named styles every CV is built from"""
         # Set page margins 
-        sections = self.doc.sections
+        sections = doc.sections
         for section in sections:
             section.page_height = Inches(14)  
             section.page_width = Inches(8.5)   
@@ -86,26 +240,47 @@ class CVGenerator:
             section.bottom_margin = Inches(0.5)
             section.left_margin = Inches(0.7)
             section.right_margin = Inches(0.7)
+        
+        def paragraph_style(name, size, bold=False, alignment=None, base='Normal'):
+            style = doc.styles.add_style(name, WD_STYLE_TYPE.PARAGRAPH)
+            style.base_style = doc.styles[base]
+            style.font.name = 'Calibri'
+            style.font.size = Pt(size)
+            if bold:
+                style.font.bold = True
+            if alignment is not None:
+                style.paragraph_format.alignment = alignment
+            return style
+        
+        paragraph_style(STYLE_NAME, 36, bold=True, alignment=WD_ALIGN_PARAGRAPH.CENTER)
+        paragraph_style(STYLE_JOB_TITLE, 14, bold=True, alignment=WD_ALIGN_PARAGRAPH.CENTER)
+        paragraph_style(STYLE_CONTACT, 12, alignment=WD_ALIGN_PARAGRAPH.CENTER)
+        
+        section_title = paragraph_style(STYLE_SECTION_TITLE, 13, bold=True)
+        section_title.font.all_caps = True
+        section_title.paragraph_format.space_after = Pt(0)
+        
+        rule = paragraph_style(STYLE_RULE, 7, alignment=WD_ALIGN_PARAGRAPH.LEFT)
+        rule.paragraph_format.space_after = Pt(6)
+        rule.paragraph_format.space_before = Pt(0)
+        
+        paragraph_style(STYLE_JOB_HEADER, 12, bold=True)
+        paragraph_style(STYLE_DETAIL, 12)
+        paragraph_style(STYLE_BODY, 11)
+        paragraph_style(STYLE_BULLET, 11, base='List Bullet')
+        
+        strong = doc.styles.add_style(STYLE_STRONG, WD_STYLE_TYPE.CHARACTER)
+        strong.font.bold = True
     
     def _create_ats_header_section(self, data: Dict[str, Any]):
         """Create ATS-friendly header with name, title, and contact info"""
         
         # Name 
-        name_paragraph = self.doc.add_paragraph()
-        name_paragraph.alignment = WD_ALIGN_PARAGRAPH.CENTER
-        name_run = name_paragraph.add_run(data.get('full_name', '').upper())
-        name_run.font.size = Pt(36)
-        name_run.font.bold = True
-        name_run.font.name = 'Calibri'
+        self.doc.add_paragraph(data.get('full_name', '').upper(), style=STYLE_NAME)
         
         # Job Title - Centered below name (like "Digital Marketing | SEO | SEM")
         if data.get('job_title'):
-            job_paragraph = self.doc.add_paragraph()
-            job_paragraph.alignment = WD_ALIGN_PARAGRAPH.CENTER
-            job_run = job_paragraph.add_run(data.get('job_title', ''))
-            job_run.font.size = Pt(14)
-            job_run.font.name = 'Calibri'
-            job_run.bold = True
+            self.doc.add_paragraph(data.get('job_title', ''), style=STYLE_JOB_TITLE)
         
         # Contact Information 
         contact_parts = []
@@ -124,11 +299,7 @@ class CVGenerator:
             contact_parts.append(portfolio)
         
         if contact_parts:
-            contact_paragraph = self.doc.add_paragraph()
-            contact_paragraph.alignment = WD_ALIGN_PARAGRAPH.CENTER
-            contact_run = contact_paragraph.add_run(' | '.join(contact_parts))
-            contact_run.font.size = Pt(12)
-            contact_run.font.name = 'Calibri'
+            self.doc.add_paragraph(' | '.join(contact_parts), style=STYLE_CONTACT)
         
     def _create_professional_summary(self, data: Dict[str, Any]):
         """Create professional summary section (2nd section after header)"""
@@ -138,10 +309,7 @@ class CVGenerator:
             self._add_ats_section_title("PROFESSIONAL SUMMARY")
             
             # Professional summary paragraph (normal font, not bold)
-            summary_paragraph = self.doc.add_paragraph()
-            summary_run = summary_paragraph.add_run(summary)
-            summary_run.font.name = 'Calibri'
-            summary_run.font.size = Pt(11)
+            self.doc.add_paragraph(summary, style=STYLE_BODY)
                       
         else:
             logger.warning("No professional summary provided")
@@ -155,11 +323,7 @@ class CVGenerator:
             
             for job in work_experience:
                 # Job title and company
-                job_paragraph = self.doc.add_paragraph()
-                job_run = job_paragraph.add_run(f"{job.get('position', '')} | {job.get('company', '')}")
-                job_run.font.name = 'Calibri'
-                job_run.font.size = Pt(12)
-                job_run.font.bold = True
+                self.doc.add_paragraph(f"{job.get('position', '')} | {job.get('company', '')}", style=STYLE_JOB_HEADER)
                 
                 # Date and location
                 date_location = []
@@ -171,20 +335,12 @@ class CVGenerator:
                     date_location.append(f" | {job['location']}")
                 
                 if date_location:
-                    date_paragraph = self.doc.add_paragraph()
-                    date_run = date_paragraph.add_run(''.join(date_location))
-                    date_run.font.name = 'Calibri'
-                    date_run.font.size = Pt(12)
-                    date_run.font.bold=True
+                    self.doc.add_paragraph(''.join(date_location), style=STYLE_JOB_HEADER)
                 
                 # Responsibilities
                 responsibilities = job.get('responsibilities', [])
                 for responsibility in responsibilities:
-                    responsibility_paragraph = self.doc.add_paragraph()
-                    responsibility_paragraph.style = 'List Bullet'
-                    responsibility_run = responsibility_paragraph.add_run(responsibility)
-                    responsibility_run.font.name = 'Calibri'
-                    responsibility_run.font.size = Pt(11)
+                    self.doc.add_paragraph(responsibility, style=STYLE_BULLET)
             
         else:
             logger.info("No work experience provided - section skipped")
@@ -197,22 +353,18 @@ class CVGenerator:
         if technical_skills or soft_skills:
             self._add_ats_section_title("SKILLS")
             
-            skills_paragraph = self.doc.add_paragraph()
+            skills_paragraph = self.doc.add_paragraph(style=STYLE_BODY)
             
             # Technical skills
             if technical_skills:
                 tech_skills_text ="Technical Skills: " + ", ".join(technical_skills)
-                run = skills_paragraph.add_run(tech_skills_text)
-                run.font.name='Calibri'
-                run.font.size = Pt(11)
+                skills_paragraph.add_run(tech_skills_text)
                 skills_paragraph.add_run("\n")  # New line
             
             # Soft skills
             if soft_skills:
                 soft_skills_text ="Soft Skills: " + ", ".join(soft_skills)
-                run = skills_paragraph.add_run(soft_skills_text)
-                run.font.name='Calibri'
-                run.font.size = Pt(11)
+                skills_paragraph.add_run(soft_skills_text)
                         
         else:
             logger.warning("No skills information provided")
@@ -231,11 +383,7 @@ class CVGenerator:
                 line1_text = degree
                 if gpa:
                     line1_text += f" | GPA: {gpa}"
-                line1 = self.doc.add_paragraph()
-                run1 = line1.add_run(line1_text)
-                run1.font.name = 'Calibri'
-                run1.font.size = Pt(12)
-                run1.font.bold = True
+                self.doc.add_paragraph(line1_text, style=STYLE_JOB_HEADER)
                 
                 # LINE 2: institution | Location | Dates
                 university = edu.get('institution', '')
@@ -252,10 +400,7 @@ class CVGenerator:
                 parts = [p for p in [university, location, dates] if p]
                 line2_text = " | ".join(parts)
 
-                line2 = self.doc.add_paragraph()
-                run2 = line2.add_run(line2_text)
-                run2.font.name = 'Calibri'
-                run2.font.size = Pt(12)
+                self.doc.add_paragraph(line2_text, style=STYLE_DETAIL)
                             
         else:
             logger.warning("No education information provided")
@@ -267,25 +412,17 @@ class CVGenerator:
         if languages:
             self._add_ats_section_title("LANGUAGES")
             
-            languages_text = []
             for lang in languages:
                 language_name = lang.get('name', '')
                 proficiency = lang.get('proficiency', '')
                 if language_name and proficiency:
-                    lang_paragraph = self.doc.add_paragraph()
-                    lang_paragraph.style = 'List Bullet'
+                    lang_paragraph = self.doc.add_paragraph(style=STYLE_BULLET)
             
                     # Language name bold
-                    run_name = lang_paragraph.add_run(f"{language_name}")
-                    run_name.font.bold = True
-                    run_name.font.name = 'Calibri'
-                    run_name.font.size = Pt(11)
+                    lang_paragraph.add_run(f"{language_name}", style=STYLE_STRONG)
 
                     # Colon and proficiency
-                    run_prof = lang_paragraph.add_run(f": {proficiency}")
-                    run_prof.font.bold = False
-                    run_prof.font.name = 'Calibri'
-                    run_prof.font.size = Pt(11)
+                    lang_paragraph.add_run(f": {proficiency}")
             
         else:
             logger.info("No languages provided - section skipped")
@@ -297,11 +434,7 @@ class CVGenerator:
         if certificates:
             self._add_ats_section_title("CERTIFICATIONS")
             for cert in certificates:
-                cert_paragraph = self.doc.add_paragraph()
-                cert_paragraph.style = 'List Bullet'
-                cert_run = cert_paragraph.add_run(cert)
-                cert_run.font.name = 'Calibri'
-                cert_run.font.size = Pt(11)
+                self.doc.add_paragraph(cert, style=STYLE_BULLET)
         else:
             logger.info("No certifications provided - section skipped")
 
@@ -314,25 +447,15 @@ class CVGenerator:
             
             for project in projects:
                 # Project name
-                project_paragraph = self.doc.add_paragraph()
-                project_run = project_paragraph.add_run(project.get('name', ''))
-                project_run.font.name = 'Calibri'
-                project_run.font.size = Pt(12)
-                project_run.font.bold = True
+                self.doc.add_paragraph(project.get('name', ''), style=STYLE_JOB_HEADER)
                 
                 # Project description
                 if project.get('description'):
-                    desc_paragraph = self.doc.add_paragraph()
-                    desc_run = desc_paragraph.add_run(project['description'])
-                    desc_run.font.name = 'Calibri'
-                    desc_run.font.size = Pt(11)
+                    self.doc.add_paragraph(project['description'], style=STYLE_BODY)
                 
                 '''# Technologies used
                 if project.get('technologies'):
-                    tech_paragraph = self.doc.add_paragraph()
-                    tech_run = tech_paragraph.add_run(f"Technologies: {', '.join(project['technologies'])}")
-                    tech_run.font.name = 'Calibri'
-                    tech_run.font.size = Pt(11)'''
+                    self.doc.add_paragraph(f"Technologies: {', '.join(project['technologies'])}", style=STYLE_BODY)'''
 
                 # Check for 'Project_Link' (Prompt instruction) AND 'project_link' (Common AI output)
                 links = project.get('Project_Link') or project.get('project_link') or []
@@ -344,11 +467,8 @@ class CVGenerator:
                     links = []
 
                 if links:
-                    tech_paragraph = self.doc.add_paragraph()
                     # Changed label from "Project_Link:" to "Link:" for better looks
-                    tech_run = tech_paragraph.add_run(f"Link: {', '.join(links)}")
-                    tech_run.font.name = 'Calibri'
-                    tech_run.font.size = Pt(11)
+                    self.doc.add_paragraph(f"Link: {', '.join(links)}", style=STYLE_BODY)
                            
         else:
             logger.info("No projects provided - section skipped")
@@ -358,34 +478,20 @@ class CVGenerator:
         Add ATS-friendly section title (all caps, bold, with proper spacing)
         Exactly like in the template: PROFESSIONAL SUMMARY, WORK EXPERIENCE, etc.
         """
-        title_paragraph = self.doc.add_paragraph()
-        title_run = title_paragraph.add_run(title)
-        title_run.font.size = Pt(13)
-        title_run.font.bold = True
-        title_run.font.name = 'Calibri'
-        title_run.font.all_caps = True
-        
-        # Add proper spacing after title 
-        title_paragraph.paragraph_format.space_after = Pt(0)
+        self.doc.add_paragraph(title, style=STYLE_SECTION_TITLE)
 
         # Add horizontal line across the page width
         self._add_horizontal_line()
 
     def _add_horizontal_line(self):
         """Add horizontal line using text characters"""
-        line_paragraph = self.doc.add_paragraph()
-        line_run = line_paragraph.add_run("_" * 145)  # Using em-dash for solid line
-        line_run.font.size = Pt(7)
-        line_run.font.name = 'Calibri'
-        line_run.font.color.rgb = None  # Black color
-        line_paragraph.paragraph_format.space_after = Pt(6)
-        line_paragraph.paragraph_format.space_before = Pt(0)
-        line_paragraph.alignment = WD_ALIGN_PARAGRAPH.LEFT  # Align left
+        self.doc.add_paragraph("_" * 145, style=STYLE_RULE)  # Using underscores for a solid line
     
     def _save_document(self) -> str:
         """Save the document to a temporary file and return the path"""
-        temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.docx')
-        self.doc.save(temp_file.name)
+        temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=self.EXTENSION)
+        with metrics.stage("save_file"):
+            self.doc.save(temp_file.name)
         logger.info("Document saved to temporary file: %s", temp_file.name)
         return temp_file.name
 
@@ -393,6 +499,7 @@ if __name__ == "__main__":
     """
     Example usage when running this file directly
     """
+    logging.basicConfig(level=logging.INFO)
     print("CV Generator - Direct JSON File Test")
     print("=" * 50)
 
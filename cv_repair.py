@@ -0,0 +1,401 @@
+# cv_repair.py - Local repair of the model's JSON answer and coercion to the CV schema, with a report of every fix
+import ast
+import json
+import re
+import sys
+
+# Top-level schema from system_prompt.txt, in document order
+STRING_FIELDS = ("full_name", "job_title", "email", "phone", "city", "linkedin", "portfolio", "professional_summary")
+LIST_FIELDS = ("technical_skills", "soft_skills", "certificates")
+ITEM_FIELDS = {
+    "languages": ("name", "proficiency"),
+    "education": ("degree", "institution", "start_date", "end_date", "location", "gpa"),
+    "work_experience": ("position", "company", "start_date", "end_date", "location", "responsibilities"),
+    "projects": ("name", "description", "Project_Link"),
+}
+SCHEMA_KEYS = STRING_FIELDS + ("technical_skills", "soft_skills", "languages", "education",
+                               "work_experience", "projects", "certificates")
+# Item fields that hold a list of strings
+ITEM_LIST_FIELDS = {"responsibilities", "Project_Link"}
+
+# Spellings models use instead of the schema keys (compared lower-case, with spaces/hyphens as "_")
+TOP_LEVEL_ALIASES = {
+    "name": "full_name", "fullname": "full_name", "candidate_name": "full_name",
+    "title": "job_title", "headline": "job_title", "position": "job_title", "role": "job_title",
+    "email_address": "email", "mail": "email",
+    "phone_number": "phone", "mobile": "phone", "telephone": "phone",
+    "location": "city", "address": "city",
+    "linkedin_url": "linkedin", "linkedin_profile": "linkedin",
+    "website": "portfolio", "portfolio_url": "portfolio", "personal_website": "portfolio",
+    "summary": "professional_summary", "profile": "professional_summary", "about": "professional_summary",
+    "objective": "professional_summary",
+    "skills": "technical_skills", "hard_skills": "technical_skills", "technical": "technical_skills",
+    "soft": "soft_skills",
+    "language": "languages",
+    "educations": "education", "education_history": "education",
+    "experience": "work_experience", "experiences": "work_experience", "work_history": "work_experience",
+    "employment": "work_experience", "employment_history": "work_experience", "jobs": "work_experience",
+    "project": "projects",
+    "certifications": "certificates", "certificate": "certificates", "certification": "certificates",
+}
+ITEM_ALIASES = {
+    "languages": {"language": "name", "level": "proficiency", "fluency": "proficiency"},
+    "education": {"university": "institution", "school": "institution", "college": "institution",
+                  "from": "start_date", "start": "start_date", "to": "end_date", "end": "end_date",
+                  "graduation_date": "end_date", "grade": "gpa", "qualification": "degree"},
+    "work_experience": {"title": "position", "role": "position", "job_title": "position",
+                        "employer": "company", "organization": "company", "company_name": "company",
+                        "from": "start_date", "start": "start_date", "to": "end_date", "end": "end_date",
+                        "description": "responsibilities", "duties": "responsibilities",
+                        "achievements": "responsibilities", "bullets": "responsibilities",
+                        "highlights": "responsibilities", "tasks": "responsibilities"},
+    "projects": {"title": "name", "project_name": "name", "summary": "description",
+                 "project_link": "Project_Link", "project_links": "Project_Link", "link": "Project_Link",
+                 "links": "Project_Link", "url": "Project_Link", "github": "Project_Link"},
+}
+
+_FENCE = re.compile(r"```(?:json)?\s*(.*?)(?:```|$)", re.DOTALL)
+_DECODER = json.JSONDecoder(strict=False)
+_BULLET_PREFIX = re.compile(r"^\s*(?:[-*•▪●]|\d+[.)])\s+")
+_LANGUAGE_TEXT = re.compile(r"^\s*([^:(\-–]+?)\s*(?:[:\-–]\s*|\(\s*)([^)]*?)\)?\s*$")
+_MAX_TRUNCATION_CUTS = 64
+
+
+class RepairReport:
+    """What had to be done to turn the answer into a schema-shaped CV."""
+
+    def __init__(self):
+        self.fixes = []      # (code, detail)
+        self.present = []    # schema keys the model actually returned
+        self.missing = []    # schema keys it did not return (filled with empty values)
+        self.incomplete = [] # schema key that was cut off when the answer was truncated
+
+    def add(self, code, detail):
+        self.fixes.append((code, detail))
+
+    @property
+    def truncated(self):
+        return any(code == "truncated" for code, _ in self.fixes)
+
+    @property
+    def changed(self):
+        return bool(self.fixes or self.missing)
+
+    def summary(self):
+        parts = [detail for _, detail in self.fixes]
+        if self.missing:
+            parts.append("missing: " + ", ".join(self.missing))
+        if self.incomplete:
+            parts.append("incomplete: " + ", ".join(self.incomplete))
+        return "; ".join(parts) or "clean"
+
+    def to_dict(self):
+        return {"fixes": [{"code": code, "detail": detail} for code, detail in self.fixes],
+                "missing": list(self.missing), "incomplete": list(self.incomplete)}
+
+
+# ---------- JSON text repair ----------
+def _close_truncated(text):
+    """
+    Candidates for a JSON document cut off mid-way: the text closed as-is, then cut back
+    to each of the last member/element separators, with the open brackets closed.
+    Trailing commas before a closing bracket are dropped on the way.
+    """
+    out = []
+    stack = []
+    cuts = []            # (length of out, open brackets) just before a "," at any depth
+    in_string = escape = False
+    removed_commas = 0
+
+    for char in text:
+        if in_string:
+            out.append(char)
+            if escape:
+                escape = False
+            elif char == "\\":
+                escape = True
+            elif char == '"':
+                in_string = False
+            continue
+        if char == '"':
+            in_string = True
+        elif char in "{[":
+            stack.append("}" if char == "{" else "]")
+        elif char in "}]":
+            # drop a trailing comma: [1, 2, ] / {"a": 1, }
+            index = len(out) - 1
+            while index >= 0 and out[index].isspace():
+                index -= 1
+            if index >= 0 and out[index] == ",":
+                del out[index]
+                removed_commas += 1
+            if stack:
+                stack.pop()
+            out.append(char)
+            if not stack:
+                break
+            continue
+        elif char == ",":
+            cuts.append((len(out), "".join(reversed(stack))))
+        out.append(char)
+
+    body = "".join(out)
+    closing = '"' if in_string else ""
+    candidates = [body + closing + "".join(reversed(stack))]
+    for length, closers in reversed(cuts[-_MAX_TRUNCATION_CUTS:]):
+        candidates.append(body[:length] + closers)
+    return candidates, removed_commas, bool(stack) or in_string
+
+
+def _loads_python_literal(text):
+    """The user message is a Python dict repr, and models sometimes echo that style back."""
+    end = text.rfind("}")
+    if end < 0:
+        return None
+    try:
+        value = ast.literal_eval(text[:end + 1])
+    except (ValueError, SyntaxError, MemoryError, RecursionError):
+        return None
+    return value if isinstance(value, dict) else None
+
+
+def parse_json_object(content, report):
+    """The first JSON object in the model's answer, repaired if needed; None if there is none at all."""
+    text = content or ""
+    fence = _FENCE.search(text)
+    if fence:
+        text = fence.group(1)
+    start = text.find("{")
+    if start < 0:
+        report.add("no_json", "no JSON object in the answer")
+        return None
+    if text[:start].strip():
+        report.add("prose", "dropped text before the JSON object")
+
+    try:
+        value, end = _DECODER.raw_decode(text, start)
+        if text[end:].strip():
+            report.add("prose", "dropped text after the JSON object")
+        return value
+    except ValueError:
+        pass
+
+    value = _loads_python_literal(text[start:])
+    if value is not None:
+        report.add("python_literal", "converted a Python-style dict")
+        return value
+
+    candidates, removed_commas, truncated = _close_truncated(text[start:])
+    for attempt, candidate in enumerate(candidates):
+        try:
+            value = _DECODER.decode(candidate)
+        except ValueError:
+            continue
+        if removed_commas:
+            report.add("trailing_comma", f"removed {removed_commas} trailing comma(s)")
+        if truncated:
+            report.add("truncated", "closed a truncated answer" +
+                       (" (dropped an incomplete last member)" if attempt else ""))
+        return value if isinstance(value, dict) else None
+
+    report.add("unparseable", "answer is not JSON and could not be repaired")
+    return None
+
+
+# ---------- schema coercion ----------
+def _canonical(key):
+    return re.sub(r"[\s\-]+", "_", str(key).strip()).lower()
+
+
+def _to_string(value, joiner=", "):
+    if value is None:
+        return ""
+    if isinstance(value, str):
+        return value.strip()
+    if isinstance(value, (list, tuple)):
+        return joiner.join(part for part in (_to_string(item, joiner) for item in value) if part)
+    if isinstance(value, dict):
+        return " - ".join(part for part in (_to_string(item, joiner) for item in value.values()) if part)
+    return str(value)
+
+
+def _split_text(text, separators):
+    parts = re.split(separators, text)
+    return [_BULLET_PREFIX.sub("", part).strip() for part in parts if part and part.strip()]
+
+
+def _to_string_list(value, separators):
+    """List of non-empty strings; text is split on `separators`, nested lists are flattened."""
+    if value is None:
+        return []
+    if isinstance(value, str):
+        return _split_text(value, separators)
+    if isinstance(value, dict):
+        value = [value]
+    if not isinstance(value, (list, tuple)):
+        return [str(value)]
+    result = []
+    for item in value:
+        if isinstance(item, (list, tuple)):
+            result.extend(_to_string_list(item, separators))
+        else:
+            text = _to_string(item)
+            if text:
+                result.append(_BULLET_PREFIX.sub("", text))
+    return result
+
+
+# Skills come as "A, B, C"; bullets and certificates come one per line
+_SKILL_SEPARATORS = r"[,;\n]+"
+_LINE_SEPARATORS = r"\n+|;\s*|\s+•\s+"
+_LINK_SEPARATORS = r"[\s,]+"
+
+
+def _item_from_text(field, text):
+    if field == "languages":
+        match = _LANGUAGE_TEXT.match(text)
+        if match:
+            return {"name": match.group(1).strip(), "proficiency": match.group(2).strip()}
+        return {"name": text.strip(), "proficiency": ""}
+    first = ITEM_FIELDS[field][0]
+    return {first: text.strip()}
+
+
+def _normalize_item(field, item, report):
+    aliases = ITEM_ALIASES[field]
+    normalized = {}
+    for key, value in item.items():
+        canonical = _canonical(key)
+        target = aliases.get(canonical, canonical)
+        if target not in ITEM_FIELDS[field]:
+            # keep extra fields (e.g. project technologies) under their original key
+            normalized.setdefault(key, value)
+            continue
+        if target != key:
+            report.add("key", f"{field}: renamed {key!r} to {target!r}")
+        if target in normalized and normalized[target] not in ("", [], None):
+            continue
+        normalized[target] = value
+
+    for name in ITEM_FIELDS[field]:
+        value = normalized.get(name)
+        if name in ITEM_LIST_FIELDS:
+            separators = _LINK_SEPARATORS if name == "Project_Link" else _LINE_SEPARATORS
+            coerced = _to_string_list(value, separators)
+            # the prompt asks for Project_Link as a string, the renderer wants a list: not a fix
+            if value is not None and not isinstance(value, list) and not (name == "Project_Link" and isinstance(value, str)):
+                report.add("type", f"{field}.{name}: converted to a list")
+        else:
+            coerced = _to_string(value)
+            if value is not None and not isinstance(value, str):
+                report.add("type", f"{field}.{name}: converted to text")
+        normalized[name] = coerced
+    return normalized
+
+
+def normalize_field(key, value, report):
+    """Coerce one top-level member to the schema; returns (schema key or original key, value)."""
+    canonical = _canonical(key)
+    target = key if key in SCHEMA_KEYS else TOP_LEVEL_ALIASES.get(canonical, canonical)
+    if target not in SCHEMA_KEYS:
+        return key, value
+    if target != key:
+        report.add("key", f"renamed {key!r} to {target!r}")
+
+    if target in STRING_FIELDS:
+        if value is not None and not isinstance(value, str):
+            report.add("type", f"{target}: converted to text")
+        return target, _to_string(value, " " if target == "professional_summary" else ", ")
+
+    if target in LIST_FIELDS:
+        if value is not None and not isinstance(value, list):
+            report.add("type", f"{target}: converted to a list")
+        separators = _LINE_SEPARATORS if target == "certificates" else _SKILL_SEPARATORS
+        return target, _to_string_list(value, separators)
+
+    # list of objects
+    if value is None:
+        items = []
+    elif isinstance(value, dict):
+        report.add("type", f"{target}: wrapped a single object in a list")
+        items = [value]
+    elif isinstance(value, str):
+        report.add("type", f"{target}: converted text to a list")
+        items = _split_text(value, _LINE_SEPARATORS)
+    elif isinstance(value, list):
+        items = value
+    else:
+        report.add("type", f"{target}: dropped a {type(value).__name__} value")
+        items = []
+
+    normalized = []
+    for item in items:
+        if isinstance(item, str):
+            if not item.strip():
+                continue
+            item = _item_from_text(target, item)
+        elif not isinstance(item, dict):
+            report.add("type", f"{target}: dropped a {type(item).__name__} entry")
+            continue
+        item = _normalize_item(target, item, report)
+        if not any(item.get(name) for name in ITEM_FIELDS[target]):
+            report.add("empty_item", f"{target}: dropped an empty entry")
+            continue
+        normalized.append(item)
+    return target, normalized
+
+
+def empty_value(key):
+    return "" if key in STRING_FIELDS else []
+
+
+def normalize_cv(data, report):
+    """Schema-shaped copy of a parsed answer; schema keys it lacks are listed in report.missing."""
+    cv = {}
+    target = None
+    for key, value in data.items():
+        target, value = normalize_field(key, value, report)
+        if target in cv and cv[target] not in ("", []):
+            continue  # the schema spelling wins over an alias that also appeared
+        cv[target] = value
+
+    if report.truncated and target in SCHEMA_KEYS:
+        report.incomplete = [target]  # the last member before the cut may be partial
+    report.present = [key for key in SCHEMA_KEYS if key in cv]
+    report.missing = [key for key in SCHEMA_KEYS if key not in cv]
+    for key in report.missing:
+        cv[key] = empty_value(key)
+    return cv
+
+
+def fields_with_input(raw, keys):
+    """The schema keys among `keys` for which the raw CV input actually has content."""
+    available = set()
+    for key, value in raw.items():
+        if value in (None, "", [], {}):
+            continue
+        canonical = _canonical(key)
+        available.add(key if key in SCHEMA_KEYS else TOP_LEVEL_ALIASES.get(canonical, canonical))
+    return [key for key in keys if key in available]
+
+
+def repair_structured_cv(content):
+    """Model answer (text) -> (schema-shaped CV dict, RepairReport). Never raises on bad input."""
+    report = RepairReport()
+    data = parse_json_object(content, report)
+    if isinstance(data, dict) and len(data) == 1 and isinstance(next(iter(data.values())), dict) \
+            and _canonical(next(iter(data))) in ("cv", "resume", "structured_cv", "data"):
+        report.add("wrapper", f"unwrapped the {next(iter(data))!r} object")
+        data = next(iter(data.values()))
+    return normalize_cv(data if isinstance(data, dict) else {}, report), report
+
+
+if __name__ == "__main__":
+    """
+    Try the repair on a saved model answer: python cv_repair.py answer.txt
+    Prints the schema-shaped JSON on stdout and the repair report on stderr.
+    """
+    with open(sys.argv[1], "r", encoding="utf-8") as f:
+        cv, report = repair_structured_cv(f.read())
+    print(json.dumps(cv, indent=2, ensure_ascii=False))
+    print(f"Repair report: {report.summary()}", file=sys.stderr)
@@ -0,0 +1,214 @@
+# fast_docx.py - Direct OOXML renderer: same layout as CVGenerator, no python-docx object tree per CV
+import io
+import os
+import re
+import sys
+import threading
+import zipfile
+import xml.etree.ElementTree as ET
+from xml.sax.saxutils import escape
+
+from cv_generator import CVGenerator, get_base_template
+
+_W_NS = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+
+# Characters XML 1.0 cannot carry at all (python-docx would reject them, here they are dropped)
+_INVALID_XML_CHARS = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]")
+_SPECIAL_CHARS = re.compile(r"([\t\n\r])")
+
+_P_OPEN = '<w:p><w:pPr><w:pStyle w:val="%s"/></w:pPr>'
+_P_OPEN_PLAIN = "<w:p>"
+_P_CLOSE = "</w:p>"
+_R_OPEN = '<w:r><w:rPr><w:rStyle w:val="%s"/></w:rPr>'
+_R_OPEN_PLAIN = "<w:r>"
+_R_CLOSE = "</w:r>"
+_T = '<w:t xml:space="preserve">%s</w:t>'
+_TAB = "<w:tab/>"
+_BR = "<w:br/>"
+
+
+class _Parts:
+    """Static package parts and document.xml head/tail, split once out of the base template."""
+
+    def __init__(self, template: bytes):
+        self.static = []
+        with zipfile.ZipFile(io.BytesIO(template)) as archive:
+            for info in archive.infolist():
+                data = archive.read(info.filename)
+                if info.filename == "word/document.xml":
+                    document_xml = data.decode("utf-8")
+                    continue
+                if info.filename == "word/styles.xml":
+                    styles_xml = data
+                self.static.append((info.filename, data))
+
+        # Everything before the first body child and the trailing <w:sectPr> (page setup) stay fixed
+        body_start = document_xml.index("<w:body>") + len("<w:body>")
+        sect_start = document_xml.index("<w:sectPr", body_start)
+        self.head = document_xml[:body_start]
+        self.tail = document_xml[sect_start:]
+
+        # Style display name -> style id, as python-docx resolves `style="CV Body"`
+        self.style_ids = {}
+        for style in ET.fromstring(styles_xml).iter(f"{{{_W_NS}}}style"):
+            name = style.find(f"{{{_W_NS}}}name")
+            if name is not None:
+                self.style_ids[name.get(f"{{{_W_NS}}}val")] = style.get(f"{{{_W_NS}}}styleId")
+
+
+_parts = None
+_parts_lock = threading.Lock()
+
+
+def _get_parts():
+    global _parts
+    if _parts is None:
+        with _parts_lock:
+            if _parts is None:
+                _parts = _Parts(get_base_template())
+    return _parts
+
+
+def warm_up():
+    """Build the base template and split it into parts ahead of the first render."""
+    _get_parts()
+
+
+def _text_xml(text):
+    """Run content for text, mapping tabs and line breaks the way python-docx does."""
+    out = []
+    for piece in _SPECIAL_CHARS.split(_INVALID_XML_CHARS.sub("", text)):
+        if piece == "\t":
+            out.append(_TAB)
+        elif piece in ("\n", "\r"):
+            out.append(_BR)
+        elif piece:
+            out.append(_T % escape(piece))
+    return "".join(out)
+
+
+class FastParagraph:
+    def __init__(self, style_id):
+        self.style_id = style_id
+        self.runs = []  # (text, run style id or None)
+
+    def add_run(self, text=None, style=None):
+        style_id = _get_parts().style_ids[style] if style else None
+        self.runs.append((str(text or ""), style_id))
+        return self
+
+
+class FastDocument:
+    """
+    The small subset of the python-docx Document API that CVGenerator uses
+    (add_paragraph, Paragraph.add_run, save), backed by plain lists and
+    serialised with string templates.
+    """
+
+    def __init__(self):
+        self.paragraphs = []
+
+    def add_paragraph(self, text="", style=None):
+        style_id = _get_parts().style_ids[style] if style else None
+        paragraph = FastParagraph(style_id)
+        if text:
+            paragraph.add_run(text)
+        self.paragraphs.append(paragraph)
+        return paragraph
+
+    def document_xml(self) -> bytes:
+        parts = _get_parts()
+        out = [parts.head]
+        for paragraph in self.paragraphs:
+            out.append(_P_OPEN % paragraph.style_id if paragraph.style_id else _P_OPEN_PLAIN)
+            for text, run_style in paragraph.runs:
+                out.append(_R_OPEN % run_style if run_style else _R_OPEN_PLAIN)
+                out.append(_text_xml(text))
+                out.append(_R_CLOSE)
+            out.append(_P_CLOSE)
+        out.append(parts.tail)
+        return "".join(out).encode("utf-8")
+
+    def save(self, target):
+        """Write the .docx package to a path or a binary stream."""
+        with zipfile.ZipFile(target, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+            for name, data in _get_parts().static:
+                archive.writestr(name, data)
+            archive.writestr("word/document.xml", self.document_xml())
+
+
+class FastCVGenerator(CVGenerator):
+    """
+    Drop-in replacement for CVGenerator (generate_cv, generate_cv_bytes and the
+    progressive start_document/add_field/finish_document API). It reuses every
+    _create_* section builder, but paragraphs go into a FastDocument instead of
+    an lxml tree, and the package is written with zipfile from cached parts.
+    """
+
+    def _new_document(self):
+        return FastDocument()
+
+
+def get_generator_class():
+    """CVGenerator or FastCVGenerator, picked by the CV_RENDERER env var ("docx", the default, or "fast")."""
+    if os.environ.get("CV_RENDERER", "docx").lower() == "fast":
+        return FastCVGenerator
+    return CVGenerator
+
+
+def describe_docx(data: bytes):
+    """(paragraph style id, [(run text, run style id)]) per paragraph, read from the package XML."""
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        root = ET.fromstring(archive.read("word/document.xml"))
+    w = f"{{{_W_NS}}}"
+    result = []
+    for paragraph in root.iter(f"{w}p"):
+        style = paragraph.find(f"{w}pPr/{w}pStyle")
+        runs = []
+        for run in paragraph.iter(f"{w}r"):
+            run_style = run.find(f"{w}rPr/{w}rStyle")
+            text = []
+            for child in run:
+                if child.tag == f"{w}t":
+                    text.append(child.text or "")
+                elif child.tag == f"{w}tab":
+                    text.append("\t")
+                elif child.tag == f"{w}br":
+                    text.append("\n")
+            runs.append(("".join(text), run_style.get(f"{w}val") if run_style is not None else None))
+        result.append((style.get(f"{w}val") if style is not None else None, runs))
+    return result
+
+
+def compare_renderers(json_data):
+    """
+    Render json_data with both CVGenerator and FastCVGenerator.
+    Returns a list of human-readable differences in text and structure ([] when they match).
+    """
+    reference = describe_docx(CVGenerator().generate_cv_bytes(json_data).getvalue())
+    fast = describe_docx(FastCVGenerator().generate_cv_bytes(json_data).getvalue())
+    differences = []
+    if len(reference) != len(fast):
+        differences.append(f"paragraph count: python-docx={len(reference)} fast={len(fast)}")
+    for index, (expected, actual) in enumerate(zip(reference, fast)):
+        if expected != actual:
+            differences.append(f"paragraph {index}: python-docx={expected!r} fast={actual!r}")
+    return differences
+
+
+if __name__ == "__main__":
+    """
+    Parity check: python fast_docx.py structured_cv.json [more.json ...]
+    Exits with status 1 if the fast renderer's output differs from CVGenerator's.
+    """
+    import json
+
+    failed = False
+    for path in sys.argv[1:]:
+        with open(path, "r", encoding="utf-8") as f:
+            differences = compare_renderers(json.load(f))
+        print(f"{path}: {'OK' if not differences else f'{len(differences)} difference(s)'}")
+        for line in differences[:20]:
+            print("   ", line)
+        failed = failed or bool(differences)
+    sys.exit(1 if failed else 0)
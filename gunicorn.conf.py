@@ -0,0 +1,33 @@
+# gunicorn.conf.py - Production server settings: gunicorn -c gunicorn.conf.py app:app
+# (async mode: gunicorn -c gunicorn.conf.py -k uvicorn.workers.UvicornWorker asgi:app)
+import os
+import threading
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+# A job is polled and downloaded by whichever worker takes the request, so jobs and stored
+# results must be in SQLite files every worker opens (CV_JOBS_DB + CV_RESULTS_DB, each with
+# its secret) before there can be more than one worker; until then one worker gets more threads.
+SHARED_STORES = bool(os.environ.get("CV_JOBS_DB") and os.environ.get("CV_RESULTS_DB"))
+workers = int(os.environ.get("WEB_CONCURRENCY", 2 if SHARED_STORES else 1))
+# Threads keep SSE streams and job polls from blocking each other inside a worker
+worker_class = "gthread"
+threads = int(os.environ.get("GUNICORN_THREADS", 8 if SHARED_STORES else 16))
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 180))  # a senior CV can take a while on the model
+
+# Load app.py once in the master: openai, python-docx/lxml and the DOCX base template are
+# imported and built before forking, so every worker starts warm and shares those pages.
+preload_app = True
+os.environ.setdefault("CV_WARMUP", "preload")
+
+
+def on_starting(server):
+    if server.cfg.workers > 1 and not SHARED_STORES:
+        server.log.warning("%d workers without CV_JOBS_DB and CV_RESULTS_DB: job polls and downloads "
+                           "that reach another worker will get 404/410", server.cfg.workers)
+
+
+def post_fork(server, worker):
+    """HTTP clients must not cross a fork: each worker builds its own in the background."""
+    import app
+
+    threading.Thread(target=app._background_warm_up, name="cv-warm-up", daemon=True).start()
@@ -0,0 +1,221 @@
+# jobs.py - Asynchronous CV jobs: submit returns at once, a bounded thread pool runs the pipeline
+import contextvars
+import os
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from secure_storage import get_cipher
+
+
+class JobQueueFullError(Exception):
+    """Raised when the pool already has max_pending jobs queued or running."""
+
+
+class JobStore:
+    """
+    Job records and finished CV files, kept in SQLite.
+    db_path=":memory:" keeps everything inside the worker process; a file path
+    lets every gunicorn worker on the host answer status/download polls.
+    Results are encrypted when a secret is configured and deleted rows are zeroed; a file
+    store needs the secret, so finished CVs never reach the disk in plain text.
+    """
+
+    def __init__(self, db_path=":memory:", secret=None):
+        if not secret and db_path != ":memory:":
+            raise ValueError("A file job store (CV_JOBS_DB) needs CV_JOBS_SECRET: finished CVs would be "
+                             "written to disk unencrypted")
+        self.db_path = db_path
+        self.cipher = get_cipher(secret)
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+
+    def _connection(self):
+        """One connection per process, re-opened after a fork. Caller holds self._lock."""
+        if self._conn is None or self._pid != os.getpid():
+            conn = sqlite3.connect(self.db_path, timeout=5, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA secure_delete = ON")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cv_jobs ("
+                "id TEXT PRIMARY KEY, status TEXT NOT NULL, created_at REAL NOT NULL, updated_at REAL NOT NULL, "
+                "error TEXT, filename TEXT, mimetype TEXT, result BLOB, progress TEXT NOT NULL DEFAULT '[]', "
+                "result_token TEXT)"
+            )
+            try:
+                conn.execute("ALTER TABLE cv_jobs ADD COLUMN result_token TEXT")  # databases created before the column
+            except sqlite3.OperationalError:
+                pass
+            self._conn = conn
+            self._pid = os.getpid()
+        return self._conn
+
+    def _execute(self, sql, params=()):
+        """Run a write statement and return the affected row count."""
+        with self._lock:
+            return self._connection().execute(sql, params).rowcount
+
+    def _fetchone(self, sql, params=()):
+        with self._lock:
+            return self._connection().execute(sql, params).fetchone()
+
+    def create(self, job_id):
+        now = time.time()
+        self._execute(
+            "INSERT INTO cv_jobs (id, status, created_at, updated_at) VALUES (?, 'queued', ?, ?)",
+            (job_id, now, now),
+        )
+
+    def mark_running(self, job_id):
+        self._execute("UPDATE cv_jobs SET status = 'running', updated_at = ? WHERE id = ?", (time.time(), job_id))
+
+    def add_progress(self, job_id, event):
+        """Append a progress event (small JSON-able dict) to the job."""
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute("SELECT progress FROM cv_jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None:
+                return
+            events = json.loads(row[0])
+            events.append(event)
+            conn.execute(
+                "UPDATE cv_jobs SET progress = ?, updated_at = ? WHERE id = ?",
+                (json.dumps(events), time.time(), job_id),
+            )
+
+    def get_progress(self, job_id, since=0):
+        """Progress events from index `since` onwards ([] for unknown jobs)."""
+        row = self._fetchone("SELECT progress FROM cv_jobs WHERE id = ?", (job_id,))
+        if row is None:
+            return []
+        return json.loads(row[0])[since:]
+
+    def mark_failed(self, job_id, error):
+        self._execute(
+            "UPDATE cv_jobs SET status = 'failed', error = ?, updated_at = ? WHERE id = ?",
+            (error, time.time(), job_id),
+        )
+
+    def mark_done(self, job_id, result, filename, mimetype, result_token=None):
+        """Store the finished file and, optionally, the token of its entry in the result store."""
+        if self.cipher is not None:
+            result = self.cipher.encrypt(result)
+        self._execute(
+            "UPDATE cv_jobs SET status = 'done', result = ?, filename = ?, mimetype = ?, result_token = ?, updated_at = ? "
+            "WHERE id = ?",
+            (result, filename, mimetype, result_token, time.time(), job_id),
+        )
+
+    def get(self, job_id):
+        """Job metadata as a dict (without the result bytes), or None."""
+        row = self._fetchone(
+            "SELECT id, status, created_at, updated_at, error, filename, result_token FROM cv_jobs WHERE id = ?",
+            (job_id,),
+        )
+        if row is None:
+            return None
+        keys = ("job_id", "status", "created_at", "updated_at", "error", "filename", "result_token")
+        return dict(zip(keys, row))
+
+    def get_result(self, job_id):
+        """(bytes, filename, mimetype) for a finished job, or None."""
+        row = self._fetchone(
+            "SELECT result, filename, mimetype FROM cv_jobs WHERE id = ? AND status = 'done'", (job_id,)
+        )
+        if row is None:
+            return None
+        result, filename, mimetype = row
+        result = bytes(result)
+        if self.cipher is not None:
+            result = self.cipher.decrypt(result)
+        return result, filename, mimetype
+
+    def delete_expired(self, ttl_seconds):
+        """Remove jobs untouched for longer than the TTL (including ones orphaned by a dead worker)."""
+        cutoff = time.time() - ttl_seconds
+        return self._execute("DELETE FROM cv_jobs WHERE updated_at < ?", (cutoff,))
+
+
+class JobManager:
+    """
+    Runs pipeline(payload, progress) -> (bytes, filename, mimetype[, result_token]) on a bounded pool of worker threads.
+    The pipeline reports progress by calling progress(event_dict); events are kept with the job.
+    """
+
+    def __init__(self, pipeline, store=None, max_workers=4, max_pending=32, ttl_seconds=600):
+        self.pipeline = pipeline
+        self.store = store or JobStore()
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pid = None
+        self._pending = 0
+
+    @classmethod
+    def from_env(cls, pipeline):
+        """Build the manager from CV_JOB_* / CV_JOBS_* environment variables."""
+        store = JobStore(
+            db_path=os.environ.get("CV_JOBS_DB", ":memory:"),
+            secret=os.environ.get("CV_JOBS_SECRET"),
+        )
+        return cls(
+            pipeline,
+            store=store,
+            max_workers=int(os.environ.get("CV_JOB_WORKERS", "4")),
+            max_pending=int(os.environ.get("CV_JOB_MAX_PENDING", "32")),
+            ttl_seconds=float(os.environ.get("CV_JOB_TTL", "600")),
+        )
+
+    def _get_executor(self):
+        """Threads do not survive a fork, so each worker process lazily starts its own pool. Caller holds self._lock."""
+        if self._executor is None or self._pid != os.getpid():
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="cv-job")
+            self._pid = os.getpid()
+            self._pending = 0
+        return self._executor
+
+    def submit(self, payload):
+        """Queue a job and return its id; raises JobQueueFullError when the pool is saturated."""
+        self.store.delete_expired(self.ttl_seconds)
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise JobQueueFullError("Too many CVs are being processed, please retry shortly")
+            executor = self._get_executor()
+            self._pending += 1
+            self.store.create(job_id)
+            # The job keeps the submitting request's context (trace id for logs and metrics)
+            executor.submit(contextvars.copy_context().run, self._run, job_id, payload)
+        return job_id
+
+    def _run(self, job_id, payload):
+        try:
+            self.store.mark_running(job_id)
+            result, filename, mimetype, *token = self.pipeline(
+                payload, lambda event: self.store.add_progress(job_id, event)
+            )
+            self.store.mark_done(job_id, result, filename, mimetype, token[0] if token else None)
+        except Exception as e:
+            self.store.mark_failed(job_id, str(e))
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def status(self, job_id):
+        self.store.delete_expired(self.ttl_seconds)
+        return self.store.get(job_id)
+
+    def result(self, job_id):
+        return self.store.get_result(job_id)
+
+    def progress(self, job_id, since=0):
+        return self.store.get_progress(job_id, since)
+
+    @property
+    def pending(self):
+        return self._pending
@@ -0,0 +1,223 @@
+# llm_cache.py - Content-addressed cache for CVProcessor.convert_to_structured_cv results
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from secure_storage import get_cipher
+
+
+def _normalize(value):
+    """Canonical form of the cleaned input so near-identical submissions share a key."""
+    if isinstance(value, str):
+        return " ".join(value.split())
+    if isinstance(value, dict):
+        return {key: _normalize(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(item) for item in value]
+    return value
+
+
+def canonical_json(value):
+    """Whitespace- and key-order-insensitive JSON text of a cleaned input (or any part of it)."""
+    return json.dumps(_normalize(value), sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+
+
+def make_cache_key(clean_data, system_prompt, model):
+    """SHA-256 over the model name, the system prompt and the canonical cleaned input."""
+    canonical = canonical_json(clean_data)
+    digest = hashlib.sha256()
+    for part in (model, system_prompt, canonical):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class LLMResultCache:
+    """
+    Two-tier cache for structured CV results:
+      - in-process LRU (per gunicorn worker)
+      - optional SQLite file shared by every worker on the host
+    Both tiers honour the same TTL. Only hashed keys are stored, values are
+    encrypted on disk (the SQLite tier needs a secret), and SQLite runs with
+    secure_delete so evicted rows are zeroed instead of lingering in free pages.
+    """
+
+    def __init__(self, max_entries=256, ttl_seconds=900, db_path=None, db_max_entries=5000, secret=None):
+        if db_path and not secret:
+            raise ValueError("The SQLite cache tier (CV_CACHE_DB) needs CV_CACHE_SECRET: structured CVs "
+                             "would be written to disk unencrypted")
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.db_path = db_path
+        self.db_max_entries = db_max_entries
+        self.cipher = get_cipher(secret)
+
+        self._memory = OrderedDict()  # key -> (stored_at, value)
+        self._lock = threading.Lock()
+        self._counters = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "evictions": 0,
+        }
+
+        if self.db_path:
+            with self._connection() as conn:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS llm_cache ("
+                    "key TEXT PRIMARY KEY, value BLOB NOT NULL, stored_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+                )
+                conn.execute("CREATE INDEX IF NOT EXISTS llm_cache_accessed ON llm_cache (accessed_at)")
+
+    @classmethod
+    def from_env(cls):
+        """Build the cache from CV_CACHE_* environment variables (CV_CACHE_MAX_ENTRIES=0 disables it)."""
+        max_entries = int(os.environ.get("CV_CACHE_MAX_ENTRIES", "256"))
+        db_path = os.environ.get("CV_CACHE_DB") or None
+        if max_entries <= 0 and not db_path:
+            return None
+        return cls(
+            max_entries=max_entries,
+            ttl_seconds=float(os.environ.get("CV_CACHE_TTL", "900")),
+            db_path=db_path,
+            db_max_entries=int(os.environ.get("CV_CACHE_DB_MAX_ENTRIES", "5000")),
+            secret=os.environ.get("CV_CACHE_SECRET"),
+        )
+
+    def get(self, key):
+        """Return the cached model output for key, or None on a miss."""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                stored_at, value = entry
+                if now - stored_at < self.ttl_seconds:
+                    self._memory.move_to_end(key)
+                    self._counters["memory_hits"] += 1
+                    return value
+                del self._memory[key]
+                self._counters["evictions"] += 1
+
+        if self.db_path:
+            value, stored_at = self._disk_get(key, now)
+            if value is not None:
+                with self._lock:
+                    self._counters["disk_hits"] += 1
+                    self._remember(key, value, stored_at)
+                return value
+
+        with self._lock:
+            self._counters["misses"] += 1
+        return None
+
+    def set(self, key, value):
+        now = time.time()
+        with self._lock:
+            self._counters["stores"] += 1
+            self._remember(key, value, now)
+        if self.db_path:
+            self._disk_set(key, value, now)
+
+    async def aget(self, key):
+        """get() for an event loop: the SQLite tier is read on the default executor, off the loop."""
+        if not self.db_path:
+            return self.get(key)
+        return await asyncio.get_running_loop().run_in_executor(None, self.get, key)
+
+    async def aset(self, key, value):
+        """set() for an event loop, like aget()."""
+        if not self.db_path:
+            return self.set(key, value)
+        return await asyncio.get_running_loop().run_in_executor(None, self.set, key, value)
+
+    def delete(self, key):
+        """Forget one entry in both tiers (no-op when it is not there)."""
+        with self._lock:
+            self._memory.pop(key, None)
+        if self.db_path:
+            with self._connection() as conn:
+                conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+            stats["memory_entries"] = len(self._memory)
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = round((stats["memory_hits"] + stats["disk_hits"]) / lookups, 4) if lookups else 0.0
+        return stats
+
+    def clear(self):
+        """Drop every entry from both tiers and compact the database file."""
+        with self._lock:
+            self._memory.clear()
+        if self.db_path:
+            with self._connection() as conn:
+                conn.execute("DELETE FROM llm_cache")
+            with self._connection() as conn:
+                conn.execute("VACUUM")
+
+    # ---------- internals ----------
+    def _remember(self, key, value, stored_at):
+        """Insert into the LRU tier. Caller holds self._lock."""
+        if self.max_entries <= 0:
+            return
+        self._memory[key] = (stored_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self._counters["evictions"] += 1
+
+    @contextmanager
+    def _connection(self):
+        """Short-lived connection (fork-safe); commits on success and always closes."""
+        conn = sqlite3.connect(self.db_path, timeout=5)
+        try:
+            conn.execute("PRAGMA secure_delete = ON")
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _disk_get(self, key, now):
+        with self._connection() as conn:
+            row = conn.execute("SELECT value, stored_at FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None, None
+            blob, stored_at = row
+            if now - stored_at >= self.ttl_seconds:
+                conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                with self._lock:
+                    self._counters["evictions"] += 1
+                return None, None
+            conn.execute("UPDATE llm_cache SET accessed_at = ? WHERE key = ?", (now, key))
+
+        try:
+            blob = self.cipher.decrypt(bytes(blob))
+        except ValueError:
+            # Written under a different secret - unusable, treat as a miss
+            return None, None
+        return blob.decode("utf-8"), stored_at
+
+    def _disk_set(self, key, value, now):
+        blob = self.cipher.encrypt(value.encode("utf-8"))
+
+        with self._connection() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, stored_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, blob, now, now),
+            )
+            expired = conn.execute("DELETE FROM llm_cache WHERE stored_at < ?", (now - self.ttl_seconds,)).rowcount
+            overflow = conn.execute(
+                "DELETE FROM llm_cache WHERE key IN ("
+                "SELECT key FROM llm_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.db_max_entries,),
+            ).rowcount
+        with self._lock:
+            self._counters["evictions"] += expired + overflow
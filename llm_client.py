@@ -0,0 +1,160 @@
+# llm_client.py - Process-wide OpenAI client registry and hot-reloaded system prompt
+import asyncio
+import os
+import threading
+import time
+import weakref
+
+import httpx
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient, OpenAI, DefaultHttpxClient
+
+
+def _env_float(name, default):
+    return float(os.environ.get(name, default))
+
+
+def _env_int(name, default):
+    return int(os.environ.get(name, default))
+
+
+def _pool_settings(max_connections="20", max_keepalive="10"):
+    timeout = httpx.Timeout(
+        _env_float("CV_OPENAI_TIMEOUT", "120"),
+        connect=_env_float("CV_OPENAI_CONNECT_TIMEOUT", "5"),
+    )
+    limits = httpx.Limits(
+        max_connections=_env_int("CV_OPENAI_MAX_CONNECTIONS", max_connections),
+        max_keepalive_connections=_env_int("CV_OPENAI_MAX_KEEPALIVE", max_keepalive),
+        keepalive_expiry=_env_float("CV_OPENAI_KEEPALIVE_EXPIRY", "60"),
+    )
+    return timeout, limits
+
+
+def _build_client(api_key, base_url):
+    """One OpenAI client with a keep-alive connection pool sized from CV_OPENAI_* env vars."""
+    timeout, limits = _pool_settings()
+    return OpenAI(
+        api_key=api_key,
+        base_url=base_url,
+        timeout=timeout,
+        # retries, with deadlines and jitter, are made by resilience.ModelCaller
+        max_retries=_env_int("CV_OPENAI_MAX_RETRIES", "0"),
+        http_client=DefaultHttpxClient(limits=limits, timeout=timeout),
+    )
+
+
+_clients = {}
+# event loop -> {(api_key, base_url): AsyncOpenAI}; an entry goes with its loop
+_async_clients = weakref.WeakKeyDictionary()
+_clients_lock = threading.Lock()
+
+
+def get_client(api_key=None, base_url=None):
+    """
+    Return the shared client for (api_key, base_url), creating it on first use.
+    The client is thread-safe, so every request in the process reuses its pool
+    and the TLS connections to the API stay warm between CVs.
+    """
+    base_url = base_url or os.environ.get("OPENAI_BASE_URL") or None
+    key = (api_key, base_url)
+    client = _clients.get(key)
+    if client is not None:
+        return client
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            client = _build_client(api_key, base_url)
+            _clients[key] = client
+        return client
+
+
+def get_async_client(api_key=None, base_url=None):
+    """
+    Shared AsyncOpenAI client for (api_key, base_url) on the running event loop (its
+    connections belong to that loop). One client multiplexes every in-flight CV of the
+    worker, so its pool is larger by default (CV_OPENAI_MAX_CONNECTIONS, default 500).
+    Clients of closed loops are dropped, so their pools can be collected with the loop.
+    """
+    base_url = base_url or os.environ.get("OPENAI_BASE_URL") or None
+    loop = asyncio.get_running_loop()
+    key = (api_key, base_url)
+    with _clients_lock:
+        for closed in [other for other in _async_clients if other.is_closed()]:
+            del _async_clients[closed]
+        clients = _async_clients.setdefault(loop, {})
+        client = clients.get(key)
+        if client is None:
+            timeout, limits = _pool_settings(max_connections="500", max_keepalive="100")
+            client = AsyncOpenAI(
+                api_key=api_key,
+                base_url=base_url,
+                timeout=timeout,
+                max_retries=_env_int("CV_OPENAI_MAX_RETRIES", "0"),
+                http_client=DefaultAsyncHttpxClient(limits=limits, timeout=timeout),
+            )
+            clients[key] = client
+        return client
+
+
+def _reset_after_fork():
+    """Sockets inherited from the parent must not be shared, so forked workers start with a fresh registry."""
+    global _clients_lock
+    _clients_lock = threading.Lock()
+    _clients.clear()
+    _async_clients.clear()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+class SystemPrompt:
+    """
+    System prompt loaded once and reloaded only when the file changes on disk.
+    The file is stat'ed at most once per check_interval seconds.
+    """
+
+    def __init__(self, path, check_interval=2.0):
+        self.path = path
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._text = None
+        self._signature = None
+        self._checked_at = 0.0
+        self._load()
+
+    def _load(self):
+        stat = os.stat(self.path)
+        with open(self.path, "r") as f:
+            self._text = f.read()
+        self._signature = (stat.st_mtime_ns, stat.st_size)
+
+    @property
+    def text(self):
+        now = time.monotonic()
+        if now - self._checked_at >= self.check_interval:
+            with self._lock:
+                if now - self._checked_at >= self.check_interval:
+                    self._checked_at = now
+                    try:
+                        stat = os.stat(self.path)
+                        if (stat.st_mtime_ns, stat.st_size) != self._signature:
+                            self._load()
+                    except OSError:
+                        pass  # keep serving the last good prompt
+        return self._text
+
+
+_prompts = {}
+_prompts_lock = threading.Lock()
+
+
+def get_system_prompt(path="system_prompt.txt"):
+    """Return the shared SystemPrompt for path."""
+    path = os.path.abspath(path)
+    with _prompts_lock:
+        prompt = _prompts.get(path)
+        if prompt is None:
+            prompt = SystemPrompt(path)
+            _prompts[path] = prompt
+        return prompt
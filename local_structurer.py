@@ -0,0 +1,235 @@
+# local_structurer.py - Rule-based structuring of the frontend payload, and a score of how much polishing each field needs
+import json
+import re
+import sys
+
+from cv_repair import RepairReport, SCHEMA_KEYS, normalize_cv
+
+# How a CV gets structured: the model does all of it (llm), the rules do and the model polishes
+# only the free text that needs it (auto), or the rules alone with no network call (fast)
+STRUCTURER_MODES = ("llm", "auto", "fast")
+
+# Fields whose wording the model improves; everything else is structure the rules handle alone
+FREE_TEXT_FIELDS = ("professional_summary", "work_experience", "projects")
+DEFAULT_POLISH_THRESHOLD = 0.35
+
+MONTHS = ("January", "February", "March", "April", "May", "June", "July", "August", "September", "October",
+          "November", "December")
+_MONTH_LOOKUP = {name.lower()[:3]: name for name in MONTHS}
+_MONTH_YEAR = re.compile(r"^([A-Za-z]{3,9})\.?,?\s+(\d{4})$")
+_NUMERIC_DATE = re.compile(r"^(?:(\d{1,2})[/.\-](\d{4})|(\d{4})[/.\-](\d{1,2}))$")
+_PRESENT = re.compile(r"^(?:present|current|currently|now|ongoing|to date|till now|today)$", re.I)
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+(?=[A-Z])")
+
+# Things the rules cannot fix: each hit adds its weight to a field's polish score (capped at 1)
+COMMON_MISSPELLINGS = frozenset(
+    "acheived acheive accross adress begining beleive buisness calender collegue comittee commited comunication "
+    "concensus definately develope developement enviroment existance experiance familar finaly foward goverment "
+    "guarentee immediatly independant knowlege langauge liason maintainance managment neccessary occured "
+    "oppurtunity persue posession prefered proffesional publically recieve recomend refered relevent reponsible "
+    "responsable resposibilities seperate sucess sucessful succesful supervisior tommorow truely untill wich "
+    "writting".split()
+)
+INFORMAL_WORDS = frozenset("stuff things lots gonna wanna kinda sorta u ur pls plz btw tho thru awesome cool".split())
+WEAK_PHRASES = ("responsible for", "worked on", "helped with", "helped to", "was in charge of", "duties included",
+                "tasked with", "did ", "various tasks")
+SIGNALS = {
+    "misspelling": 0.4,
+    "informal": 0.4,
+    "lowercase_i": 0.4,
+    "run_on": 0.35,
+    "paragraph_bullet": 0.4,
+    "repeated_word": 0.3,
+    "first_person": 0.2,
+    "repeated_punctuation": 0.2,
+    "shouting": 0.2,
+    "missing_space": 0.2,
+    "weak_phrase": 0.15,
+}
+_WORD = re.compile(r"[A-Za-z']+")
+
+
+# ---------- deterministic clean-up ----------
+_SMALL_WORDS = frozenset("a an and at de del for in of on the to van von".split())
+
+
+def _fix_case(text):
+    """Title-case names and titles typed in all lower or all upper case; anything mixed is left as typed."""
+    if sum(char.isalpha() for char in text) < 2 or not (text == text.lower() or text == text.upper()):
+        return text
+
+    def word(match):
+        value = match.group(0)
+        return value if value in _SMALL_WORDS and match.start() > 0 else value.capitalize()
+    return re.sub(r"[^\W\d_]+", word, text.lower())
+
+
+def _sentence_case(text):
+    text = text.strip().rstrip(",;:")
+    return text[:1].upper() + text[1:] if text else text
+
+
+def normalize_date(text):
+    """"jan 2020", "01/2020", "2020-01" -> "January 2020" (the frontend's own format); "now" -> "Present"."""
+    text = text.strip()
+    if not text:
+        return text
+    if _PRESENT.match(text):
+        return "Present"
+    match = _MONTH_YEAR.match(text)
+    if match and match.group(1).lower()[:3] in _MONTH_LOOKUP:
+        return f"{_MONTH_LOOKUP[match.group(1).lower()[:3]]} {match.group(2)}"
+    match = _NUMERIC_DATE.match(text)
+    if match:
+        month, year = (match.group(1), match.group(2)) if match.group(1) else (match.group(4), match.group(3))
+        if 1 <= int(month) <= 12:
+            return f"{MONTHS[int(month) - 1]} {year}"
+    return text
+
+
+def normalize_url(text):
+    text = text.strip()
+    if text and not re.match(r"^[a-z][a-z0-9+.\-]*://", text, re.I) and "." in text and " " not in text:
+        return "https://" + text
+    return text
+
+
+def _unique(items):
+    seen = set()
+    result = []
+    for item in items:
+        key = item.casefold()
+        if item and key not in seen:
+            seen.add(key)
+            result.append(item)
+    return result
+
+
+def _bullets(lines):
+    """Sentence-cased bullets, long paragraphs split into sentences, one ending style for all."""
+    bullets = []
+    for line in lines:
+        sentences = _SENTENCE_END.split(line)
+        bullets.extend(sentences if len(sentences) >= 3 else [line])
+    bullets = [_sentence_case(bullet) for bullet in bullets if bullet.strip()]
+    with_period = sum(bullet.endswith(".") for bullet in bullets)
+    if with_period * 2 > len(bullets):
+        return [bullet if bullet[-1] in ".!?" else bullet + "." for bullet in bullets]
+    return [bullet[:-1] if bullet.endswith(".") and not bullet.endswith("..") else bullet for bullet in bullets]
+
+
+def _paragraph(text):
+    text = _sentence_case(text)
+    return text + "." if text and text[-1] not in ".!?" else text
+
+
+def structure_locally(clean_data):
+    """
+    Map the cleaned frontend payload onto the CVGenerator schema without the model:
+    aliases and types via cv_repair, then case, dates, links, duplicates and bullet style.
+    Returns (structured CV, RepairReport of the schema coercion).
+    """
+    report = RepairReport()
+    cv = normalize_cv(dict(clean_data), report)
+
+    cv["full_name"] = _fix_case(cv["full_name"])
+    cv["job_title"] = _fix_case(cv["job_title"])
+    cv["city"] = _fix_case(cv["city"])
+    cv["email"] = re.sub(r"^mailto:", "", cv["email"], flags=re.I).lower()
+    cv["linkedin"] = normalize_url(cv["linkedin"])
+    cv["portfolio"] = normalize_url(cv["portfolio"])
+    cv["professional_summary"] = _paragraph(cv["professional_summary"])
+
+    cv["technical_skills"] = _unique([skill.strip(" .") for skill in cv["technical_skills"]])
+    cv["soft_skills"] = _unique([_sentence_case(skill.strip(" .")) for skill in cv["soft_skills"]])
+    cv["certificates"] = _unique([_sentence_case(certificate) for certificate in cv["certificates"]])
+
+    for language in cv["languages"]:
+        language["name"] = _sentence_case(language["name"])
+        language["proficiency"] = _sentence_case(language["proficiency"])
+    for entry in cv["education"]:
+        entry["degree"] = _fix_case(entry["degree"])
+        entry["institution"] = _fix_case(entry["institution"])
+        entry["location"] = _fix_case(entry["location"])
+        entry["start_date"] = normalize_date(entry["start_date"])
+        entry["end_date"] = normalize_date(entry["end_date"])
+    for job in cv["work_experience"]:
+        job["position"] = _fix_case(job["position"])
+        job["location"] = _fix_case(job["location"])
+        job["start_date"] = normalize_date(job["start_date"])
+        job["end_date"] = normalize_date(job["end_date"])
+        job["responsibilities"] = _bullets(job["responsibilities"])
+    for project in cv["projects"]:
+        project["description"] = _paragraph(project["description"])
+        project["Project_Link"] = [normalize_url(link) for link in project["Project_Link"]]
+    return cv, report
+
+
+# ---------- polish scores ----------
+def text_signals(text):
+    """{signal: hits} for one piece of free text (after the deterministic clean-up)."""
+    hits = {}
+
+    def add(signal, count=1):
+        if count:
+            hits[signal] = hits.get(signal, 0) + count
+
+    words = _WORD.findall(text)
+    lower = [word.lower() for word in words]
+    add("misspelling", sum(word in COMMON_MISSPELLINGS for word in lower))
+    add("informal", sum(word in INFORMAL_WORDS for word in lower))
+    add("lowercase_i", sum(word in ("i", "i'm", "i've", "i'd") for word in words))
+    add("first_person", sum(word in ("I", "my", "me", "My") for word in words))
+    add("repeated_word", sum(1 for a, b in zip(lower, lower[1:]) if a == b and len(a) > 1))
+    add("shouting", sum(1 for word in words if len(word) > 4 and word.isupper()))
+    add("repeated_punctuation", len(re.findall(r"[!?]{2,}|,,|\.{4,}|(?<!\.)\.\.(?!\.)", text)))
+    add("missing_space", len(re.findall(r"[a-z][,;!?][A-Za-z]|[a-z]{3}\.[A-Z][a-z]", text)))
+    phrase_text = " " + " ".join(lower) + " "
+    add("weak_phrase", sum(phrase_text.count(" " + phrase.strip() + " ") for phrase in WEAK_PHRASES))
+    add("run_on", sum(1 for sentence in re.split(r"[.!?]+\s", text) if len(sentence.split()) > 40))
+    return hits
+
+
+def _score(texts, bullets=()):
+    hits = {}
+    for text in texts:
+        for signal, count in text_signals(text).items():
+            hits[signal] = hits.get(signal, 0) + count
+    paragraph_bullets = sum(1 for bullet in bullets if len(bullet) > 350)
+    if paragraph_bullets:
+        hits["paragraph_bullet"] = paragraph_bullets
+    return min(1.0, round(sum(SIGNALS[signal] * count for signal, count in hits.items()), 3)), hits
+
+
+def polish_scores(structured_cv):
+    """
+    {field: (score, signals)} for the free-text fields: 0 means the text can go into the
+    CV as it is, 1 that it clearly needs rewriting (misspellings, informal or first-person
+    wording, run-on sentences, paragraph-long bullets...). Structured fields are not scored:
+    structure_locally already puts them into their final shape.
+    """
+    responsibilities = [bullet for job in structured_cv.get("work_experience", [])
+                        for bullet in job.get("responsibilities", [])]
+    descriptions = [project.get("description", "") for project in structured_cv.get("projects", [])]
+    return {
+        "professional_summary": _score([structured_cv.get("professional_summary", "")]),
+        "work_experience": _score(responsibilities, responsibilities),
+        "projects": _score(descriptions),
+    }
+
+
+def fields_to_polish(scores, threshold=DEFAULT_POLISH_THRESHOLD):
+    """Free-text fields whose score reaches the threshold, in schema order."""
+    return [field for field in SCHEMA_KEYS if field in scores and scores[field][0] >= threshold]
+
+
+if __name__ == "__main__":
+    """
+    Try the local structurer on a frontend payload: python local_structurer.py input.json
+    Prints the structured CV on stdout and the polish score of each free-text field on stderr.
+    """
+    with open(sys.argv[1], "r", encoding="utf-8") as f:
+        cv, _ = structure_locally(json.load(f))
+    print(json.dumps(cv, indent=2, ensure_ascii=False))
+    for field, (score, hits) in polish_scores(cv).items():
+        print(f"{field}: {score} {hits or ''}", file=sys.stderr)
@@ -0,0 +1,190 @@
+# log_setup.py - Non-blocking logging: JSON lines written by a background thread, trace ids,
+# rate limits for repetitive messages and redaction of personal data
+#
+# Request threads only put a prepared record on a queue (QueueHandler); a QueueListener thread
+# formats and writes it, so a slow or contended stderr never holds up a request.
+import atexit
+import copy
+import json
+import logging
+import os
+import queue
+import re
+import sys
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener
+
+import metrics
+
+# Library loggers that log every HTTP call at INFO (overridable through CV_LOG_LEVELS)
+DEFAULT_LEVELS = {"httpx": "WARNING"}
+TEXT_FORMAT = "%(asctime)s %(levelname)s %(name)s [%(trace_id)s] %(message)s"
+
+LOG_RECORDS_DROPPED = metrics.Counter("cv_log_records_dropped_total",
+                                      "Log records not written, by reason: rate_limit, queue_full.",
+                                      labels=("reason",))
+
+# Safety net: CV contents must never reach a log line, whatever a message interpolates
+_EMAIL = re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+")
+_PHONE = re.compile(r"(?<![\w.])\+?\d[\d ().-]{7,}\d(?![\w.])")
+_PROFILE_URL = re.compile(r"(?i)\b(?:https?://)?(?:www\.)?(?:linkedin\.com|github\.com)/\S+")
+
+
+def redact(text):
+    """text with e-mail addresses, phone numbers and profile URLs replaced by placeholders"""
+    text = _EMAIL.sub("<email>", text)
+    text = _PROFILE_URL.sub("<url>", text)
+    return _PHONE.sub("<phone>", text)
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, logger, trace_id, msg (+ suppressed, exc)."""
+
+    def format(self, record):
+        entry = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created)) + f".{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "trace_id": getattr(record, "trace_id", "-"),
+            "msg": record.getMessage(),
+        }
+        if getattr(record, "suppressed", 0):
+            entry["suppressed"] = record.suppressed
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Lets through at most `limit` records per message template (logger + unformatted message)
+    per `window` seconds, then one in `sample` of the rest (0 = none). The first record let
+    through after some were dropped carries their count as record.suppressed.
+    ERROR and above always pass.
+    """
+
+    def __init__(self, limit=20, window=60.0, sample=100, max_templates=2000):
+        super().__init__()
+        self.limit = limit
+        self.window = window
+        self.sample = sample
+        self.max_templates = max_templates
+        self._seen = {}  # (logger, template) -> [window start, count in window, suppressed]
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if record.levelno >= logging.ERROR:
+            return True
+        key = (record.name, str(record.msg))
+        now = time.monotonic()
+        with self._lock:
+            state = self._seen.get(key)
+            if state is None:
+                if len(self._seen) >= self.max_templates:
+                    self._seen.clear()
+                state = self._seen[key] = [now, 0, 0]
+            elif now - state[0] >= self.window:
+                state[0], state[1] = now, 0
+            state[1] += 1
+            allowed = state[1] <= self.limit or (self.sample > 0 and (state[1] - self.limit) % self.sample == 0)
+            if allowed:
+                record.suppressed, state[2] = state[2], 0
+            else:
+                state[2] += 1
+        if not allowed:
+            LOG_RECORDS_DROPPED.inc(reason="rate_limit")
+        return allowed
+
+
+class _QueueHandler(QueueHandler):
+    """Prepares records in the calling thread (trace id, message, redaction) and never blocks."""
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.trace_id = metrics.get_trace_id()
+        record.msg = redact(record.getMessage())
+        record.args = None
+        if record.exc_info:
+            record.exc_text = redact(logging.Formatter().formatException(record.exc_info))
+            record.exc_info = None
+        record.stack_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_RECORDS_DROPPED.inc(reason="queue_full")
+
+
+_handler = None
+_listener = None
+
+
+def _parse_levels(spec):
+    """"backend_1=DEBUG,httpx=INFO" -> {"backend_1": "DEBUG", "httpx": "INFO"}"""
+    levels = {}
+    for part in spec.split(","):
+        name, _, level = part.partition("=")
+        if name.strip() and level.strip():
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def _start_listener(queue_size, formatter):
+    global _listener
+    output = logging.StreamHandler(sys.stderr)
+    output.setFormatter(formatter)
+    _handler.queue = queue.Queue(queue_size)
+    _listener = QueueListener(_handler.queue, output)
+    _listener.start()
+
+
+def _stop_listener():
+    if _listener is not None:
+        _listener.stop()
+
+
+def configure_logging():
+    """
+    Route the root logger through a queue to a background writer thread (idempotent).
+
+    CV_LOG_LEVEL       root level (default INFO)
+    CV_LOG_LEVELS      per-logger levels, e.g. "cv_generator=WARNING,backend_1=DEBUG"
+    CV_LOG_FORMAT      "json" (default) or "text"
+    CV_LOG_RATE_LIMIT  records per message template per minute before sampling (default 20, 0 = off)
+    CV_LOG_SAMPLE      past the limit, one record in this many is kept (default 100, 0 = none)
+    CV_LOG_QUEUE_SIZE  records waiting for the writer before new ones are dropped (default 10000)
+
+    When the entry point already configured the root logger (benchmarks, tests), only trace
+    ids are added to its handlers.
+    """
+    global _handler
+    root = logging.getLogger()
+    if _handler is not None:
+        return
+    if root.handlers:
+        metrics.install_log_trace_ids(root)
+        return
+
+    levels = dict(DEFAULT_LEVELS, **_parse_levels(os.environ.get("CV_LOG_LEVELS", "")))
+    root.setLevel(os.environ.get("CV_LOG_LEVEL", "INFO").upper())
+    for name, level in levels.items():
+        logging.getLogger(name).setLevel(level)
+
+    _handler = _QueueHandler(queue.Queue())
+    text = os.environ.get("CV_LOG_FORMAT", "json").lower() == "text"
+    formatter = logging.Formatter(TEXT_FORMAT) if text else JsonFormatter()
+    per_minute = int(os.environ.get("CV_LOG_RATE_LIMIT", "20"))
+    if per_minute > 0:
+        _handler.addFilter(RateLimitFilter(limit=per_minute, sample=int(os.environ.get("CV_LOG_SAMPLE", "100"))))
+    root.addHandler(_handler)
+
+    queue_size = int(os.environ.get("CV_LOG_QUEUE_SIZE", "10000"))
+    _start_listener(queue_size, formatter)
+    atexit.register(_stop_listener)
+    # The writer thread does not survive a fork (gunicorn preloads the app in the master)
+    os.register_at_fork(after_in_child=lambda: _start_listener(queue_size, formatter))
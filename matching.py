@@ -0,0 +1,402 @@
+# matching.py - Score a structured CV against job postings: BM25 over an inverted term index
+import functools
+import json
+import math
+import os
+import re
+import sqlite3
+import threading
+import time
+import uuid
+
+# Canonical term -> spellings that mean the same thing (matched case-insensitively, as whole words).
+# Canonical terms also form the skill vocabulary used for missing-keyword reports.
+SYNONYMS = {
+    "javascript": ("js", "ecmascript", "es6"),
+    "typescript": ("ts",),
+    "node.js": ("node", "nodejs", "node js"),
+    "react": ("react.js", "reactjs", "react js"),
+    "vue": ("vue.js", "vuejs"),
+    "angular": ("angular.js", "angularjs"),
+    "python": ("python3", "py"),
+    "golang": ("go lang",),
+    "c++": ("cpp",),
+    "c#": ("csharp", "c sharp"),
+    "dotnet": ("asp.net", "net core", "dotnet core"),
+    "java": (),
+    "kotlin": (),
+    "swift": (),
+    "php": (),
+    "ruby": ("ruby on rails", "rails", "ror"),
+    "django": (),
+    "flask": (),
+    "fastapi": (),
+    "spring": ("spring boot", "springboot"),
+    "sql": (),
+    "postgresql": ("postgres", "psql"),
+    "mysql": (),
+    "mongodb": ("mongo",),
+    "redis": (),
+    "elasticsearch": ("elastic search", "opensearch"),
+    "kafka": ("apache kafka",),
+    "spark": ("apache spark", "pyspark"),
+    "aws": ("amazon web services",),
+    "azure": ("microsoft azure",),
+    "gcp": ("google cloud", "google cloud platform"),
+    "docker": ("containerization",),
+    "kubernetes": ("k8s",),
+    "terraform": ("infrastructure as code", "iac"),
+    "ci/cd": ("cicd", "ci cd", "continuous integration", "continuous delivery", "continuous deployment"),
+    "git": ("github", "gitlab"),
+    "linux": ("unix",),
+    "rest api": ("restful", "restful api", "rest apis", "restful apis"),
+    "graphql": (),
+    "microservices": ("microservice", "micro services"),
+    "machine learning": ("ml",),
+    "deep learning": ("dl", "neural networks"),
+    "artificial intelligence": ("ai",),
+    "natural language processing": ("nlp",),
+    "data analysis": ("data analytics", "analytics"),
+    "data science": (),
+    "tensorflow": ("tf",),
+    "pytorch": ("torch",),
+    "pandas": (),
+    "excel": ("microsoft excel", "ms excel"),
+    "power bi": ("powerbi",),
+    "tableau": (),
+    "figma": (),
+    "html": ("html5",),
+    "css": ("css3",),
+    "agile": ("scrum", "kanban"),
+    "project management": ("pmp",),
+    "product management": (),
+    "communication": ("communication skills", "communicator"),
+    "leadership": ("team leadership", "leading teams", "team lead"),
+    "teamwork": ("collaboration", "team player"),
+    "problem solving": ("problem-solving", "analytical thinking"),
+    "time management": (),
+    "customer service": ("customer support",),
+    "seo": ("search engine optimization",),
+    "accounting": ("bookkeeping",),
+}
+
+STOPWORDS = frozenset(
+    "a about above after all also an and any are as at be been being both but by can could do does for from "
+    "has have having he her here his how i if in into is it its job like may more most must new no not of on "
+    "one or other our out over own per role same she should so some such than that the their them then there "
+    "these they this those through to too under up us very was we well were what when where which while who "
+    "will with within work would you your years year etc including strong good great plus ability able "
+    "experience experienced looking join team company responsibilities requirements required preferred "
+    "skills knowledge understanding working".split()
+)
+
+_TOKEN = re.compile(r"[a-z0-9][a-z0-9+#]*(?:\.[a-z0-9+#]+)*")
+_ALIASES = {}
+for _canonical, _spellings in SYNONYMS.items():
+    for _spelling in (_canonical,) + _spellings:
+        _ALIASES[tuple(_TOKEN.findall(_spelling.replace(".net", " dotnet")))] = _canonical
+_PHRASE_STARTS = frozenset(tokens[0] for tokens in _ALIASES if len(tokens) > 1)
+_MAX_PHRASE = max(len(tokens) for tokens in _ALIASES)
+VOCABULARY = frozenset(SYNONYMS)
+
+# Fields of the structured CV (the dict CVGenerator consumes) and how much a term found there weighs
+CV_FIELD_WEIGHTS = (
+    ("technical_skills", 3.0),
+    ("certificates", 2.0),
+    ("soft_skills", 1.5),
+    ("job_title", 1.5),
+    ("work_experience", 1.0),
+    ("professional_summary", 1.0),
+)
+
+
+@functools.lru_cache(maxsize=65536)
+def _term(token):
+    """Term of a single token: its canonical synonym, else the token with plurals folded; None for stopwords."""
+    canonical = _ALIASES.get((token,))
+    if canonical is not None:
+        return canonical
+    if token in STOPWORDS or len(token) < 2 or token.rstrip("+").isdigit():
+        return None
+    if len(token) <= 4 or token[-1] != "s" or token.endswith(("ss", "us", "is")):
+        return token
+    return token[:-3] + "y" if token.endswith("ies") else token[:-1]
+
+
+def analyze(text):
+    """Normalised terms of a text: lowercased words, synonyms folded to one canonical term, stopwords dropped."""
+    tokens = _TOKEN.findall(str(text).lower().replace(".net", " dotnet").replace("/", " "))
+    terms = []
+    i = 0
+    count = len(tokens)
+    while i < count:
+        token = tokens[i]
+        if token in _PHRASE_STARTS:
+            # longest multi-word spelling starting here ("google cloud platform" before "google cloud")
+            for size in range(min(_MAX_PHRASE, count - i), 1, -1):
+                canonical = _ALIASES.get(tuple(tokens[i:i + size]))
+                if canonical is not None:
+                    terms.append(canonical)
+                    i += size
+                    break
+            else:
+                canonical = None
+            if canonical is not None:
+                continue
+        term = _term(token)
+        if term is not None:
+            terms.append(term)
+        i += 1
+    return terms
+
+
+def _texts(value):
+    """Every string inside a CV field (strings, lists and nested dicts)."""
+    if isinstance(value, str):
+        yield value
+    elif isinstance(value, dict):
+        for item in value.values():
+            yield from _texts(item)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            yield from _texts(item)
+
+
+def cv_terms(structured_cv):
+    """{term: weight} of a structured CV; a term counts at the weight of the heaviest field it appears in."""
+    weights = {}
+    for field, weight in CV_FIELD_WEIGHTS:
+        value = structured_cv.get(field)
+        if field == "work_experience" and isinstance(value, list):
+            value = [
+                [job.get("job_title", ""), job.get("responsibilities", [])] if isinstance(job, dict) else job
+                for job in value
+            ]
+        for text in _texts(value):
+            for term in analyze(text):
+                if weights.get(term, 0) < weight:
+                    weights[term] = weight
+    return weights
+
+
+class Posting:
+    """One job posting as indexed: metadata, term counts and the keywords it asks for."""
+
+    __slots__ = ("id", "meta", "counts", "length", "keywords")
+
+    def __init__(self, posting_id, data):
+        self.id = posting_id
+        self.meta = {key: data[key] for key in ("title", "company", "location", "url") if data.get(key)}
+        terms = analyze(data.get("title", "")) + analyze(data.get("description", ""))
+        skills = [term for skill in data.get("skills") or [] for term in analyze(skill)]
+        self.counts = {}
+        for term in terms + skills * 2:  # listed skills count as if mentioned twice
+            self.counts[term] = self.counts.get(term, 0) + 1
+        self.length = sum(self.counts.values())
+        # What the posting explicitly asks for: its skill list plus known skills named in the text
+        self.keywords = frozenset(skills) | (frozenset(terms) & VOCABULARY)
+
+
+class JobIndex:
+    """
+    Inverted index of job postings, scored with BM25 against the terms of a structured CV.
+    Each posting list stores the length-normalised term frequency, computed once when the
+    posting is added; idf is applied per query term, so adding or removing a posting only
+    touches its own terms. The normalisation uses the average posting length frozen at the
+    last rebuild, and the lists are rebuilt once the live average has drifted by more than
+    10%. With db_path the postings live in SQLite and every worker catches up on changes
+    made by the others (by sequence number) before it answers a query.
+    """
+
+    K1 = 1.2
+    B = 0.75
+
+    def __init__(self, db_path=None, max_postings=50000):
+        self.db_path = db_path
+        self.max_postings = max_postings
+        self._postings = {}  # id -> Posting
+        self._index = {}     # term -> {posting id: normalised tf}
+        self._total_length = 0
+        self._frozen_avgdl = 1.0
+        self._seq = 0        # last database change applied
+        self._lock = threading.RLock()
+        self._conn = None
+        self._pid = None
+
+    @classmethod
+    def from_env(cls):
+        """CV_MATCH_* environment variables (CV_MATCH_DB shares postings between workers)."""
+        return cls(
+            db_path=os.environ.get("CV_MATCH_DB") or None,
+            max_postings=int(os.environ.get("CV_MATCH_MAX_POSTINGS", "50000")),
+        )
+
+    def __len__(self):
+        self.sync()
+        return len(self._postings)
+
+    # ---------- updates ----------
+    def add(self, postings):
+        """
+        Add or replace postings: dicts with title, description, optional skills list and
+        optional id (generated when missing). Returns the ids in order.
+        Raises ValueError for a posting without text or when the index is full.
+        """
+        prepared = []
+        for data in postings:
+            if not isinstance(data, dict) or not (data.get("description") or data.get("title")):
+                raise ValueError("Each posting needs at least a title or a description")
+            if data.get("skills") is not None and not isinstance(data["skills"], list):
+                raise ValueError("Posting skills must be a list of strings")
+            posting_id = str(data.get("id") or uuid.uuid4().hex)
+            prepared.append((posting_id, data))
+        with self._lock:
+            self.sync()
+            new = {posting_id for posting_id, _ in prepared} - set(self._postings)
+            if len(self._postings) + len(new) > self.max_postings:
+                raise ValueError(f"The index is limited to {self.max_postings} postings")
+            if self.db_path:
+                self._write([(posting_id, json.dumps(data)) for posting_id, data in prepared])
+                self.sync()
+            else:
+                self._apply(prepared)
+        return [posting_id for posting_id, _ in prepared]
+
+    def remove(self, posting_id):
+        """Drop one posting; returns False when it was not indexed."""
+        with self._lock:
+            self.sync()
+            if posting_id not in self._postings:
+                return False
+            if self.db_path:
+                self._write([(posting_id, None)])
+                self.sync()
+            else:
+                self._apply([(posting_id, None)])
+            return True
+
+    def _apply(self, changes):
+        """
+        Replace (id, data) or delete (id, None) postings in memory, then rebuild the posting
+        lists if the average length has drifted too far. Caller holds self._lock.
+        """
+        for posting_id, data in changes:
+            old = self._postings.pop(posting_id, None)
+            if old is not None:
+                self._total_length -= old.length
+                for term in old.counts:
+                    postings = self._index[term]
+                    del postings[posting_id]
+                    if not postings:
+                        del self._index[term]
+            if data is not None:
+                posting = Posting(posting_id, data)
+                self._postings[posting_id] = posting
+                self._total_length += posting.length
+                self._insert(posting)
+        if self._postings:
+            avgdl = self._total_length / len(self._postings)
+            if abs(avgdl / self._frozen_avgdl - 1) > 0.1:
+                self._rebuild(avgdl)
+
+    def _insert(self, posting):
+        norm = self.K1 * (1 - self.B + self.B * posting.length / self._frozen_avgdl)
+        for term, tf in posting.counts.items():
+            self._index.setdefault(term, {})[posting.id] = tf * (self.K1 + 1) / (tf + norm)
+
+    def _rebuild(self, avgdl):
+        self._frozen_avgdl = avgdl
+        self._index = {}
+        for posting in self._postings.values():
+            self._insert(posting)
+
+    # ---------- queries ----------
+    def idf(self, term):
+        df = len(self._index.get(term, ()))
+        n = len(self._postings)
+        return math.log(1 + (n - df + 0.5) / (df + 0.5))
+
+    def match(self, structured_cv, top_k=10, max_keywords=15):
+        """
+        Best postings for a structured CV, highest BM25 score first. Each match reports the
+        posting's keywords the CV covers, the ones it is missing (most distinctive first)
+        and coverage, the covered share of the keywords.
+        """
+        terms = cv_terms(structured_cv)
+        with self._lock:
+            self.sync()
+            scores = {}
+            for term, weight in terms.items():
+                postings = self._index.get(term)
+                if not postings:
+                    continue
+                factor = weight * self.idf(term)
+                for posting_id, tf_norm in postings.items():
+                    scores[posting_id] = scores.get(posting_id, 0.0) + factor * tf_norm
+            best = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:max(0, top_k)]
+
+            matches = []
+            for posting_id, score in best:
+                posting = self._postings[posting_id]
+                matched = [term for term in posting.keywords if term in terms]
+                missing = sorted(
+                    (term for term in posting.keywords if term not in terms),
+                    key=lambda term: (-posting.counts.get(term, 0) * self.idf(term), term),
+                )
+                matches.append(dict(
+                    posting.meta,
+                    id=posting_id,
+                    score=round(score, 4),
+                    coverage=round(len(matched) / len(posting.keywords), 3) if posting.keywords else None,
+                    matched_keywords=sorted(matched),
+                    missing_keywords=missing[:max_keywords],
+                ))
+        return matches
+
+    def stats(self):
+        with self._lock:
+            self.sync()
+            return {"postings": len(self._postings), "terms": len(self._index)}
+
+    # ---------- shared storage ----------
+    def _connection(self):
+        """One connection per process, re-opened after a fork. Caller holds self._lock."""
+        if self._conn is None or self._pid != os.getpid():
+            conn = sqlite3.connect(self.db_path, timeout=5, check_same_thread=False, isolation_level=None)
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS job_postings ("
+                "id TEXT PRIMARY KEY, body TEXT, seq INTEGER NOT NULL, updated_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS job_postings_seq ON job_postings (seq)")
+            self._conn = conn
+            self._pid = os.getpid()
+        return self._conn
+
+    def _write(self, rows):
+        """Upsert (id, body) rows, body None marking a deletion, each under a new sequence number."""
+        conn = self._connection()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            seq = conn.execute("SELECT COALESCE(MAX(seq), 0) FROM job_postings").fetchone()[0]
+            for offset, (posting_id, body) in enumerate(rows, start=1):
+                conn.execute(
+                    "INSERT OR REPLACE INTO job_postings (id, body, seq, updated_at) VALUES (?, ?, ?, ?)",
+                    (posting_id, body, seq + offset, now),
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def sync(self):
+        """Apply postings added or removed through the database since the last sync (no-op without one)."""
+        if not self.db_path:
+            return
+        with self._lock:
+            rows = self._connection().execute(
+                "SELECT id, body, seq FROM job_postings WHERE seq > ? ORDER BY seq", (self._seq,)
+            ).fetchall()
+            if rows:
+                self._apply([(posting_id, json.loads(body) if body is not None else None) for posting_id, body, _ in rows])
+                self._seq = rows[-1][2]
@@ -0,0 +1,249 @@
+# metrics.py - Low-overhead in-process metrics (Prometheus text format) and per-request trace ids
+import bisect
+import contextvars
+import logging
+import re
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+# Seconds; spans a cached answer (ms) up to a slow model call (minutes)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    pairs.extend(f'{name}="{_escape(value)}"' for name, value in extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    TYPE = None
+
+    def __init__(self, name, documentation, labels=(), registry=None):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+        (registry or REGISTRY).register(self)
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, "")) for name in self.label_names)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.TYPE}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.append(f"{self.name}{_format_labels(self.label_names, key)} {_format_number(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    TYPE = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+
+class Gauge(_Metric):
+    """Settable gauge, or a read-on-scrape gauge when a callback is given."""
+    TYPE = "gauge"
+
+    def __init__(self, name, documentation, labels=(), registry=None, callback=None):
+        super().__init__(name, documentation, labels, registry)
+        self.callback = callback
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+    def render(self):
+        if self.callback is not None:
+            try:
+                self.set(self.callback())
+            except Exception:
+                pass  # a broken callback must never break the scrape
+        return super().render()
+
+
+class Histogram(_Metric):
+    TYPE = "histogram"
+
+    def __init__(self, name, documentation, labels=(), registry=None, buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labels, registry)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # per-bucket (non-cumulative) counts, sum, count
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def count(self, **labels):
+        state = self._values.get(self._key(labels))
+        return state[2] if state else 0
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.TYPE}"]
+        with self._lock:
+            items = sorted((key, ([*state[0]], state[1], state[2])) for key, state in self._values.items())
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.label_names, key, [("le", _format_number(bound))])
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.label_names, key)
+            lines.append(f"{self.name}_sum{labels} {_format_number(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format (version 0.0.4)."""
+        with self._lock:
+            metrics = list(self._metrics)
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# ---------- pipeline metrics ----------
+STAGE_SECONDS = Histogram(
+    "cv_stage_duration_seconds",
+    "Time spent in each pipeline stage (clean, llm, parse, render.<section>, save, ...).",
+    labels=("stage",),
+)
+REQUEST_SECONDS = Histogram(
+    "cv_http_request_duration_seconds",
+    "HTTP request latency by route, method and status code.",
+    labels=("endpoint", "method", "status"),
+)
+REQUESTS_IN_FLIGHT = Gauge("cv_http_requests_in_flight", "HTTP requests currently being handled.")
+LLM_TOKENS = Counter("cv_llm_tokens_total", "Tokens reported by the OpenAI usage block.", labels=("kind",))
+LLM_CACHE_LOOKUPS = Counter("cv_llm_cache_lookups_total", "Result cache lookups by outcome.", labels=("result",))
+CV_REPAIRS = Counter("cv_repairs_total", "Local fixes applied to model answers, by kind.", labels=("fix",))
+LLM_REASKS = Counter("cv_llm_reasks_total", "Follow-up calls asking the model for missing fields only.")
+CV_SECTIONS = Counter("cv_sections_total", "Sections of edited CVs regenerated by the model or reused.",
+                      labels=("result",))
+CV_FIELDS_STRUCTURED = Counter("cv_fields_structured_total",
+                               "Free-text fields finished by the local rules or polished by the model.",
+                               labels=("route",))
+PROMPT_TOKENS_SAVED = Counter("cv_prompt_tokens_saved_total",
+                              "Estimated prompt tokens saved by the compact CV serialisation.")
+PROMPT_FIELDS_SHORTENED = Counter("cv_prompt_fields_shortened_total",
+                                  "Free-text fields shortened to keep a CV within the prompt token budget.")
+LLM_CALL_OUTCOMES = Counter("cv_llm_call_outcomes_total",
+                            "Model calls and attempts by outcome: ok, retried, timeout, error, hedged, "
+                            "hedge_won, breaker_open, fallback.", labels=("outcome",))
+LLM_BREAKER_TRIPS = Counter("cv_llm_breaker_trips_total", "Times the model circuit breaker opened.")
+ERRORS = Counter("cv_errors_total", "Exceptions by pipeline stage and exception type.", labels=("stage", "type"))
+ADMISSION_REJECTIONS = Counter("cv_admission_rejections_total",
+                               "Requests refused by overload protection, by reason.", labels=("reason",))
+
+
+@contextmanager
+def stage(name):
+    """Time a block into cv_stage_duration_seconds; exceptions are counted in cv_errors_total and re-raised."""
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception as e:
+        ERRORS.inc(stage=name, type=type(e).__name__)
+        raise
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - start, stage=name)
+
+
+def record_usage(usage):
+    """Add a response.usage block (chat completion or last stream chunk) to the token counters."""
+    if usage is None:
+        return
+    for kind in ("prompt", "completion"):
+        tokens = getattr(usage, f"{kind}_tokens", None)
+        if tokens:
+            LLM_TOKENS.inc(tokens, kind=kind)
+
+
+# ---------- trace ids ----------
+_trace_id = contextvars.ContextVar("cv_trace_id", default="-")
+_VALID_TRACE_ID = re.compile(r"^[A-Za-z0-9._-]{1,64}$")
+
+
+def start_trace(incoming=None):
+    """
+    Set the trace id for the current context (request, job thread) and return it.
+    A well-formed incoming id (e.g. an X-Request-ID header) is kept, anything else gets a fresh one.
+    """
+    trace_id = incoming if incoming and _VALID_TRACE_ID.match(incoming) else uuid.uuid4().hex
+    _trace_id.set(trace_id)
+    return trace_id
+
+
+def get_trace_id():
+    return _trace_id.get()
+
+
+class TraceIdFilter(logging.Filter):
+    """Adds record.trace_id so log formats can include %(trace_id)s."""
+
+    def filter(self, record):
+        record.trace_id = _trace_id.get()
+        return True
+
+
+def install_log_trace_ids(logger=None, fmt="%(levelname)s:%(name)s:[%(trace_id)s] %(message)s"):
+    """Put the current trace id into every line written by the handlers of `logger` (root by default)."""
+    logger = logger or logging.getLogger()
+    for handler in logger.handlers:
+        if not any(isinstance(f, TraceIdFilter) for f in handler.filters):
+            handler.addFilter(TraceIdFilter())
+            handler.setFormatter(logging.Formatter(fmt))
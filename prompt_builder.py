@@ -0,0 +1,158 @@
+# prompt_builder.py - Compact, deterministic serialisation of the cleaned CV for the model, within a token budget
+import json
+import os
+import re
+
+from cv_repair import SCHEMA_KEYS
+
+_SPACES = re.compile(r"[ \t\u00a0]+")
+# Rough BPE model: words in ~4-character pieces, digits in groups of 3, punctuation merging in
+# runs of up to 3 (",\"" is one token), a single space riding along with the following word
+_TOKEN_PIECES = re.compile(r"[^\W\d_]+|\d{1,3}|[^\w\s]+|_+|\s+")
+_SENTENCE_END = re.compile(r"[.!?;](?=\s)")
+ELLIPSIS = " …"
+MIN_SHORTENED_CHARS = 60  # free text is never cut below this
+
+
+def _is_empty(value):
+    if value is None:
+        return True
+    if isinstance(value, str):
+        return not value or value.lower() == "none"
+    if isinstance(value, (list, tuple, dict)):
+        return not value
+    return False
+
+
+def compact(value):
+    """
+    Drop empty strings, lists, objects and "none" at every level, collapse runs of
+    spaces and blank lines. Line breaks are kept: they separate bullets.
+    """
+    if isinstance(value, str):
+        lines = (_SPACES.sub(" ", line).strip() for line in value.splitlines())
+        return "\n".join(line for line in lines if line)
+    if isinstance(value, dict):
+        result = {}
+        for key, item in value.items():
+            item = compact(item)
+            if not _is_empty(item):
+                result[key] = item
+        return result
+    if isinstance(value, (list, tuple)):
+        result = []
+        for item in value:
+            item = compact(item)
+            if not _is_empty(item):
+                result.append(item)
+        return result
+    return value
+
+
+def estimate_tokens(text):
+    """Approximate BPE token count, computed locally (no network, no tokenizer files)."""
+    count = 0
+    for piece in _TOKEN_PIECES.findall(text):
+        first = piece[0]
+        if first.isalpha():
+            count += (len(piece) + 3) // 4
+        elif first.isdigit():
+            count += 1
+        elif first.isspace():
+            count += 0 if piece == " " else (len(piece) + 3) // 4
+        else:
+            count += (len(piece) + 2) // 3
+    return count
+
+
+def _ordered(clean_data):
+    """Schema keys first, in schema order, then anything else in input order: same input, same bytes."""
+    ordered = {key: clean_data[key] for key in SCHEMA_KEYS if key in clean_data}
+    ordered.update((key, value) for key, value in clean_data.items() if key not in ordered)
+    return ordered
+
+
+def _dumps(data):
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+
+
+def _free_text(data, path=()):
+    """(path, text) for every string in the structure."""
+    if isinstance(data, str):
+        yield path, data
+    elif isinstance(data, dict):
+        for key, value in data.items():
+            yield from _free_text(value, path + (key,))
+    elif isinstance(data, list):
+        for index, value in enumerate(data):
+            yield from _free_text(value, path + (index,))
+
+
+def _set_path(data, path, value):
+    for step in path[:-1]:
+        data = data[step]
+    data[path[-1]] = value
+
+
+def shorten(text, max_chars):
+    """Keep the leading sentences that fit in max_chars (else cut at a word boundary) and mark the cut."""
+    if len(text) <= max_chars:
+        return text
+    limit = max(max_chars - len(ELLIPSIS), 1)
+    head = text[:limit]
+    sentence_ends = [match.end() for match in _SENTENCE_END.finditer(head)]
+    if sentence_ends and sentence_ends[-1] >= limit // 2:
+        head = head[:sentence_ends[-1]]
+    elif " " in head[limit // 2:]:
+        head = head[:head.rindex(" ")]
+    return head.rstrip() + ELLIPSIS
+
+
+class SerializedCV:
+    """The user-message payload and what it cost."""
+
+    def __init__(self, text, tokens, original_tokens, shortened):
+        self.text = text
+        self.tokens = tokens
+        self.original_tokens = original_tokens  # estimate for the old repr() form
+        self.shortened = shortened              # paths of free-text fields cut to fit the budget
+
+    @property
+    def tokens_saved(self):
+        return self.original_tokens - self.tokens
+
+
+def token_budget():
+    """CV_PROMPT_TOKEN_BUDGET: max estimated tokens for the CV data (default 6000, 0 = no limit)."""
+    return int(os.environ.get("CV_PROMPT_TOKEN_BUDGET", "6000"))
+
+
+def serialize_cv(clean_data, budget=None):
+    """
+    Minimal JSON of the cleaned CV (no empty values, no whitespace noise, stable key order).
+    Over the budget, the longest free-text fields are shortened step by step - always the
+    same fields in the same way for the same input - until it fits or nothing long is left.
+    """
+    budget = token_budget() if budget is None else budget
+    data = compact(_ordered(clean_data))
+    text = _dumps(data)
+    tokens = estimate_tokens(text)
+
+    shortened = []
+    if budget and tokens > budget:
+        texts = {path: value for path, value in _free_text(data)}
+        while tokens > budget:
+            # longest first; the path breaks ties so the choice never depends on dict internals
+            path, value = max(texts.items(), key=lambda item: (len(item[1]), str(item[0])))
+            if len(value) <= MIN_SHORTENED_CHARS:
+                break
+            new_value = shorten(value, max(MIN_SHORTENED_CHARS, len(value) * 3 // 4))
+            tokens -= estimate_tokens(_dumps(value)) - estimate_tokens(_dumps(new_value))
+            texts[path] = new_value
+            _set_path(data, path, new_value)
+            if path not in shortened:
+                shortened.append(path)
+        text = _dumps(data)
+        tokens = estimate_tokens(text)
+
+    return SerializedCV(text, tokens, estimate_tokens(str(clean_data)), shortened)
@@ -0,0 +1,401 @@
+# renderers.py - One structured CV, many formats: DOCX, plain text, HTML and PDF, with a per-CV render cache
+import hashlib
+import html
+import io
+import os
+import threading
+import zlib
+from collections import OrderedDict
+
+from cv_generator import (
+    CVGenerator, STYLE_BODY, STYLE_BULLET, STYLE_CONTACT, STYLE_DETAIL, STYLE_JOB_HEADER, STYLE_JOB_TITLE,
+    STYLE_NAME, STYLE_RULE, STYLE_SECTION_TITLE, STYLE_STRONG,
+)
+from llm_cache import canonical_json
+
+
+# ---------- layout collected from the CVGenerator section builders ----------
+class LayoutParagraph:
+    def __init__(self, style):
+        self.style = style
+        self.runs = []  # (text, character style or None)
+
+    def add_run(self, text=None, style=None):
+        self.runs.append((str(text or ""), style))
+        return self
+
+    @property
+    def text(self):
+        return "".join(text for text, _ in self.runs)
+
+
+class LayoutDocument:
+    """
+    Records what the CVGenerator section builders write (styled paragraphs and runs),
+    so every format gets exactly the content and order of the DOCX.
+    Subclasses turn the paragraphs into bytes in to_bytes().
+    """
+
+    def __init__(self):
+        self.paragraphs = []
+
+    def add_paragraph(self, text="", style=None):
+        paragraph = LayoutParagraph(style)
+        if text:
+            paragraph.add_run(text)
+        self.paragraphs.append(paragraph)
+        return paragraph
+
+    def to_bytes(self) -> bytes:
+        raise NotImplementedError
+
+    def save(self, target):
+        """Write to a path or a binary stream, like python-docx's Document.save."""
+        data = self.to_bytes()
+        if isinstance(target, (str, os.PathLike)):
+            with open(target, "wb") as f:
+                f.write(data)
+        else:
+            target.write(data)
+
+
+# ---------- plain text ----------
+class TextDocument(LayoutDocument):
+    WIDTH = 80
+
+    def to_bytes(self):
+        lines = []
+        for paragraph in self.paragraphs:
+            text = paragraph.text
+            if paragraph.style in (STYLE_NAME, STYLE_JOB_TITLE, STYLE_CONTACT):
+                lines.extend(line.center(self.WIDTH).rstrip() for line in text.split("\n"))
+            elif paragraph.style == STYLE_SECTION_TITLE:
+                lines.extend(["", text.upper()])
+            elif paragraph.style == STYLE_RULE:
+                lines.append("-" * self.WIDTH)
+            elif paragraph.style == STYLE_BULLET:
+                lines.append("- " + text.replace("\n", "\n  "))
+            else:
+                lines.append(text)
+        return ("\n".join(lines).strip("\n") + "\n").encode("utf-8")
+
+
+# ---------- HTML ----------
+_HTML_TAGS = {
+    STYLE_NAME: ("h1", None),
+    STYLE_JOB_TITLE: ("p", "title"),
+    STYLE_CONTACT: ("p", "contact"),
+    STYLE_SECTION_TITLE: ("h2", None),
+    STYLE_JOB_HEADER: ("p", "entry"),
+    STYLE_DETAIL: ("p", "detail"),
+}
+_HTML_CSS = (
+    "body{font-family:Calibri,Arial,sans-serif;max-width:48em;margin:2em auto;padding:0 1em;color:#000;"
+    "font-size:11pt;line-height:1.35}h1{font-size:26pt;text-align:center;margin:0}"
+    ".title{font-size:14pt;font-weight:bold;text-align:center;margin:.2em 0}.contact{text-align:center;"
+    "margin:.2em 0 1em}h2{font-size:13pt;text-transform:uppercase;margin:1em 0 0;border-bottom:1px solid #000}"
+    ".entry{font-weight:bold;margin:.6em 0 0}.detail{margin:0}p{margin:.3em 0}ul{margin:.3em 0;padding-left:1.4em}"
+)
+
+
+class HtmlDocument(LayoutDocument):
+    def _runs_html(self, paragraph):
+        out = []
+        for text, style in paragraph.runs:
+            escaped = html.escape(text).replace("\n", "<br>")
+            out.append(f"<strong>{escaped}</strong>" if style == STYLE_STRONG else escaped)
+        return "".join(out)
+
+    def to_bytes(self):
+        title = next((p.text for p in self.paragraphs if p.style == STYLE_NAME), "") or "CV"
+        body = []
+        in_list = False
+        for paragraph in self.paragraphs:
+            if paragraph.style == STYLE_BULLET:
+                if not in_list:
+                    body.append("<ul>")
+                    in_list = True
+                body.append(f"<li>{self._runs_html(paragraph)}</li>")
+                continue
+            if in_list:
+                body.append("</ul>")
+                in_list = False
+            if paragraph.style == STYLE_RULE:
+                continue  # the h2 border is the rule
+            tag, css_class = _HTML_TAGS.get(paragraph.style, ("p", None))
+            attributes = f' class="{css_class}"' if css_class else ""
+            body.append(f"<{tag}{attributes}>{self._runs_html(paragraph)}</{tag}>")
+        if in_list:
+            body.append("</ul>")
+        document = (
+            '<!DOCTYPE html>\n<html lang="en">\n<head>\n<meta charset="utf-8">\n'
+            f"<title>{html.escape(title.title())}</title>\n<style>{_HTML_CSS}</style>\n</head>\n<body>\n"
+            + "\n".join(body) + "\n</body>\n</html>\n"
+        )
+        return document.encode("utf-8")
+
+
+# ---------- PDF (standard Helvetica fonts, no external tools) ----------
+# Advance widths (1/1000 em) of the printable ASCII characters 32..126 in the standard AFM metrics
+_HELVETICA = (
+    278, 278, 355, 556, 556, 889, 667, 191, 333, 333, 389, 584, 278, 333, 278, 278, 556, 556, 556, 556,
+    556, 556, 556, 556, 556, 556, 278, 278, 584, 584, 584, 556, 1015, 667, 667, 722, 722, 667, 611, 778,
+    722, 278, 500, 667, 556, 833, 722, 778, 667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 278,
+    278, 278, 469, 556, 333, 556, 556, 500, 556, 556, 278, 556, 556, 222, 222, 500, 222, 833, 556, 556,
+    556, 556, 333, 500, 278, 556, 500, 722, 500, 500, 500, 334, 260, 334, 584,
+)
+_HELVETICA_BOLD = (
+    278, 333, 474, 556, 556, 889, 722, 238, 333, 333, 389, 584, 278, 333, 278, 278, 556, 556, 556, 556,
+    556, 556, 556, 556, 556, 556, 333, 333, 584, 584, 584, 611, 975, 722, 722, 722, 722, 667, 611, 778,
+    722, 278, 556, 722, 611, 833, 722, 778, 667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 333,
+    278, 333, 584, 556, 333, 556, 611, 556, 611, 556, 333, 611, 611, 278, 278, 556, 278, 889, 611, 611,
+    611, 611, 389, 556, 333, 611, 556, 778, 556, 556, 500, 389, 280, 389, 584,
+)
+_FONTS = {False: ("F1", _HELVETICA), True: ("F2", _HELVETICA_BOLD)}
+
+# Same page and paragraph styles as the DOCX (8.5 x 14 in, 0.5/0.7 in margins), in points:
+# style -> (font size, bold, centred, space before, space after)
+_PDF_STYLES = {
+    STYLE_NAME: (36, True, True, 0, 4),
+    STYLE_JOB_TITLE: (14, True, True, 0, 2),
+    STYLE_CONTACT: (12, False, True, 0, 6),
+    STYLE_SECTION_TITLE: (13, True, False, 10, 0),
+    STYLE_RULE: (7, False, False, 0, 6),
+    STYLE_JOB_HEADER: (12, True, False, 4, 0),
+    STYLE_DETAIL: (12, False, False, 0, 2),
+    STYLE_BODY: (11, False, False, 0, 3),
+    STYLE_BULLET: (11, False, False, 0, 1),
+}
+_PAGE_WIDTH, _PAGE_HEIGHT = 612, 1008
+_MARGIN_X, _MARGIN_Y = 50.4, 36
+_BULLET_INDENT = 14
+
+
+def _pdf_bytes(text):
+    """WinAnsi bytes (what the standard fonts can show); anything else becomes '?'."""
+    return text.encode("cp1252", errors="replace")
+
+
+def _pdf_string(data):
+    return b"(" + data.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)") + b")"
+
+
+def _text_width(data, bold, size):
+    widths = _FONTS[bold][1]
+    return sum(widths[c - 32] if 32 <= c <= 126 else 556 for c in data) * size / 1000
+
+
+def _split_long_word(word, bold, size, max_width):
+    """Pieces of a word wider than the line (long URLs), cut between characters."""
+    if _text_width(word, bold, size) <= max_width:
+        return [word]
+    pieces, start = [], 0
+    for end in range(1, len(word) + 1):
+        if end - start > 1 and _text_width(word[start:end], bold, size) > max_width:
+            pieces.append(word[start:end - 1])
+            start = end - 1
+    pieces.append(word[start:])
+    return pieces
+
+
+class PdfDocument(LayoutDocument):
+    def _lines(self, paragraph, size, bold, max_width):
+        """Word-wrap the runs; each line is a list of (bytes, bold) segments."""
+        words = []  # (bytes, bold, starts a new line)
+        for text, style in paragraph.runs:
+            run_bold = bold or style == STYLE_STRONG
+            for line_index, line in enumerate(text.split("\n")):
+                for word_index, word in enumerate(line.split(" ")):
+                    # a word glued to the previous run (no space between) stays glued
+                    glued = word_index == 0 and line_index == 0 and bool(words) and not text.startswith(" ")
+                    hard_break = line_index > 0 and word_index == 0
+                    for piece in _split_long_word(_pdf_bytes(word), run_bold, size, max_width):
+                        words.append((piece, run_bold, hard_break, glued))
+                        hard_break, glued = False, False
+
+        lines, current, width = [], [], 0.0
+        for word, word_bold, hard_break, glued in words:
+            space = 0.0 if (not current or glued) else _text_width(b" ", word_bold, size)
+            word_width = _text_width(word, word_bold, size)
+            if current and (hard_break or width + space + word_width > max_width):
+                lines.append((current, width))
+                current, width, space = [], 0.0, 0.0
+            piece = word if (not current or glued) else b" " + word
+            if current and current[-1][1] == word_bold:
+                current[-1] = (current[-1][0] + piece, word_bold)
+            else:
+                current.append((piece, word_bold))
+            width += space + word_width
+        if current:
+            lines.append((current, width))
+        return lines
+
+    def to_bytes(self):
+        pages, ops = [], []
+        y = _PAGE_HEIGHT - _MARGIN_Y
+        content_width = _PAGE_WIDTH - 2 * _MARGIN_X
+
+        def new_page():
+            nonlocal ops, y
+            pages.append(ops)
+            ops = []
+            y = _PAGE_HEIGHT - _MARGIN_Y
+
+        for paragraph in self.paragraphs:
+            size, bold, centred, before, after = _PDF_STYLES.get(paragraph.style, (11, False, False, 0, 3))
+            y -= before
+            if paragraph.style == STYLE_RULE:
+                # a line of underscores in the DOCX: a drawn line at the foot of a 7pt paragraph here
+                if y - size * 1.2 < _MARGIN_Y:
+                    new_page()
+                y -= size * 1.2
+                ops.append(b"0.75 w %.2f %.2f m %.2f %.2f l S" % (_MARGIN_X, y + 2, _PAGE_WIDTH - _MARGIN_X, y + 2))
+                y -= after
+                continue
+
+            indent = _BULLET_INDENT if paragraph.style == STYLE_BULLET else 0
+            leading = size * 1.2
+            for line_index, (segments, width) in enumerate(self._lines(paragraph, size, bold, content_width - indent)):
+                if y - leading < _MARGIN_Y:
+                    new_page()
+                y -= leading
+                x = _MARGIN_X + indent
+                if centred:
+                    x = _MARGIN_X + max((content_width - width) / 2, 0)
+                if indent and line_index == 0:
+                    ops.append(b"BT /F1 %d Tf %.2f %.2f Td %s Tj ET" % (size, _MARGIN_X + 3, y, _pdf_string(b"\x95")))
+                ops.append(b"BT %.2f %.2f Td" % (x, y))
+                for data, segment_bold in segments:
+                    ops.append(b"/%s %d Tf %s Tj" % (_FONTS[segment_bold][0].encode(), size, _pdf_string(data)))
+                ops.append(b"ET")
+            y -= after
+        pages.append(ops)
+        return self._assemble(pages)
+
+    @staticmethod
+    def _assemble(pages):
+        objects = []  # body of object n is objects[n - 1]
+
+        def add(body):
+            objects.append(body)
+            return len(objects)
+
+        catalog = add(None)
+        page_tree = add(None)
+        fonts = [
+            add(b"<< /Type /Font /Subtype /Type1 /BaseFont /%s /Encoding /WinAnsiEncoding >>" % name)
+            for name in (b"Helvetica", b"Helvetica-Bold")
+        ]
+        resources = b"<< /Font << /F1 %d 0 R /F2 %d 0 R >> >>" % tuple(fonts)
+        page_ids = []
+        for ops in pages:
+            stream = zlib.compress(b"\n".join(ops))
+            content = add(b"<< /Length %d /Filter /FlateDecode >>\nstream\n%s\nendstream" % (len(stream), stream))
+            page_ids.append(add(
+                b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 %d %d] /Resources %s /Contents %d 0 R >>"
+                % (page_tree, _PAGE_WIDTH, _PAGE_HEIGHT, resources, content)
+            ))
+        objects[catalog - 1] = b"<< /Type /Catalog /Pages %d 0 R >>" % page_tree
+        objects[page_tree - 1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+            b" ".join(b"%d 0 R" % page for page in page_ids), len(page_ids))
+
+        out = io.BytesIO()
+        out.write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+        offsets = []
+        for number, body in enumerate(objects, start=1):
+            offsets.append(out.tell())
+            out.write(b"%d 0 obj\n%s\nendobj\n" % (number, body))
+        xref = out.tell()
+        out.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+        for offset in offsets:
+            out.write(b"%010d 00000 n \n" % offset)
+        out.write(b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, catalog, xref))
+        return out.getvalue()
+
+
+# ---------- renderer classes (the CVGenerator interface: render(), generate_cv_bytes(), progressive API) ----------
+class TextCVRenderer(CVGenerator):
+    FORMAT = "txt"
+    EXTENSION = ".txt"
+    MIMETYPE = "text/plain; charset=utf-8"
+
+    def _new_document(self):
+        return TextDocument()
+
+
+class HtmlCVRenderer(CVGenerator):
+    FORMAT = "html"
+    EXTENSION = ".html"
+    MIMETYPE = "text/html; charset=utf-8"
+
+    def _new_document(self):
+        return HtmlDocument()
+
+
+class PdfCVRenderer(CVGenerator):
+    FORMAT = "pdf"
+    EXTENSION = ".pdf"
+    MIMETYPE = "application/pdf"
+
+    def _new_document(self):
+        return PdfDocument()
+
+
+FORMATS = ("docx", "pdf", "txt", "html")
+
+
+def get_renderer_class(fmt="docx"):
+    """Renderer for an output format; DOCX honours CV_RENDERER (python-docx or the fast path)."""
+    fmt = (fmt or "docx").lower()
+    if fmt == "docx":
+        from fast_docx import get_generator_class
+
+        return get_generator_class()
+    renderers = {"txt": TextCVRenderer, "html": HtmlCVRenderer, "pdf": PdfCVRenderer}
+    if fmt not in renderers:
+        raise ValueError(f"Unsupported format {fmt!r}; use one of: {', '.join(FORMATS)}")
+    return renderers[fmt]
+
+
+# ---------- render cache ----------
+class RenderCache:
+    """Small LRU of rendered files keyed by (structured CV hash, format): a second format costs one local render."""
+
+    def __init__(self, max_entries=64):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(structured_cv, fmt):
+        return hashlib.sha256(canonical_json(structured_cv).encode("utf-8")).hexdigest() + ":" + fmt
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+RENDER_CACHE = RenderCache(int(os.environ.get("CV_RENDER_CACHE_ENTRIES", "64")))
+
+
+def render_cv(structured_cv, fmt="docx"):
+    """(file bytes, extension, mimetype) of a structured CV in the given format, cached per CV and format."""
+    renderer_class = get_renderer_class(fmt)
+    key = RenderCache.key(structured_cv, renderer_class.FORMAT)
+    data = RENDER_CACHE.get(key)
+    if data is None:
+        data = renderer_class().render(structured_cv)
+        RENDER_CACHE.set(key, data)
+    return data, renderer_class.EXTENSION, renderer_class.MIMETYPE
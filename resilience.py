@@ -0,0 +1,444 @@
+# resilience.py - Deadlines, retries with jitter, hedged requests and a circuit breaker for model calls
+import asyncio
+import contextvars
+import functools
+import logging
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import metrics
+from admission import OverloadedError
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpenError(OverloadedError):
+    """The breaker is open: fail fast (503 with Retry-After) instead of waiting on a failing upstream."""
+
+    def __init__(self, retry_after):
+        super().__init__("The AI service is failing, please retry shortly", retry_after)
+
+
+class DeadlineExceededError(TimeoutError):
+    """The overall deadline of a model call ran out before any attempt succeeded."""
+
+
+# Exception classes (by name, so neither openai nor httpx is imported here) that mean the
+# request never got a proper answer: worth retrying, and a sign of upstream trouble
+_TRANSIENT_ERRORS = ("APIConnectionError", "APITimeoutError", "TransportError", "TimeoutException")
+
+
+def is_retryable(error):
+    """Timeouts, connection errors, 408/409/429 and 5xx answers; anything else (bad request, auth) is final."""
+    status = getattr(error, "status_code", None)
+    if isinstance(status, int):
+        return status in (408, 409, 429) or status >= 500
+    if isinstance(error, (TimeoutError, asyncio.TimeoutError, ConnectionError)):
+        return True
+    return any(cls.__name__ in _TRANSIENT_ERRORS for cls in type(error).__mro__)
+
+
+def is_upstream_failure(error):
+    """The model could not be reached in time: the breaker is open, the deadline passed or retries ran out."""
+    return isinstance(error, (CircuitOpenError, DeadlineExceededError)) or is_retryable(error)
+
+
+def _is_timeout(error):
+    return isinstance(error, (TimeoutError, asyncio.TimeoutError)) or any(cls.__name__ in ("APITimeoutError", "TimeoutException")
+                                                  for cls in type(error).__mro__)
+
+
+def _retry_after(error):
+    """Seconds from a Retry-After header on an API error (429/503), or None."""
+    response = getattr(error, "response", None)
+    try:
+        return float(response.headers.get("retry-after"))
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
+class CircuitBreaker:
+    """
+    Closed: calls go through and their outcomes are kept for `window` seconds. Once at least
+    min_calls are in the window and the share of failures reaches failure_rate, the breaker
+    opens and every call fails at once for `cooldown` seconds. After that one probe call is
+    let through (half-open): its success closes the breaker, its failure opens it again.
+    Only transient failures count (see is_retryable): a rejected request means the API is up.
+    """
+
+    def __init__(self, failure_rate=0.5, min_calls=10, window=30.0, cooldown=15.0):
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.window = window
+        self.cooldown = cooldown
+        self.state = "closed"
+        self._outcomes = deque()  # (monotonic time, failed)
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        """CV_BREAKER_* environment variables; CV_BREAKER_MIN_CALLS=0 disables the breaker."""
+        min_calls = int(os.environ.get("CV_BREAKER_MIN_CALLS", "10"))
+        if min_calls <= 0:
+            return None
+        return cls(
+            failure_rate=float(os.environ.get("CV_BREAKER_FAILURE_RATE", "0.5")),
+            min_calls=min_calls,
+            window=float(os.environ.get("CV_BREAKER_WINDOW", "30")),
+            cooldown=float(os.environ.get("CV_BREAKER_COOLDOWN", "15")),
+        )
+
+    def retry_after(self):
+        return max(1.0, self._opened_at + self.cooldown - time.monotonic())
+
+    def before_call(self):
+        """
+        Raise CircuitOpenError unless a call may go upstream now. Returns True when the call
+        is the half-open probe: the caller must then call release_probe() once it is over.
+        """
+        with self._lock:
+            if self.state == "closed":
+                return False
+            if self.state == "open" and time.monotonic() - self._opened_at >= self.cooldown:
+                self.state = "half_open"
+                self._probing = False
+            if self.state == "half_open" and not self._probing:
+                self._probing = True
+                return True
+        metrics.LLM_CALL_OUTCOMES.inc(outcome="breaker_open")
+        raise CircuitOpenError(self.retry_after())
+
+    def release_probe(self):
+        """Free the probe slot of a probe that ended without an outcome (deadline, cancellation)."""
+        with self._lock:
+            if self.state == "half_open":
+                self._probing = False
+
+    def record(self, failed):
+        now = time.monotonic()
+        with self._lock:
+            if self.state == "half_open":
+                self._probing = False
+                if failed:
+                    self._open(now)
+                else:
+                    self.state = "closed"
+                    logger.info("Circuit breaker closed, the model answers again")
+                return
+            if self.state == "open":
+                return  # a late answer to a call started before the breaker opened
+            self._outcomes.append((now, failed))
+            self._failures += failed
+            while now - self._outcomes[0][0] > self.window:
+                self._failures -= self._outcomes.popleft()[1]
+            if len(self._outcomes) >= self.min_calls and self._failures >= self.failure_rate * len(self._outcomes):
+                self._open(now)
+
+    def _open(self, now):
+        logger.warning("Circuit breaker open: model calls fail fast for %.0f s", self.cooldown)
+        metrics.LLM_BREAKER_TRIPS.inc()
+        self.state = "open"
+        self._opened_at = now
+        self._outcomes.clear()
+        self._failures = 0
+
+
+class LatencyTracker:
+    """Latencies of the last `size` successful attempts of one kind of call."""
+
+    def __init__(self, size=200, min_samples=20):
+        self.min_samples = min_samples
+        self._samples = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def add(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, p):
+        """The p-th percentile in seconds, or None until min_samples latencies are in."""
+        with self._lock:
+            samples = sorted(self._samples)
+        if len(samples) < self.min_samples:
+            return None
+        return samples[min(len(samples) - 1, int(len(samples) * p / 100))]
+
+
+class _HedgePool:
+    """
+    Threads for hedged calls that never queue work: submit() only hands a task over while a
+    thread is free and returns None otherwise, so a call is never held up behind hedges.
+    Created on first use and again after a fork (threads do not survive one).
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self._executor = None
+        self._free = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def submit(self, fn):
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ThreadPoolExecutor(max_workers=self.size, thread_name_prefix="cv-llm")
+                self._free = threading.BoundedSemaphore(self.size)
+                self._pid = os.getpid()
+            executor, free = self._executor, self._free
+        if not free.acquire(blocking=False):
+            return None
+        future = executor.submit(contextvars.copy_context().run, fn)
+        future.add_done_callback(lambda _future: free.release())
+        return future
+
+
+class ModelCaller:
+    """
+    Makes one model call within a policy:
+    - deadline: seconds for the whole call, retries and hedges included; each attempt gets
+      at most attempt_timeout of what is left, passed to the client as the request timeout
+    - retries: up to max_retries more attempts after transient errors, with full-jitter
+      exponential back-off (a random wait up to base_delay * 2^n, capped at max_delay, or
+      the server's Retry-After), never past the deadline
+    - hedging: when an attempt is still running after the hedge_percentile latency of recent
+      calls of the same kind (at least hedge_min_delay), one duplicate is sent and the first
+      answer wins. A blocking client call cannot be interrupted, so with call() the loser is
+      abandoned (its answer discarded, it ends at its own timeout); with acall() it is cancelled.
+      At most max_hedges run at once. call() runs both attempts on a pool of pool_size
+      threads; when no thread is free the call runs on the caller's thread, unhedged, and a
+      hedge is skipped, so a saturated pool never delays a call.
+    - breaker: an optional CircuitBreaker consulted before, and told about, every attempt
+    """
+
+    def __init__(self, deadline=90.0, attempt_timeout=60.0, max_retries=2, base_delay=0.5, max_delay=8.0,
+                 hedge_percentile=95, hedge_min_delay=1.0, max_hedges=4, breaker=None, pool_size=64):
+        self.deadline = deadline
+        self.attempt_timeout = attempt_timeout
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_delay = hedge_min_delay
+        self.max_hedges = max_hedges
+        self.breaker = breaker
+        self.hedges_in_flight = 0
+        self._pool = _HedgePool(pool_size)
+        self._latencies = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, breaker=None):
+        """
+        CV_LLM_* environment variables; CV_LLM_HEDGE_PERCENTILE=0 turns hedging off. The hedge
+        pool has a thread for every model call the worker allows at once, plus the hedges.
+        """
+        max_hedges = int(os.environ.get("CV_LLM_MAX_HEDGES", "4"))
+        max_in_flight = int(os.environ.get("CV_LLM_MAX_IN_FLIGHT", "8")) or 64
+        return cls(
+            deadline=float(os.environ.get("CV_LLM_DEADLINE", "90")),
+            attempt_timeout=float(os.environ.get("CV_LLM_ATTEMPT_TIMEOUT", "60")),
+            max_retries=int(os.environ.get("CV_LLM_RETRIES", "2")),
+            base_delay=float(os.environ.get("CV_LLM_RETRY_BASE_DELAY", "0.5")),
+            max_delay=float(os.environ.get("CV_LLM_RETRY_MAX_DELAY", "8")),
+            hedge_percentile=float(os.environ.get("CV_LLM_HEDGE_PERCENTILE", "95")),
+            hedge_min_delay=float(os.environ.get("CV_LLM_HEDGE_MIN_DELAY", "1")),
+            max_hedges=max_hedges,
+            breaker=breaker,
+            pool_size=max_in_flight + max_hedges,
+        )
+
+    def _tracker(self, kind):
+        with self._lock:
+            return self._latencies.setdefault(kind, LatencyTracker())
+
+    def hedge_delay(self, kind):
+        """Seconds after which an attempt of this kind gets a duplicate, or None (no hedging yet)."""
+        if self.hedge_percentile <= 0 or self.max_hedges <= 0:
+            return None
+        if self.breaker is not None and self.breaker.state != "closed":
+            return None
+        latency = self._tracker(kind).percentile(self.hedge_percentile)
+        return None if latency is None else max(self.hedge_min_delay, latency)
+
+    def call(self, create, kind="llm", **kwargs):
+        """
+        create(timeout=..., **kwargs) under the policy; returns the first successful response.
+        `kind` groups calls of similar size for the hedge delay (full CV, sections, re-ask...).
+        Streaming calls are retried until the stream opens but never hedged.
+        """
+        deadline = time.monotonic() + self.deadline
+        attempt = 0
+        while True:
+            if deadline - time.monotonic() <= 0:
+                metrics.LLM_CALL_OUTCOMES.inc(outcome="timeout")
+                raise DeadlineExceededError("Model call deadline exceeded")
+            probe = self.breaker.before_call() if self.breaker is not None else False
+            try:
+                response = self._attempt(create, kwargs, kind, deadline)
+            except Exception as e:
+                remaining = deadline - time.monotonic()
+                delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+                delay = max(delay, min(_retry_after(e) or 0, self.max_delay))
+                if not is_retryable(e) or attempt >= self.max_retries or delay >= remaining:
+                    metrics.LLM_CALL_OUTCOMES.inc(outcome="timeout" if _is_timeout(e) else "error")
+                    raise
+                metrics.LLM_CALL_OUTCOMES.inc(outcome="retried")
+                logger.info("Model call failed (%s), retry %d in %.1f s", type(e).__name__, attempt + 1, delay)
+                time.sleep(delay)
+                attempt += 1
+                continue
+            finally:
+                if probe:
+                    self.breaker.release_probe()
+            metrics.LLM_CALL_OUTCOMES.inc(outcome="ok")
+            return response
+
+    def _single(self, create, kwargs, kind, deadline):
+        """One upstream request; its outcome goes to the breaker and its latency to the tracker."""
+        timeout = min(self.attempt_timeout, deadline - time.monotonic())
+        if timeout <= 0:
+            raise DeadlineExceededError("Model call deadline exceeded")
+        started = time.monotonic()
+        try:
+            response = create(timeout=timeout, **kwargs)
+        except Exception as e:
+            if self.breaker is not None:
+                self.breaker.record(failed=is_retryable(e))
+            raise
+        if self.breaker is not None:
+            self.breaker.record(failed=False)
+        self._tracker(kind).add(time.monotonic() - started)
+        return response
+
+    def _attempt(self, create, kwargs, kind, deadline):
+        delay = None if kwargs.get("stream") else self.hedge_delay(kind)
+        if delay is None:
+            return self._single(create, kwargs, kind, deadline)
+
+        run = functools.partial(self._single, create, kwargs, kind, deadline)
+        primary = self._pool.submit(run)
+        if primary is None:
+            return run()
+        done, _ = wait([primary], timeout=min(delay, max(0.0, deadline - time.monotonic())))
+        if done or not self._start_hedge():
+            return primary.result()
+
+        hedge = self._pool.submit(run)
+        if hedge is None:
+            self._end_hedge(None)
+            return primary.result()
+        metrics.LLM_CALL_OUTCOMES.inc(outcome="hedged")
+        hedge.add_done_callback(self._end_hedge)
+        pending = {primary, hedge}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is hedge:
+                        metrics.LLM_CALL_OUTCOMES.inc(outcome="hedge_won")
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    async def acall(self, create, kind="llm", **kwargs):
+        """call() for an async client (AsyncOpenAI): the same policy, awaiting instead of blocking."""
+        deadline = time.monotonic() + self.deadline
+        attempt = 0
+        while True:
+            if deadline - time.monotonic() <= 0:
+                metrics.LLM_CALL_OUTCOMES.inc(outcome="timeout")
+                raise DeadlineExceededError("Model call deadline exceeded")
+            probe = self.breaker.before_call() if self.breaker is not None else False
+            try:
+                response = await self._aattempt(create, kwargs, kind, deadline)
+            except Exception as e:
+                remaining = deadline - time.monotonic()
+                delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+                delay = max(delay, min(_retry_after(e) or 0, self.max_delay))
+                if not is_retryable(e) or attempt >= self.max_retries or delay >= remaining:
+                    metrics.LLM_CALL_OUTCOMES.inc(outcome="timeout" if _is_timeout(e) else "error")
+                    raise
+                metrics.LLM_CALL_OUTCOMES.inc(outcome="retried")
+                logger.info("Model call failed (%s), retry %d in %.1f s", type(e).__name__, attempt + 1, delay)
+                await asyncio.sleep(delay)
+                attempt += 1
+                continue
+            finally:
+                if probe:
+                    self.breaker.release_probe()
+            metrics.LLM_CALL_OUTCOMES.inc(outcome="ok")
+            return response
+
+    async def _asingle(self, create, kwargs, kind, deadline):
+        timeout = min(self.attempt_timeout, deadline - time.monotonic())
+        if timeout <= 0:
+            raise DeadlineExceededError("Model call deadline exceeded")
+        started = time.monotonic()
+        try:
+            response = await asyncio.wait_for(create(timeout=timeout, **kwargs), timeout)
+        except Exception as e:  # a cancelled hedge (CancelledError) is not an upstream failure
+            if self.breaker is not None:
+                self.breaker.record(failed=is_retryable(e))
+            raise
+        if self.breaker is not None:
+            self.breaker.record(failed=False)
+        self._tracker(kind).add(time.monotonic() - started)
+        return response
+
+    async def _aattempt(self, create, kwargs, kind, deadline):
+        delay = None if kwargs.get("stream") else self.hedge_delay(kind)
+        if delay is None:
+            return await self._asingle(create, kwargs, kind, deadline)
+
+        primary = asyncio.ensure_future(self._asingle(create, kwargs, kind, deadline))
+        done, _ = await asyncio.wait({primary}, timeout=min(delay, max(0.0, deadline - time.monotonic())))
+        if done or not self._start_hedge():
+            return await primary
+
+        metrics.LLM_CALL_OUTCOMES.inc(outcome="hedged")
+        hedge = asyncio.ensure_future(self._asingle(create, kwargs, kind, deadline))
+        hedge.add_done_callback(self._end_hedge)
+        pending = {primary, hedge}
+        error = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            metrics.LLM_CALL_OUTCOMES.inc(outcome="hedge_won")
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()  # the slower request is dropped, closing its connection
+
+    def _start_hedge(self):
+        with self._lock:
+            if self.hedges_in_flight >= self.max_hedges:
+                return False
+            self.hedges_in_flight += 1
+            return True
+
+    def _end_hedge(self, _future):
+        with self._lock:
+            self.hedges_in_flight -= 1
+
+
+# Process-wide: every CVProcessor in a worker shares the breaker and the latency history
+BREAKER = CircuitBreaker.from_env()
+MODEL_CALLS = ModelCaller.from_env(BREAKER)
+
+metrics.Gauge("cv_llm_breaker_open", "1 while the model circuit breaker is open or probing.",
+              callback=lambda: int(BREAKER is not None and BREAKER.state != "closed"))
+metrics.Gauge("cv_llm_hedges_in_flight", "Duplicate model requests currently running.",
+              callback=lambda: MODEL_CALLS.hedges_in_flight)
@@ -0,0 +1,310 @@
+# results.py - Short-lived encrypted store of finished CVs, so a failed download is retried without reprocessing
+import hashlib
+import json
+import logging
+import os
+import secrets
+import sqlite3
+import threading
+import time
+
+from contextlib import contextmanager
+
+from secure_storage import get_cipher
+
+logger = logging.getLogger(__name__)
+
+
+class ResultStore:
+    """
+    Finished CVs by unguessable token: the structured CV and every file rendered from it.
+    - Only a hash of the token is stored; everything else is encrypted (Fernet) with
+      a configured secret or, for the in-memory store only, a random key that never leaves
+      the process. A file store is shared by workers that may not share memory, so it needs
+      the secret; rows that still do not decrypt (the secret changed) are treated as missing.
+    - Entries live for ttl_seconds after they were created; past max_bytes (or max_entries)
+      the least recently used ones are evicted. The byte and entry totals are kept in the
+      database next to the rows, so a write does not have to add up the whole store.
+    - SQLite runs with secure_delete, so expired and evicted rows are overwritten with
+      zeros; a sweeper thread per process removes expired entries every sweep_interval.
+    db_path=":memory:" keeps the store inside the worker; a file lets every worker answer.
+    """
+
+    def __init__(self, db_path=":memory:", secret=None, ttl_seconds=900, max_bytes=64 * 1024 * 1024,
+                 max_entries=1000, sweep_interval=30):
+        if not secret and db_path != ":memory:":
+            raise ValueError("A file result store (CV_RESULTS_DB) needs CV_RESULTS_SECRET: "
+                             "workers that are not forked from one process would not share a random key")
+        self.db_path = db_path
+        self._secret = secret or secrets.token_bytes(32)
+        self._cipher = None
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.sweep_interval = sweep_interval
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+        self._sweeper_pid = None
+
+    @classmethod
+    def from_env(cls):
+        """CV_RESULTS_* environment variables; CV_RESULTS_TTL=0 disables the store."""
+        ttl_seconds = float(os.environ.get("CV_RESULTS_TTL", "900"))
+        if ttl_seconds <= 0:
+            return None
+        return cls(
+            db_path=os.environ.get("CV_RESULTS_DB", ":memory:"),
+            secret=os.environ.get("CV_RESULTS_SECRET"),
+            ttl_seconds=ttl_seconds,
+            max_bytes=int(float(os.environ.get("CV_RESULTS_MAX_MB", "64")) * 1024 * 1024),
+            max_entries=int(os.environ.get("CV_RESULTS_MAX_ENTRIES", "1000")),
+            sweep_interval=float(os.environ.get("CV_RESULTS_SWEEP_INTERVAL", "30")),
+        )
+
+    @property
+    def cipher(self):
+        """Built on first use: the cryptography import stays out of application start-up."""
+        if self._cipher is None:
+            self._cipher = get_cipher(self._secret)
+        return self._cipher
+
+    @staticmethod
+    def _key(token):
+        return hashlib.sha256(f"cv-result\0{token}".encode("utf-8")).hexdigest()
+
+    def _connection(self):
+        """One connection per process, re-opened after a fork. Caller holds self._lock."""
+        if self._conn is None or self._pid != os.getpid():
+            conn = sqlite3.connect(self.db_path, timeout=5, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA secure_delete = ON")
+            with self._transaction(conn):
+                columns = [row[1] for row in conn.execute("PRAGMA table_info(cv_results)")]
+                if columns and "size" not in columns:
+                    # a store written before sizes were kept: its entries expire within minutes anyway
+                    conn.execute("DROP TABLE cv_results")
+                    conn.execute("DROP TABLE IF EXISTS cv_result_files")
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS cv_results ("
+                    "key TEXT PRIMARY KEY, created_at REAL NOT NULL, accessed_at REAL NOT NULL, "
+                    "structured BLOB NOT NULL, size INTEGER NOT NULL)"
+                )
+                conn.execute("CREATE INDEX IF NOT EXISTS cv_results_accessed ON cv_results (accessed_at)")
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS cv_result_files ("
+                    "key TEXT NOT NULL, format TEXT NOT NULL, filename TEXT NOT NULL, mimetype TEXT NOT NULL, "
+                    "data BLOB NOT NULL, PRIMARY KEY (key, format))"
+                )
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS cv_result_totals ("
+                    "id INTEGER PRIMARY KEY CHECK (id = 0), bytes INTEGER NOT NULL, entries INTEGER NOT NULL)"
+                )
+                conn.execute(
+                    "INSERT OR IGNORE INTO cv_result_totals (id, bytes, entries) "
+                    "SELECT 0, COALESCE(SUM(size), 0), COUNT(*) FROM cv_results"
+                )
+            self._conn = conn
+            self._pid = os.getpid()
+        return self._conn
+
+    def _start_sweeper(self):
+        """Threads do not survive a fork, so each worker process starts its own sweeper on first use."""
+        if self._sweeper_pid == os.getpid() or self.sweep_interval <= 0:
+            return
+        self._sweeper_pid = os.getpid()
+        threading.Thread(target=self._sweep_forever, name="cv-results-sweeper", daemon=True).start()
+
+    def _sweep_forever(self):
+        while True:
+            time.sleep(self.sweep_interval)
+            self.sweep()
+
+    @staticmethod
+    @contextmanager
+    def _transaction(conn):
+        """One write transaction, so the totals never disagree with the rows (other workers included)."""
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    @staticmethod
+    def _adjust_totals(conn, size, entries=0):
+        conn.execute("UPDATE cv_result_totals SET bytes = bytes + ?, entries = entries + ? WHERE id = 0",
+                     (size, entries))
+
+    @classmethod
+    def _delete(cls, conn, keys):
+        """Delete entries inside a transaction; returns how many existed."""
+        deleted = 0
+        for key in keys:
+            row = conn.execute("SELECT size FROM cv_results WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                continue
+            conn.execute("DELETE FROM cv_result_files WHERE key = ?", (key,))
+            conn.execute("DELETE FROM cv_results WHERE key = ?", (key,))
+            cls._adjust_totals(conn, -row[0], -1)
+            deleted += 1
+        return deleted
+
+    def sweep(self):
+        """Wipe expired entries; returns how many were removed."""
+        cutoff = time.time() - self.ttl_seconds
+        with self._lock:
+            conn = self._connection()
+            with self._transaction(conn):
+                expired = [row[0] for row in conn.execute("SELECT key FROM cv_results WHERE created_at < ?",
+                                                          (cutoff,))]
+                return self._delete(conn, expired)
+
+    def _enforce_limits(self, conn, newest):
+        """
+        Evict least recently used entries while over the size or count cap. The newest entry
+        is always kept, even when it is bigger than the cap on its own. Caller holds
+        self._lock and a transaction.
+        """
+        total_bytes, entries = conn.execute("SELECT bytes, entries FROM cv_result_totals WHERE id = 0").fetchone()
+        if total_bytes <= self.max_bytes and entries <= self.max_entries:
+            return
+        evicted = []
+        for key, size in conn.execute("SELECT key, size FROM cv_results ORDER BY accessed_at"):
+            if total_bytes <= self.max_bytes and entries <= self.max_entries:
+                break
+            if key == newest:
+                continue
+            evicted.append(key)
+            total_bytes -= size
+            entries -= 1
+        self._delete(conn, evicted)
+
+    def put(self, structured_cv, fmt, data, filename, mimetype):
+        """Store a finished CV and its first rendered file; returns the token that retrieves them."""
+        self._start_sweeper()
+        token = secrets.token_urlsafe(24)
+        key = self._key(token)
+        structured = self.cipher.encrypt(json.dumps(structured_cv, ensure_ascii=False).encode("utf-8"))
+        encrypted = self.cipher.encrypt(data)
+        size = len(structured) + len(encrypted)
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            with self._transaction(conn):
+                conn.execute(
+                    "INSERT INTO cv_results (key, created_at, accessed_at, structured, size) VALUES (?, ?, ?, ?, ?)",
+                    (key, now, now, structured, size),
+                )
+                conn.execute(
+                    "INSERT INTO cv_result_files (key, format, filename, mimetype, data) VALUES (?, ?, ?, ?, ?)",
+                    (key, fmt, filename, mimetype, encrypted),
+                )
+                self._adjust_totals(conn, size, 1)
+                self._enforce_limits(conn, key)
+        return token
+
+    def add_file(self, token, fmt, data, filename, mimetype):
+        """Keep another rendered format of a stored result (no-op when the result is gone)."""
+        key = self._key(token)
+        encrypted = self.cipher.encrypt(data)
+        with self._lock:
+            conn = self._connection()
+            with self._transaction(conn):
+                if conn.execute("SELECT 1 FROM cv_results WHERE key = ?", (key,)).fetchone() is None:
+                    return
+                replaced = conn.execute(
+                    "SELECT LENGTH(data) FROM cv_result_files WHERE key = ? AND format = ?", (key, fmt)
+                ).fetchone()
+                growth = len(encrypted) - (replaced[0] if replaced else 0)
+                conn.execute(
+                    "INSERT OR REPLACE INTO cv_result_files (key, format, filename, mimetype, data) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (key, fmt, filename, mimetype, encrypted),
+                )
+                conn.execute("UPDATE cv_results SET size = size + ? WHERE key = ?", (growth, key))
+                self._adjust_totals(conn, growth)
+                self._enforce_limits(conn, key)
+
+    def _live_key(self, conn, token):
+        """Hashed key of an unexpired result, touching it for LRU; None when unknown or expired."""
+        key = self._key(token)
+        now = time.time()
+        row = conn.execute("SELECT created_at FROM cv_results WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        if now - row[0] >= self.ttl_seconds:
+            with self._transaction(conn):
+                self._delete(conn, [key])
+            return None
+        conn.execute("UPDATE cv_results SET accessed_at = ? WHERE key = ?", (now, key))
+        return key
+
+    def get(self, token):
+        """
+        {"structured": dict, "formats": [...], "filename": name of the first file, "expires_at": epoch seconds}
+        of a stored result, or None.
+        """
+        with self._lock:
+            conn = self._connection()
+            key = self._live_key(conn, token)
+            if key is None:
+                return None
+            structured, created_at = conn.execute(
+                "SELECT structured, created_at FROM cv_results WHERE key = ?", (key,)
+            ).fetchone()
+            files = conn.execute(
+                "SELECT format, filename FROM cv_result_files WHERE key = ? ORDER BY rowid", (key,)
+            ).fetchall()
+        structured = self._decrypt(structured)
+        if structured is None:
+            return None
+        return {
+            "structured": json.loads(structured),
+            "formats": [fmt for fmt, _ in files],
+            "filename": files[0][1] if files else None,
+            "expires_at": created_at + self.ttl_seconds,
+        }
+
+    def get_file(self, token, fmt=None):
+        """(bytes, filename, mimetype) of a stored file (the first one rendered when fmt is None), or None."""
+        with self._lock:
+            conn = self._connection()
+            key = self._live_key(conn, token)
+            if key is None:
+                return None
+            if fmt is None:
+                row = conn.execute(
+                    "SELECT data, filename, mimetype FROM cv_result_files WHERE key = ? ORDER BY rowid LIMIT 1", (key,)
+                ).fetchone()
+            else:
+                row = conn.execute(
+                    "SELECT data, filename, mimetype FROM cv_result_files WHERE key = ? AND format = ?", (key, fmt)
+                ).fetchone()
+        if row is None:
+            return None
+        data, filename, mimetype = row
+        data = self._decrypt(data)
+        return None if data is None else (data, filename, mimetype)
+
+    def _decrypt(self, data):
+        """Plain bytes, or None for a row encrypted with another secret (read as a miss)."""
+        try:
+            return self.cipher.decrypt(bytes(data))
+        except ValueError:
+            logger.warning("A stored result could not be decrypted (CV_RESULTS_SECRET changed?)")
+            return None
+
+    def forget(self, token):
+        """Wipe a result now (the user is done with it)."""
+        with self._lock:
+            conn = self._connection()
+            with self._transaction(conn):
+                self._delete(conn, [self._key(token)])
+
+    def stats(self):
+        with self._lock:
+            size, entries = self._connection().execute(
+                "SELECT bytes, entries FROM cv_result_totals WHERE id = 0"
+            ).fetchone()
+        return {"entries": entries, "bytes": size}
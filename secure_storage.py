@@ -0,0 +1,35 @@
+# secure_storage.py - Encryption-at-rest helpers for anything that keeps CV data around
+import base64
+import hashlib
+
+
+class Cipher:
+    """Symmetric authenticated encryption (Fernet) derived from a server-side secret."""
+
+    def __init__(self, secret):
+        # Imported here so modules that never encrypt do not pay for the import
+        from cryptography.fernet import Fernet
+
+        if isinstance(secret, str):
+            secret = secret.encode("utf-8")
+        key = base64.urlsafe_b64encode(hashlib.sha256(secret).digest())
+        self._fernet = Fernet(key)
+
+    def encrypt(self, data: bytes) -> bytes:
+        return self._fernet.encrypt(data)
+
+    def decrypt(self, token: bytes) -> bytes:
+        """Raises ValueError if the data was tampered with or the secret changed."""
+        from cryptography.fernet import InvalidToken
+
+        try:
+            return self._fernet.decrypt(token)
+        except InvalidToken:
+            raise ValueError("Encrypted data could not be authenticated")
+
+
+def get_cipher(secret):
+    """Return a Cipher for the secret, or None when no secret is configured."""
+    if not secret:
+        return None
+    return Cipher(secret)
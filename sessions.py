@@ -0,0 +1,102 @@
+# sessions.py - Last input and structured result per editing session, for section-level regeneration
+import hashlib
+import json
+import os
+import re
+
+from cv_repair import TOP_LEVEL_ALIASES, SCHEMA_KEYS
+from llm_cache import LLMResultCache, canonical_json
+
+# Raw input fields (schema names, as sent by collectCVData in app.js) grouped by CV section.
+# A section is polished as a unit: editing one of its fields re-sends only that section.
+SECTION_FIELDS = {
+    "header": ("full_name", "job_title", "email", "phone", "city", "linkedin", "portfolio"),
+    "professional_summary": ("professional_summary",),
+    "work_experience": ("work_experience",),
+    "skills": ("technical_skills", "soft_skills"),
+    "education": ("education",),
+    "languages": ("languages",),
+    "certificates": ("certificates",),
+    "projects": ("projects",),
+}
+OTHER_SECTION = "other"  # input keys outside the schema: a change there means a full regeneration
+
+_FIELD_SECTIONS = {field: section for section, fields in SECTION_FIELDS.items() for field in fields}
+_VALID_SESSION_ID = re.compile(r"^[A-Za-z0-9_-]{8,64}$")
+
+
+def section_of(key):
+    """CV section a raw input key belongs to (aliases such as "experience" included)."""
+    if key not in SCHEMA_KEYS:
+        key = TOP_LEVEL_ALIASES.get(re.sub(r"[\s\-]+", "_", str(key).strip()).lower(), key)
+    return _FIELD_SECTIONS.get(key, OTHER_SECTION)
+
+
+def split_sections(clean_data):
+    """{section: {key: value}} of a cleaned input."""
+    sections = {}
+    for key, value in clean_data.items():
+        sections.setdefault(section_of(key), {})[key] = value
+    return sections
+
+
+def changed_sections(old_input, new_input):
+    """Sections whose input differs between two submissions (whitespace-only edits do not count)."""
+    old, new = split_sections(old_input), split_sections(new_input)
+    names = list(SECTION_FIELDS) + [OTHER_SECTION]
+    return [name for name in names if canonical_json(old.get(name, {})) != canonical_json(new.get(name, {}))]
+
+
+class SessionStore:
+    """
+    Previous cleaned input and structured CV per session id, so an edited resubmission
+    only sends the changed sections to the model. Backed by an LLMResultCache
+    (memory LRU + optional encrypted SQLite), keyed by a hash of the session id.
+    """
+
+    def __init__(self, store):
+        self.store = store
+
+    @classmethod
+    def from_env(cls):
+        """CV_SESSION_* environment variables; CV_SESSION_MAX_ENTRIES=0 disables sessions."""
+        max_entries = int(os.environ.get("CV_SESSION_MAX_ENTRIES", "500"))
+        db_path = os.environ.get("CV_SESSION_DB") or None
+        if max_entries <= 0 and not db_path:
+            return None
+        return cls(LLMResultCache(
+            max_entries=max_entries,
+            ttl_seconds=float(os.environ.get("CV_SESSION_TTL", "1800")),
+            db_path=db_path,
+            secret=os.environ.get("CV_SESSION_SECRET") or os.environ.get("CV_CACHE_SECRET"),
+        ))
+
+    @staticmethod
+    def is_valid_id(session_id):
+        return isinstance(session_id, str) and bool(_VALID_SESSION_ID.match(session_id))
+
+    @staticmethod
+    def _key(session_id):
+        return hashlib.sha256(f"cv-session\0{session_id}".encode("utf-8")).hexdigest()
+
+    def get(self, session_id, fingerprint):
+        """{"input": ..., "structured": ...} of the last submission, or None (unknown, expired or other prompt/model)."""
+        if not self.is_valid_id(session_id):
+            return None
+        value = self.store.get(self._key(session_id))
+        if value is None:
+            return None
+        entry = json.loads(value)
+        if entry.get("fingerprint") != fingerprint:
+            return None
+        return entry
+
+    def put(self, session_id, fingerprint, clean_data, structured_cv):
+        if not self.is_valid_id(session_id):
+            return
+        entry = {"fingerprint": fingerprint, "input": clean_data, "structured": structured_cv}
+        self.store.set(self._key(session_id), json.dumps(entry, ensure_ascii=False))
+
+    def forget(self, session_id):
+        if self.is_valid_id(session_id):
+            self.store.delete(self._key(session_id))
@@ -0,0 +1,541 @@
+# static_assets.py - Frontend asset pipeline: allow-listed files, minified, content-hashed, precompressed
+"""
+Usage (from the project root, as part of a deployment):
+    python static_assets.py build            # writes public/ (or --out DIR)
+
+The server only ever serves the files of the bundle: index.html, app.js, styles.css
+and the images in Assets/. Everything else in the project directory (Python sources,
+system_prompt.txt, databases...) answers 404. Without a build on disk, or when the
+sources changed since the build, the same bundle is built in memory at start-up.
+"""
+import argparse
+import hashlib
+import io
+import json
+import logging
+import mimetypes
+import os
+import re
+import threading
+
+logger = logging.getLogger(__name__)
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# What the browser may fetch: these files, and files with these extensions inside these folders
+PUBLIC_FILES = ("index.html", "styles.css", "app.js")
+PUBLIC_DIRS = {"Assets": (".jpg", ".jpeg", ".png", ".webp", ".svg")}
+
+INDEX = "index.html"
+COMPRESSIBLE = (".html", ".css", ".js", ".svg", ".json", ".txt")
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+# Sample images: re-encoded as progressive JPEGs plus downscaled copies for srcset
+# (the landing-page cards show them about 260px wide). Needs Pillow; without it they are copied.
+IMAGE_WIDTHS = (320, 640)
+IMAGE_SIZES = "(max-width: 700px) 80vw, 300px"
+JPEG_QUALITY = 80
+
+
+# ---------- minifiers (conservative: whitespace and comments only, line breaks kept) ----------
+_JS_WORD = re.compile(r"[A-Za-z0-9_$\\]")
+_JS_REGEX_BEFORE = set("(,=:[!&|?{};+-*%<>~^")
+_JS_REGEX_KEYWORDS = {"return", "typeof", "case", "do", "else", "in", "of", "new", "delete", "void", "throw",
+                      "instanceof", "yield", "await"}
+_JS_TIGHT = set("{}()[];,:=&|?")
+
+
+def _skip_quoted(source, i, quote):
+    """Index just past the string or template literal starting at i (templates stop at `${`)."""
+    i += 1
+    while i < len(source):
+        char = source[i]
+        if char == "\\":
+            i += 2
+            continue
+        if char == quote:
+            return i + 1
+        if quote == "`" and source.startswith("${", i):
+            return i + 2
+        i += 1
+    return i
+
+
+def _skip_regex(source, i):
+    """Index just past the regular expression literal (and its flags) starting at i."""
+    i += 1
+    in_class = False
+    while i < len(source):
+        char = source[i]
+        if char == "\\":
+            i += 2
+            continue
+        if char == "\n":
+            break
+        if char == "[":
+            in_class = True
+        elif char == "]":
+            in_class = False
+        elif char == "/" and not in_class:
+            i += 1
+            break
+        i += 1
+    while i < len(source) and _JS_WORD.match(source[i]):
+        i += 1
+    return i
+
+
+def minify_js(source):
+    """Drop comments and indentation and collapse spaces; strings, templates and regexes are kept verbatim."""
+    out = []
+    templates = []  # brace depth inside each open `${ ... }`
+    pending = ""    # whitespace seen since the last token: "", " " or "\n"
+    last_word = ""
+    i, n = 0, len(source)
+
+    def emit(text):
+        nonlocal pending
+        if pending and out:
+            previous, following = out[-1][-1], text[0]
+            if pending == "\n" and previous not in "{([,;" and following not in ")]},":
+                out.append("\n")
+            elif pending == " " and previous not in _JS_TIGHT and following not in _JS_TIGHT:
+                out.append(" ")
+        pending = ""
+        out.append(text)
+
+    while i < n:
+        char = source[i]
+        if char in " \t\r\n\f\v\u00a0\ufeff":
+            if char == "\n":
+                pending = "\n"
+            elif not pending:
+                pending = " "
+            i += 1
+        elif source.startswith("//", i):
+            end = source.find("\n", i)
+            i = n if end < 0 else end
+        elif source.startswith("/*", i):
+            end = source.find("*/", i + 2)
+            if not pending:
+                pending = " "
+            i = n if end < 0 else end + 2
+        elif char in "'\"`":
+            end = _skip_quoted(source, i, char)
+            emit(source[i:end])
+            if char == "`" and source.startswith("${", end - 2) and end - 2 > i:
+                templates.append(0)
+            i = end
+            last_word = ""
+        elif char == "}" and templates and templates[-1] == 0:
+            # end of a `${ ... }` expression: back inside the template literal
+            templates.pop()
+            end = _skip_quoted(source, i, "`")
+            emit(source[i:end])
+            if source.startswith("${", end - 2):
+                templates.append(0)
+            i = end
+            last_word = ""
+        elif char == "/":
+            previous = out[-1][-1] if out else ""
+            if not previous or previous in _JS_REGEX_BEFORE or last_word in _JS_REGEX_KEYWORDS:
+                end = _skip_regex(source, i)
+            else:
+                end = i + 1
+            emit(source[i:end])
+            i = end
+            last_word = ""
+        elif _JS_WORD.match(char):
+            end = i
+            while end < n and (_JS_WORD.match(source[end]) or (source[end] == "." and source[end - 1].isdigit())):
+                end += 1
+            word = source[i:end]
+            emit(word)
+            i = end
+            last_word = word
+        else:
+            if templates:
+                if char == "{":
+                    templates[-1] += 1
+                elif char == "}":
+                    templates[-1] -= 1
+            emit(char)
+            i += 1
+            last_word = ""
+    return "".join(out) + "\n"
+
+
+def minify_css(source):
+    """Drop comments and collapse whitespace around CSS punctuation; strings are kept verbatim."""
+    parts = []
+    i, n = 0, len(source)
+    while i < n:
+        char = source[i]
+        if source.startswith("/*", i):
+            end = source.find("*/", i + 2)
+            i = n if end < 0 else end + 2
+            parts.append(" ")
+        elif char in "'\"":
+            end = _skip_quoted(source, i, char)
+            parts.append("\0" + source[i:end] + "\0")
+            i = end
+        else:
+            end = i
+            while end < n and source[end] not in "'\"" and not source.startswith("/*", end):
+                end += 1
+            parts.append(source[i:end])
+            i = end
+    chunks = "".join(parts).split("\0")
+    for index in range(0, len(chunks), 2):  # even chunks are outside strings
+        text = re.sub(r"\s+", " ", chunks[index])
+        text = re.sub(r" ?([{};,]) ?", r"\1", text)
+        text = re.sub(r": ", ":", text)
+        chunks[index] = text.replace(";}", "}")
+    return "".join(chunks).strip() + "\n"
+
+
+_HTML_VERBATIM = re.compile(r"(<(pre|textarea|script|style)\b.*?</\2>)", re.S | re.I)
+
+
+def minify_html(source):
+    """Drop comments, indentation and blank lines (pre, textarea, script and style blocks untouched)."""
+    pieces = _HTML_VERBATIM.split(source)
+    out = []
+    for index in range(0, len(pieces), 3):
+        text = re.sub(r"<!--(?!\[).*?-->", "", pieces[index], flags=re.S)
+        lines = "\n".join(line.strip() for line in text.splitlines() if line.strip())
+        # whitespace next to a verbatim block still separates it from its neighbours
+        if index and text[:1].isspace():
+            lines = "\n" + lines
+        if index + 1 < len(pieces) and text[-1:].isspace() and lines != "\n":
+            lines += "\n"
+        out.append(lines)
+        if index + 1 < len(pieces):
+            out.append(pieces[index + 1])
+    return "".join(out).strip() + "\n"
+
+
+# ---------- images ----------
+def _jpeg(image):
+    buffer = io.BytesIO()
+    image.save(buffer, "JPEG", quality=JPEG_QUALITY, optimize=True, progressive=True)
+    return buffer.getvalue()
+
+
+def encode_image(path, data):
+    """
+    (data, width, {width: smaller copy}) for a sample image. JPEGs are re-encoded (kept when
+    that does not make them smaller) and downscaled to IMAGE_WIDTHS; without Pillow the
+    original is returned as it is.
+    """
+    if not path.lower().endswith((".jpg", ".jpeg")):
+        return data, None, {}
+    try:
+        from PIL import Image
+    except ImportError:
+        return data, None, {}
+    with Image.open(io.BytesIO(data)) as image:
+        image = image.convert("RGB")
+        encoded = _jpeg(image)
+        variants = {}
+        for width in IMAGE_WIDTHS:
+            if width < image.width:
+                height = round(image.height * width / image.width)
+                variants[width] = _jpeg(image.resize((width, height), Image.LANCZOS))
+        return (encoded if len(encoded) < len(data) else data), image.width, variants
+
+
+# ---------- bundle ----------
+class Asset:
+    """One servable file: its bytes, precompressed variants and cache metadata."""
+
+    __slots__ = ("path", "data", "encodings", "etag", "content_type", "immutable")
+
+    def __init__(self, path, data, encodings=None, immutable=False):
+        self.path = path
+        self.data = data
+        self.encodings = encodings or {}  # "br" / "gzip" -> bytes
+        self.etag = hashlib.sha256(data).hexdigest()[:20]
+        content_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        if content_type.startswith("text/") or content_type in ("application/javascript", "image/svg+xml"):
+            content_type += "; charset=utf-8"
+        self.content_type = content_type
+        self.immutable = immutable
+
+
+def source_files(root=ROOT_DIR):
+    """{relative path: bytes} of every allow-listed frontend file."""
+    files = {}
+    for name in PUBLIC_FILES:
+        with open(os.path.join(root, name), "rb") as f:
+            files[name] = f.read()
+    for folder, extensions in PUBLIC_DIRS.items():
+        directory = os.path.join(root, folder)
+        for name in sorted(os.listdir(directory)) if os.path.isdir(directory) else ():
+            if name.lower().endswith(extensions) and os.path.isfile(os.path.join(directory, name)):
+                with open(os.path.join(directory, name), "rb") as f:
+                    files[f"{folder}/{name}"] = f.read()
+    return files
+
+
+def source_fingerprints(files):
+    return {path: hashlib.sha256(data).hexdigest() for path, data in files.items()}
+
+
+def hashed_name(path, data, label=""):
+    """styles.css -> styles.<hash>.css (label adds e.g. .w320 before the hash)."""
+    stem, extension = os.path.splitext(path)
+    return f"{stem}{label}.{hashlib.sha256(data).hexdigest()[:10]}{extension}"
+
+
+def _rewrite_references(text, renames):
+    """Point quoted or url() references at the hashed names ("./" prefixes kept)."""
+    for original, renamed in renames.items():
+        text = re.sub(r"""(["'(])(\./)?%s(["')])""" % re.escape(original), r"\g<1>\g<2>%s\g<3>" % renamed, text)
+    return text
+
+
+def _add_srcsets(html, responsive):
+    """srcset/sizes on <img> tags whose image has downscaled copies."""
+    def add(match):
+        tag, src = match.group(0), match.group(2)
+        entry = responsive.get(src[2:] if src.startswith("./") else src)
+        if entry is None or "srcset=" in tag:
+            return tag
+        prefix = "./" if src.startswith("./") else ""
+        srcset = ", ".join(f"{prefix}{path} {width}w" for width, path in entry)
+        return tag[:-1].rstrip("/ ") + f' srcset="{srcset}" sizes="{IMAGE_SIZES}">'
+    return re.sub(r"""<img\b[^>]*?\bsrc=(["'])([^"']+)\1[^>]*>""", add, html)
+
+
+def _compress(path, data):
+    """{"br": ..., "gzip": ...} variants worth sending (brotli only when the module is installed)."""
+    if not path.endswith(COMPRESSIBLE):
+        return {}
+    import gzip
+
+    variants = {"gzip": gzip.compress(data, compresslevel=9, mtime=0)}
+    try:
+        import brotli
+    except ImportError:
+        brotli = None
+    if brotli is not None:
+        variants["br"] = brotli.compress(data, quality=11)
+    return {name: body for name, body in variants.items() if len(body) < len(data) * 0.9}
+
+
+def build_bundle(files):
+    """
+    Build every servable file from the sources: {served path: Asset}.
+    Minified files get content-hashed names (cached for a year); the unhashed names stay
+    servable with revalidation, and index.html refers to the hashed ones.
+    """
+    outputs = {}      # logical path -> (hashed path or None, data)
+    renames = {}
+    responsive = {}   # hashed image path -> [(width, path)]
+
+    for path, data in files.items():
+        if path.startswith(tuple(folder + "/" for folder in PUBLIC_DIRS)):
+            data, width, variants = encode_image(path, data)
+            renamed = hashed_name(path, data)
+            outputs[path] = (renamed, data)
+            renames[path] = renamed
+            if variants:
+                entries = []
+                for variant_width, body in sorted(variants.items()):
+                    variant_path = hashed_name(path, body, f".w{variant_width}")
+                    outputs[variant_path] = (variant_path, body)
+                    entries.append((variant_width, variant_path))
+                responsive[renamed] = entries + [(width, renamed)]
+
+    for path, minify in (("styles.css", minify_css), ("app.js", minify_js)):
+        text = _rewrite_references(minify(files[path].decode("utf-8")), renames)
+        data = text.encode("utf-8")
+        renamed = hashed_name(path, data)
+        outputs[path] = (renamed, data)
+        renames[path] = renamed
+
+    html = _add_srcsets(_rewrite_references(minify_html(files[INDEX].decode("utf-8")), renames), responsive)
+    outputs[INDEX] = (None, html.encode("utf-8"))
+
+    bundle = {}
+    for logical, (renamed, data) in outputs.items():
+        asset = Asset(renamed or logical, data, _compress(logical, data), immutable=renamed is not None)
+        bundle[asset.path] = asset
+        if renamed and renamed != logical:
+            # old or hand-written references to the plain name: same bytes, revalidated on each use
+            bundle[logical] = Asset(logical, data, asset.encodings)
+    return bundle
+
+
+def write_bundle(bundle, out_dir, fingerprints):
+    """Write the bundle (with .gz/.br siblings) and manifest.json into out_dir."""
+    manifest = {"sources": fingerprints, "files": {}}
+    for path, asset in bundle.items():
+        target = os.path.join(out_dir, path)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with open(target, "wb") as f:
+            f.write(asset.data)
+        for encoding, body in asset.encodings.items():
+            with open(target + (".br" if encoding == "br" else ".gz"), "wb") as f:
+                f.write(body)
+        manifest["files"][path] = {"immutable": asset.immutable, "encodings": sorted(asset.encodings)}
+    with open(os.path.join(out_dir, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return manifest
+
+
+def clear_bundle(out_dir):
+    """
+    Delete a previous build from out_dir: the files its manifest.json lists (and their
+    .br/.gz siblings), then the manifest. Anything else in the directory is left alone.
+    Raises ValueError when out_dir is not empty and holds no build.
+    """
+    manifest_path = os.path.join(out_dir, "manifest.json")
+    if not os.path.isfile(manifest_path):
+        if os.listdir(out_dir):
+            raise ValueError(f"{out_dir} is not empty and holds no frontend build (no manifest.json)")
+        return
+    try:
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            files = json.load(f)["files"]
+    except (ValueError, KeyError, TypeError):
+        raise ValueError(f"{manifest_path} is not a frontend build manifest")
+    root = os.path.realpath(out_dir)
+    for path in files:
+        target = os.path.realpath(os.path.join(root, path))
+        if os.path.commonpath([root, target]) != root:
+            raise ValueError(f"{manifest_path} lists a file outside {out_dir}: {path}")
+        for name in (target, target + ".br", target + ".gz"):
+            if os.path.isfile(name):
+                os.remove(name)
+        # drop directories the build created and that are now empty (Assets/, ...)
+        parent = os.path.dirname(target)
+        while parent != root and os.path.isdir(parent) and not os.listdir(parent):
+            os.rmdir(parent)
+            parent = os.path.dirname(parent)
+    os.remove(manifest_path)
+
+
+def read_bundle(out_dir):
+    """(bundle, source fingerprints) of a build written by write_bundle."""
+    with open(os.path.join(out_dir, "manifest.json"), "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    bundle = {}
+    for path, entry in manifest["files"].items():
+        target = os.path.join(out_dir, path)
+        with open(target, "rb") as f:
+            data = f.read()
+        encodings = {}
+        for encoding in entry["encodings"]:
+            with open(target + (".br" if encoding == "br" else ".gz"), "rb") as f:
+                encodings[encoding] = f.read()
+        bundle[path] = Asset(path, data, encodings, immutable=entry["immutable"])
+    return bundle, manifest["sources"]
+
+
+def _accepted_encodings(header):
+    """Content codings the client accepts (q=0 excluded)."""
+    accepted = set()
+    for item in (header or "").split(","):
+        name, _, params = item.strip().partition(";")
+        quality = re.search(r"q=([0-9.]+)", params)
+        if name and not (quality and float(quality.group(1) or 0) == 0):
+            accepted.add(name.strip().lower())
+    return accepted
+
+
+def _etag_matches(header, etag):
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return etag in (tag.strip().removeprefix("W/") for tag in header.split(","))
+
+
+class StaticSite:
+    """
+    The frontend as served: the bundle in memory, one precompressed body per encoding.
+    Loaded from build_dir when its manifest matches the current sources, otherwise
+    built in memory from them (same output, minus nothing but the files on disk).
+    """
+
+    def __init__(self, root=ROOT_DIR, build_dir=None):
+        self.root = root
+        self.build_dir = build_dir
+        self._bundle = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        """CV_STATIC_DIR: where `python static_assets.py build` wrote the bundle (default public/)."""
+        build_dir = os.environ.get("CV_STATIC_DIR") or os.path.join(ROOT_DIR, "public")
+        return cls(build_dir=build_dir)
+
+    def load(self):
+        """Load or build the bundle once; returns it."""
+        if self._bundle is not None:
+            return self._bundle
+        with self._lock:
+            if self._bundle is None:
+                files = source_files(self.root)
+                fingerprints = source_fingerprints(files)
+                bundle = None
+                if self.build_dir and os.path.isfile(os.path.join(self.build_dir, "manifest.json")):
+                    bundle, built_from = read_bundle(self.build_dir)
+                    if built_from != fingerprints:
+                        logger.warning("%s is older than the frontend sources; serving an in-memory build "
+                                       "(run `python static_assets.py build`)", self.build_dir)
+                        bundle = None
+                self._bundle = bundle or build_bundle(files)
+        return self._bundle
+
+    def respond(self, path, accept_encoding="", if_none_match=""):
+        """
+        (body, status, headers) for a request path, or None when the path is not part of
+        the bundle. Picks brotli, then gzip, when the client accepts them; answers 304
+        when If-None-Match names the representation it would send.
+        """
+        asset = self.load().get(path.lstrip("/") or INDEX)
+        if asset is None:
+            return None
+        accepted = _accepted_encodings(accept_encoding)
+        encoding = next((name for name in ("br", "gzip") if name in asset.encodings and name in accepted), None)
+        etag = f'"{asset.etag}-{encoding}"' if encoding else f'"{asset.etag}"'
+        headers = {"ETag": etag, "Cache-Control": IMMUTABLE if asset.immutable else "no-cache"}
+        if asset.encodings:
+            headers["Vary"] = "Accept-Encoding"
+        if _etag_matches(if_none_match, etag):
+            return b"", 304, headers
+        headers["Content-Type"] = asset.content_type
+        if encoding:
+            headers["Content-Encoding"] = encoding
+        return (asset.encodings[encoding] if encoding else asset.data), 200, headers
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the frontend bundle served by app.py.")
+    parser.add_argument("command", choices=["build"])
+    parser.add_argument("--out", default=os.path.join(ROOT_DIR, "public"), help="output directory (default public/)")
+    args = parser.parse_args()
+
+    files = source_files()
+    bundle = build_bundle(files)
+    if os.path.isdir(args.out):
+        try:
+            clear_bundle(args.out)  # no stale hashed files left behind
+        except ValueError as e:
+            parser.error(f"{e}; refusing to write the bundle there")
+    write_bundle(bundle, args.out, source_fingerprints(files))
+
+    before = sum(len(data) for data in files.values())
+    served = {path: asset for path, asset in bundle.items() if asset.immutable or path == INDEX}
+    after = sum(len(asset.encodings.get("br") or asset.encodings.get("gzip") or asset.data) for asset in served.values())
+    for path, asset in sorted(served.items()):
+        sizes = ", ".join(f"{name} {len(body)}" for name, body in sorted(asset.encodings.items()))
+        print(f"{path:48} {len(asset.data):>8}  {sizes}")
+    print(f"Sources {before} bytes -> {after} bytes on the wire (best encoding), written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
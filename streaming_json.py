@@ -0,0 +1,78 @@
+# streaming_json.py - Incremental parser that emits top-level JSON keys as soon as their value is complete
+import json
+
+
+class TopLevelKeyParser:
+    """
+    Feed it model output chunk by chunk; it returns (key, value) pairs for
+    every top-level member of the first JSON object as soon as that member is
+    closed. Prose or a ```json fence before the object is skipped, anything
+    after the closing brace is ignored.
+    """
+
+    def __init__(self):
+        self._buffer = ""
+        self._pos = 0           # next character of _buffer to scan
+        self._member_start = None
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self.finished = False
+        self.keys = []
+
+    def feed(self, chunk):
+        """Consume a chunk of text and return the members completed by it."""
+        if self.finished or not chunk:
+            return []
+        self._buffer += chunk
+        members = []
+        buffer = self._buffer
+        i = self._pos
+
+        while i < len(buffer):
+            char = buffer[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+            elif self._depth == 0:
+                if char == "{":
+                    self._depth = 1
+                    self._member_start = i + 1
+            elif char == '"':
+                self._in_string = True
+            elif char in "{[":
+                self._depth += 1
+            elif char in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    members.extend(self._emit(buffer[self._member_start:i]))
+                    self.finished = True
+                    break
+            elif char == "," and self._depth == 1:
+                members.extend(self._emit(buffer[self._member_start:i]))
+                self._member_start = i + 1
+            i += 1
+
+        # Drop what has been consumed so the buffer only ever holds the member being parsed
+        if self._member_start is not None and not self.finished:
+            self._buffer = buffer[self._member_start:]
+            self._pos = i - self._member_start
+            self._member_start = 0
+        else:
+            self._buffer = ""
+            self._pos = 0
+        return members
+
+    def _emit(self, member_text):
+        if not member_text.strip():
+            return []
+        try:
+            member = json.loads("{" + member_text + "}")
+        except json.JSONDecodeError:
+            return []  # malformed member: left for the full-text fallback parse
+        self.keys.extend(member.keys())
+        return list(member.items())
@@ -0,0 +1,10 @@
+# conftest.py - Tests import the modules from the repository root, as app.py does
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# app.py reads its settings at import time: no model key is needed (no test calls the model)
+# and the warm-up thread would only slow the suite down
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+os.environ.setdefault("CV_WARMUP", "off")
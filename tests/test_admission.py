@@ -0,0 +1,157 @@
+import asyncio
+import threading
+
+import pytest
+
+import admission
+from admission import (AsyncConcurrencyLimiter, ConcurrencyLimiter, OverloadedError, RateLimitedError, RateLimiter,
+                       retry_after_header)
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(admission.time, "monotonic", clock)
+    return clock
+
+
+def test_the_bucket_refills_at_the_configured_rate(clock):
+    limiter = RateLimiter(per_minute=6, burst=2)
+    limiter.acquire("ip:a")
+    limiter.acquire("ip:a")
+    with pytest.raises(RateLimitedError) as refused:
+        limiter.acquire("ip:a")
+    assert refused.value.retry_after == pytest.approx(10)
+
+    clock.now += 10
+    limiter.acquire("ip:a")
+    clock.now += 3600  # never more than the burst saved up
+    for _ in range(2):
+        limiter.acquire("ip:a")
+    with pytest.raises(RateLimitedError):
+        limiter.acquire("ip:a")
+
+
+def test_the_least_recently_seen_clients_are_dropped(clock):
+    limiter = RateLimiter(per_minute=1, burst=1, max_clients=2)
+    for client in ("ip:a", "ip:b", "ip:c"):
+        limiter.acquire(client)
+    # "a" was forgotten, so it starts again with a full bucket
+    limiter.acquire("ip:a")
+    with pytest.raises(RateLimitedError):
+        limiter.acquire("ip:c")
+
+
+def test_retry_after_header_is_whole_seconds_and_at_least_one():
+    assert retry_after_header(0.1) == "1"
+    assert retry_after_header(2.01) == "3"
+
+
+def test_made_up_api_keys_share_the_ip_bucket():
+    limiter = RateLimiter(per_minute=1, burst=2)
+    for attempt in range(2):
+        limiter.acquire(*limiter.clients("10.0.0.1", f"random-{attempt}"))
+    with pytest.raises(RateLimitedError):
+        limiter.acquire(*limiter.clients("10.0.0.1", "random-2"))
+    limiter.acquire(*limiter.clients("10.0.0.2"))
+
+
+def test_a_configured_key_is_limited_on_top_of_the_ip():
+    limiter = RateLimiter(per_minute=1, burst=2, api_keys=["team-key"])
+    assert limiter.clients("10.0.0.1", "team-key")[0] == "ip:10.0.0.1"
+    limiter.acquire(*limiter.clients("10.0.0.1", "team-key"))
+    limiter.acquire(*limiter.clients("10.0.0.2", "team-key"))
+    with pytest.raises(RateLimitedError) as refused:
+        limiter.acquire(*limiter.clients("10.0.0.3", "team-key"))
+    assert refused.value.retry_after > 0
+    # the refused request took no token from the fresh address
+    limiter.acquire(*limiter.clients("10.0.0.3"))
+    limiter.acquire(*limiter.clients("10.0.0.3"))
+
+
+def test_a_full_wait_queue_refuses_straight_away():
+    limiter = ConcurrencyLimiter(max_in_flight=1, max_waiting=0, wait_timeout=5)
+    with limiter.slot():
+        with pytest.raises(OverloadedError) as refused:
+            limiter.check_capacity()
+        assert refused.value.retry_after >= 1
+        with pytest.raises(OverloadedError):
+            with limiter.slot():
+                pass
+    assert limiter.in_flight == 0
+    limiter.check_capacity()
+
+
+def test_a_waiter_gets_the_slot_when_it_frees_up_or_times_out():
+    limiter = ConcurrencyLimiter(max_in_flight=1, max_waiting=1, wait_timeout=0.05)
+    with limiter.slot():
+        with pytest.raises(OverloadedError, match="Timed out"):
+            with limiter.slot():
+                pass
+
+    release = threading.Event()
+    holder_in = threading.Event()
+
+    def hold():
+        with limiter.slot():
+            holder_in.set()
+            release.wait(5)
+
+    holder = threading.Thread(target=hold)
+    holder.start()
+    holder_in.wait(5)
+    limiter.wait_timeout = 5
+    threading.Timer(0.05, release.set).start()
+    with limiter.slot():
+        assert limiter.in_flight == 1
+    holder.join(5)
+    assert (limiter.in_flight, limiter.waiting) == (0, 0)
+
+
+def test_the_async_limiter_refuses_past_its_queue():
+    async def scenario():
+        limiter = AsyncConcurrencyLimiter(max_in_flight=1, max_waiting=1, wait_timeout=5)
+        release = asyncio.Event()
+
+        async def hold():
+            async with limiter.slot():
+                await release.wait()
+
+        async def wait_for_slot():
+            async with limiter.slot():
+                return limiter.in_flight
+
+        holder = asyncio.ensure_future(hold())
+        await asyncio.sleep(0)
+        waiter = asyncio.ensure_future(wait_for_slot())
+        await asyncio.sleep(0)
+        with pytest.raises(OverloadedError):
+            async with limiter.slot():
+                pass
+        release.set()
+        await holder
+        return await waiter, limiter.in_flight, limiter.waiting
+
+    assert asyncio.run(scenario()) == (1, 0, 0)
+
+
+def test_the_app_answers_429_with_retry_after(monkeypatch):
+    import app
+
+    monkeypatch.setattr(app, "RATE_LIMITER", RateLimiter(per_minute=1, burst=1))
+    client = app.app.test_client()
+    assert client.post("/api/process-cv", json={}).status_code == 400  # took the one token
+
+    response = client.post("/api/process-cv", json={})
+
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
+    assert response.get_json()["retry_after"] == int(response.headers["Retry-After"])
@@ -0,0 +1,131 @@
+import io
+import json
+import tempfile
+import time
+import types
+import uuid
+import zipfile
+
+import pytest
+
+import app
+from results import ResultStore
+
+DOCX = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+STRUCTURED = {
+    "full_name": "Ada Lovelace",
+    "email": "ada@example.com",
+    "job_title": "Engineer",
+    "professional_summary": "Mathematician who wrote the first published program.",
+}
+
+
+@pytest.fixture
+def client():
+    return app.app.test_client()
+
+
+def _finished_job(token):
+    job_id = uuid.uuid4().hex
+    app.JOBS.store.create(job_id)
+    app.JOBS.store.mark_done(job_id, b"docx bytes", "Enhanced_CV.docx", DOCX, token)
+    return job_id
+
+
+@pytest.mark.parametrize("results", [None, ResultStore()], ids=["results-disabled", "results-on-another-worker"])
+def test_a_job_download_in_its_own_format_does_not_need_the_result_store(client, monkeypatch, results):
+    monkeypatch.setattr(app, "RESULTS", results)
+    job_id = _finished_job("not-in-this-store")
+
+    for url in (f"/api/jobs/{job_id}/download", f"/api/jobs/{job_id}/download?format=docx"):
+        response = client.get(url)
+        assert response.status_code == 200
+        assert response.data == b"docx bytes"
+
+    assert client.get(f"/api/jobs/{job_id}/download?format=pdf").status_code == 410
+
+
+def test_postings_cannot_change_without_a_configured_admin_key(client, monkeypatch):
+    posting = {"id": "backend", "title": "Python developer", "description": "Flask and PostgreSQL"}
+    monkeypatch.delenv("CV_MATCH_ADMIN_KEY", raising=False)
+    assert client.post("/api/postings", json=posting).status_code == 403
+    assert client.delete("/api/postings/backend").status_code == 403
+
+    monkeypatch.setenv("CV_MATCH_ADMIN_KEY", "admin")
+    assert client.post("/api/postings", json=posting, headers={"X-Admin-Key": "wrong"}).status_code == 403
+    assert client.post("/api/postings", json=posting, headers={"X-Admin-Key": "admin"}).status_code == 201
+    assert client.delete("/api/postings/backend", headers={"X-Admin-Key": "admin"}).status_code == 204
+
+
+class _Completions:
+    def __init__(self, answer):
+        self.answer = answer
+        self.calls = []
+
+    def create(self, **kwargs):
+        self.calls.append(kwargs)
+        message = types.SimpleNamespace(content="```json\n" + json.dumps(self.answer) + "\n```")
+        return types.SimpleNamespace(choices=[types.SimpleNamespace(message=message)], usage=None)
+
+
+@pytest.fixture
+def model(monkeypatch):
+    """A stand-in for the OpenAI client that answers with STRUCTURED."""
+    import llm_client
+
+    completions = _Completions(STRUCTURED)
+    monkeypatch.setattr(llm_client, "get_client", lambda *args, **kwargs: types.SimpleNamespace(
+        chat=types.SimpleNamespace(completions=completions)))
+    monkeypatch.setattr(app, "RATE_LIMITER", None)
+    monkeypatch.setattr(app, "LLM_CACHE", None)
+    return completions
+
+
+def test_process_cv_renders_in_memory_without_temp_files(client, model, monkeypatch):
+    def no_temp_files(*args, **kwargs):
+        raise AssertionError("the request wrote a temporary file")
+
+    monkeypatch.setattr(tempfile, "NamedTemporaryFile", no_temp_files)
+    monkeypatch.setattr(tempfile, "mkstemp", no_temp_files)
+
+    response = client.post("/api/process-cv?mode=llm", json={"full_name": "ada lovelace", "email": "ada@example.com"})
+    assert response.status_code == 200
+    assert response.mimetype == DOCX
+    document = zipfile.ZipFile(io.BytesIO(response.data)).read("word/document.xml").decode("utf-8")
+    assert "ADA LOVELACE" in document and "first published program" in document
+    assert len(model.calls) == 1
+
+
+def test_process_cv_rejects_an_empty_body(client):
+    assert client.post("/api/process-cv", json={}).status_code == 400
+
+
+def test_the_job_api_submits_polls_and_downloads(client, monkeypatch):
+    monkeypatch.setattr(app, "RATE_LIMITER", None)
+    response = client.post("/api/jobs?mode=fast", json={"full_name": "ada lovelace"})
+    assert response.status_code == 202
+    status_url = response.json["status_url"]
+    assert response.headers["Location"] == status_url
+
+    for _ in range(500):
+        job = client.get(status_url).json
+        if job["status"] in ("done", "failed"):
+            break
+        time.sleep(0.01)
+    assert job["status"] == "done", job
+    download = client.get(job["download_url"])
+    assert download.status_code == 200 and download.mimetype == DOCX
+    assert client.get("/api/jobs/unknown").status_code == 404
+
+
+def test_job_events_report_each_section_then_done(client, monkeypatch):
+    monkeypatch.setattr(app, "RATE_LIMITER", None)
+    job_id = client.post("/api/jobs?mode=fast", json={"full_name": "ada lovelace", "job_title": "Engineer",
+                                                      "technical_skills": ["Python"]}).json["job_id"]
+    stream = client.get(f"/api/jobs/{job_id}/events").get_data(as_text=True)
+    events = [(block.split("\n")[0][len("event: "):], json.loads(block.split("\n")[1][len("data: "):]))
+              for block in stream.strip().split("\n\n") if block.startswith("event:")]
+    sections = [data["section"] for name, data in events if data.get("type") == "section"]
+    assert sections and events[-1][0] == "done"
+    assert events[-1][1]["download_url"] == f"/api/jobs/{job_id}/download"
+    assert [data["done"] for name, data in events if data.get("type") == "section"] == list(range(1, len(sections) + 1))
@@ -0,0 +1,37 @@
+import asyncio
+
+import httpx
+
+import asgi
+from asgi import _option
+from renderers import FORMATS
+
+
+def test_a_body_option_is_popped_even_when_the_query_sets_it():
+    data = {"full_name": "Ada", "format": "docx"}
+    assert _option({"format": ["pdf"]}, data, "format", FORMATS, "docx") == "pdf"
+    assert data == {"full_name": "Ada"}
+
+
+def test_the_body_option_is_used_without_a_query():
+    data = {"format": "PDF"}
+    assert _option({}, data, "format", FORMATS, "docx") == "pdf"
+    assert data == {}
+
+
+def test_a_render_failure_is_a_json_500_with_cors_headers(monkeypatch):
+    def broken_render(structured_cv, fmt, data):
+        raise RuntimeError("renderer exploded")
+
+    monkeypatch.setattr(asgi.wsgi, "render_result", broken_render)
+    monkeypatch.setattr(asgi.wsgi, "RATE_LIMITER", None)
+
+    async def post():
+        transport = httpx.ASGITransport(app=asgi.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.post("/api/process-cv?mode=fast", json={"full_name": "Ada Lovelace"})
+
+    response = asyncio.run(post())
+    assert response.status_code == 500
+    assert response.json() == {"error": "renderer exploded"}
+    assert response.headers["access-control-allow-origin"] == "*"
@@ -0,0 +1,102 @@
+import asyncio
+import json
+import threading
+import types
+
+from backend_1 import AsyncCVProcessor, CVProcessor
+from llm_cache import LLMResultCache
+
+RAW_CV = {
+    "full_name": "ada lovelace",
+    "email": "ada@example.com",
+    "job_title": "Engineer",
+    "technical_skills": ["Python"],
+    "work_experience": [{"position": "Engineer", "company": "Analytical Engines",
+                         "start_date": "January 2020", "end_date": "Present",
+                         "responsibilities": ["Wrote the first program"]}],
+}
+
+
+def test_async_processor_has_only_the_paths_it_implements():
+    for name in ("stream_structured_cv", "process_changes", "run", "load_and_clean"):
+        assert not hasattr(AsyncCVProcessor, name)
+        assert hasattr(CVProcessor, name)
+
+
+def test_both_processors_structure_a_cv_locally_alike():
+    sync = CVProcessor(client=object(), mode="fast").process(dict(RAW_CV))
+    processor = AsyncCVProcessor(client=object(), mode="fast")
+    assert asyncio.run(processor.process(dict(RAW_CV))) == sync
+    assert sync["full_name"] == "Ada Lovelace"
+
+
+class _AsyncCompletions:
+    def __init__(self):
+        self.calls = 0
+
+    async def create(self, **kwargs):
+        self.calls += 1
+        message = types.SimpleNamespace(content=json.dumps(RAW_CV))
+        return types.SimpleNamespace(choices=[types.SimpleNamespace(message=message)], usage=None)
+
+
+class _ThreadRecordingCache(LLMResultCache):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.threads = []
+
+    def get(self, key):
+        self.threads.append(threading.get_ident())
+        return super().get(key)
+
+    def set(self, key, value):
+        self.threads.append(threading.get_ident())
+        return super().set(key, value)
+
+
+def test_the_async_processor_reads_and_writes_the_sqlite_cache_off_the_loop(tmp_path, monkeypatch):
+    monkeypatch.setenv("CV_REPAIR_REASK", "0")
+    completions = _AsyncCompletions()
+    cache = _ThreadRecordingCache(db_path=str(tmp_path / "cache.db"), secret="secret")
+    processor = AsyncCVProcessor(client=types.SimpleNamespace(chat=types.SimpleNamespace(completions=completions)),
+                                 cache=cache, mode="llm")
+
+    async def process_twice():
+        loop_thread = threading.get_ident()
+        first = await processor.process(dict(RAW_CV))
+        second = await processor.process(dict(RAW_CV))
+        return loop_thread, first, second
+
+    loop_thread, first, second = asyncio.run(process_twice())
+    assert first == second and completions.calls == 1
+    assert cache.threads and loop_thread not in cache.threads
+
+
+class _StreamingCompletions:
+    def __init__(self, answer, chunk_size=11):
+        self.text = "```json\n" + json.dumps(answer) + "\n```"
+        self.chunk_size = chunk_size
+        self.consumed = 0
+
+    def create(self, **kwargs):
+        assert kwargs["stream"]
+
+        def events():
+            for start in range(0, len(self.text), self.chunk_size):
+                self.consumed = start + self.chunk_size
+                delta = types.SimpleNamespace(content=self.text[start:start + self.chunk_size])
+                yield types.SimpleNamespace(choices=[types.SimpleNamespace(delta=delta)], usage=None)
+        return events()
+
+
+def test_streamed_fields_arrive_before_the_answer_is_complete(monkeypatch):
+    monkeypatch.setenv("CV_REPAIR_REASK", "0")
+    completions = _StreamingCompletions(RAW_CV)
+    processor = CVProcessor(client=types.SimpleNamespace(chat=types.SimpleNamespace(completions=completions)),
+                            mode="llm")
+    seen = []
+    for key, value in processor.stream_structured_cv(processor.clean(dict(RAW_CV))):
+        seen.append((key, completions.consumed < len(completions.text)))
+    keys = [key for key, _ in seen]
+    assert keys[:len(RAW_CV)] == list(RAW_CV)
+    assert seen[0][1]  # the first field came out while the model was still writing
@@ -0,0 +1,53 @@
+import io
+import json
+import os
+import subprocess
+import sys
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+from batch import MANIFEST_NAME, BatchRunner
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class EchoProcessor:
+    def process(self, data):
+        return {"full_name": data.get("full_name", "")}
+
+
+def test_a_line_that_is_not_utf8_only_fails_itself():
+    lines = [
+        json.dumps({"full_name": "Ada"}).encode("utf-8") + b"\n",
+        b'{"full_name": "\xff\xfe"}\n',
+        b"[1, 2]\n",
+    ]
+    with ThreadPoolExecutor(2) as render_pool:
+        runner = BatchRunner(EchoProcessor(), llm_concurrency=2, render_pool=render_pool)
+        archive = zipfile.ZipFile(io.BytesIO(b"".join(runner.iter_zip(lines))))
+    manifest = [json.loads(line) for line in archive.read(MANIFEST_NAME).decode("utf-8").splitlines()]
+    statuses = {entry["line"]: entry for entry in manifest}
+    assert statuses[1]["status"] == "ok"
+    assert statuses[2]["status"] == "error" and "UTF-8" in statuses[2]["error"]
+    assert statuses[3]["status"] == "error"
+
+
+def test_the_cli_records_a_bad_line_and_runs_fast_mode_without_an_api_key(tmp_path):
+    source = tmp_path / "cvs.jsonl"
+    source.write_bytes(
+        json.dumps({"full_name": "ada lovelace", "job_title": "Engineer"}).encode("utf-8") + b"\n"
+        + b'{"full_name": "\xc3\x28"}\n'
+        + json.dumps({"full_name": "grace hopper", "job_title": "Admiral"}).encode("utf-8") + b"\n"
+    )
+    output = tmp_path / "cvs.zip"
+    env = {key: value for key, value in os.environ.items() if key != "OPENAI_API_KEY"}
+    completed = subprocess.run(
+        [sys.executable, os.path.join(ROOT, "batch.py"), str(source), str(output), "--mode", "fast",
+         "--render-workers", "1"],
+        cwd=ROOT, env=env, capture_output=True, text=True, timeout=120,
+    )
+    assert completed.returncode == 0, completed.stderr
+    archive = zipfile.ZipFile(output)
+    manifest = [json.loads(line) for line in archive.read(MANIFEST_NAME).decode("utf-8").splitlines()]
+    assert [entry["status"] for entry in sorted(manifest, key=lambda entry: entry["line"])] == ["ok", "error", "ok"]
+    assert "UTF-8" in manifest[[entry["line"] for entry in manifest].index(2)]["error"]
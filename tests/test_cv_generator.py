@@ -0,0 +1,61 @@
+import io
+
+from docx import Document
+
+import cv_generator
+from cv_generator import CVGenerator, STYLE_BULLET, STYLE_NAME, STYLE_SECTION_TITLE
+
+CV = {
+    "full_name": "Ada Lovelace",
+    "job_title": "Engineer",
+    "email": "ada@example.com",
+    "professional_summary": "Wrote the first published program.",
+    "work_experience": [{
+        "job_title": "Analyst",
+        "company": "Analytical Engine",
+        "start_date": "1842",
+        "end_date": "1843",
+        "responsibilities": ["Translated the Menabrea paper", "Added the notes"],
+    }],
+    "technical_skills": ["Mathematics"],
+}
+
+
+def test_the_base_template_is_built_once_per_process(monkeypatch):
+    builds = []
+    real_build = cv_generator._build_base_template
+
+    def counting_build():
+        builds.append(1)
+        return real_build()
+
+    monkeypatch.setattr(cv_generator, "_template_bytes", None)
+    monkeypatch.setattr(cv_generator, "_build_base_template", counting_build)
+
+    CVGenerator().render(CV)
+    CVGenerator().render(CV)
+
+    assert builds == [1]
+    assert cv_generator.get_base_template() is cv_generator.get_base_template()
+
+
+def test_the_base_template_carries_only_the_cv_styles():
+    doc = Document(io.BytesIO(cv_generator.get_base_template()))
+    names = {style.name for style in doc.styles}
+
+    assert {STYLE_NAME, STYLE_SECTION_TITLE, STYLE_BULLET} <= names
+    # the default template's long tail of built-in styles is pruned
+    assert "Heading 9" not in names and "Intense Quote" not in names
+    assert doc.paragraphs == []
+
+
+def test_renders_reference_named_styles_and_do_not_share_state():
+    first = Document(io.BytesIO(CVGenerator().render(CV)))
+    second = Document(io.BytesIO(CVGenerator().render(CV)))
+
+    assert [p.text for p in first.paragraphs] == [p.text for p in second.paragraphs]
+    by_text = {p.text: p.style.name for p in first.paragraphs}
+    assert by_text["ADA LOVELACE"] == STYLE_NAME
+    assert by_text["Translated the Menabrea paper"] == STYLE_BULLET
+    # a render edits its own copy, never the cached template
+    assert Document(io.BytesIO(cv_generator.get_base_template())).paragraphs == []
@@ -0,0 +1,96 @@
+import pytest
+
+from cv_repair import RepairReport, SCHEMA_KEYS, fields_with_input, parse_json_object, repair_structured_cv
+
+
+def codes(report):
+    return [code for code, _ in report.fixes]
+
+
+def test_a_clean_answer_needs_no_fixes_except_missing_keys():
+    cv, report = repair_structured_cv('{"full_name": "Ada", "technical_skills": ["Python"]}')
+
+    assert cv["full_name"] == "Ada" and cv["technical_skills"] == ["Python"]
+    assert report.fixes == []
+    assert report.present == ["full_name", "technical_skills"]
+    assert set(report.missing) == set(SCHEMA_KEYS) - {"full_name", "technical_skills"}
+    assert cv["work_experience"] == [] and cv["email"] == ""
+
+
+def test_fences_prose_and_trailing_commas_are_repaired():
+    content = 'Here you go:\n```json\n{"full_name": "Ada", "remote": true, "soft_skills": ["Calm", "Kind", ],}\n```'
+
+    cv, report = repair_structured_cv(content)
+
+    assert cv["soft_skills"] == ["Calm", "Kind"]
+    assert "prose" not in codes(report)  # the fence already isolates the object
+    assert "trailing_comma" in codes(report)
+
+
+@pytest.mark.parametrize("content, expected", [
+    ('{"full_name": "Ada", "email": "ada@exa', {"full_name": "Ada", "email": "ada@exa"}),
+    ('{"full_name": "Ada", "technical_skills": ["Py', {"full_name": "Ada", "technical_skills": ["Py"]}),
+    ('{"full_name": "Ada", "languages": [{"name": "French", "profi',
+     {"full_name": "Ada", "languages": [{"name": "French"}]}),
+])
+def test_truncated_answers_are_closed(content, expected):
+    report = RepairReport()
+
+    value = parse_json_object(content, report)
+
+    assert value == expected
+    assert report.truncated
+
+
+def test_the_cut_off_member_is_reported_incomplete():
+    _, report = repair_structured_cv('{"full_name": "Ada", "professional_summary": "Wrote the fir')
+
+    assert report.incomplete == ["professional_summary"]
+    assert "incomplete: professional_summary" in report.summary()
+
+
+def test_python_literals_are_accepted():
+    cv, report = repair_structured_cv("{'full_name': 'Ada', 'technical_skills': ['Python'], 'phone': None}")
+
+    assert cv["full_name"] == "Ada" and cv["phone"] == ""
+    assert codes(report) == ["python_literal"]
+
+
+def test_no_json_gives_an_empty_cv_without_raising():
+    cv, report = repair_structured_cv("Sorry, I cannot help with that.")
+
+    assert cv == {key: "" if isinstance(cv[key], str) else [] for key in SCHEMA_KEYS}
+    assert codes(report) == ["no_json"]
+
+
+def test_aliases_and_types_are_coerced_to_the_schema():
+    content = """{"cv": {
+        "name": "Ada",
+        "skills_technical": null,
+        "technical_skills": "Python, SQL; Rust",
+        "summary": ["Mathematician.", "Programmer."],
+        "languages": ["French (fluent)", "German: basic"],
+        "work_experience": {"title": "Analyst", "employer": "Engine Co",
+                            "responsibilities": "- Wrote notes\\n- Fixed bugs", "team": "R&D"},
+        "projects": [{"name": "", "description": ""}, 42]
+    }}"""
+
+    cv, report = repair_structured_cv(content)
+
+    assert cv["full_name"] == "Ada"
+    assert cv["technical_skills"] == ["Python", "SQL", "Rust"]
+    assert cv["professional_summary"] == "Mathematician. Programmer."
+    assert cv["languages"] == [{"name": "French", "proficiency": "fluent"},
+                               {"name": "German", "proficiency": "basic"}]
+    job, = cv["work_experience"]
+    assert job["responsibilities"] == ["Wrote notes", "Fixed bugs"]
+    assert job["team"] == "R&D"  # unknown item fields are kept
+    assert cv["projects"] == []
+    assert {"wrapper", "key", "type", "empty_item"} <= set(codes(report))
+
+
+def test_fields_with_input_maps_aliases_and_skips_empty_values():
+    raw = {"name": "Ada", "summary": "", "skills": [], "work_experience": [{"company": "X"}]}
+
+    assert fields_with_input(raw, ["full_name", "professional_summary", "work_experience"]) == \
+        ["full_name", "work_experience"]
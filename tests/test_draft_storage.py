@@ -0,0 +1,116 @@
+import json
+import os
+import shutil
+import subprocess
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+NODE = shutil.which("node")
+
+pytestmark = pytest.mark.skipif(NODE is None, reason="needs node")
+
+# Runs the DRAFT STORAGE section of app.js in Node, with a stand-in localStorage and no IndexedDB
+_HARNESS = r"""
+const fs = require('fs');
+const vm = require('vm');
+
+const source = fs.readFileSync(process.argv[1], 'utf8');
+const start = source.indexOf('// ==================== DRAFT STORAGE');
+const section = source.slice(start, source.indexOf('function escapeHtml(', start));
+
+const items = new Map();
+const localStorage = {
+  get length() { return items.size; },
+  key: (i) => Array.from(items.keys())[i],
+  getItem: (key) => items.has(key) ? items.get(key) : null,
+  setItem: (key, value) => { items.set(key, String(value)); },
+  removeItem: (key) => { items.delete(key); },
+};
+const context = vm.createContext({
+  console, JSON, Map, Set, Promise, Date, Math, setTimeout, clearTimeout, localStorage,
+  indexedDB: { open: () => { throw new Error('IndexedDB is not available'); } },
+  document: { addEventListener: () => {} },
+  window: { addEventListener: () => {} },
+});
+vm.runInContext(section, context);
+const run = (code) => vm.runInContext(code, context);
+const stored = () => Object.fromEntries(Array.from(items).filter(([key]) => key.startsWith('cvDraft:')));
+
+(async () => {
+  const out = {};
+  // a draft saved whole by an older version
+  localStorage.setItem('personalInfo', JSON.stringify({ fullName: 'Ada' }));
+  localStorage.setItem('work', JSON.stringify([{ company: 'A' }, { company: 'B' }]));
+  await run('loadDraft()');
+  run('flushDraft()');
+  out.migrated = { legacyLeft: localStorage.getItem('work'), stored: stored(), work: run("loadData('work')") };
+
+  // a fresh page load reads the records back
+  run('draft.cache.clear(); draft.written.clear()');
+  await run('loadDraft()');
+  out.reloaded = { personalInfo: run("loadData('personalInfo')"), work: run("loadData('work')") };
+
+  // only changed records are written
+  run(`var writes = [];
+       draft.backend = { write: async (puts, deletes) => { writes.push({ puts: puts.map(p => p[0]), deletes }); },
+                         clear: async () => {} };`);
+  const work = run("loadData('work')");
+  const [first, second] = work;
+  run(`saveData('work', ${JSON.stringify([{ ...first, company: 'A2' }, second])})`);
+  out.timerSet = run('draft.timer !== null');
+  run('flushDraft()');
+  run(`saveData('work', ${JSON.stringify([{ ...first, company: 'A2' }])})`);
+  run('flushDraft()');
+  run(`saveData('personalInfo', { fullName: 'Ada' })`);
+  run('flushDraft()');
+  out.writes = run('writes');
+  out.ids = [first.id, second.id];
+
+  // clearing the form clears the stored draft too
+  run('draft.backend = localStorageBackend');
+  run('clearDraft()');
+  await new Promise(resolve => setTimeout(resolve, 0));
+  out.cleared = { stored: stored(), personalInfo: run("loadData('personalInfo')") };
+  console.log(JSON.stringify(out));
+})().catch(error => { console.error(error); process.exit(1); });
+"""
+
+
+@pytest.fixture(scope="module")
+def result():
+    output = subprocess.run([NODE, "-e", _HARNESS, os.path.join(ROOT, "app.js")],
+                            capture_output=True, text=True, check=True, timeout=60).stdout
+    return json.loads(output)
+
+
+def test_a_legacy_draft_is_moved_over_one_record_per_block(result):
+    migrated = result["migrated"]
+    ids = [item["id"] for item in migrated["work"]]
+
+    assert migrated["legacyLeft"] is None
+    assert [item["company"] for item in migrated["work"]] == ["A", "B"]
+    assert len(set(ids)) == 2
+    assert json.loads(migrated["stored"]["cvDraft:work"]) == {"order": ids}
+    assert json.loads(migrated["stored"][f"cvDraft:work:{ids[1]}"]) == {"company": "B", "id": ids[1]}
+    assert json.loads(migrated["stored"]["cvDraft:personalInfo"]) == {"fullName": "Ada"}
+
+
+def test_the_draft_is_read_back_in_block_order(result):
+    assert result["reloaded"]["personalInfo"] == {"fullName": "Ada"}
+    assert [item["company"] for item in result["reloaded"]["work"]] == ["A", "B"]
+
+
+def test_only_changed_blocks_are_written(result):
+    first, second = result["ids"]
+
+    assert result["timerSet"]
+    # an edited block leaves the order record alone; re-saving an unchanged value writes nothing
+    assert result["writes"] == [
+        {"puts": [f"work:{first}"], "deletes": []},
+        {"puts": ["work"], "deletes": [f"work:{second}"]},
+    ]
+
+
+def test_clearing_the_form_clears_the_stored_draft(result):
+    assert result["cleared"] == {"stored": {}, "personalInfo": None}
@@ -0,0 +1,67 @@
+import os
+import sys
+
+import pytest
+from docx import Document
+
+from cv_generator import CVGenerator
+from fast_docx import FastCVGenerator, compare_renderers, describe_docx
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+from synthetic_cv import PROFILES, make_structured_cv  # noqa: E402
+
+
+def fast_paragraphs(json_data):
+    return describe_docx(FastCVGenerator().generate_cv_bytes(json_data).getvalue())
+
+
+def all_text(paragraphs):
+    return "\n".join("".join(text for text, _ in runs) for _, runs in paragraphs)
+
+
+@pytest.mark.parametrize("profile", sorted(PROFILES))
+def test_same_text_and_structure_as_python_docx(profile):
+    assert compare_renderers(make_structured_cv(profile)) == []
+
+
+def test_xml_special_characters_are_escaped():
+    cv = make_structured_cv("small")
+    cv["full_name"] = 'Ada & "Bob" <Lovelace>'
+    cv["professional_summary"] = "R&D lead, <b>not bold</b>, 'quoted' & \"double\" > all"
+    cv["work_experience"][0]["responsibilities"] = ["Cut costs by >30% & <10 ms p99"]
+
+    assert compare_renderers(cv) == []
+    text = all_text(fast_paragraphs(cv))
+    assert "R&D lead, <b>not bold</b>, 'quoted' & \"double\" > all" in text
+    # the package opens in python-docx too
+    data = FastCVGenerator().generate_cv_bytes(cv)
+    assert any("Cut costs by >30% & <10 ms p99" in p.text for p in Document(data).paragraphs)
+
+
+def test_tabs_and_line_breaks_match_python_docx():
+    cv = make_structured_cv("small")
+    cv["professional_summary"] = "First line\nsecond\tcolumn\r\nthird"
+    cv["projects"][0]["description"] = "a\tb\tc"
+
+    assert compare_renderers(cv) == []
+
+
+def test_control_characters_are_dropped():
+    # python-docx refuses these outright; the fast renderer leaves them out
+    cv = make_structured_cv("small")
+    cv["professional_summary"] = "Summary with\x00 control\x01 characters\x0b removed\x1f"
+    expected = dict(cv, professional_summary="Summary with control characters removed")
+
+    text = all_text(fast_paragraphs(cv))
+    assert not any(ch in text for ch in "\x00\x01\x0b\x1f")
+    assert text == all_text(describe_docx(CVGenerator().generate_cv_bytes(expected).getvalue()))
+
+
+@pytest.mark.parametrize("json_data", [
+    {"full_name": "Only A Name"},
+    {"full_name": "Empty Lists", "work_experience": [], "projects": [], "technical_skills": [],
+     "soft_skills": [], "languages": [], "education": [], "certificates": []},
+    {"full_name": "Empty Strings", "professional_summary": "", "email": "", "phone": ""},
+])
+def test_empty_sections_match_python_docx(json_data):
+    assert compare_renderers(json_data) == []
@@ -0,0 +1,81 @@
+import threading
+import time
+
+import pytest
+
+from jobs import JobManager, JobQueueFullError, JobStore
+
+
+def test_a_file_job_store_needs_a_secret(tmp_path):
+    with pytest.raises(ValueError, match="CV_JOBS_SECRET"):
+        JobStore(db_path=str(tmp_path / "jobs.db"))
+
+
+def test_finished_files_are_encrypted_on_disk(tmp_path):
+    store = JobStore(db_path=str(tmp_path / "jobs.db"), secret="secret")
+    store.create("job")
+    store.mark_done("job", b"PLAIN CV BYTES", "cv.docx", "application/octet-stream")
+    assert b"PLAIN CV BYTES" not in (tmp_path / "jobs.db").read_bytes()
+    assert store.get_result("job") == (b"PLAIN CV BYTES", "cv.docx", "application/octet-stream")
+
+
+def _wait_for(manager, job_id, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = manager.status(job_id)
+        if job["status"] in ("done", "failed"):
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"job {job_id} did not finish")
+
+
+def test_a_job_runs_in_the_background_and_keeps_its_progress_and_file():
+    started = threading.Event()
+    release = threading.Event()
+
+    def pipeline(payload, progress):
+        started.set()
+        progress({"type": "section", "section": "header"})
+        release.wait(5)
+        return payload["name"].encode("utf-8"), "cv.docx", "application/octet-stream", "token"
+
+    manager = JobManager(pipeline, max_workers=1)
+    job_id = manager.submit({"name": "Ada"})
+    assert started.wait(5)
+    assert manager.status(job_id)["status"] == "running"
+    assert manager.result(job_id) is None
+    release.set()
+
+    job = _wait_for(manager, job_id)
+    assert job["status"] == "done" and job["result_token"] == "token"
+    assert manager.result(job_id) == (b"Ada", "cv.docx", "application/octet-stream")
+    assert manager.progress(job_id) == [{"type": "section", "section": "header"}]
+    assert manager.progress(job_id, since=1) == []
+
+
+def test_a_failed_job_keeps_its_error():
+    def pipeline(payload, progress):
+        raise RuntimeError("model unavailable")
+
+    manager = JobManager(pipeline)
+    job = _wait_for(manager, manager.submit({}))
+    assert job["status"] == "failed" and job["error"] == "model unavailable"
+
+
+def test_submissions_past_max_pending_are_refused():
+    release = threading.Event()
+    manager = JobManager(lambda payload, progress: release.wait(5) and (b"", "cv", "x"), max_workers=1, max_pending=1)
+    job_id = manager.submit({})
+    with pytest.raises(JobQueueFullError):
+        manager.submit({})
+    release.set()
+    _wait_for(manager, job_id)
+    manager.submit({})
+
+
+def test_jobs_expire_after_the_ttl():
+    manager = JobManager(lambda payload, progress: (b"cv", "cv.docx", "x"), ttl_seconds=60)
+    job_id = manager.submit({})
+    _wait_for(manager, job_id)
+    manager.ttl_seconds = 0
+    assert manager.status(job_id) is None
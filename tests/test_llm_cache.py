@@ -0,0 +1,43 @@
+import pytest
+
+from llm_cache import LLMResultCache, make_cache_key
+
+PROMPT = "Structure this CV."
+
+
+def test_the_key_ignores_whitespace_and_key_order_but_not_the_prompt():
+    key = make_cache_key({"full_name": "Ada  Lovelace", "email": "ada@example.com"}, PROMPT, "gpt")
+    assert make_cache_key({"email": "ada@example.com", "full_name": "Ada Lovelace "}, PROMPT, "gpt") == key
+    assert make_cache_key({"full_name": "Ada Lovelace", "email": "ada@example.com"}, PROMPT + "!", "gpt") != key
+    assert make_cache_key({"full_name": "Ada Lovelace", "email": "ada@example.com"}, PROMPT, "other") != key
+
+
+def test_memory_hits_misses_and_expiry():
+    cache = LLMResultCache(max_entries=2, ttl_seconds=60)
+    assert cache.get("a") is None
+    cache.set("a", '{"full_name": "Ada"}')
+    assert cache.get("a") == '{"full_name": "Ada"}'
+    cache.set("b", "{}")
+    cache.set("c", "{}")  # evicts "a", the least recently used
+    assert cache.get("a") is None
+    stats = cache.stats()
+    assert (stats["memory_hits"], stats["misses"], stats["memory_entries"]) == (1, 2, 2)
+
+    cache.ttl_seconds = 0
+    assert cache.get("b") is None
+
+
+def test_the_sqlite_tier_needs_a_secret(tmp_path):
+    with pytest.raises(ValueError, match="CV_CACHE_SECRET"):
+        LLMResultCache(db_path=str(tmp_path / "cache.db"))
+
+
+def test_the_sqlite_tier_is_shared_and_encrypted(tmp_path):
+    path = str(tmp_path / "cache.db")
+    LLMResultCache(db_path=path, secret="one").set("key", '{"full_name": "Ada Lovelace"}')
+    assert b"Ada Lovelace" not in (tmp_path / "cache.db").read_bytes()
+
+    other_worker = LLMResultCache(db_path=path, secret="one")
+    assert other_worker.get("key") == '{"full_name": "Ada Lovelace"}'
+    assert other_worker.stats()["disk_hits"] == 1
+    assert LLMResultCache(db_path=path, secret="rotated").get("key") is None
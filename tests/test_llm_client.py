@@ -0,0 +1,42 @@
+import asyncio
+
+import llm_client
+
+
+async def _client():
+    return llm_client.get_async_client("key", "http://localhost:1")
+
+
+def test_async_clients_are_shared_per_loop_and_dropped_with_it():
+    loop = asyncio.new_event_loop()
+    first = loop.run_until_complete(_client())
+    assert loop.run_until_complete(_client()) is first
+    loop.close()
+
+    other = asyncio.run(_client())
+    assert other is not first
+    assert loop not in llm_client._async_clients  # closed loops are pruned on the next lookup
+
+
+def test_one_sync_client_per_key_and_base_url():
+    client = llm_client.get_client("key", "http://localhost:1")
+    assert llm_client.get_client("key", "http://localhost:1") is client
+    assert llm_client.get_client("other-key", "http://localhost:1") is not client
+
+
+def test_the_system_prompt_is_reloaded_only_when_the_file_changes(tmp_path):
+    path = tmp_path / "prompt.txt"
+    path.write_text("first")
+    prompt = llm_client.SystemPrompt(str(path), check_interval=0)
+    assert prompt.text == "first"
+
+    path.write_text("second, longer")
+    assert prompt.text == "second, longer"
+    path.unlink()
+    assert prompt.text == "second, longer"  # the last good prompt stays in use
+
+
+def test_the_system_prompt_is_shared_per_path(tmp_path):
+    path = tmp_path / "prompt.txt"
+    path.write_text("shared")
+    assert llm_client.get_system_prompt(str(path)) is llm_client.get_system_prompt(str(path))
@@ -0,0 +1,117 @@
+import json
+import re
+import types
+
+import pytest
+
+from backend_1 import CVProcessor
+from local_structurer import fields_to_polish, normalize_date, normalize_url, polish_scores, structure_locally
+
+CLEAN_CV = {
+    "full_name": "ada lovelace",
+    "job_title": "SOFTWARE ENGINEER",
+    "email": "MAILTO:Ada@Example.com",
+    "linkedin": "linkedin.com/in/ada",
+    "professional_summary": "Engineer with ten years of experience in payment systems",
+    "technical_skills": ["Python", "python", "SQL."],
+    "soft_skills": ["teamwork"],
+    "work_experience": [{"position": "senior engineer", "company": "Engine Co", "start_date": "jan 2020",
+                         "end_date": "now", "responsibilities": ["Built the billing API.", "cut costs by 30%."]}],
+    "projects": [{"name": "Notes", "description": "a note taker", "Project_Link": "github.com/ada/notes"}],
+}
+MESSY_SUMMARY = "i am a hard worker and i did lots of stuff, definately gonna be awesome!!"
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("jan 2020", "January 2020"),
+    ("Sept. 2019", "September 2019"),
+    ("03/2021", "March 2021"),
+    ("2021-11", "November 2021"),
+    ("currently", "Present"),
+    ("13/2021", "13/2021"),
+    ("Summer 2020", "Summer 2020"),
+    ("", ""),
+])
+def test_normalize_date(text, expected):
+    assert normalize_date(text) == expected
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("github.com/ada", "https://github.com/ada"),
+    ("http://ada.dev", "http://ada.dev"),
+    ("not a link", "not a link"),
+    ("", ""),
+])
+def test_normalize_url(text, expected):
+    assert normalize_url(text) == expected
+
+
+def test_structure_locally_cleans_up_case_dates_links_and_duplicates():
+    cv, _ = structure_locally(CLEAN_CV)
+
+    assert cv["full_name"] == "Ada Lovelace"
+    assert cv["job_title"] == "Software Engineer"
+    assert cv["email"] == "ada@example.com"
+    assert cv["linkedin"] == "https://linkedin.com/in/ada"
+    assert cv["professional_summary"].endswith("systems.")
+    assert cv["technical_skills"] == ["Python", "SQL"]
+    assert cv["soft_skills"] == ["Teamwork"]
+    job, = cv["work_experience"]
+    assert (job["position"], job["start_date"], job["end_date"]) == ("Senior Engineer", "January 2020", "Present")
+    assert job["responsibilities"] == ["Built the billing API.", "Cut costs by 30%."]
+    assert cv["projects"][0]["Project_Link"] == ["https://github.com/ada/notes"]
+    assert cv["education"] == [] and cv["phone"] == ""
+
+
+def test_polish_scores_flag_only_the_text_that_needs_rewriting():
+    cv, _ = structure_locally(dict(CLEAN_CV, professional_summary=MESSY_SUMMARY))
+
+    scores = polish_scores(cv)
+
+    summary_score, signals = scores["professional_summary"]
+    assert summary_score == 1.0
+    assert {"misspelling", "informal", "lowercase_i", "repeated_punctuation"} <= set(signals)
+    assert scores["work_experience"] == (0, {})
+    assert fields_to_polish(scores) == ["professional_summary"]
+    assert fields_to_polish(scores, threshold=1.1) == []
+
+
+class _PolishCompletions:
+    def __init__(self):
+        self.asked = []
+
+    def create(self, **kwargs):
+        user = kwargs["messages"][-1]["content"]
+        keys = re.search(r"ONLY these keys: (.*)$", user).group(1).split(", ")
+        self.asked.append(keys)
+        answer = {"professional_summary": "Dedicated engineer with a record of delivery."}
+        message = types.SimpleNamespace(content=json.dumps({key: answer[key] for key in keys}))
+        return types.SimpleNamespace(choices=[types.SimpleNamespace(message=message)], usage=None)
+
+
+def _processor(mode):
+    completions = _PolishCompletions()
+    client = types.SimpleNamespace(chat=types.SimpleNamespace(completions=completions))
+    return CVProcessor(client=client, mode=mode), completions
+
+
+def test_auto_mode_sends_only_the_fields_that_score_high():
+    processor, completions = _processor("auto")
+
+    clean = processor.process(dict(CLEAN_CV))
+    assert completions.asked == []
+    assert clean["full_name"] == "Ada Lovelace"
+
+    messy = processor.process(dict(CLEAN_CV, professional_summary=MESSY_SUMMARY))
+    assert completions.asked == [["professional_summary"]]
+    assert messy["professional_summary"] == "Dedicated engineer with a record of delivery."
+    assert messy["work_experience"] == clean["work_experience"]
+
+
+def test_fast_mode_never_calls_the_model():
+    processor, completions = _processor("fast")
+
+    cv = processor.process(dict(CLEAN_CV, professional_summary=MESSY_SUMMARY))
+
+    assert completions.asked == []
+    assert cv["professional_summary"].startswith("I am a hard worker")
@@ -0,0 +1,113 @@
+import json
+import logging
+import os
+import queue
+import subprocess
+import sys
+
+import pytest
+
+import log_setup
+import metrics
+from log_setup import JsonFormatter, RateLimitFilter, redact
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _record(msg="Rendered %s sections", args=(3,), level=logging.INFO, name="cv_generator"):
+    return logging.LogRecord(name, level, __file__, 1, msg, args, None)
+
+
+def test_redact_replaces_personal_data():
+    text = "ada.l+cv@example.co.uk called +44 (20) 7946-0958, see linkedin.com/in/ada and github.com/ada"
+
+    assert redact(text) == "<email> called <phone>, see <url> and <url>"
+    assert redact("Rendered 8 sections in 12.5 ms (version 2024.1)") == \
+        "Rendered 8 sections in 12.5 ms (version 2024.1)"
+
+
+def test_json_formatter_writes_one_object_per_record():
+    record = _record()
+    record.trace_id = "trace-1"
+    record.suppressed = 4
+
+    entry = json.loads(JsonFormatter().format(record))
+
+    assert entry["msg"] == "Rendered 3 sections"
+    assert (entry["level"], entry["logger"], entry["trace_id"], entry["suppressed"]) == \
+        ("INFO", "cv_generator", "trace-1", 4)
+    assert entry["ts"].endswith("Z")
+
+
+def test_the_rate_limit_samples_and_reports_suppressed_records(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(log_setup.time, "monotonic", lambda: now[0])
+    limiter = RateLimitFilter(limit=2, window=60, sample=3)
+
+    passed = []
+    for _ in range(8):
+        record = _record()
+        if limiter.filter(record):
+            passed.append(record.suppressed)
+
+    # 2 within the limit, then every 3rd: the 5th and 8th, carrying what was dropped before them
+    assert passed == [0, 0, 2, 2]
+    assert limiter.filter(_record(level=logging.ERROR))
+    assert limiter.filter(_record(msg="Another template %s"))
+
+    now[0] += 60
+    record = _record()
+    assert limiter.filter(record) and record.suppressed == 0
+
+
+def test_the_queue_handler_prepares_records_in_the_calling_thread():
+    handler = log_setup._QueueHandler(queue.Queue(1))
+    metrics.start_trace("trace-2")
+    try:
+        raise ValueError("bad input from ada@example.com")
+    except ValueError:
+        record = _record(msg="Failed for %s", args=("ada@example.com",))
+        record.exc_info = sys.exc_info()
+
+    handler.emit(record)
+    prepared = handler.queue.get_nowait()
+
+    assert prepared.msg == "Failed for <email>" and prepared.args is None
+    assert prepared.trace_id == "trace-2"
+    assert "<email>" in prepared.exc_text and "ada@" not in prepared.exc_text
+    assert prepared.exc_info is None
+
+
+def test_a_full_queue_drops_records_instead_of_blocking():
+    handler = log_setup._QueueHandler(queue.Queue(1))
+    dropped = log_setup.LOG_RECORDS_DROPPED.value(reason="queue_full")
+
+    handler.emit(_record())
+    handler.emit(_record())
+
+    assert handler.queue.qsize() == 1
+    assert log_setup.LOG_RECORDS_DROPPED.value(reason="queue_full") == dropped + 1
+
+
+@pytest.mark.parametrize("fmt", ["json", "text"])
+def test_configure_logging_writes_redacted_lines_from_a_background_thread(fmt):
+    probe = (
+        "import logging, log_setup, metrics\n"
+        "log_setup.configure_logging()\n"
+        "log_setup.configure_logging()\n"
+        "metrics.start_trace('trace-3')\n"
+        "for i in range(5):\n"
+        "    logging.getLogger('app').info('CV for %s', 'ada@example.com')\n"
+        "logging.getLogger('httpx').info('HTTP request')\n"
+    )
+    env = dict(os.environ, CV_LOG_FORMAT=fmt, CV_LOG_RATE_LIMIT="2", CV_LOG_SAMPLE="0")
+
+    lines = subprocess.run([sys.executable, "-c", probe], cwd=ROOT, env=env,
+                           capture_output=True, text=True, check=True, timeout=60).stderr.splitlines()
+
+    assert len(lines) == 2  # rate limited; httpx is at WARNING by default
+    if fmt == "json":
+        entry = json.loads(lines[0])
+        assert (entry["msg"], entry["trace_id"]) == ("CV for <email>", "trace-3")
+    else:
+        assert lines[0].endswith("INFO app [trace-3] CV for <email>")
@@ -0,0 +1,40 @@
+from matching import JobIndex
+
+POSTINGS = [
+    {"id": "backend", "title": "Backend engineer", "skills": ["Python", "PostgreSQL", "Docker"],
+     "description": "Build Flask services running on k8s."},
+    {"id": "frontend", "title": "Frontend engineer", "skills": ["JavaScript", "React", "CSS"],
+     "description": "Build the web app."},
+]
+CV = {
+    "job_title": "Software Engineer",
+    "technical_skills": ["Python", "Kubernetes", "Docker"],
+    "work_experience": [{"position": "Backend developer", "responsibilities": ["Wrote Flask services"]}],
+}
+
+
+def test_the_closest_posting_ranks_first_with_its_keyword_coverage():
+    index = JobIndex()
+    index.add(POSTINGS)
+    best = index.match(CV)[0]
+    assert best["id"] == "backend"
+    assert "python" in best["matched_keywords"] and "docker" in best["matched_keywords"]
+    assert "postgresql" in best["missing_keywords"]
+    assert 0 < best["coverage"] < 1
+
+
+def test_synonyms_count_as_one_term():
+    index = JobIndex()
+    index.add([{"id": "ops", "title": "Platform engineer", "skills": ["k8s"]}])
+    assert index.match({"technical_skills": ["Kubernetes"]})[0]["coverage"] == 1.0
+
+
+def test_postings_are_replaced_and_removed_and_shared_through_sqlite(tmp_path):
+    path = str(tmp_path / "postings.db")
+    writer, reader = JobIndex(db_path=path), JobIndex(db_path=path)
+    writer.add(POSTINGS)
+    assert reader.stats()["postings"] == 2
+    writer.add([{"id": "frontend", "title": "Data analyst", "skills": ["SQL"]}])
+    assert {match["id"] for match in reader.match({"technical_skills": ["SQL"]})} == {"frontend"}
+    assert writer.remove("backend") and not writer.remove("backend")
+    assert len(reader) == 1
@@ -0,0 +1,100 @@
+import logging
+import types
+
+import pytest
+
+import metrics
+
+
+@pytest.fixture
+def registry():
+    return metrics.Registry()
+
+
+def test_counter_and_gauge_exposition(registry):
+    counter = metrics.Counter("t_calls_total", "Calls.", labels=("kind",), registry=registry)
+    counter.inc(kind="a")
+    counter.inc(2, kind="a")
+    counter.inc(kind='quote"d')
+    gauge = metrics.Gauge("t_depth", "Depth.", registry=registry, callback=lambda: 7)
+
+    text = registry.render()
+
+    assert "# TYPE t_calls_total counter" in text
+    assert 't_calls_total{kind="a"} 3' in text
+    assert 't_calls_total{kind="quote\\"d"} 1' in text
+    assert "t_depth 7" in text.splitlines()
+    assert gauge.value() == 7
+
+
+def test_a_failing_gauge_callback_does_not_break_the_scrape(registry):
+    metrics.Gauge("t_broken", "Broken.", registry=registry, callback=lambda: 1 / 0)
+    metrics.Counter("t_after", "After.", registry=registry).inc()
+
+    assert "t_after 1" in registry.render().splitlines()
+
+
+def test_histogram_buckets_are_cumulative(registry):
+    histogram = metrics.Histogram("t_seconds", "Latency.", labels=("stage",), registry=registry,
+                                  buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.7, 5.0):
+        histogram.observe(value, stage="llm")
+
+    lines = registry.render().splitlines()
+
+    assert 't_seconds_bucket{stage="llm",le="0.1"} 1' in lines
+    assert 't_seconds_bucket{stage="llm",le="1.0"} 3' in lines
+    assert 't_seconds_bucket{stage="llm",le="+Inf"} 4' in lines
+    assert 't_seconds_count{stage="llm"} 4' in lines
+    assert histogram.count(stage="llm") == 4
+
+
+def test_stage_times_the_block_and_counts_errors():
+    before = metrics.STAGE_SECONDS.count(stage="t-stage")
+    with metrics.stage("t-stage"):
+        pass
+    with pytest.raises(KeyError):
+        with metrics.stage("t-stage"):
+            raise KeyError("x")
+
+    assert metrics.STAGE_SECONDS.count(stage="t-stage") == before + 2
+    assert metrics.ERRORS.value(stage="t-stage", type="KeyError") == 1
+
+
+def test_record_usage_adds_prompt_and_completion_tokens():
+    prompt = metrics.LLM_TOKENS.value(kind="prompt")
+    completion = metrics.LLM_TOKENS.value(kind="completion")
+
+    metrics.record_usage(types.SimpleNamespace(prompt_tokens=120, completion_tokens=30))
+    metrics.record_usage(None)
+
+    assert metrics.LLM_TOKENS.value(kind="prompt") == prompt + 120
+    assert metrics.LLM_TOKENS.value(kind="completion") == completion + 30
+
+
+def test_trace_ids_keep_well_formed_incoming_ids_only(caplog):
+    assert metrics.start_trace("req-42.a_b") == "req-42.a_b"
+    assert metrics.get_trace_id() == "req-42.a_b"
+
+    fresh = metrics.start_trace("bad id\nwith newline")
+    assert fresh != "bad id\nwith newline" and len(fresh) == 32
+
+    record = logging.LogRecord("t", logging.INFO, __file__, 1, "msg", (), None)
+    metrics.TraceIdFilter().filter(record)
+    assert record.trace_id == fresh
+
+
+def test_metrics_endpoint_reports_request_latency():
+    import app
+
+    client = app.app.test_client()
+    response = client.get("/api/health", headers={"X-Request-ID": "trace-1"})
+    assert response.headers["X-Request-ID"] == "trace-1"
+
+    response = client.get("/api/metrics")
+
+    assert response.status_code == 200
+    assert response.content_type == metrics.CONTENT_TYPE
+    body = response.get_data(as_text=True)
+    assert 'cv_http_request_duration_seconds_count{endpoint="/api/health",method="GET",status="200"}' in body
+    assert "cv_http_requests_in_flight 1" in body.splitlines()
@@ -0,0 +1,80 @@
+import json
+
+from prompt_builder import ELLIPSIS, MIN_SHORTENED_CHARS, compact, estimate_tokens, serialize_cv, shorten
+
+CV = {
+    "projects": [{"name": "Engine", "description": "Notes  on   the\n\n\nengine"}],
+    "full_name": "Ada Lovelace",
+    "phone": "none",
+    "email": "",
+    "technical_skills": ["Python", "", None],
+    "education": [{"degree": "", "institution": ""}],
+}
+
+
+def test_compact_drops_empty_values_and_whitespace_noise():
+    assert compact(CV) == {
+        "projects": [{"name": "Engine", "description": "Notes on the\nengine"}],
+        "full_name": "Ada Lovelace",
+        "technical_skills": ["Python"],
+    }
+
+
+def test_serialize_cv_is_minimal_and_in_schema_order():
+    payload = serialize_cv(CV, budget=0)
+
+    assert payload.text == ('{"full_name":"Ada Lovelace","technical_skills":["Python"],'
+                            '"projects":[{"name":"Engine","description":"Notes on the\\nengine"}]}')
+    assert serialize_cv(dict(reversed(list(CV.items()))), budget=0).text == payload.text
+    assert payload.tokens_saved > 0
+    assert payload.shortened == []
+
+
+def test_estimate_tokens_is_in_the_range_of_a_bpe_tokenizer():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("Python") == 2
+    assert estimate_tokens("2024") == 2
+    sentence = "Led a team of five engineers building the billing platform."
+    assert 10 <= estimate_tokens(sentence) <= 20
+
+
+def test_shorten_prefers_sentence_then_word_boundaries():
+    text = "First sentence here. Second sentence is a lot longer than the first one."
+
+    assert shorten(text, 200) == text
+    assert shorten(text, 40) == "First sentence here." + ELLIPSIS
+    assert shorten("word " * 20, 30) == ("word " * 5).rstrip() + ELLIPSIS
+    assert len(shorten("x" * 100, 30)) <= 30
+
+
+def test_a_cv_over_budget_has_its_longest_fields_shortened_deterministically():
+    long_summary = " ".join(f"Sentence number {i} about the work." for i in range(200))
+    cv = {"full_name": "Ada Lovelace", "professional_summary": long_summary,
+          "technical_skills": ["Python"], "projects": [{"name": "Engine", "description": "Short."}]}
+
+    payload = serialize_cv(cv, budget=300)
+
+    assert payload.tokens <= 300
+    assert payload.shortened == [("professional_summary",)]
+    data = json.loads(payload.text)
+    assert data["professional_summary"].endswith(ELLIPSIS)
+    assert data["projects"] == cv["projects"]
+    assert serialize_cv(cv, budget=300).text == payload.text
+
+
+def test_short_fields_are_never_cut_below_the_minimum():
+    cv = {"technical_skills": ["x" * MIN_SHORTENED_CHARS] * 50}
+
+    payload = serialize_cv(cv, budget=10)
+
+    assert payload.tokens > 10
+    assert payload.shortened == []
+
+
+def test_the_budget_comes_from_the_environment(monkeypatch):
+    cv = {"professional_summary": "A fairly long sentence about the work. " * 100}
+    monkeypatch.setenv("CV_PROMPT_TOKEN_BUDGET", "100")
+    assert serialize_cv(cv).shortened
+
+    monkeypatch.setenv("CV_PROMPT_TOKEN_BUDGET", "0")
+    assert not serialize_cv(cv).shortened
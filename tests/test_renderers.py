@@ -0,0 +1,116 @@
+import io
+import re
+import zipfile
+import zlib
+
+import pytest
+
+import renderers
+from renderers import FORMATS, RenderCache, get_renderer_class, render_cv
+from results import ResultStore
+
+CV = {
+    "full_name": "Ada Lovelace",
+    "job_title": "Engineer",
+    "email": "ada@example.com",
+    "professional_summary": "Wrote the first published program <& notes>.",
+    "work_experience": [{"position": "Analyst", "company": "Engine Co", "start_date": "1842", "end_date": "1843",
+                         "responsibilities": ["Translated the paper", "Added notes A to G"]}],
+    "technical_skills": ["Mathematics", "Python"],
+}
+
+
+def pdf_text(data):
+    """Decompressed page content streams."""
+    streams = re.findall(rb"/FlateDecode >>\nstream\n(.*?)\nendstream", data, re.DOTALL)
+    return b"\n".join(zlib.decompress(stream) for stream in streams).decode("latin-1")
+
+
+def pdf_pages(data):
+    return int(re.search(rb"/Type /Pages /Kids \[[^]]*\] /Count (\d+)", data).group(1))
+
+
+@pytest.mark.parametrize("fmt", FORMATS)
+def test_every_format_carries_the_same_content(fmt):
+    data, extension, mimetype = render_cv(CV, fmt)
+
+    assert extension == "." + fmt
+    assert mimetype == get_renderer_class(fmt).MIMETYPE
+    if fmt == "docx":
+        text = zipfile.ZipFile(io.BytesIO(data)).read("word/document.xml").decode("utf-8")
+        assert "&lt;&amp; notes&gt;" in text
+    elif fmt == "pdf":
+        assert data.startswith(b"%PDF-") and data.rstrip().endswith(b"%%EOF")
+        text = pdf_text(data)
+    else:
+        text = data.decode("utf-8")
+    for expected in ("Translated the paper", "Engine Co", "Mathematics"):
+        assert expected in text
+
+
+def test_text_and_html_layouts():
+    text = render_cv(CV, "txt")[0].decode("utf-8")
+    assert "\nWORK EXPERIENCE\n" in text
+    assert "\n- Translated the paper\n" in text
+
+    page = render_cv(CV, "html")[0].decode("utf-8")
+    assert "<title>Ada Lovelace</title>" in page
+    assert "<li>Translated the paper</li>" in page
+    assert "&lt;&amp; notes&gt;" in page
+
+
+def test_long_pdf_content_wraps_onto_more_pages():
+    long_cv = dict(CV, work_experience=[dict(CV["work_experience"][0], responsibilities=["A long bullet " * 20] * 80)])
+
+    short, long = render_cv(CV, "pdf")[0], render_cv(long_cv, "pdf")[0]
+
+    assert pdf_pages(short) == 1
+    assert pdf_pages(long) > 1
+
+
+def test_unknown_formats_are_refused():
+    with pytest.raises(ValueError, match="Unsupported format 'odt'"):
+        get_renderer_class("odt")
+    assert get_renderer_class("PDF").FORMAT == "pdf"
+
+
+def test_a_second_request_for_the_same_cv_and_format_is_served_from_the_cache(monkeypatch):
+    monkeypatch.setattr(renderers, "RENDER_CACHE", RenderCache(4))
+    renders = []
+    real_render = renderers.TextCVRenderer.render
+    monkeypatch.setattr(renderers.TextCVRenderer, "render", lambda self, cv: renders.append(1) or real_render(self, cv))
+
+    first = render_cv(CV, "txt")
+    second = render_cv(dict(reversed(list(CV.items()))), "txt")
+
+    assert first == second and renders == [1]
+
+
+def test_the_render_cache_evicts_the_least_recently_used():
+    cache = RenderCache(2)
+    cache.set("a", b"1")
+    cache.set("b", b"2")
+    cache.get("a")
+    cache.set("c", b"3")
+
+    assert cache.get("b") is None
+    assert cache.get("a") == b"1" and cache.get("c") == b"3"
+    RenderCache(0).set("a", b"1")  # disabled cache: a no-op
+
+
+def test_a_stored_result_can_be_downloaded_in_another_format(monkeypatch):
+    import app
+
+    results = ResultStore()
+    monkeypatch.setattr(app, "RESULTS", results)
+    token = results.put(CV, "docx", b"docx bytes", "Enhanced_CV.docx",
+                        get_renderer_class("docx").MIMETYPE)
+    client = app.app.test_client()
+
+    response = client.get(f"/api/results/{token}?format=txt")
+    assert response.status_code == 200
+    assert response.headers["Content-Disposition"].endswith("Enhanced_CV.txt")
+    assert b"Translated the paper" in response.data
+
+    assert client.get(f"/api/results/{token}").data == b"docx bytes"
+    assert client.get(f"/api/results/{token}?format=odt").status_code == 400
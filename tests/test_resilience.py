@@ -0,0 +1,107 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from resilience import CircuitBreaker, CircuitOpenError, DeadlineExceededError, ModelCaller
+
+
+def half_open_breaker():
+    breaker = CircuitBreaker(min_calls=1, cooldown=15.0)
+    breaker.state = "open"
+    breaker._opened_at = time.monotonic() - breaker.cooldown  # cooldown just over
+    return breaker
+
+
+def test_expired_deadline_does_not_take_the_probe():
+    breaker = half_open_breaker()
+    caller = ModelCaller(deadline=0, breaker=breaker)
+    with pytest.raises(DeadlineExceededError):
+        caller.call(lambda timeout: "never called")
+    assert not breaker._probing
+
+    answer = ModelCaller(breaker=breaker).call(lambda timeout: "ok")
+    assert answer == "ok"
+    assert breaker.state == "closed"
+
+
+def test_probe_without_an_outcome_frees_the_slot():
+    breaker = half_open_breaker()
+    caller = ModelCaller(breaker=breaker)
+
+    def interrupted(timeout):
+        raise KeyboardInterrupt
+
+    with pytest.raises(KeyboardInterrupt):
+        caller.call(interrupted)
+    assert breaker.state == "half_open" and not breaker._probing
+    assert caller.call(lambda timeout: "ok") == "ok"
+
+
+def test_cancelled_async_probe_frees_the_slot():
+    breaker = half_open_breaker()
+    caller = ModelCaller(breaker=breaker)
+
+    async def hang(timeout):
+        await asyncio.sleep(3600)
+
+    async def answer(timeout):
+        return "ok"
+
+    async def scenario():
+        probe = asyncio.ensure_future(caller.acall(hang))
+        await asyncio.sleep(0.01)
+        assert breaker._probing
+        probe.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await probe
+        assert not breaker._probing
+        return await caller.acall(answer)
+
+    assert asyncio.run(scenario()) == "ok"
+    assert breaker.state == "closed"
+
+
+def test_a_second_call_is_refused_while_the_probe_runs():
+    breaker = half_open_breaker()
+    assert breaker.before_call() is True
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    breaker.record(failed=False)
+    assert breaker.before_call() is False
+
+
+def test_a_slow_call_is_hedged_and_the_first_answer_wins():
+    caller = ModelCaller(pool_size=4)
+    caller.hedge_delay = lambda kind: 0.05
+    answers = iter(["slow", "fast"])
+
+    def create(timeout):
+        answer = next(answers)
+        if answer == "slow":
+            time.sleep(0.5)
+        return answer
+
+    assert caller.call(create) == "fast"
+
+
+def test_a_saturated_pool_runs_the_call_inline_without_a_hedge():
+    caller = ModelCaller(pool_size=1)
+    caller.hedge_delay = lambda kind: 0.01
+    release = threading.Event()
+    busy = caller._pool.submit(release.wait)  # the only thread is taken
+    calls = []
+
+    def create(timeout):
+        calls.append(threading.get_ident())
+        time.sleep(0.05)
+        return "ok"
+
+    try:
+        assert caller.call(create) == "ok"
+    finally:
+        release.set()
+        busy.result()
+    assert calls == [threading.get_ident()]
+    assert caller.hedges_in_flight == 0
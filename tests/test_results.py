@@ -0,0 +1,55 @@
+import pytest
+
+from results import ResultStore
+
+
+def _store(path, secret="one", **limits):
+    return ResultStore(db_path=str(path), secret=secret, sweep_interval=0, **limits)
+
+
+def _size(store):
+    stats = store.stats()
+    return stats["bytes"], stats["entries"]
+
+
+def test_a_file_store_needs_a_secret(tmp_path):
+    with pytest.raises(ValueError, match="CV_RESULTS_SECRET"):
+        ResultStore(db_path=str(tmp_path / "results.db"))
+    ResultStore()  # the in-memory store makes its own key
+
+
+def test_a_result_written_under_another_secret_is_a_miss(tmp_path):
+    path = tmp_path / "results.db"
+    token = _store(path).put({"full_name": "Ada"}, "docx", b"file", "cv.docx", "application/octet-stream")
+    other = _store(path, secret="two")
+    assert other.get(token) is None
+    assert other.get_file(token) is None
+    assert _store(path).get_file(token)[0] == b"file"
+
+
+def test_totals_follow_writes_replacements_and_deletes(tmp_path):
+    store = _store(tmp_path / "results.db")
+    token = store.put({"full_name": "Ada"}, "docx", b"x" * 100, "cv.docx", "application/octet-stream")
+    store.add_file(token, "pdf", b"y" * 100, "cv.pdf", "application/pdf")
+    store.add_file(token, "pdf", b"y" * 500, "cv.pdf", "application/pdf")
+    size, entries = _size(store)
+    stored = store._connection().execute(
+        "SELECT (SELECT SUM(LENGTH(structured)) FROM cv_results) + (SELECT SUM(LENGTH(data)) FROM cv_result_files)"
+    ).fetchone()[0]
+    assert (size, entries) == (stored, 1)
+    store.forget(token)
+    assert _size(store) == (0, 0)
+
+
+def test_least_recently_used_entries_are_evicted_over_the_caps(tmp_path):
+    store = _store(tmp_path / "results.db", max_entries=2)
+    tokens = [store.put({"n": n}, "docx", b"x", "cv.docx", "application/octet-stream") for n in range(3)]
+    assert store.get(tokens[0]) is None
+    assert [store.get(token)["structured"]["n"] for token in tokens[1:]] == [1, 2]
+    assert _size(store)[1] == 2
+
+    one_entry = _size(store)[0] // 2
+    store.max_bytes = one_entry + one_entry // 2
+    big = store.put({"n": 3}, "docx", b"z" * (10 * one_entry), "cv.docx", "application/octet-stream")
+    assert store.get(big) is not None  # the newest entry stays even when it alone is over the cap
+    assert _size(store)[1] == 1
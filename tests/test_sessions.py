@@ -0,0 +1,119 @@
+import json
+import re
+import types
+
+import pytest
+
+from backend_1 import CVProcessor
+from llm_cache import LLMResultCache
+from sessions import OTHER_SECTION, SECTION_FIELDS, SessionStore, changed_sections, section_of
+
+RAW_CV = {
+    "full_name": "Ada Lovelace",
+    "email": "ada@example.com",
+    "professional_summary": "Mathematician.",
+    "technical_skills": ["Python"],
+    "work_experience": [{"position": "Analyst", "company": "Engine Co"}],
+}
+SESSION = "session-0001"
+
+
+def test_section_of_maps_fields_and_aliases():
+    assert section_of("email") == "header"
+    assert section_of("soft_skills") == "skills"
+    assert section_of("summary") == "professional_summary"
+    assert section_of("hobbies") == OTHER_SECTION
+
+
+def test_changed_sections_ignores_whitespace_and_key_order():
+    old = {"full_name": "Ada", "technical_skills": ["Python", "SQL"],
+           "work_experience": [{"position": "Analyst", "company": "X"}]}
+    same = {"work_experience": [{"company": "X ", "position": "Analyst"}],
+            "full_name": " Ada", "technical_skills": ["Python", "SQL"]}
+    assert changed_sections(old, same) == []
+
+    edited = dict(old, technical_skills=["Python", "Rust"], hobbies="chess")
+    assert changed_sections(old, edited) == ["skills", OTHER_SECTION]
+
+
+def test_the_session_store_keys_entries_by_session_and_fingerprint():
+    sessions = SessionStore(LLMResultCache(max_entries=10))
+    sessions.put(SESSION, "prompt-v1", {"full_name": "Ada"}, {"full_name": "Ada"})
+
+    assert sessions.get(SESSION, "prompt-v1")["input"] == {"full_name": "Ada"}
+    assert sessions.get(SESSION, "prompt-v2") is None
+    assert sessions.get("other-session", "prompt-v1") is None
+
+    sessions.forget(SESSION)
+    assert sessions.get(SESSION, "prompt-v1") is None
+
+
+@pytest.mark.parametrize("session_id", ["short", "has spaces in it", "x" * 65, None, 12345678])
+def test_invalid_session_ids_are_never_stored(session_id):
+    sessions = SessionStore(LLMResultCache(max_entries=10))
+    sessions.put(session_id, "fp", {}, {})
+
+    assert not SessionStore.is_valid_id(session_id)
+    assert sessions.get(session_id, "fp") is None
+    assert len(sessions.store._memory) == 0
+
+
+class _FieldCompletions:
+    """Answers with the requested keys only, taken from `answer`."""
+
+    def __init__(self, answer):
+        self.answer = answer
+        self.asked = []
+
+    def create(self, **kwargs):
+        user = kwargs["messages"][-1]["content"]
+        keys = re.search(r"ONLY these keys: (.*)$", user).group(1).split(", ")
+        self.asked.append((keys, json.loads(user.split("\n", 1)[1].split("\n\n")[0])))
+        message = types.SimpleNamespace(content=json.dumps({key: self.answer[key] for key in keys}))
+        return types.SimpleNamespace(choices=[types.SimpleNamespace(message=message)], usage=None)
+
+
+def _processor(completions):
+    return CVProcessor(client=types.SimpleNamespace(chat=types.SimpleNamespace(completions=completions)),
+                       mode="llm")
+
+
+def test_process_changes_sends_only_the_edited_section(monkeypatch):
+    monkeypatch.setenv("CV_REPAIR_REASK", "0")
+    previous_structured = {"full_name": "Ada Lovelace", "technical_skills": ["Python"], "soft_skills": [],
+                           "work_experience": [{"position": "Analyst"}]}
+    completions = _FieldCompletions({"technical_skills": ["Python", "Rust"], "soft_skills": []})
+    processor = _processor(completions)
+    previous_input = processor.clean(dict(RAW_CV))
+
+    edited = dict(RAW_CV, technical_skills=["Python", "Rust"])
+    structured, regenerated = processor.process_changes(edited, previous_input, previous_structured)
+
+    assert regenerated == ["skills"]
+    (keys, sent), = completions.asked
+    assert keys == ["technical_skills"]
+    assert set(sent) == {"technical_skills"}
+    assert structured["technical_skills"] == ["Python", "Rust"]
+    assert structured["work_experience"] == previous_structured["work_experience"]
+
+
+def test_process_changes_without_edits_makes_no_model_call():
+    completions = _FieldCompletions({})
+    processor = _processor(completions)
+    previous = {"full_name": "Ada Lovelace"}
+
+    structured, regenerated = processor.process_changes(dict(RAW_CV), processor.clean(dict(RAW_CV)), previous)
+
+    assert (structured, regenerated) == (previous, [])
+    assert completions.asked == []
+
+
+def test_an_edit_outside_the_schema_regenerates_everything(monkeypatch):
+    processor = _processor(_FieldCompletions({}))
+    monkeypatch.setattr(processor, "process", lambda data: {"full": True})
+
+    structured, regenerated = processor.process_changes(dict(RAW_CV, hobbies="chess"),
+                                                        processor.clean(dict(RAW_CV)), {})
+
+    assert structured == {"full": True}
+    assert regenerated == list(SECTION_FIELDS)
@@ -0,0 +1,47 @@
+import os
+
+import pytest
+
+from static_assets import Asset, clear_bundle, read_bundle, write_bundle
+
+
+def small_bundle():
+    return {
+        "index.html": Asset("index.html", b"<html></html>", {"gzip": b"gz"}),
+        "Assets/app.js": Asset("Assets/app.js", b"x", {}, immutable=True),
+    }
+
+
+def test_rebuild_removes_only_the_previous_build(tmp_path):
+    write_bundle(small_bundle(), str(tmp_path), {})
+    (tmp_path / "keep.txt").write_text("not ours")
+
+    clear_bundle(str(tmp_path))
+
+    assert sorted(os.listdir(tmp_path)) == ["keep.txt"]
+    write_bundle(small_bundle(), str(tmp_path), {})
+    bundle, _ = read_bundle(str(tmp_path))
+    assert sorted(bundle) == ["Assets/app.js", "index.html"]
+
+
+def test_refuses_a_directory_that_is_not_a_build(tmp_path):
+    (tmp_path / "important.py").write_text("print('hi')")
+    with pytest.raises(ValueError):
+        clear_bundle(str(tmp_path))
+    assert (tmp_path / "important.py").exists()
+
+
+def test_refuses_a_manifest_pointing_outside(tmp_path):
+    outside = tmp_path / "outside.txt"
+    outside.write_text("x")
+    build = tmp_path / "public"
+    build.mkdir()
+    (build / "manifest.json").write_text('{"sources": {}, "files": {"../outside.txt": {}}}')
+    with pytest.raises(ValueError):
+        clear_bundle(str(build))
+    assert outside.exists()
+
+
+def test_empty_directory_is_fine(tmp_path):
+    clear_bundle(str(tmp_path))
+    assert os.listdir(tmp_path) == []
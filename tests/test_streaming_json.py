@@ -0,0 +1,41 @@
+import json
+
+import pytest
+
+from streaming_json import TopLevelKeyParser
+
+ANSWER = {
+    "full_name": "Ada \"Countess\" Lovelace",
+    "links": {"github": "github.com/ada", "note": "braces } and ] in a string"},
+    "technical_skills": ["Python", "C\\C++", "{curly}"],
+    "summary": "Line one,\nline two",
+}
+
+
+def _feed_in_chunks(text, size):
+    parser = TopLevelKeyParser()
+    members = []
+    for start in range(0, len(text), size):
+        members.extend(parser.feed(text[start:start + size]))
+    return parser, members
+
+
+@pytest.mark.parametrize("size", [1, 3, 7, 64, 10000])
+def test_every_member_comes_out_whole_however_the_text_is_split(size):
+    text = "Here is the CV:\n```json\n" + json.dumps(ANSWER, indent=2) + "\n```\nanything after"
+    parser, members = _feed_in_chunks(text, size)
+    assert dict(members) == ANSWER
+    assert parser.keys == list(ANSWER) and parser.finished
+
+
+def test_a_member_is_emitted_as_soon_as_it_is_closed():
+    parser = TopLevelKeyParser()
+    assert parser.feed('{"full_name": "Ada", "job_') == [("full_name", "Ada")]
+    assert parser.feed('title": "Engineer"') == []
+    assert parser.feed("}") == [("job_title", "Engineer")]
+    assert parser.feed(', "late": 1}') == []
+
+
+def test_a_malformed_member_is_skipped_and_parsing_goes_on():
+    _, members = _feed_in_chunks('{"broken": tru, "email": "ada@example.com"}', 5)
+    assert members == [("email", "ada@example.com")]
@@ -0,0 +1,57 @@
+import os
+import subprocess
+import sys
+import threading
+
+import app
+import cv_generator
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+from import_budget import measure_once  # noqa: E402
+
+
+def test_importing_the_app_does_not_load_the_llm_or_docx_stacks():
+    _, heavy = measure_once()
+
+    assert heavy == []
+
+
+def test_the_backend_does_not_import_the_generator():
+    probe = "import sys, backend_1; print('cv_generator' in sys.modules, 'docx' in sys.modules)"
+    output = subprocess.run([sys.executable, "-c", probe], cwd=ROOT,
+                            capture_output=True, text=True, check=True).stdout
+
+    assert output.split() == ["False", "False"]
+
+
+def test_warm_up_runs_in_the_background_unless_off(monkeypatch):
+    ran = threading.Event()
+    monkeypatch.setattr(app, "_background_warm_up", ran.set)
+
+    app.start_warm_up("off")
+    assert not ran.wait(0.2)
+
+    app.start_warm_up("background")
+    assert ran.wait(5)
+
+
+def test_preload_builds_the_template_without_a_client(monkeypatch):
+    import fast_docx
+    import llm_client
+
+    def no_client(*args, **kwargs):
+        raise AssertionError("preload must not build the HTTP client")
+
+    monkeypatch.setattr(app, "WARMED_UP", threading.Event())
+    monkeypatch.setattr(cv_generator, "_template_bytes", None)
+    monkeypatch.setattr(fast_docx, "_parts", None)
+    monkeypatch.setattr(llm_client, "get_client", no_client)
+    client = app.app.test_client()
+    assert client.get("/api/health").get_json()["warm"] is False
+
+    app.start_warm_up("preload")
+
+    assert cv_generator._template_bytes is not None
+    assert fast_docx._parts is not None
+    assert client.get("/api/health").get_json()["warm"] is True